@@ -0,0 +1,132 @@
+"""
+Shared helpers for the local BookArc benchmark harness
+
+Loads the Lambda layers and handlers straight from the repo (their file
+names are hyphenated, so they are imported by path and registered under
+the module names the handlers import) and opens connections to the local
+benchmark database.
+
+The database defaults match docker-compose.yml; override with the usual
+DB_HOST / DB_PORT / DB_USER / DB_PASSWORD / DB_NAME variables.
+BENCH_SOURCE_DIR points the loaders at another checkout's backend/
+directory (run_benchmarks.py --revision sets it).
+"""
+
+import os
+import re
+import sys
+import importlib.util
+
+import pymysql
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+SOURCE_DIR = os.environ.get('BENCH_SOURCE_DIR') or BACKEND_DIR
+LAYERS_DIR = os.path.join(SOURCE_DIR, 'layers')
+HANDLERS_DIR = os.path.join(SOURCE_DIR, 'lambda-functions')
+MIGRATIONS_DIR = os.path.join(BACKEND_DIR, 'database', 'migrations')
+SCHEMA_FILE = os.path.join(BENCH_DIR, 'schema.sql')
+
+DB_DEFAULTS = {
+    'DB_HOST': '127.0.0.1',
+    'DB_PORT': '3307',
+    'DB_USER': 'root',
+    'DB_PASSWORD': 'bookarc',
+    'DB_NAME': 'bookarc_bench',
+}
+
+# Layers that need packages the harness does not require (e.g. NumPy)
+# are skipped when their imports fail
+_loaded_layers = {}
+_loaded_handlers = {}
+
+
+def configure_environment():
+    """Fill in DB_* defaults so the layers connect to the local database"""
+    for key, value in DB_DEFAULTS.items():
+        os.environ.setdefault(key, value)
+    os.environ.setdefault('AWS_LAMBDA_FUNCTION_NAME', 'bookarc-benchmark')
+
+
+def layer_module_name(filename):
+    """bookarc-dbConnection.py -> db_connection"""
+    stem = filename[len('bookarc-'):-len('.py')]
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', stem).lower()
+
+
+def _load_file(module_name, path):
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_layers():
+    """Import every layer under the name the handlers use"""
+    configure_environment()
+
+    # query_metrics and db_connection first, everything else may import them
+    ordered = sorted(
+        (f for f in os.listdir(LAYERS_DIR) if f.startswith('bookarc-') and f.endswith('.py')),
+        key=lambda f: (f not in ('bookarc-queryMetrics.py', 'bookarc-dbConnection.py'),
+                       f != 'bookarc-queryMetrics.py', f)
+    )
+    # Layers may import each other; retry until a pass loads nothing new
+    pending = [f for f in ordered if layer_module_name(f) not in _loaded_layers]
+    errors = {}
+    while pending:
+        failed = []
+        for filename in pending:
+            name = layer_module_name(filename)
+            try:
+                _loaded_layers[name] = _load_file(name, os.path.join(LAYERS_DIR, filename))
+            except ImportError as e:
+                sys.modules.pop(name, None)
+                errors[name] = e
+                failed.append(filename)
+        if len(failed) == len(pending):
+            break
+        pending = failed
+    for filename in pending:
+        name = layer_module_name(filename)
+        print(f"Skipping layer {name}: {errors[name]}", file=sys.stderr)
+    return _loaded_layers
+
+
+def load_handler(name):
+    """Load backend/lambda-functions/bookarc-<name>.py as a module"""
+    if name not in _loaded_handlers:
+        load_layers()
+        path = os.path.join(HANDLERS_DIR, f'bookarc-{name}.py')
+        _loaded_handlers[name] = _load_file(f'bench_handler_{name}', path)
+    return _loaded_handlers[name]
+
+
+def connect(database=True, **kwargs):
+    """Open a direct connection (not the layer's shared one)"""
+    configure_environment()
+    return pymysql.connect(
+        host=os.environ['DB_HOST'],
+        port=int(os.environ['DB_PORT']),
+        user=os.environ['DB_USER'],
+        password=os.environ['DB_PASSWORD'],
+        database=os.environ['DB_NAME'] if database else None,
+        charset='utf8mb4',
+        autocommit=False,
+        **kwargs
+    )
+
+
+def split_sql(script):
+    """Split a .sql file into statements (no procedures/delimiters in ours)"""
+    lines = [line for line in script.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+
+def migration_files():
+    return sorted(
+        os.path.join(MIGRATIONS_DIR, f)
+        for f in os.listdir(MIGRATIONS_DIR)
+        if f.endswith('.sql')
+    )
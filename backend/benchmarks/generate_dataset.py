@@ -0,0 +1,278 @@
+"""
+Generate a synthetic BookArc dataset in the local benchmark database
+
+Creates the schema (schema.sql + every migration), then bulk-loads
+deterministic fake data shaped like production: a handful of popular
+books and prolific users get most of the activity.
+
+Usage:
+    python generate_dataset.py --scale small
+    python generate_dataset.py --scale medium --seed 7
+    python generate_dataset.py --books 250000 --users 40000 --ratings 2000000
+
+Every user gets cognito_sub 'bench-sub-<user_id>'; user 1 is an admin.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import bench_common
+
+SCALES = {
+    'small': {'books': 10_000, 'users': 5_000, 'ratings': 100_000, 'follows': 50_000, 'notifications': 100_000},
+    'medium': {'books': 100_000, 'users': 50_000, 'ratings': 1_000_000, 'follows': 500_000, 'notifications': 1_000_000},
+    'large': {'books': 1_000_000, 'users': 200_000, 'ratings': 10_000_000, 'follows': 2_000_000, 'notifications': 5_000_000},
+}
+
+GENRES = [
+    'Fantasy', 'Science Fiction', 'Mystery', 'Thriller', 'Romance', 'Horror',
+    'Historical Fiction', 'Literary Fiction', 'Young Adult', 'Children',
+    'Biography', 'Memoir', 'History', 'Science', 'Philosophy', 'Poetry',
+    'Self-Help', 'Business', 'Travel', 'Cooking', 'Art', 'Religion',
+    'Graphic Novel', 'Classics', 'Adventure', 'Dystopian', 'Crime',
+    'Psychology', 'Politics', 'Humor',
+]
+WORDS = [
+    'shadow', 'river', 'empire', 'silent', 'garden', 'winter', 'crown', 'glass',
+    'storm', 'forgotten', 'midnight', 'stone', 'golden', 'last', 'hidden',
+    'city', 'ocean', 'fire', 'north', 'secret', 'house', 'star', 'iron',
+    'library', 'letter', 'mountain', 'song', 'wild', 'broken', 'light',
+]
+FIRST_NAMES = ['Ada', 'Omar', 'Lina', 'Karim', 'Maya', 'Sami', 'Nour', 'Leo', 'Rita', 'Hadi', 'Zara', 'Elie']
+LAST_NAMES = ['Haddad', 'Khoury', 'Saleh', 'Nasser', 'Rahme', 'Aoun', 'Fares', 'Issa', 'Mansour', 'Karam']
+DEFAULT_LISTS = ['Want to Read', 'Currently Reading', 'Read']
+READING_STATUSES = ['reading', 'completed', 'planned', 'dropped', 'on_hold']
+EVENT_TYPES = ['view', 'view', 'view', 'view', 'add_to_list', 'rate', 'review', 'complete']
+NOTIFICATION_TYPES = ['new_follower', 'author_update', 'book_approval', 'profile_update']
+
+CHUNK_SIZE = 5000
+
+
+def skewed(rng, n, exponent=3.0):
+    """Index in [0, n) biased towards 0 (popular items have low ids)"""
+    return min(int(n * rng.random() ** exponent), n - 1)
+
+
+def unique_pairs(rng, count, n_left, n_right, exponent_left=2.0, exponent_right=3.0, allow_self=True):
+    """Yield `count` distinct (left, right) 1-based id pairs with skewed popularity"""
+    count = min(count, n_left * n_right - (0 if allow_self else min(n_left, n_right)))
+    seen = set()
+    while len(seen) < count:
+        pair = (skewed(rng, n_left, exponent_left) + 1, skewed(rng, n_right, exponent_right) + 1)
+        if not allow_self and pair[0] == pair[1]:
+            continue
+        if pair not in seen:
+            seen.add(pair)
+            yield pair
+
+
+def insert_rows(cursor, table, columns, rows):
+    """Insert an iterable of tuples in multi-row chunks; returns the row count"""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    chunk = []
+    total = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK_SIZE:
+            cursor.executemany(sql, chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        cursor.executemany(sql, chunk)
+        total += len(chunk)
+    return total
+
+
+def create_schema(connection):
+    """Drop and recreate the benchmark database with schema + migrations"""
+    database = os.environ['DB_NAME']
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+        cursor.execute(f"CREATE DATABASE `{database}` CHARACTER SET utf8mb4")
+        cursor.execute(f"USE `{database}`")
+
+        files = [bench_common.SCHEMA_FILE] + bench_common.migration_files()
+        for path in files:
+            with open(path) as f:
+                for statement in bench_common.split_sql(f.read()):
+                    cursor.execute(statement)
+            print(f"  applied {path.split('backend/')[-1]}")
+    connection.commit()
+
+
+def generate(connection, counts, seed):
+    rng = random.Random(seed)
+    now = datetime.now()
+    n_books, n_users = counts['books'], counts['users']
+    n_authors = max(n_books // 5, 1)
+    n_genres = len(GENRES)
+
+    def past(days):
+        return now - timedelta(seconds=rng.randint(0, days * 86400))
+
+    with connection.cursor() as cursor:
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+        cursor.execute("SET UNIQUE_CHECKS = 0")
+
+        def step(name, table, columns, rows):
+            started = time.monotonic()
+            written = insert_rows(cursor, table, columns, rows)
+            connection.commit()
+            print(f"  {name}: {written:,} rows in {time.monotonic() - started:.1f}s")
+
+        def users():
+            for user_id in range(1, n_users + 1):
+                if user_id == 1:
+                    role = 'admin'
+                elif user_id % 20 == 0:
+                    role = 'author'
+                elif user_id % 10 == 0:
+                    role = 'premium'
+                else:
+                    role = 'normal'
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                yield (
+                    user_id, f'bench-sub-{user_id}', f'{first.lower()}{user_id}',
+                    f'{first} {last}', f'user{user_id}@bench.bookarc.local', role,
+                    rng.random() > 0.1, past(1500)
+                )
+
+        step('users', 'users',
+             ['user_id', 'cognito_sub', 'username', 'display_name', 'email', 'role', 'is_public', 'join_date'],
+             users())
+
+        step('genres', 'genres', ['genre_id', 'genre_name'],
+             ((i + 1, name) for i, name in enumerate(GENRES)))
+
+        author_users = list(range(20, n_users + 1, 20))
+
+        def authors():
+            for author_id in range(1, n_authors + 1):
+                linked = author_users[author_id - 1] if author_id <= len(author_users) else None
+                yield (
+                    author_id, f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {author_id}',
+                    linked, linked is not None, linked is not None and rng.random() > 0.5
+                )
+
+        step('authors', 'authors', ['author_id', 'name', 'user_id', 'is_registered_author', 'verified'], authors())
+
+        def books():
+            for book_id in range(1, n_books + 1):
+                title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).title()
+                status = 'approved' if rng.random() > 0.03 else rng.choice(['pending', 'rejected'])
+                yield (
+                    book_id, title, f'A story about {title.lower()}.', f'978{book_id:010d}',
+                    (now - timedelta(days=rng.randint(0, 365 * 80))).date(),
+                    f'https://covers.bench.bookarc.local/{book_id}.jpg', status, past(1000)
+                )
+
+        step('books', 'books',
+             ['book_id', 'title', 'summary', 'isbn', 'publish_date', 'cover_image_url', 'approval_status', 'created_at'],
+             books())
+
+        step('book_author', 'book_author', ['book_id', 'author_id'],
+             ((book_id, (book_id - 1) % n_authors + 1) for book_id in range(1, n_books + 1)))
+
+        def book_genres():
+            for book_id in range(1, n_books + 1):
+                for genre_id in rng.sample(range(1, n_genres + 1), rng.randint(1, 3)):
+                    yield (book_id, genre_id)
+
+        step('book_genre', 'book_genre', ['book_id', 'genre_id'], book_genres())
+
+        def favorite_genres():
+            for user_id in range(1, n_users + 1):
+                for genre_id in rng.sample(range(1, n_genres + 1), rng.randint(0, 4)):
+                    yield (user_id, genre_id)
+
+        step('user_favorite_genres', 'user_favorite_genres', ['user_id', 'genre_id'], favorite_genres())
+
+        step('ratings', 'ratings', ['user_id', 'book_id', 'rating_value', 'created_at'],
+             ((u, b, rng.choices([1, 2, 3, 4, 5], [1, 2, 4, 6, 5])[0], past(1000))
+              for u, b in unique_pairs(rng, counts['ratings'], n_users, n_books)))
+
+        step('reviews', 'reviews', ['user_id', 'book_id', 'review_text', 'created_at'],
+             ((u, b, f'Review of book {b} by user {u}.', past(1000))
+              for u, b in unique_pairs(rng, counts['ratings'] // 5, n_users, n_books)))
+
+        step('user_reading_status', 'user_reading_status', ['user_id', 'book_id', 'status'],
+             ((u, b, rng.choice(READING_STATUSES))
+              for u, b in unique_pairs(rng, counts['ratings'] // 2, n_users, n_books)))
+
+        step('lists', 'lists', ['list_id', 'user_id', 'name', 'title', 'visibility'],
+             ((i * len(DEFAULT_LISTS) + j + 1, i + 1, name, name, 'private' if j else 'public')
+              for i in range(n_users) for j, name in enumerate(DEFAULT_LISTS)))
+
+        n_lists = n_users * len(DEFAULT_LISTS)
+        step('list_books', 'list_books', ['list_id', 'book_id', 'added_at'],
+             ((l, b, past(500)) for l, b in unique_pairs(rng, counts['ratings'] // 2, n_lists, n_books, 1.5)))
+
+        step('user_follow_user', 'user_follow_user', ['follower_id', 'following_id', 'followed_at'],
+             ((f, t, past(1000)) for f, t in unique_pairs(rng, counts['follows'], n_users, n_users, 1.5, 3.0, False)))
+
+        step('user_follow_author', 'user_follow_author', ['user_id', 'author_id', 'followed_at'],
+             ((u, a, past(1000)) for u, a in unique_pairs(rng, counts['follows'] // 2, n_users, n_authors)))
+
+        step('notification_preferences', 'notification_preferences', ['user_id'],
+             ((user_id,) for user_id in range(1, n_users + 1)))
+
+        step('notifications', 'notifications', ['user_id', 'message', 'type', 'audience_type', 'is_read', 'created_at'],
+             ((skewed(rng, n_users, 2.0) + 1, f'Synthetic notification {i}', rng.choice(NOTIFICATION_TYPES),
+               'all', rng.random() > 0.3, past(365))
+              for i in range(counts['notifications'])))
+
+        epoch = int(now.timestamp())
+        step('interaction_events', 'interaction_events', ['user_id', 'book_id', 'event_type', 'event_value', 'timestamp'],
+             ((skewed(rng, n_users, 2.0) + 1, skewed(rng, n_books) + 1, event_type,
+               rng.randint(1, 5) if event_type == 'rate' else None, epoch - rng.randint(0, 90 * 86400))
+              for event_type in (rng.choice(EVENT_TYPES) for _ in range(counts['ratings']))))
+
+        cursor.execute("SET UNIQUE_CHECKS = 1")
+        cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+    bench_common.load_layers()
+    from book_stats import rebuild_book_stats
+    from user_counters import rebuild_user_counters
+    with connection.cursor() as cursor:
+        started = time.monotonic()
+        rebuilt = rebuild_book_stats(cursor)
+        connection.commit()
+        print(f"  book_stats: {rebuilt:,} books in {time.monotonic() - started:.1f}s")
+
+        started = time.monotonic()
+        rebuilt = rebuild_user_counters(cursor)
+        connection.commit()
+        print(f"  user_counters: {rebuilt:,} users in {time.monotonic() - started:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+    parser.add_argument('--seed', type=int, default=42)
+    for name in SCALES['small']:
+        parser.add_argument(f'--{name}', type=int, help=f'override the {name} count of the scale')
+    args = parser.parse_args(argv)
+
+    counts = dict(SCALES[args.scale])
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+
+    print(f"Generating dataset {counts} (seed={args.seed})")
+    connection = bench_common.connect(database=False)
+    try:
+        create_schema(connection)
+        generate(connection, counts, args.seed)
+    finally:
+        connection.close()
+    print("Done")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
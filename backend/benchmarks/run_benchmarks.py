@@ -0,0 +1,365 @@
+"""
+Benchmark BookArc Lambda handlers against the local synthetic dataset
+
+Invokes each handler in-process with API Gateway-style events and
+reports p50/p95/p99 latency, DB queries per invocation and peak Python
+memory per endpoint. Query counts come from the query_metrics layer, so
+they are exactly what the deployed function would log.
+
+Usage:
+    python run_benchmarks.py                              # all scenarios
+    python run_benchmarks.py -k books -n 200              # scenarios matching "books"
+    python run_benchmarks.py --revision main --save-baseline baseline.json
+    python run_benchmarks.py --compare baseline.json --max-regression 20
+
+--revision benchmarks the handlers and layers of another git revision
+against the same dataset, so a before/after pair comes from one harness.
+--compare exits with status 1 when a scenario's p95 grows by more than
+--max-regression percent or it issues more queries than the baseline.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import bench_common
+
+MEMORY_ITERATIONS = 5
+
+
+def claims(sub):
+    return {'authorizer': {'claims': {'sub': sub}}}
+
+
+def api_event(method, resource, sub=None, path=None, query=None, body=None):
+    """Minimal API Gateway (REST, proxy integration) event"""
+    return {
+        'httpMethod': method,
+        'resource': resource,
+        'path': resource,
+        'pathParameters': path,
+        'queryStringParameters': query,
+        'body': json.dumps(body) if body is not None else None,
+        'requestContext': claims(sub) if sub else {},
+    }
+
+
+# name -> (handler file, function, event factory)
+SCENARIOS = {
+    'getBooks.list': ('getBooks', 'handler', lambda c: api_event(
+        'GET', '/books', query={'limit': '50'})),
+    'getBooks.list_genre': ('getBooks', 'handler', lambda c: api_event(
+        'GET', '/books', query={'limit': '50', 'genre': c.rng.choice(c.genres)})),
+    'getBooks.search': ('getBooks', 'handler', lambda c: api_event(
+        'GET', '/books/search', query={'q': c.rng.choice(c.author_terms), 'limit': '20'})),
+    'getBooks.detail': ('getBooks', 'handler', lambda c: api_event(
+        'GET', '/books/{id}', path={'id': str(c.book())})),
+    'bookRecommendation': ('bookRecommendation', 'lambda_handler', lambda c: api_event(
+        'GET', '/recommendations', sub=c.user_sub(), query={'num_results': '10'})),
+    'getAdminBooks.page100': ('getAdminBooks', 'lambda_handler', lambda c: api_event(
+        'GET', '/admin/books', sub=c.admin_sub, query={'limit': '100', 'page': str(c.rng.randint(1, 20))})),
+    'getNotifications': ('getNotifications', 'lambda_handler', lambda c: api_event(
+        'GET', '/notifications', sub=c.user_sub(active=True))),
+    'searchAuthors': ('searchAuthors', 'lambda_handler', lambda c: api_event(
+        'GET', '/author', query={'q': c.rng.choice(c.author_terms)})),
+    'searchUsers': ('searchUsers', 'lambda_handler', lambda c: api_event(
+        'GET', '/users/search', sub=c.user_sub(), query={'q': c.rng.choice(c.user_terms)})),
+    'getUserStats': ('getUserStats', 'lambda_handler', lambda c: api_event(
+        'GET', '/users/{userId}/stats', sub=c.user_sub(), path={'userId': str(c.user(active=True))})),
+    'getUserFollowers': ('getUserFollowers', 'lambda_handler', lambda c: api_event(
+        'GET', '/users/{user_id}/followers', sub=c.user_sub(), path={'user_id': str(c.user(active=True))})),
+    'getUserFollowing': ('getUserFollowing', 'lambda_handler', lambda c: api_event(
+        'GET', '/users/{user_id}/following', sub=c.user_sub(), path={'user_id': str(c.user(active=True))})),
+    # Alternate follow/unfollow of one pair so every call is a write
+    'followUser.toggle': ('followUser', 'lambda_handler', lambda c: api_event(
+        'POST', '/users/{user_id}/follow', sub=c.follower_sub, path={'user_id': str(c.active_users[0])},
+        body={'action': c.follow_toggle('user')})),
+    'followAuthor.toggle': ('followAuthorHandler', 'lambda_handler', lambda c: api_event(
+        'POST', '/authors/{author_id}/follow', sub=c.follower_sub, path={'author_id': str(c.author_id)},
+        body={'action': c.follow_toggle('author')})),
+    'recordInteraction.batch20': ('recordInteraction', 'lambda_handler', lambda c: api_event(
+        'POST', '/interactions', sub=c.user_sub(), body={'events': [
+            {'book_id': c.book(), 'event_type': 'view', 'event_id': f'bench-{c.rng.getrandbits(64):x}'}
+            for _ in range(20)
+        ]})),
+}
+
+
+class Context:
+    """Ids sampled from the dataset so events hit realistic rows"""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.following = {}
+        connection = bench_common.connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT (SELECT MAX(user_id) FROM users), (SELECT MAX(book_id) FROM books)")
+                self.max_user, self.max_book = cursor.fetchone()
+                cursor.execute("SELECT cognito_sub FROM users WHERE role = 'admin' ORDER BY user_id LIMIT 1")
+                self.admin_sub = cursor.fetchone()[0]
+                cursor.execute("SELECT genre_name FROM genres")
+                self.genres = [row[0] for row in cursor.fetchall()]
+                # Most active users, so follower/notification endpoints have data
+                cursor.execute("""
+                    SELECT following_id FROM user_follow_user
+                    GROUP BY following_id ORDER BY COUNT(*) DESC LIMIT 200
+                """)
+                self.active_users = [row[0] for row in cursor.fetchall()] or [1]
+                cursor.execute("SELECT MIN(author_id) FROM authors WHERE is_registered_author = FALSE")
+                self.author_id = cursor.fetchone()[0] or 1
+                cursor.execute(
+                    "SELECT cognito_sub FROM users WHERE role != 'admin' AND is_active = 1 AND user_id <> %s "
+                    "ORDER BY user_id LIMIT 1",
+                    (self.active_users[0],)
+                )
+                self.follower_sub = cursor.fetchone()[0]
+                cursor.execute("SELECT name FROM authors ORDER BY author_id LIMIT 200")
+                self.author_terms = sorted({row[0].split()[0] for row in cursor.fetchall()}) or ['a']
+                cursor.execute("SELECT username FROM users ORDER BY user_id LIMIT 200")
+                self.user_terms = sorted({row[0][:3] for row in cursor.fetchall()}) or ['a']
+        finally:
+            connection.close()
+
+    def follow_toggle(self, kind):
+        """'follow' and 'unfollow' in turn, per kind"""
+        self.following[kind] = not self.following.get(kind, False)
+        return 'follow' if self.following[kind] else 'unfollow'
+
+    def user(self, active=False):
+        if active:
+            return self.rng.choice(self.active_users)
+        return self.rng.randint(1, self.max_user)
+
+    def user_sub(self, active=False):
+        return f'bench-sub-{self.user(active)}'
+
+    def book(self):
+        # Same popularity skew as the generator
+        return min(int(self.max_book * self.rng.random() ** 3), self.max_book - 1) + 1
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_scenario(name, context, iterations, warmup):
+    handler_name, function_name, make_event = SCENARIOS[name]
+    module = bench_common.load_handler(handler_name)
+    handler = getattr(module, function_name)
+
+    import query_metrics
+    # Summaries emitted during the current invoke(); older revisions print
+    # one per outermost release_connection(), so a request can emit several
+    summaries = []
+    original_summary = query_metrics.invocation_summary
+
+    def capture_summary():
+        summary = original_summary()
+        if summary is not None:
+            summaries.append(summary)
+        return summary
+
+    def invoke():
+        event = make_event(context)
+        summaries.clear()
+        # Handlers log heavily; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = handler(event, None)
+        status = result.get('statusCode', 200) if isinstance(result, dict) else 200
+        queries = sum(s['QueryCount'] for s in summaries)
+        db_ms = sum(s['DbTimeMs'] for s in summaries)
+        return status, queries, db_ms
+
+    query_metrics.invocation_summary = capture_summary
+    try:
+        for _ in range(warmup):
+            invoke()
+
+        latencies = []
+        queries = []
+        db_time = []
+        errors = 0
+        for _ in range(iterations):
+            started = time.perf_counter()
+            status, invocation_queries, invocation_db_ms = invoke()
+            latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(invocation_queries)
+            db_time.append(invocation_db_ms)
+            if status >= 400:
+                errors += 1
+
+        tracemalloc.start()
+        for _ in range(MEMORY_ITERATIONS):
+            invoke()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        query_metrics.invocation_summary = original_summary
+
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+        'queries': round(sum(queries) / len(queries), 1) if queries else 0.0,
+        'max_queries': max(queries) if queries else 0,
+        'db_ms': round(sum(db_time) / len(db_time), 2) if db_time else 0.0,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def dataset_counts():
+    connection = bench_common.connect()
+    try:
+        with connection.cursor() as cursor:
+            counts = {}
+            for table in ('books', 'users', 'ratings', 'user_follow_user', 'notifications', 'interaction_events'):
+                cursor.execute(f"SELECT COUNT(*) FROM {table}")
+                counts[table] = cursor.fetchone()[0]
+            return counts
+    finally:
+        connection.close()
+
+
+def git_revision(revision='HEAD'):
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', revision], cwd=bench_common.BENCH_DIR, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def run_at_revision(revision, argv):
+    """
+    Re-run this harness with the handlers and layers of another revision
+
+    The revision's backend/layers and backend/lambda-functions are exported
+    to a temporary directory; the harness, dataset and scenarios stay
+    those of the working tree.
+    """
+    commit = git_revision(revision)
+    if commit is None:
+        print(f"Unknown revision {revision!r}", file=sys.stderr)
+        return 2
+
+    with tempfile.TemporaryDirectory(prefix='bookarc-bench-') as workdir:
+        top = subprocess.check_output(
+            ['git', 'rev-parse', '--show-toplevel'], cwd=bench_common.BENCH_DIR, text=True
+        ).strip()
+        archive = subprocess.run(
+            ['git', 'archive', commit, 'backend/layers', 'backend/lambda-functions'],
+            cwd=top, check=True, stdout=subprocess.PIPE
+        ).stdout
+        subprocess.run(['tar', '-x', '-C', workdir], input=archive, check=True)
+
+        env = dict(os.environ, BENCH_SOURCE_DIR=os.path.join(workdir, 'backend'), BENCH_REVISION=commit)
+        print(f"Benchmarking revision {commit}", file=sys.stderr)
+        return subprocess.call([sys.executable, os.path.abspath(__file__)] + argv, env=env)
+
+
+def print_report(results, baseline=None):
+    header = f"{'scenario':<28}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}{'db ms':>9}{'peak KiB':>10}{'err':>5}"
+    if baseline:
+        header += f"{'p95 Δ':>9}{'q Δ':>7}"
+    print(header)
+    print('-' * len(header))
+    for name, r in results.items():
+        line = (f"{name:<28}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                f"{r['queries']:>9.1f}{r['db_ms']:>9.2f}{r['peak_kib']:>10.1f}{r['errors']:>5}")
+        base = (baseline or {}).get(name)
+        if base:
+            p95_delta = (r['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 if base['p95_ms'] else 0.0
+            line += f"{p95_delta:>+8.1f}%{r['queries'] - base['queries']:>+7.1f}"
+        print(line)
+
+
+def regressions(results, baseline, max_regression):
+    failed = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base['p95_ms'] and (r['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100 > max_regression:
+            failed.append(f"{name}: p95 {base['p95_ms']}ms -> {r['p95_ms']}ms")
+        if r['queries'] > base['queries']:
+            failed.append(f"{name}: queries {base['queries']} -> {r['queries']}")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', '--filter', help='only run scenarios whose name contains this text')
+    parser.add_argument('-n', '--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save-baseline', metavar='PATH')
+    parser.add_argument('--compare', metavar='PATH')
+    parser.add_argument('--max-regression', type=float, default=20.0, help='allowed p95 growth in percent')
+    parser.add_argument('--revision', help='benchmark the handlers and layers of this git revision instead')
+    args = parser.parse_args(argv)
+
+    # The re-run process sees --revision too; BENCH_SOURCE_DIR marks it
+    if args.revision and not os.environ.get('BENCH_SOURCE_DIR'):
+        return run_at_revision(args.revision, sys.argv[1:] if argv is None else argv)
+
+    names = [name for name in SCENARIOS if not args.filter or args.filter in name]
+    if not names:
+        parser.error(f"no scenario matches {args.filter!r}; available: {', '.join(SCENARIOS)}")
+
+    bench_common.load_layers()
+    context = Context(args.seed)
+
+    results = {}
+    for name in names:
+        print(f"Running {name} ({args.iterations} iterations)...", file=sys.stderr)
+        results[name] = run_scenario(name, context, args.iterations, args.warmup)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+
+    print_report(results, baseline)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created_at': datetime.now().isoformat(timespec='seconds'),
+                    'git_revision': os.environ.get('BENCH_REVISION') or git_revision(),
+                    'iterations': args.iterations,
+                    'dataset': dataset_counts(),
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.save_baseline}")
+
+    if baseline:
+        failed = regressions(results, baseline, args.max_regression)
+        if failed:
+            print("\nRegressions:")
+            for line in failed:
+                print(f"  {line}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,311 @@
+-- Base BookArc schema for the local benchmark database.
+--
+-- Reconstructed from docs/erd (diagrams + erd-description.md) and the
+-- columns the Lambda handlers read and write. The harness applies this
+-- first and then every backend/database/migrations/*.sql file in order,
+-- so tables/columns added by migrations are intentionally absent here.
+
+CREATE TABLE IF NOT EXISTS users (
+    user_id BIGINT NOT NULL AUTO_INCREMENT,
+    cognito_sub VARCHAR(200) NOT NULL,
+    username VARCHAR(50) NOT NULL,
+    display_name VARCHAR(100) NULL,
+    email VARCHAR(255) NOT NULL,
+    profile_image VARCHAR(500) NULL,
+    bio TEXT NULL,
+    location VARCHAR(100) NULL,
+    website VARCHAR(255) NULL,
+    role ENUM('normal', 'premium', 'author', 'admin') NOT NULL DEFAULT 'normal',
+    is_public BOOLEAN NOT NULL DEFAULT TRUE,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    verification_status ENUM('none', 'pending', 'approved', 'rejected') NOT NULL DEFAULT 'none',
+    verified_at DATETIME NULL,
+    join_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id),
+    UNIQUE KEY uq_users_cognito_sub (cognito_sub),
+    UNIQUE KEY uq_users_username (username),
+    UNIQUE KEY uq_users_email (email)
+);
+
+CREATE TABLE IF NOT EXISTS authors (
+    author_id BIGINT NOT NULL AUTO_INCREMENT,
+    name VARCHAR(255) NOT NULL,
+    bio TEXT NULL,
+    user_id BIGINT NULL,
+    is_registered_author BOOLEAN NOT NULL DEFAULT FALSE,
+    verified BOOLEAN NOT NULL DEFAULT FALSE,
+    external_source_id VARCHAR(100) NULL,
+    average_rating DECIMAL(3,2) NULL,
+    PRIMARY KEY (author_id),
+    KEY idx_authors_user (user_id),
+    CONSTRAINT fk_authors_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS books (
+    book_id BIGINT NOT NULL AUTO_INCREMENT,
+    title VARCHAR(500) NOT NULL,
+    summary TEXT NULL,
+    isbn VARCHAR(20) NULL,
+    publish_date DATE NULL,
+    cover_image_url VARCHAR(500) NULL,
+    average_rating DECIMAL(3,2) NULL,
+    source_name VARCHAR(100) NULL,
+    uploaded_by BIGINT NULL,
+    approval_status ENUM('pending', 'approved', 'rejected') NOT NULL DEFAULT 'pending',
+    approved_by BIGINT NULL,
+    approved_at DATETIME NULL,
+    rejection_reason TEXT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (book_id),
+    KEY idx_books_uploaded_by (uploaded_by),
+    CONSTRAINT fk_books_uploaded_by FOREIGN KEY (uploaded_by) REFERENCES users (user_id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS genres (
+    genre_id BIGINT NOT NULL AUTO_INCREMENT,
+    genre_name VARCHAR(100) NOT NULL,
+    PRIMARY KEY (genre_id),
+    UNIQUE KEY uq_genres_name (genre_name)
+);
+
+CREATE TABLE IF NOT EXISTS book_author (
+    book_id BIGINT NOT NULL,
+    author_id BIGINT NOT NULL,
+    PRIMARY KEY (book_id, author_id),
+    KEY idx_book_author_author (author_id),
+    CONSTRAINT fk_book_author_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE,
+    CONSTRAINT fk_book_author_author FOREIGN KEY (author_id) REFERENCES authors (author_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS book_genre (
+    book_id BIGINT NOT NULL,
+    genre_id BIGINT NOT NULL,
+    PRIMARY KEY (book_id, genre_id),
+    KEY idx_book_genre_genre (genre_id),
+    CONSTRAINT fk_book_genre_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE,
+    CONSTRAINT fk_book_genre_genre FOREIGN KEY (genre_id) REFERENCES genres (genre_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS user_favorite_genres (
+    user_id BIGINT NOT NULL,
+    genre_id BIGINT NOT NULL,
+    PRIMARY KEY (user_id, genre_id),
+    CONSTRAINT fk_user_favorite_genres_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_user_favorite_genres_genre FOREIGN KEY (genre_id) REFERENCES genres (genre_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS book_stores (
+    store_id BIGINT NOT NULL AUTO_INCREMENT,
+    book_id BIGINT NOT NULL,
+    store_name VARCHAR(100) NOT NULL,
+    price DECIMAL(10,2) NULL,
+    currency VARCHAR(3) NULL,
+    url VARCHAR(500) NULL,
+    availability_status VARCHAR(50) NULL,
+    last_checked DATETIME NULL,
+    PRIMARY KEY (store_id),
+    KEY idx_book_stores_book (book_id),
+    CONSTRAINT fk_book_stores_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS ratings (
+    rating_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    book_id BIGINT NOT NULL,
+    rating_value TINYINT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (rating_id),
+    UNIQUE KEY uq_ratings_user_book (user_id, book_id),
+    KEY idx_ratings_book (book_id),
+    CONSTRAINT fk_ratings_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_ratings_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS reviews (
+    review_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    book_id BIGINT NOT NULL,
+    review_text TEXT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (review_id),
+    KEY idx_reviews_book (book_id),
+    KEY idx_reviews_user (user_id),
+    CONSTRAINT fk_reviews_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_reviews_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS author_ratings (
+    author_rating_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    author_id BIGINT NOT NULL,
+    rating_value TINYINT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (author_rating_id),
+    UNIQUE KEY uq_author_ratings_user_author (user_id, author_id),
+    KEY idx_author_ratings_author (author_id),
+    CONSTRAINT fk_author_ratings_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_author_ratings_author FOREIGN KEY (author_id) REFERENCES authors (author_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS author_reviews (
+    author_review_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    author_id BIGINT NOT NULL,
+    review_text TEXT NOT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (author_review_id),
+    UNIQUE KEY uq_author_reviews_user_author (user_id, author_id),
+    KEY idx_author_reviews_author (author_id),
+    CONSTRAINT fk_author_reviews_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_author_reviews_author FOREIGN KEY (author_id) REFERENCES authors (author_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS lists (
+    list_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    title VARCHAR(100) NULL,
+    visibility ENUM('private', 'public') NOT NULL DEFAULT 'private',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (list_id),
+    KEY idx_lists_user (user_id),
+    CONSTRAINT fk_lists_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS list_books (
+    list_id BIGINT NOT NULL,
+    book_id BIGINT NOT NULL,
+    added_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (list_id, book_id),
+    KEY idx_list_books_book (book_id),
+    CONSTRAINT fk_list_books_list FOREIGN KEY (list_id) REFERENCES lists (list_id) ON DELETE CASCADE,
+    CONSTRAINT fk_list_books_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS user_reading_status (
+    status_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    book_id BIGINT NOT NULL,
+    status ENUM('reading', 'completed', 'planned', 'dropped', 'on_hold') NOT NULL,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (status_id),
+    UNIQUE KEY uq_user_reading_status (user_id, book_id),
+    KEY idx_user_reading_status_book (book_id),
+    CONSTRAINT fk_user_reading_status_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_user_reading_status_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS user_follow_user (
+    follower_id BIGINT NOT NULL,
+    following_id BIGINT NOT NULL,
+    followed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (follower_id, following_id),
+    KEY idx_user_follow_user_following (following_id),
+    CONSTRAINT fk_user_follow_user_follower FOREIGN KEY (follower_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_user_follow_user_following FOREIGN KEY (following_id) REFERENCES users (user_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS user_follow_author (
+    user_id BIGINT NOT NULL,
+    author_id BIGINT NOT NULL,
+    followed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, author_id),
+    KEY idx_user_follow_author_author (author_id),
+    CONSTRAINT fk_user_follow_author_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_user_follow_author_author FOREIGN KEY (author_id) REFERENCES authors (author_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS notification_preferences (
+    pref_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    allow_email BOOLEAN NOT NULL DEFAULT TRUE,
+    allow_author_updates BOOLEAN NOT NULL DEFAULT TRUE,
+    allow_premium_offers BOOLEAN NOT NULL DEFAULT TRUE,
+    PRIMARY KEY (pref_id),
+    UNIQUE KEY uq_notification_preferences_user (user_id),
+    CONSTRAINT fk_notification_preferences_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    notification_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    message TEXT NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    audience_type ENUM('normal', 'premium', 'author', 'admin', 'all') NOT NULL DEFAULT 'all',
+    is_read BOOLEAN NOT NULL DEFAULT FALSE,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (notification_id),
+    KEY idx_notifications_user (user_id, created_at),
+    CONSTRAINT fk_notifications_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS interaction_events (
+    event_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    book_id BIGINT NOT NULL,
+    event_type ENUM('view', 'rate', 'review', 'add_to_list', 'complete') NOT NULL,
+    event_value INT NULL,
+    timestamp INT NOT NULL,
+    PRIMARY KEY (event_id),
+    KEY idx_interaction_events_user (user_id, timestamp),
+    KEY idx_interaction_events_book (book_id),
+    CONSTRAINT fk_interaction_events_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_interaction_events_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS author_verification_requests (
+    request_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    full_name VARCHAR(255) NOT NULL,
+    id_image_url VARCHAR(500) NULL,
+    selfie_image_url VARCHAR(500) NULL,
+    status ENUM('pending', 'approved', 'rejected') NOT NULL DEFAULT 'pending',
+    submitted_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    reviewed_by BIGINT NULL,
+    reviewed_at DATETIME NULL,
+    rejection_reason TEXT NULL,
+    PRIMARY KEY (request_id),
+    KEY idx_author_verification_requests_user (user_id),
+    CONSTRAINT fk_author_verification_requests_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_author_verification_requests_reviewer FOREIGN KEY (reviewed_by) REFERENCES users (user_id) ON DELETE SET NULL
+);
+
+CREATE TABLE IF NOT EXISTS plans (
+    plan_id BIGINT NOT NULL AUTO_INCREMENT,
+    plan_name VARCHAR(100) NOT NULL,
+    type ENUM('monthly', 'yearly', 'onetime') NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    PRIMARY KEY (plan_id)
+);
+
+CREATE TABLE IF NOT EXISTS subscriptions (
+    subscription_id BIGINT NOT NULL AUTO_INCREMENT,
+    user_id BIGINT NOT NULL,
+    plan_id BIGINT NOT NULL,
+    status ENUM('active', 'cancelled', 'expired') NOT NULL DEFAULT 'active',
+    start_date DATETIME NOT NULL,
+    end_date DATETIME NULL,
+    PRIMARY KEY (subscription_id),
+    CONSTRAINT fk_subscriptions_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE,
+    CONSTRAINT fk_subscriptions_plan FOREIGN KEY (plan_id) REFERENCES plans (plan_id)
+);
+
+CREATE TABLE IF NOT EXISTS admin_audit_logs (
+    audit_id BIGINT NOT NULL AUTO_INCREMENT,
+    admin_user_id BIGINT NULL,
+    action_type VARCHAR(100) NOT NULL,
+    entity_type VARCHAR(50) NULL,
+    entity_id BIGINT NULL,
+    details TEXT NULL,
+    timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (audit_id),
+    CONSTRAINT fk_admin_audit_logs_admin FOREIGN KEY (admin_user_id) REFERENCES users (user_id) ON DELETE SET NULL
+);
@@ -0,0 +1,8 @@
+-- Keyset pagination for GET /books (bookarc-getBooks)
+-- The page query filters on approval_status and walks book_id downwards,
+-- so this index lets MySQL read exactly limit+1 entries per page.
+
+CREATE INDEX idx_books_status_id ON books (approval_status, book_id);
+
+-- Used by the optional ?year= filter (range on publish_date)
+CREATE INDEX idx_books_publish_date ON books (publish_date);
@@ -0,0 +1,53 @@
+-- Per-book rating/review aggregate maintained incrementally by the
+-- book_stats layer (bookarc-bookStats.py). Read by GET /books,
+-- GET /books/{id}, searchAuthors and getAuthorBookStats instead of
+-- running AVG()/COUNT() over ratings and reviews on every request.
+
+CREATE TABLE IF NOT EXISTS book_stats (
+    book_id BIGINT NOT NULL,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
+    stars_1 INT NOT NULL DEFAULT 0,
+    stars_2 INT NOT NULL DEFAULT 0,
+    stars_3 INT NOT NULL DEFAULT 0,
+    stars_4 INT NOT NULL DEFAULT 0,
+    stars_5 INT NOT NULL DEFAULT 0,
+    review_count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (book_id),
+    CONSTRAINT fk_book_stats_book FOREIGN KEY (book_id) REFERENCES books (book_id) ON DELETE CASCADE
+);
+
+-- Backfill (same as invoking bookarc-rebuildBookStats with {"mode": "rebuild"})
+INSERT INTO book_stats
+(book_id, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5, review_count)
+SELECT
+    b.book_id,
+    COALESCE(r.rating_sum, 0),
+    COALESCE(r.rating_count, 0),
+    COALESCE(r.stars_1, 0),
+    COALESCE(r.stars_2, 0),
+    COALESCE(r.stars_3, 0),
+    COALESCE(r.stars_4, 0),
+    COALESCE(r.stars_5, 0),
+    COALESCE(rv.review_count, 0)
+FROM books b
+LEFT JOIN (
+    SELECT
+        book_id,
+        SUM(rating_value) AS rating_sum,
+        COUNT(*) AS rating_count,
+        SUM(rating_value = 1) AS stars_1,
+        SUM(rating_value = 2) AS stars_2,
+        SUM(rating_value = 3) AS stars_3,
+        SUM(rating_value = 4) AS stars_4,
+        SUM(rating_value = 5) AS stars_5
+    FROM ratings
+    GROUP BY book_id
+) r ON r.book_id = b.book_id
+LEFT JOIN (
+    SELECT book_id, COUNT(*) AS review_count
+    FROM reviews
+    GROUP BY book_id
+) rv ON rv.book_id = b.book_id
+ON DUPLICATE KEY UPDATE book_id = book_id;
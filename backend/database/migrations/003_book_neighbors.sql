@@ -0,0 +1,30 @@
+-- Precomputed item-item recommendation model written by the
+-- bookarc-buildRecommendationModel batch job and served in memory by
+-- bookarc-bookRecommendation (recommendation_model layer).
+--
+-- Each build inserts a new model version; readers only use the newest
+-- version whose status is 'ready', so a build never exposes partial lists.
+
+CREATE TABLE IF NOT EXISTS recommendation_models (
+    model_version INT NOT NULL AUTO_INCREMENT,
+    status ENUM('building', 'ready') NOT NULL DEFAULT 'building',
+    books INT NOT NULL DEFAULT 0,
+    users INT NOT NULL DEFAULT 0,
+    signals INT NOT NULL DEFAULT 0,
+    neighbor_rows INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL,
+    PRIMARY KEY (model_version),
+    KEY idx_recommendation_models_status (status, model_version)
+);
+
+CREATE TABLE IF NOT EXISTS book_neighbors (
+    model_version INT NOT NULL,
+    book_id BIGINT NOT NULL,
+    neighbor_rank SMALLINT NOT NULL,
+    neighbor_id BIGINT NOT NULL,
+    score FLOAT NOT NULL,
+    PRIMARY KEY (model_version, book_id, neighbor_rank),
+    CONSTRAINT fk_book_neighbors_model FOREIGN KEY (model_version)
+        REFERENCES recommendation_models (model_version) ON DELETE CASCADE
+);
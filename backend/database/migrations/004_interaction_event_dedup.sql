@@ -0,0 +1,7 @@
+-- Client-generated dedup id for batched interaction events
+-- (bookarc-recordInteraction). NULL for legacy single-event writes; the
+-- unique key lets INSERT IGNORE drop a retried event.
+
+ALTER TABLE interaction_events
+    ADD COLUMN client_event_id VARCHAR(64) NULL,
+    ADD UNIQUE KEY uq_interaction_events_client_id (user_id, client_event_id);
@@ -0,0 +1,9 @@
+-- Keyset pagination for the activity lists in GET /stats (bookarc-getUserStats)
+-- Each list pages over (created_at, id) for one user; InnoDB appends the
+-- primary key to secondary indexes, so (user_id, created_at) covers the
+-- ORDER BY created_at DESC, id DESC walk and LIMIT reads only limit+1 rows.
+
+CREATE INDEX idx_ratings_user_created ON ratings (user_id, created_at);
+CREATE INDEX idx_reviews_user_created ON reviews (user_id, created_at);
+CREATE INDEX idx_author_ratings_user_created ON author_ratings (user_id, created_at);
+CREATE INDEX idx_author_reviews_user_created ON author_reviews (user_id, created_at);
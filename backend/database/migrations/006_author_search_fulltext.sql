@@ -0,0 +1,20 @@
+-- Author search (GET /author?q=, bookarc-searchAuthors)
+-- Replaces the unindexable LIKE '%q%' scans with InnoDB FULLTEXT indexes
+-- using the ngram parser, so substring-style matches (including CJK names)
+-- are answered from the index and ranked by relevance.
+--
+-- ngram_token_size is a server option (default 2, matching the 2-character
+-- minimum query length); leave it at the default in the RDS parameter group.
+-- Stopwords are disabled for these indexes only: with the ngram parser any
+-- token containing a stopword ("a", "in", ...) would otherwise be dropped.
+
+SET SESSION innodb_ft_enable_stopword = OFF;
+
+-- External authors: authors.name
+CREATE FULLTEXT INDEX ft_authors_name ON authors (name) WITH PARSER ngram;
+
+-- Registered authors are users with role = 'author'; searched by display
+-- name or username
+CREATE FULLTEXT INDEX ft_users_display_name_username ON users (display_name, username) WITH PARSER ngram;
+
+SET SESSION innodb_ft_enable_stopword = ON;
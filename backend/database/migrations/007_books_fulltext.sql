@@ -0,0 +1,7 @@
+-- Ranked book search (GET /books/search, bookarc-getBooks)
+-- Natural-language FULLTEXT scores (IDF-weighted term frequency) over
+-- title + summary, plus a title-only index so title hits can be boosted.
+-- Author names are matched through ft_authors_name (migration 006).
+
+CREATE FULLTEXT INDEX ft_books_title_summary ON books (title, summary);
+CREATE FULLTEXT INDEX ft_books_title ON books (title);
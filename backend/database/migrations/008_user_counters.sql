@@ -0,0 +1,55 @@
+-- Per-user counters maintained incrementally by the user_counters layer
+-- (bookarc-userCounters.py). Read by searchUsers, getUserByID,
+-- getUserFollowers and getUserFollowing instead of running COUNT()
+-- subqueries for every returned user.
+
+CREATE TABLE IF NOT EXISTS user_counters (
+    user_id BIGINT NOT NULL,
+    followers INT NOT NULL DEFAULT 0,
+    following INT NOT NULL DEFAULT 0,
+    total_reviews INT NOT NULL DEFAULT 0,
+    total_ratings INT NOT NULL DEFAULT 0,
+    books_read INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id),
+    CONSTRAINT fk_user_counters_user FOREIGN KEY (user_id) REFERENCES users (user_id) ON DELETE CASCADE
+);
+
+-- Backfill (same as invoking bookarc-rebuildUserCounters with {"mode": "rebuild"})
+INSERT INTO user_counters
+(user_id, followers, following, total_reviews, total_ratings, books_read)
+SELECT
+    u.user_id,
+    COALESCE(fr.followers, 0),
+    COALESCE(fg.following, 0),
+    COALESCE(rv.total_reviews, 0),
+    COALESCE(rt.total_ratings, 0),
+    COALESCE(rs.books_read, 0)
+FROM users u
+LEFT JOIN (
+    SELECT following_id AS user_id, COUNT(*) AS followers
+    FROM user_follow_user
+    GROUP BY following_id
+) fr ON fr.user_id = u.user_id
+LEFT JOIN (
+    SELECT follower_id AS user_id, COUNT(*) AS following
+    FROM user_follow_user
+    GROUP BY follower_id
+) fg ON fg.user_id = u.user_id
+LEFT JOIN (
+    SELECT user_id, COUNT(*) AS total_reviews
+    FROM reviews
+    GROUP BY user_id
+) rv ON rv.user_id = u.user_id
+LEFT JOIN (
+    SELECT user_id, COUNT(*) AS total_ratings
+    FROM ratings
+    GROUP BY user_id
+) rt ON rt.user_id = u.user_id
+LEFT JOIN (
+    SELECT user_id, COUNT(DISTINCT book_id) AS books_read
+    FROM user_reading_status
+    WHERE status = 'completed'
+    GROUP BY user_id
+) rs ON rs.user_id = u.user_id
+ON DUPLICATE KEY UPDATE user_id = user_id;
@@ -0,0 +1,23 @@
+-- Notification inbox: unread counter and keyset paging.
+--
+-- user_counters.unread_notifications is maintained by the
+-- notification_service layer (on insert) and by the mark-read / delete
+-- handlers, so getNotifications no longer counts the inbox on every poll.
+--
+-- getNotifications pages on (created_at, notification_id). The existing
+-- idx_notifications_user (user_id, created_at) already carries the primary
+-- key as its implicit last column, so the keyset needs no new index; the
+-- index below serves the is_read filter and the unread backfill.
+
+ALTER TABLE user_counters
+    ADD COLUMN unread_notifications INT NOT NULL DEFAULT 0 AFTER books_read;
+
+CREATE INDEX idx_notifications_user_read ON notifications (user_id, is_read, created_at);
+
+-- Backfill (same as invoking bookarc-rebuildUserCounters with {"mode": "rebuild"})
+INSERT INTO user_counters (user_id, unread_notifications)
+SELECT user_id, COUNT(*)
+FROM notifications
+WHERE is_read = FALSE
+GROUP BY user_id
+ON DUPLICATE KEY UPDATE unread_notifications = VALUES(unread_notifications);
@@ -0,0 +1,31 @@
+-- Notification outbox for large fan-outs (notification_outbox.py layer).
+--
+-- A request that would notify many users (e.g. every follower of an author
+-- when their book is approved) inserts one row here in its own transaction.
+-- bookarc-drainNotificationOutbox claims pending rows and expands them into
+-- notifications in chunks of recipients ordered by user_id.
+--
+-- progress is the last recipient user_id already written. It is updated in
+-- the same transaction as each chunk's INSERT, so a retried or re-claimed
+-- entry resumes after the last committed chunk. idempotency_key is UNIQUE,
+-- so enqueueing the same event twice is a no-op.
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    outbox_id BIGINT NOT NULL AUTO_INCREMENT,
+    event_type VARCHAR(50) NOT NULL,
+    idempotency_key VARCHAR(191) NOT NULL,
+    payload JSON NOT NULL,
+    status ENUM('pending', 'processing', 'done', 'failed') NOT NULL DEFAULT 'pending',
+    progress BIGINT NOT NULL DEFAULT 0,
+    delivered INT NOT NULL DEFAULT 0,
+    attempts INT NOT NULL DEFAULT 0,
+    claim_token CHAR(32) NULL,
+    locked_until DATETIME NULL,
+    next_attempt_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error TEXT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    processed_at DATETIME NULL,
+    PRIMARY KEY (outbox_id),
+    UNIQUE KEY uq_notification_outbox_key (idempotency_key),
+    KEY idx_notification_outbox_due (status, next_attempt_at)
+);
@@ -0,0 +1,46 @@
+-- Notification retention (bookarc-notificationMaintenance).
+--
+-- 1. notifications becomes a monthly RANGE-partitioned table on created_at.
+--    The maintenance job adds partitions ahead of time by splitting
+--    p_future, and drops old partitions once archival has emptied them.
+--    MySQL requires the partition column in every unique key and does not
+--    support foreign keys on partitioned tables, so the primary key becomes
+--    (notification_id, created_at) and fk_notifications_user is dropped.
+--    bookarc-deleteUserAccount already deletes a user's notifications
+--    explicitly.
+--
+-- 2. group_key / group_count let repeated notifications about the same
+--    subject (e.g. many book_rated for one book) be collapsed into a
+--    single digest row that counts them.
+
+ALTER TABLE notifications
+    DROP FOREIGN KEY fk_notifications_user;
+
+ALTER TABLE notifications
+    ADD COLUMN group_key VARCHAR(191) NULL AFTER audience_type,
+    ADD COLUMN group_count INT NOT NULL DEFAULT 1 AFTER group_key,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (notification_id, created_at),
+    ADD KEY idx_notifications_group (user_id, type, group_key, created_at);
+
+ALTER TABLE notifications
+    PARTITION BY RANGE COLUMNS (created_at) (
+        PARTITION p_history VALUES LESS THAN ('2026-10-01'),
+        PARTITION p202610 VALUES LESS THAN ('2026-11-01'),
+        PARTITION p202611 VALUES LESS THAN ('2026-12-01'),
+        PARTITION p202612 VALUES LESS THAN ('2027-01-01'),
+        PARTITION p_future VALUES LESS THAN (MAXVALUE)
+    );
+
+-- Archive files written by the job are listed here so each run can report
+-- what it shipped and operators can find a notification's archive object.
+CREATE TABLE IF NOT EXISTS notification_archive_log (
+    archive_id BIGINT NOT NULL AUTO_INCREMENT,
+    location VARCHAR(512) NOT NULL,
+    first_notification_id BIGINT NOT NULL,
+    last_notification_id BIGINT NOT NULL,
+    row_count INT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (archive_id),
+    KEY idx_notification_archive_log_range (first_notification_id, last_notification_id)
+);
@@ -0,0 +1,28 @@
+-- Preference-aware notification writes and hourly digests
+-- (notification_preferences.py layer).
+--
+-- notification_preferences.digest_mode lets a user opt in to receiving
+-- high-volume activity (ratings, reviews, new followers, followed authors'
+-- new books) as one notification per hour instead of one per event.
+--
+-- For those users the notification writers upsert into
+-- notification_digest_buffer, one row per (user, hour, type) holding a
+-- running count and the latest message, instead of inserting into
+-- notifications. The "hourly_digest" step of bookarc-notificationMaintenance
+-- (scheduled hourly) turns every closed hour into a single notification
+-- and deletes its buffer rows in the same transaction.
+
+ALTER TABLE notification_preferences
+    ADD COLUMN digest_mode ENUM('off', 'hourly') NOT NULL DEFAULT 'off' AFTER allow_premium_offers;
+
+CREATE TABLE IF NOT EXISTS notification_digest_buffer (
+    user_id BIGINT NOT NULL,
+    period_start DATETIME NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    event_count INT NOT NULL DEFAULT 0,
+    last_message TEXT NOT NULL,
+    audience_type ENUM('normal', 'premium', 'author', 'admin', 'all') NOT NULL DEFAULT 'all',
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, period_start, type),
+    KEY idx_notification_digest_buffer_period (period_start)
+);
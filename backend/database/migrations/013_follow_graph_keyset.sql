@@ -0,0 +1,44 @@
+-- Keyset-paginated follower/following lists (follow_graph.py layer).
+--
+-- Follower and following lists page on (followed_at, id) newest first.
+-- Each index below leads with the list owner and carries the other side
+-- of the edge, so a page is one index range scan.
+--
+-- List totals come from counters maintained in the follow transaction:
+--   user_counters.followers / following        (user -> user, existing)
+--   user_counters.following_authors            (user -> author)
+--   author_counters.followers                  (user -> author)
+-- bookarc-rebuildUserCounters reconciles both tables.
+
+CREATE INDEX idx_user_follow_user_followers_page
+    ON user_follow_user (following_id, followed_at, follower_id);
+CREATE INDEX idx_user_follow_user_following_page
+    ON user_follow_user (follower_id, followed_at, following_id);
+CREATE INDEX idx_user_follow_author_followers_page
+    ON user_follow_author (author_id, followed_at, user_id);
+CREATE INDEX idx_user_follow_author_following_page
+    ON user_follow_author (user_id, followed_at, author_id);
+
+ALTER TABLE user_counters
+    ADD COLUMN following_authors INT NOT NULL DEFAULT 0 AFTER following;
+
+CREATE TABLE IF NOT EXISTS author_counters (
+    author_id BIGINT NOT NULL,
+    followers INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (author_id),
+    CONSTRAINT fk_author_counters_author FOREIGN KEY (author_id) REFERENCES authors (author_id) ON DELETE CASCADE
+);
+
+-- Backfill (same as invoking bookarc-rebuildUserCounters with {"mode": "rebuild"})
+INSERT INTO user_counters (user_id, following_authors)
+SELECT user_id, COUNT(*)
+FROM user_follow_author
+GROUP BY user_id
+ON DUPLICATE KEY UPDATE following_authors = VALUES(following_authors);
+
+INSERT INTO author_counters (author_id, followers)
+SELECT author_id, COUNT(*)
+FROM user_follow_author
+GROUP BY author_id
+ON DUPLICATE KEY UPDATE followers = VALUES(followers);
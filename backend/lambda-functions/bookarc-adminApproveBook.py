@@ -1,82 +1,21 @@
 """
 Lambda Function: bookarc-adminApproveBook
-Approve book submissions with EMBEDDED notifications
+Approve book submissions with notifications
 Endpoint: POST /admin/books/{book_id}/approve
 """
 
 import json
 import pymysql
-import os
 from datetime import datetime
-from typing import Optional
-
-# ============================================================================
-# EMBEDDED NOTIFICATION SERVICE
-# ============================================================================
-
-class NotificationService:
-    """Service for creating and managing notifications"""
-    
-    def __init__(self, connection):
-        self.connection = connection
-    
-    def create_notification(self, user_id: int, message: str, notification_type: str, audience_type: str = 'all') -> Optional[int]:
-        """Create a single notification"""
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    INSERT INTO notifications (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """, (user_id, message, notification_type, audience_type))
-                self.connection.commit()
-                return cursor.lastrowid
-        except Exception as e:
-            print(f"Error creating notification: {str(e)}")
-            return None
-    
-    def notify_followers_new_book(self, author_user_id: int, book_title: str) -> int:
-        """Notify all followers that author published a new book"""
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    SELECT COALESCE(display_name, username) as name FROM users WHERE user_id = %s
-                """, (author_user_id,))
-                author_result = cursor.fetchone()
-                author_name = author_result['name'] if author_result else 'An author'
-                
-                cursor.execute("""
-                    SELECT ufa.user_id
-                    FROM user_follow_author ufa
-                    JOIN authors a ON ufa.author_id = a.author_id
-                    WHERE a.user_id = %s
-                """, (author_user_id,))
-                
-                follower_ids = [row['user_id'] for row in cursor.fetchall()]
-            
-            if follower_ids:
-                message = f'{author_name} just published a new book: "{book_title}"'
-                with self.connection.cursor() as cursor:
-                    cursor.executemany("""
-                        INSERT INTO notifications (user_id, message, type, audience_type, is_read, created_at)
-                        VALUES (%s, %s, 'author_update', 'normal', FALSE, NOW())
-                    """, [(uid, message) for uid in follower_ids])
-                    self.connection.commit()
-                    print(f"Notified {len(follower_ids)} followers about new book")
-                    return len(follower_ids)
-            return 0
-        except Exception as e:
-            print(f"Error notifying followers: {str(e)}")
-            return 0
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_service import NotificationService
+from notification_outbox import wake_worker
 
 # ============================================================================
 # Database configuration
 # ============================================================================
 
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME')
-
 CORS_HEADERS = {
     'Access-Control-Allow-Origin': '*',
     'Access-Control-Allow-Headers': 'Content-Type,Authorization',
@@ -84,6 +23,7 @@ CORS_HEADERS = {
     'Content-Type': 'application/json'
 }
 
+@measure_invocation
 def lambda_handler(event, context):
     print("Event:", json.dumps(event))
     
@@ -113,10 +53,7 @@ def lambda_handler(event, context):
             return {'statusCode': 400, 'headers': CORS_HEADERS,
                    'body': json.dumps({'message': 'Invalid book_id'})}
         
-        connection = pymysql.connect(
-            host=DB_HOST, user=DB_USER, password=DB_PASSWORD,
-            database=DB_NAME, cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with connection.cursor() as cursor:
@@ -197,27 +134,19 @@ def lambda_handler(event, context):
                     'genres': book['genres']
                 })))
                 
+                # Notifications are written in the approval transaction; the
+                # follower fan-out is queued and written by bookarc-drainNotificationOutbox
+                notif_service = NotificationService(connection)
+                if book['uploaded_by']:
+                    notif_service.notify_book_approved(book['uploaded_by'], book['title'])
+                    notif_service.notify_followers_new_book(
+                        book['uploaded_by'], book['title'], book_id=book_id, cursor=cursor
+                    )
+                notif_service.flush(cursor)
+                
                 connection.commit()
                 print("Book approved successfully")
-                
-                # Send notifications
-                try:
-                    notif_service = NotificationService(connection)
-                    
-                    if book['uploaded_by']:
-                        notif_service.create_notification(
-                            book['uploaded_by'],
-                            f'Congratulations! Your book "{book["title"]}" has been approved and is now live.',
-                            'book_approval',
-                            'author'
-                        )
-                        
-                        follower_count = notif_service.notify_followers_new_book(book['uploaded_by'], book['title'])
-                        print(f"Notified {follower_count} followers")
-                    
-                    print("All notifications sent successfully")
-                except Exception as notif_error:
-                    print(f"Failed to send notifications: {str(notif_error)}")
+                wake_worker()
                 
                 return {
                     'statusCode': 200,
@@ -237,7 +166,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            connection.close()
+            release_connection(connection)
             
     except KeyError as ke:
         print(f"Missing required field: {str(ke)}")
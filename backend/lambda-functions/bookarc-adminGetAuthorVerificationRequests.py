@@ -1,7 +1,9 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     GET /admin/verification-requests
@@ -9,13 +11,7 @@ def lambda_handler(event, context):
     """
     
     # Database connection
-    connection = pymysql.connect(
-        host=os.environ['DB_HOST'],
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        database=os.environ['DB_NAME'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
     
     try:
         # Extract admin user_id from authorizer
@@ -131,4 +127,4 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
         }
     finally:
-        connection.close()
+        release_connection(connection)
@@ -1,64 +1,15 @@
 """
 Lambda Function: bookarc-adminRejectBook
-Reject book submissions with EMBEDDED notifications
+Reject book submissions with notifications
 Endpoint: POST /admin/books/{book_id}/reject
 """
 
 import json
 import pymysql
-import os
 from datetime import datetime
-from typing import Optional
-
-# ============================================================================
-# EMBEDDED NOTIFICATION SERVICE - NO LAYER NEEDED
-# ============================================================================
-
-class NotificationService:
-    """Service for creating and managing notifications"""
-    
-    def __init__(self, connection):
-        self.connection = connection
-    
-    def create_notification(
-        self, 
-        user_id: int, 
-        message: str, 
-        notification_type: str,
-        audience_type: str = 'all'
-    ) -> Optional[int]:
-        """Create a single notification"""
-        try:
-            with self.connection.cursor() as cursor:
-                sql = """
-                    INSERT INTO notifications 
-                    (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """
-                cursor.execute(sql, (user_id, message, notification_type, audience_type))
-                self.connection.commit()
-                notification_id = cursor.lastrowid
-                print(f"Created notification {notification_id} for user {user_id}: {message}")
-                return notification_id
-        except Exception as e:
-            print(f"Error creating notification: {str(e)}")
-            return None
-    
-    def notify_book_rejected(
-        self, 
-        user_id: int, 
-        book_title: str, 
-        rejection_reason: Optional[str] = None
-    ) -> Optional[int]:
-        """Notify author that their book was rejected"""
-        message = f'Your book "{book_title}" was rejected.'
-        if rejection_reason:
-            message += f' Reason: {rejection_reason}'
-        return self.create_notification(user_id, message, 'book_rejection', 'author')
-
-# ============================================================================
-# END OF EMBEDDED NOTIFICATION SERVICE
-# ============================================================================
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_service import NotificationService
 
 CORS_HEADERS = {
     'Access-Control-Allow-Origin': '*',
@@ -67,6 +18,7 @@ CORS_HEADERS = {
     'Content-Type': 'application/json'
 }
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Lambda function for admins to reject a pending book
@@ -101,13 +53,7 @@ def lambda_handler(event, context):
                 })
             }
         
-        conn = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with conn.cursor() as cursor:
@@ -195,31 +141,18 @@ def lambda_handler(event, context):
                     })
                 ))
                 
+                # Notify the author in the same transaction
+                notif_service = NotificationService(conn)
+                if book['uploaded_by']:
+                    notif_service.notify_book_rejected(book['uploaded_by'], book['title'], rejection_reason)
+                else:
+                    print("No author user_id found, skipping notification")
+                notif_service.flush(cursor)
+                
                 conn.commit()
                 
                 print(f"Book rejected successfully")
                 
-                # SEND NOTIFICATION
-                try:
-                    if book['uploaded_by']:
-                        print(f"\n📧 Creating NotificationService...")
-                        notif_service = NotificationService(conn)
-                        
-                        print(f"📬 Sending rejection notification to author (user_id: {book['uploaded_by']})")
-                        notif_id = notif_service.notify_book_rejected(
-                            book['uploaded_by'], 
-                            book['title'], 
-                            rejection_reason
-                        )
-                        print(f"Notification created: {notif_id}\n")
-                    else:
-                        print("No author user_id found, skipping notification")
-                except Exception as notif_error:
-                    print(f"Failed to send notification: {str(notif_error)}")
-                    import traceback
-                    traceback.print_exc()
-                    # Don't fail the request if notification fails
-                
                 return {
                     'statusCode': 200,
                     'headers': CORS_HEADERS,
@@ -236,8 +169,8 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            conn.close()
-            print("Database connection closed")
+            release_connection(conn)
+            print("Database connection released")
     
     except json.JSONDecodeError:
         return {
@@ -1,48 +1,20 @@
 """
 Lambda Function: bookarc-adminRejectVerification
-Reject author verification requests with EMBEDDED notifications
+Reject author verification requests with notifications
 Endpoint: POST /admin/verification-requests/{request_id}/reject
 """
 
 import json
 import pymysql
-import os
 from datetime import datetime
-from typing import Optional
-
-# ============================================================================
-# EMBEDDED NOTIFICATION SERVICE
-# ============================================================================
-
-class NotificationService:
-    """Service for creating and managing notifications"""
-    
-    def __init__(self, connection):
-        self.connection = connection
-    
-    def create_notification(self, user_id: int, message: str, notification_type: str, audience_type: str = 'all') -> Optional[int]:
-        """Create a single notification"""
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    INSERT INTO notifications (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """, (user_id, message, notification_type, audience_type))
-                self.connection.commit()
-                return cursor.lastrowid
-        except Exception as e:
-            print(f"Error creating notification: {str(e)}")
-            return None
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_service import NotificationService
 
 # ============================================================================
 # Database configuration
 # ============================================================================
 
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME')
-
 CORS_HEADERS = {
     'Content-Type': 'application/json',
     'Access-Control-Allow-Origin': '*',
@@ -50,6 +22,7 @@ CORS_HEADERS = {
     'Access-Control-Allow-Methods': 'POST,OPTIONS'
 }
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     POST /admin/verification-requests/{request_id}/reject
@@ -78,10 +51,7 @@ def lambda_handler(event, context):
             return {'statusCode': 400, 'headers': CORS_HEADERS,
                    'body': json.dumps({'error': 'Rejection reason is required'})}
         
-        connection = pymysql.connect(
-            host=DB_HOST, user=DB_USER, password=DB_PASSWORD,
-            database=DB_NAME, cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         with connection.cursor() as cursor:
             # Single query to get admin and verification request data
@@ -131,39 +101,18 @@ def lambda_handler(event, context):
                 UPDATE users SET verification_status = 'rejected' WHERE user_id = %s
             """, (result['applicant_user_id'],))
             
+            # Notify the applicant and the admin in the same transaction
+            notif_service = NotificationService(connection)
+            notif_service.notify_verification_rejected(result['applicant_user_id'], rejection_reason)
+            admin_message = f'You rejected author verification for {result["applicant_display_name"]}.'
+            if rejection_reason:
+                admin_message += f' Reason: {rejection_reason}'
+            notif_service.notify_admin_action(result['admin_user_id'], admin_message)
+            notif_service.flush(cursor)
+            
             connection.commit()
             print(f"Verification rejected for {result['applicant_username']}")
             
-            # Send notifications
-            try:
-                notif_service = NotificationService(connection)
-                
-                # Notify the applicant
-                user_message = 'Your author verification request was rejected.'
-                if rejection_reason:
-                    user_message += f' Reason: {rejection_reason}'
-                notif_service.create_notification(
-                    result['applicant_user_id'],
-                    user_message,
-                    'verification_rejected',
-                    'normal'
-                )
-                
-                # Notify the admin
-                admin_message = f'You rejected author verification for {result["applicant_display_name"]}.'
-                if rejection_reason:
-                    admin_message += f' Reason: {rejection_reason}'
-                notif_service.create_notification(
-                    result['admin_user_id'],
-                    admin_message,
-                    'admin_action',
-                    'admin'
-                )
-                
-                print("Notifications sent successfully")
-            except Exception as notif_error:
-                print(f"Failed to send notifications: {str(notif_error)}")
-            
             # Log admin action
             try:
                 cursor.execute("""
@@ -208,4 +157,4 @@ def lambda_handler(event, context):
                'body': json.dumps({'error': 'Internal server error', 'details': str(e)})}
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
@@ -1,28 +1,19 @@
 import json
 import pymysql
-import os
 from decimal import Decimal
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
-# RDS Configuration
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME')
 
 def get_db_connection():
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def decimal_default(obj):
     if isinstance(obj, Decimal):
         return float(obj)
     raise TypeError
 
+@measure_invocation
 def lambda_handler(event, context):
     print("Event:", json.dumps(event))
     
@@ -256,7 +247,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            connection.close()
+            release_connection(connection)
             
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -1,38 +1,15 @@
 """
 Lambda Function: bookarc-authorSubmitBook
-Authors submit new books with EMBEDDED notifications
+Authors submit new books with notifications
 Endpoint: POST /author/books
 """
 
 import json
 import pymysql
-import os
 from datetime import datetime
-from typing import Optional
-
-# ============================================================================
-# EMBEDDED NOTIFICATION SERVICE
-# ============================================================================
-
-class NotificationService:
-    """Service for creating and managing notifications"""
-    
-    def __init__(self, connection):
-        self.connection = connection
-    
-    def create_notification(self, user_id: int, message: str, notification_type: str, audience_type: str = 'all') -> Optional[int]:
-        """Create a single notification"""
-        try:
-            with self.connection.cursor() as cursor:
-                cursor.execute("""
-                    INSERT INTO notifications (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """, (user_id, message, notification_type, audience_type))
-                self.connection.commit()
-                return cursor.lastrowid
-        except Exception as e:
-            print(f"Error creating notification: {str(e)}")
-            return None
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_service import NotificationService
 
 # ============================================================================
 # Database configuration
@@ -45,6 +22,7 @@ CORS_HEADERS = {
     'Content-Type': 'application/json'
 }
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Lambda function for authors to submit new books
@@ -86,11 +64,7 @@ def lambda_handler(event, context):
             return {'statusCode': 400, 'headers': CORS_HEADERS,
                    'body': json.dumps({'error': 'At least one genre is required'})}
         
-        conn = pymysql.connect(
-            host=os.environ['DB_HOST'], user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'], database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with conn.cursor() as cursor:
@@ -170,22 +144,13 @@ def lambda_handler(event, context):
                     VALUES (%s, 'BOOK_SUBMITTED', 'book', %s, %s, NOW())
                 """, (user['user_id'], book_id, json.dumps({'title': title, 'author': author_name, 'genres': genres})))
                 
+                notif_service = NotificationService(conn)
+                notif_service.notify_book_submitted(user['user_id'], title)
+                notif_service.flush(cursor)
+                
                 conn.commit()
                 print("Book submission complete")
                 
-                # Send notification
-                try:
-                    notif_service = NotificationService(conn)
-                    notif_service.create_notification(
-                        user['user_id'],
-                        f'Your book "{title}" has been successfully submitted and is pending review.',
-                        'book_submission',
-                        'author'
-                    )
-                    print("Notification sent")
-                except Exception as notif_error:
-                    print(f"Failed to send notification: {str(notif_error)}")
-                
                 return {
                     'statusCode': 201,
                     'headers': CORS_HEADERS,
@@ -206,7 +171,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            conn.close()
+            release_connection(conn)
     
     except json.JSONDecodeError:
         return {'statusCode': 400, 'headers': CORS_HEADERS,
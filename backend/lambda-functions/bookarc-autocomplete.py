@@ -0,0 +1,106 @@
+"""
+Lambda Function: bookarc-autocomplete
+Typeahead suggestions across books, authors and users
+
+GET /autocomplete?q=tolk&limit=8&types=books,authors,users
+✅ PUBLIC ACCESS - No authentication required
+
+Served entirely from the memory-mapped prefix index snapshot built by
+bookarc-buildAutocompleteIndex; no database connection is opened.
+"""
+
+import json
+from prefix_index import load_prefix_index, normalize
+
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+MAX_QUERY_LENGTH = 100
+
+# Query "types" -> index kinds
+TYPE_KINDS = {
+    'books': {'book'},
+    'authors': {'author_registered', 'author_external'},
+    'users': {'user'},
+}
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'GET,OPTIONS',
+    'Content-Type': 'application/json',
+}
+
+
+def response(status_code, body, cache_seconds=0):
+    headers = dict(CORS_HEADERS)
+    if cache_seconds:
+        # Suggestions only change when the snapshot is rebuilt
+        headers['Cache-Control'] = f'public, max-age={cache_seconds}'
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': json.dumps(body)
+    }
+
+
+def parse_types(raw_types):
+    """Return the index kinds to search (all by default)"""
+    if not raw_types:
+        return None
+    requested = {t.strip() for t in raw_types.split(',') if t.strip()}
+    unknown = requested - set(TYPE_KINDS)
+    if unknown:
+        raise ValueError(f"Unknown types: {', '.join(sorted(unknown))}. Must be any of: {', '.join(TYPE_KINDS)}")
+    return set().union(*(TYPE_KINDS[t] for t in requested))
+
+
+def format_suggestion(record):
+    suggestion = {
+        'type': 'author' if record['kind'].startswith('author_') else record['kind'],
+        'id': record['id'],
+        'label': record['label'],
+        'subtitle': record['subtitle'],
+    }
+    if suggestion['type'] == 'author':
+        # Matches searchAuthors / GET /author/{id}?type=
+        suggestion['authorType'] = record['kind'].split('_', 1)[1]
+    return suggestion
+
+
+def lambda_handler(event, context):
+    """Return the top suggestions for a typed prefix"""
+    if event.get('httpMethod') == 'OPTIONS':
+        return response(200, {'message': 'OK'})
+
+    params = event.get('queryStringParameters') or {}
+    raw_query = (params.get('q') or '')[:MAX_QUERY_LENGTH]
+
+    try:
+        limit = max(1, min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+        kinds = parse_types(params.get('types'))
+    except ValueError as e:
+        return response(400, {'error': str(e)})
+
+    prefix = normalize(raw_query)
+    if not prefix:
+        return response(200, {'query': raw_query, 'suggestions': []})
+
+    try:
+        index = load_prefix_index()
+        if index is None:
+            return response(503, {'error': 'Autocomplete index is not available yet'})
+
+        suggestions = [format_suggestion(r) for r in index.lookup(prefix, limit=limit, kinds=kinds)]
+
+        return response(200, {
+            'query': raw_query,
+            'suggestions': suggestions,
+            'index_built_at': index.meta.get('built_at')
+        }, cache_seconds=60)
+
+    except Exception as e:
+        print(f"Error serving autocomplete: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return response(500, {'error': 'Internal server error', 'details': str(e)})
@@ -0,0 +1,95 @@
+import json
+import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_identity
+from follow_graph import follow_status, MAX_STATUS_IDS
+
+def parse_ids(raw_ids, name):
+    """'1,2,3' -> [1, 2, 3]"""
+    if not raw_ids:
+        return []
+    try:
+        ids = sorted({int(value) for value in raw_ids.split(',') if value.strip()})
+    except ValueError:
+        raise ValueError(f'{name} must be a comma-separated list of integers')
+    if len(ids) > MAX_STATUS_IDS:
+        raise ValueError(f'At most {MAX_STATUS_IDS} {name} per request')
+    return ids
+
+@measure_invocation
+def lambda_handler(event, context):
+    """
+    GET /follow-status?userIds=1,2,3&authorIds=4,5
+    Follow state of the current user towards many users and authors
+
+    Up to 200 userIds and 200 authorIds; one query per relation.
+    Anonymous callers get false for everything.
+    """
+
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+        'Access-Control-Allow-Methods': 'GET,OPTIONS',
+        'Content-Type': 'application/json'
+    }
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return {'statusCode': 200, 'headers': headers, 'body': ''}
+
+    try:
+        params = event.get('queryStringParameters') or {}
+
+        try:
+            user_ids = parse_ids(params.get('userIds'), 'userIds')
+            author_ids = parse_ids(params.get('authorIds'), 'authorIds')
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': str(e)})
+            }
+
+        authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+        claims = authorizer.get('claims') or {}
+        cognito_sub = claims.get('sub')
+
+        viewer_id = None
+        followed_user_ids, followed_author_ids = set(), set()
+
+        if cognito_sub and (user_ids or author_ids):
+            conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+            try:
+                with conn.cursor() as cursor:
+                    viewer = resolve_identity(cursor, cognito_sub, claims, require_active=True)
+                    if viewer:
+                        viewer_id = viewer['user_id']
+                        followed_user_ids, followed_author_ids = follow_status(
+                            cursor, viewer_id, user_ids, author_ids
+                        )
+            finally:
+                release_connection(conn)
+
+        return {
+            'statusCode': 200,
+            'headers': headers,
+            'body': json.dumps({
+                'viewerId': viewer_id,
+                'users': {str(user_id): user_id in followed_user_ids for user_id in user_ids},
+                'authors': {str(author_id): author_id in followed_author_ids for author_id in author_ids}
+            })
+        }
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({
+                'error': 'Internal server error',
+                'details': str(e)
+            })
+        }
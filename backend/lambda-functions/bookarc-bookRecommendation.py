@@ -1,6 +1,10 @@
 """
 Lambda Function: Simplified Book Recommendations Engine
 Generates personalized recommendations - MySQL compatible
+
+Scores the user's history against the precomputed item-item neighbour
+lists of its books (see bookarc-buildRecommendationModel), and falls back to
+genre/rating based SQL when the model has nothing for this user.
 """
 
 import json
@@ -9,6 +13,9 @@ import os
 import datetime
 from datetime import timedelta
 from decimal import Decimal
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from recommendation_model import load_neighbor_model, get_user_signals, score_books
 
 # Environment variables
 DB_HOST = os.environ.get('DB_HOST')
@@ -27,36 +34,81 @@ def decimal_to_float(obj):
 def get_db_connection():
     """Create database connection"""
     print(f"Connecting to database: {DB_HOST}/{DB_NAME}")
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor,
-        connect_timeout=5
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def get_user_reading_history(conn, user_id):
-    """Get books the user has already read/rated/reviewed"""
+    """Get the user's weighted history: {book_id: (weight, excludes)}"""
     try:
-        with conn.cursor() as cursor:
-            sql = """
-                SELECT DISTINCT book_id
-                FROM (
-                    SELECT book_id FROM ratings WHERE user_id = %s
-                    UNION
-                    SELECT book_id FROM reviews WHERE user_id = %s
-                    UNION
-                    SELECT book_id FROM user_reading_status WHERE user_id = %s
-                ) AS read_books
-            """
-            cursor.execute(sql, (user_id, user_id, user_id))
-            result = [row['book_id'] for row in cursor.fetchall()]
-            print(f"User has {len(result)} books in reading history")
-            return result
+        result = get_user_signals(conn, user_id)
+        print(f"User has {len(result)} books in reading history")
+        return result
     except Exception as e:
         print(f"Error getting reading history: {str(e)}")
+        return {}
+
+def get_books_by_ids(conn, book_ids, reason):
+    """Fetch display rows for the given approved books, keeping the given order"""
+    if not book_ids:
         return []
+    placeholders = ','.join(['%s'] * len(book_ids))
+    with conn.cursor() as cursor:
+        sql = f"""
+            SELECT 
+                b.book_id,
+                b.title,
+                b.summary,
+                b.cover_image_url,
+                CAST(b.average_rating AS DECIMAL(3,2)) as average_rating,
+                b.publish_date,
+                YEAR(b.publish_date) as publish_year,
+                GROUP_CONCAT(DISTINCT a.name ORDER BY a.name SEPARATOR ', ') as authors,
+                GROUP_CONCAT(DISTINCT g.genre_name ORDER BY g.genre_name SEPARATOR ', ') as genres,
+                %s as reason
+            FROM books b
+            LEFT JOIN book_author ba ON b.book_id = ba.book_id
+            LEFT JOIN authors a ON ba.author_id = a.author_id
+            LEFT JOIN book_genre bg ON b.book_id = bg.book_id
+            LEFT JOIN genres g ON bg.genre_id = g.genre_id
+            WHERE b.book_id IN ({placeholders})
+            AND b.approval_status = 'approved'
+            GROUP BY b.book_id, b.title, b.summary, b.cover_image_url, b.average_rating, b.publish_date
+        """
+        cursor.execute(sql, [reason] + list(book_ids))
+        rows = {row['book_id']: row for row in cursor.fetchall()}
+
+    results = []
+    for book_id in book_ids:
+        book = rows.get(book_id)
+        if book:
+            if book.get('average_rating') is not None:
+                book['average_rating'] = float(book['average_rating'])
+            results.append(book)
+    return results
+
+def get_similar_book_recommendations(conn, history, exclude_books, limit=10):
+    """Score the user's history against the precomputed neighbour lists"""
+    try:
+        model = load_neighbor_model(conn, history)
+        if not model['neighbors'] or not history:
+            print("No neighbour model or no history, skipping item similarity")
+            return [], model['version']
+
+        ranked = score_books(model, history, exclude=exclude_books, limit=limit)
+        print(f"Item similarity scored {len(ranked)} candidates (model v{model['version']})")
+
+        recommendations = get_books_by_ids(
+            conn, [book_id for book_id, _ in ranked], 'Readers with similar taste enjoyed this'
+        )
+        scores = dict(ranked)
+        for book in recommendations:
+            book['score'] = round(scores[book['book_id']], 4)
+        return recommendations, model['version']
+
+    except Exception as e:
+        print(f"Error getting item similarity recommendations: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return [], None
 
 def get_user_favorite_genres(conn, user_id):
     """Get user's favorite genres"""
@@ -115,7 +167,7 @@ def get_recommendations_simple(conn, user_id, favorite_genres, exclude_books, li
                     AND b.approval_status = 'approved'
                     {exclude_clause}
                     GROUP BY b.book_id, b.title, b.summary, b.cover_image_url, b.average_rating, b.publish_date
-                    ORDER BY matching_genres DESC, b.average_rating DESC, RAND()
+                    ORDER BY matching_genres DESC, b.average_rating DESC, b.book_id DESC
                     LIMIT %s
                 """
                 
@@ -153,7 +205,7 @@ def get_recommendations_simple(conn, user_id, favorite_genres, exclude_books, li
                     AND b.average_rating >= 4.0
                     {exclude_clause}
                     GROUP BY b.book_id, b.title, b.summary, b.cover_image_url, b.average_rating, b.publish_date
-                    ORDER BY b.average_rating DESC, RAND()
+                    ORDER BY b.average_rating DESC, b.book_id DESC
                     LIMIT %s
                 """
                 
@@ -183,6 +235,7 @@ def get_recommendations_simple(conn, user_id, favorite_genres, exclude_books, li
         traceback.print_exc()
         return []
 
+@measure_invocation
 def lambda_handler(event, context):
     """Generate personalized book recommendations"""
     
@@ -246,17 +299,26 @@ def lambda_handler(event, context):
             
             # Get user's reading history
             print("Fetching reading history...")
-            exclude_books = get_user_reading_history(conn, db_user_id)
+            history = get_user_reading_history(conn, db_user_id)
+            exclude_books = [book_id for book_id, (_, excludes) in history.items() if excludes]
             
             # Get user's favorite genres
             print("Fetching favorite genres...")
             favorite_genres = get_user_favorite_genres(conn, db_user_id)
             
-            # Get recommendations
+            # Get recommendations from the precomputed neighbour model first
             print("Generating recommendations...")
-            recommendations = get_recommendations_simple(
-                conn, db_user_id, favorite_genres, exclude_books, num_results
+            recommendations, model_version = get_similar_book_recommendations(
+                conn, history, exclude_books, num_results
             )
+            source = 'item_similarity' if recommendations else 'custom_algorithm'
+            
+            if len(recommendations) < num_results:
+                # Top up from favorite genres / highly rated books
+                seen = exclude_books + [book['book_id'] for book in recommendations]
+                recommendations += get_recommendations_simple(
+                    conn, db_user_id, favorite_genres, seen, num_results - len(recommendations)
+                )
             
             if not recommendations:
                 print("No recommendations found, trying fallback...")
@@ -281,7 +343,7 @@ def lambda_handler(event, context):
                         LEFT JOIN genres g ON bg.genre_id = g.genre_id
                         WHERE b.approval_status = 'approved'
                         GROUP BY b.book_id, b.title, b.summary, b.cover_image_url, b.average_rating, b.publish_date
-                        ORDER BY b.average_rating DESC, RAND()
+                        ORDER BY b.average_rating DESC, b.book_id DESC
                         LIMIT %s
                     """
                     cursor.execute(sql, (num_results,))
@@ -297,7 +359,8 @@ def lambda_handler(event, context):
             response_body = {
                 'recommendations': recommendations,
                 'total': len(recommendations),
-                'source': 'custom_algorithm',
+                'source': source,
+                'model_version': model_version,
                 'has_favorite_genres': len(favorite_genres) > 0
             }
             
@@ -311,8 +374,8 @@ def lambda_handler(event, context):
             }
             
         finally:
-            conn.close()
-            print("Database connection closed")
+            release_connection(conn)
+            print("Database connection released")
         
     except Exception as e:
         print("=" * 60)
@@ -0,0 +1,159 @@
+"""
+Lambda Function: bookarc-buildAutocompleteIndex
+Batch job that rebuilds the typeahead prefix index snapshot
+
+Loads approved books, registered and external authors and public users,
+scores each by popularity (log of ratings or followers) and serializes them
+with prefix_index.build_snapshot. The snapshot is uploaded to
+s3://AUTOCOMPLETE_BUCKET/AUTOCOMPLETE_KEY (or written to
+AUTOCOMPLETE_INDEX_PATH when set), where bookarc-autocomplete picks it up
+within AUTOCOMPLETE_CHECK_INTERVAL seconds.
+
+Run from an EventBridge schedule (e.g. every 15 minutes) or manually with {}.
+"""
+
+import json
+import math
+import os
+import time
+from datetime import datetime
+import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from prefix_index import build_snapshot, INDEX_PATH, INDEX_BUCKET, INDEX_KEY
+
+
+ENTRY_QUERIES = {
+    'book': """
+        SELECT
+            b.book_id as id,
+            b.title as label,
+            GROUP_CONCAT(a.name ORDER BY a.name SEPARATOR ', ') as subtitle,
+            COALESCE(bs.rating_count, 0) as popularity
+        FROM books b
+        LEFT JOIN book_stats bs ON bs.book_id = b.book_id
+        LEFT JOIN book_author ba ON ba.book_id = b.book_id
+        LEFT JOIN authors a ON a.author_id = ba.author_id
+        WHERE b.approval_status = 'approved'
+        GROUP BY b.book_id, b.title, bs.rating_count
+    """,
+    # Same id semantics as searchAuthors: registered -> user_id, external -> author_id
+    'author_registered': """
+        SELECT
+            u.user_id as id,
+            COALESCE(u.display_name, u.username) as label,
+            'Author' as subtitle,
+            (SELECT COUNT(*) FROM user_follow_user WHERE following_id = u.user_id) +
+            COALESCE((SELECT COUNT(*) FROM user_follow_author WHERE author_id = a.author_id), 0) as popularity
+        FROM users u
+        LEFT JOIN authors a ON u.user_id = a.user_id AND a.is_registered_author = TRUE
+        WHERE u.role = 'author' AND u.is_active = 1
+    """,
+    'author_external': """
+        SELECT
+            a.author_id as id,
+            a.name as label,
+            'Author' as subtitle,
+            (SELECT COUNT(*) FROM user_follow_author WHERE author_id = a.author_id) as popularity
+        FROM authors a
+        WHERE a.is_registered_author = FALSE
+    """,
+    # Same visibility rules as searchUsers without include_private
+    'user': """
+        SELECT
+            u.user_id as id,
+            COALESCE(u.display_name, u.username) as label,
+            CONCAT('@', u.username) as subtitle,
+            (SELECT COUNT(*) FROM user_follow_user WHERE following_id = u.user_id) as popularity
+        FROM users u
+        WHERE u.role != 'author' AND u.is_active = 1 AND u.is_public = TRUE
+    """,
+}
+
+
+def load_entries(cursor):
+    """
+    Load every suggestable entity
+
+    Returns:
+        (entries, counts) where entries are (kind, id, score, label, subtitle)
+    """
+    entries = []
+    counts = {}
+    for kind, sql in ENTRY_QUERIES.items():
+        cursor.execute(sql)
+        rows = cursor.fetchall()
+        counts[kind] = len(rows)
+        for row in rows:
+            if not row['label']:
+                continue
+            score = math.log1p(int(row['popularity'] or 0))
+            entries.append((kind, row['id'], score, row['label'], row['subtitle'] or ''))
+    return entries, counts
+
+
+def publish_snapshot(snapshot):
+    """Write the snapshot where the serving containers read it from"""
+    if INDEX_PATH:
+        tmp_path = f"{INDEX_PATH}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, INDEX_PATH)
+        return INDEX_PATH
+
+    if not INDEX_BUCKET:
+        raise ValueError('Set AUTOCOMPLETE_BUCKET or AUTOCOMPLETE_INDEX_PATH')
+
+    import boto3
+    boto3.client('s3').put_object(
+        Bucket=INDEX_BUCKET,
+        Key=INDEX_KEY,
+        Body=snapshot,
+        ContentType='application/octet-stream'
+    )
+    return f"s3://{INDEX_BUCKET}/{INDEX_KEY}"
+
+
+@measure_invocation
+def lambda_handler(event, context):
+    """Rebuild and publish the autocomplete snapshot"""
+    print("Building autocomplete index")
+    started = time.monotonic()
+
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
+    try:
+        with connection.cursor() as cursor:
+            entries, counts = load_entries(cursor)
+
+        snapshot = build_snapshot(entries, meta={
+            'built_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'counts': counts,
+        })
+        location = publish_snapshot(snapshot)
+
+        elapsed = round(time.monotonic() - started, 2)
+        print(f"✅ Autocomplete index: {len(entries)} records, {len(snapshot)} bytes -> {location} in {elapsed}s")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'records': len(entries),
+                'bytes': len(snapshot),
+                'location': location,
+                'elapsed_seconds': elapsed,
+                'counts': counts
+            })
+        }
+
+    except Exception as e:
+        print(f"Error building autocomplete index: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
+        }
+
+    finally:
+        release_connection(connection)
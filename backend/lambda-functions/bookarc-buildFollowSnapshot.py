@@ -0,0 +1,123 @@
+"""
+Lambda Function: bookarc-buildFollowSnapshot
+Batch job that rebuilds the follow graph adjacency snapshot
+
+Streams every user -> user edge between active users out of
+user_follow_user and serializes both directions with
+follow_snapshot.build_snapshot. The snapshot is uploaded to
+s3://FOLLOW_SNAPSHOT_BUCKET/FOLLOW_SNAPSHOT_KEY (or written to
+FOLLOW_SNAPSHOT_PATH when set), where bookarc-getSocialConnections picks it
+up within FOLLOW_SNAPSHOT_CHECK_INTERVAL seconds.
+
+Run from an EventBridge schedule (e.g. every 15 minutes) or manually with {}.
+
+Requires the NumPy layer in addition to pymysql.
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+import numpy as np
+import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from follow_snapshot import build_snapshot, SNAPSHOT_PATH, SNAPSHOT_BUCKET, SNAPSHOT_KEY
+
+FETCH_CHUNK_SIZE = 50000
+
+EDGE_SQL = """
+    SELECT ufu.follower_id, ufu.following_id
+    FROM user_follow_user ufu
+    JOIN users f ON f.user_id = ufu.follower_id AND f.is_active = 1
+    JOIN users t ON t.user_id = ufu.following_id AND t.is_active = 1
+"""
+
+
+def load_edges(connection):
+    """
+    Stream every active edge without materialising row dicts
+
+    Returns:
+        (followers, following) as int64 NumPy arrays
+    """
+    followers, following = [], []
+    with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(EDGE_SQL)
+        while True:
+            rows = cursor.fetchmany(FETCH_CHUNK_SIZE)
+            if not rows:
+                break
+            chunk = np.array(rows, dtype=np.int64)
+            followers.append(chunk[:, 0])
+            following.append(chunk[:, 1])
+
+    if not followers:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(followers), np.concatenate(following)
+
+
+def publish_snapshot(snapshot):
+    """Write the snapshot where the serving containers read it from"""
+    if SNAPSHOT_PATH:
+        tmp_path = f"{SNAPSHOT_PATH}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, SNAPSHOT_PATH)
+        return SNAPSHOT_PATH
+
+    if not SNAPSHOT_BUCKET:
+        raise ValueError('Set FOLLOW_SNAPSHOT_BUCKET or FOLLOW_SNAPSHOT_PATH')
+
+    import boto3
+    boto3.client('s3').put_object(
+        Bucket=SNAPSHOT_BUCKET,
+        Key=SNAPSHOT_KEY,
+        Body=snapshot,
+        ContentType='application/octet-stream'
+    )
+    return f"s3://{SNAPSHOT_BUCKET}/{SNAPSHOT_KEY}"
+
+
+@measure_invocation
+def lambda_handler(event, context):
+    """Rebuild and publish the follow graph snapshot"""
+    print("Building follow graph snapshot")
+    started = time.monotonic()
+
+    connection = acquire_connection()
+
+    try:
+        followers, following = load_edges(connection)
+        print(f"Loaded {len(followers)} edges")
+
+        snapshot = build_snapshot(followers, following, meta={
+            'built_at': datetime.utcnow().isoformat(timespec='seconds'),
+        })
+        location = publish_snapshot(snapshot)
+
+        edges = len(followers)
+        elapsed = round(time.monotonic() - started, 2)
+        print(f"✅ Follow snapshot: {edges} edges, {len(snapshot)} bytes -> {location} in {elapsed}s")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'edges': edges,
+                'bytes': len(snapshot),
+                'location': location,
+                'elapsed_seconds': elapsed
+            })
+        }
+
+    except Exception as e:
+        print(f"Error building follow snapshot: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
+        }
+
+    finally:
+        release_connection(connection)
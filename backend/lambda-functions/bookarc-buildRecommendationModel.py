@@ -0,0 +1,236 @@
+"""
+Lambda Function: bookarc-buildRecommendationModel
+Offline batch job that precomputes item-item book neighbours
+
+Builds a user x book implicit-feedback matrix from ratings, reviews,
+list_books, user_reading_status and interaction_events, computes cosine
+similarity between book columns with SciPy sparse matrices and stores the
+top-K neighbours of every approved book in book_neighbors under a new
+model version. bookarc-bookRecommendation serves from those lists.
+
+Run from an EventBridge schedule (e.g. nightly) or manually with:
+    {}                          -> defaults
+    {"top_k": 50, "min_support": 2, "keep_versions": 2}
+
+Requires the NumPy/SciPy layer in addition to pymysql.
+"""
+
+import json
+import os
+import time
+import numpy as np
+import pymysql
+from scipy import sparse
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from recommendation_model import signal_sql
+
+DEFAULT_TOP_K = int(os.environ.get('RECOMMENDATION_TOP_K', '50'))
+# Books with fewer interacting users than this get no neighbour list
+DEFAULT_MIN_SUPPORT = int(os.environ.get('RECOMMENDATION_MIN_SUPPORT', '2'))
+# Shrink similarities backed by few co-occurrences: sim * n / (n + SHRINKAGE)
+SHRINKAGE = float(os.environ.get('RECOMMENDATION_SHRINKAGE', '5'))
+INSERT_CHUNK_SIZE = 1000
+
+
+def load_interactions(cursor):
+    """
+    Load every (user, book, weight) signal for approved books
+
+    Returns:
+        (user_idx, book_idx, weights, book_ids) as NumPy arrays
+    """
+    cursor.execute("SELECT book_id FROM books WHERE approval_status = 'approved' ORDER BY book_id")
+    book_ids = np.fromiter((row['book_id'] for row in cursor.fetchall()), dtype=np.int64)
+
+    sql, params = signal_sql()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    print(f"Loaded {len(rows)} raw signals for {len(book_ids)} approved books")
+
+    users = np.fromiter((row['user_id'] for row in rows), dtype=np.int64, count=len(rows))
+    books = np.fromiter((row['book_id'] for row in rows), dtype=np.int64, count=len(rows))
+    weights = np.fromiter((float(row['weight']) for row in rows), dtype=np.float32, count=len(rows))
+
+    # Drop signals on books that are not (or no longer) approved
+    book_pos = np.searchsorted(book_ids, books)
+    known = book_pos < len(book_ids)
+    known[known] = book_ids[book_pos[known]] == books[known]
+    users, book_pos, weights = users[known], book_pos[known], weights[known]
+
+    _, user_idx = np.unique(users, return_inverse=True)
+    return user_idx, book_pos, weights, book_ids
+
+
+def build_user_book_matrix(user_idx, book_idx, weights, n_books):
+    """Collapse duplicate (user, book) signals to their strongest weight"""
+    n_users = int(user_idx.max()) + 1 if len(user_idx) else 0
+    keys = user_idx.astype(np.int64) * n_books + book_idx
+    order = np.argsort(keys, kind='stable')
+    keys, weights = keys[order], weights[order]
+
+    unique_keys, starts = np.unique(keys, return_index=True)
+    strongest = np.maximum.reduceat(weights, starts) if len(starts) else weights
+
+    return sparse.csr_matrix(
+        (strongest, (unique_keys // n_books, unique_keys % n_books)),
+        shape=(n_users, n_books),
+        dtype=np.float32
+    )
+
+
+def compute_similarity(matrix, min_support):
+    """
+    Cosine similarity between book columns, shrunk by co-occurrence count
+
+    Returns:
+        Sparse CSR book x book similarity matrix with an empty diagonal
+    """
+    matrix = matrix.tocsc()
+    binary = matrix.copy()
+    binary.data[:] = 1.0
+
+    support = np.asarray(binary.sum(axis=0)).ravel()
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[support < min_support] = 0.0
+    inverse = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+    normalized = matrix @ sparse.diags(inverse.astype(np.float32))
+    similarity = (normalized.T @ normalized).tocsr()
+
+    if SHRINKAGE > 0:
+        shrink = (binary.T @ binary).tocsr()
+        shrink.data = shrink.data / (shrink.data + SHRINKAGE)
+        similarity = similarity.multiply(shrink).tocsr()
+
+    similarity.setdiag(0)
+    similarity.eliminate_zeros()
+    return similarity
+
+
+def top_k_neighbors(similarity, book_ids, top_k):
+    """Yield (book_id, neighbor_id, score, rank) for the best neighbours of each book"""
+    indptr, indices, data = similarity.indptr, similarity.indices, similarity.data
+    for row in range(similarity.shape[0]):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        scores = data[start:end]
+        if end - start > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            best = np.arange(end - start)
+        best = best[np.argsort(-scores[best], kind='stable')]
+        for rank, pos in enumerate(best, start=1):
+            yield (
+                int(book_ids[row]),
+                int(book_ids[indices[start + pos]]),
+                float(scores[pos]),
+                rank
+            )
+
+
+def save_model(connection, cursor, neighbors, stats, keep_versions):
+    """Write a new model version, mark it ready and prune old versions"""
+    cursor.execute("""
+        INSERT INTO recommendation_models (status, books, users, signals, neighbor_rows)
+        VALUES ('building', %s, %s, %s, 0)
+    """, (stats['books'], stats['users'], stats['signals']))
+    version = cursor.lastrowid
+    connection.commit()
+
+    sql = """
+        INSERT INTO book_neighbors (model_version, book_id, neighbor_id, score, neighbor_rank)
+        VALUES (%s, %s, %s, %s, %s)
+    """
+    chunk = []
+    written = 0
+    for book_id, neighbor_id, score, rank in neighbors:
+        chunk.append((version, book_id, neighbor_id, score, rank))
+        if len(chunk) >= INSERT_CHUNK_SIZE:
+            cursor.executemany(sql, chunk)
+            written += len(chunk)
+            chunk = []
+    if chunk:
+        cursor.executemany(sql, chunk)
+        written += len(chunk)
+
+    cursor.execute("""
+        UPDATE recommendation_models
+        SET status = 'ready', neighbor_rows = %s, completed_at = NOW()
+        WHERE model_version = %s
+    """, (written, version))
+    connection.commit()
+
+    # Serving containers pick up the new version on their next check
+    cursor.execute("""
+        SELECT model_version, status
+        FROM recommendation_models
+        WHERE model_version < %s
+        ORDER BY model_version DESC
+    """, (version,))
+    previous = cursor.fetchall()
+    ready = [row['model_version'] for row in previous if row['status'] == 'ready']
+    failed = [row['model_version'] for row in previous if row['status'] != 'ready']
+    stale = ready[keep_versions - 1:] + failed
+    if stale:
+        placeholders = ', '.join(['%s'] * len(stale))
+        cursor.execute(f"DELETE FROM book_neighbors WHERE model_version IN ({placeholders})", stale)
+        cursor.execute(f"DELETE FROM recommendation_models WHERE model_version IN ({placeholders})", stale)
+        connection.commit()
+        print(f"Pruned model versions: {stale}")
+
+    return version, written
+
+
+@measure_invocation
+def lambda_handler(event, context):
+    """Rebuild the item-item neighbour model"""
+    event = event or {}
+    top_k = int(event.get('top_k', DEFAULT_TOP_K))
+    min_support = int(event.get('min_support', DEFAULT_MIN_SUPPORT))
+    keep_versions = max(int(event.get('keep_versions', 2)), 1)
+
+    print(f"Building recommendation model (top_k={top_k}, min_support={min_support})")
+    started = time.monotonic()
+
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
+    try:
+        with connection.cursor() as cursor:
+            user_idx, book_idx, weights, book_ids = load_interactions(cursor)
+            matrix = build_user_book_matrix(user_idx, book_idx, weights, len(book_ids))
+            print(f"User x book matrix: {matrix.shape}, {matrix.nnz} non-zeros")
+
+            similarity = compute_similarity(matrix, min_support)
+            print(f"Similarity matrix: {similarity.nnz} non-zeros")
+
+            stats = {'books': len(book_ids), 'users': matrix.shape[0], 'signals': int(matrix.nnz)}
+            version, written = save_model(
+                connection, cursor, top_k_neighbors(similarity, book_ids, top_k), stats, keep_versions
+            )
+
+        elapsed = round(time.monotonic() - started, 2)
+        print(f"Model v{version} ready: {written} neighbour rows in {elapsed}s")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({
+                'model_version': version,
+                'neighbor_rows': written,
+                'elapsed_seconds': elapsed,
+                **stats
+            })
+        }
+
+    except Exception as e:
+        print(f"Error building recommendation model: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
+        }
+
+    finally:
+        release_connection(connection)
@@ -0,0 +1,111 @@
+import json
+import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_identity
+from user_counters import record_unread_change, get_unread_count
+from notification_selection import parse_selection
+
+@measure_invocation
+def lambda_handler(event, context):
+    """
+    PATCH /notifications/bulk-read
+    Mark a set of the current user's notifications as read
+    Body: {"ids": [1, 2, ...]} (up to 1000) or {"before": cursor | id | timestamp}
+
+    One UPDATE; rows of other users are excluded by the WHERE clause, so
+    foreign or unknown ids are simply not counted.
+    """
+
+    headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+        'Access-Control-Allow-Methods': 'OPTIONS,PATCH',
+        'Content-Type': 'application/json'
+    }
+
+    if event.get('httpMethod') == 'OPTIONS':
+        return {'statusCode': 200, 'headers': headers, 'body': ''}
+
+    try:
+        # Get user from JWT token
+        authorizer = event.get('requestContext', {}).get('authorizer', {})
+        cognito_sub = authorizer.get('claims', {}).get('sub') if 'claims' in authorizer else authorizer.get('cognito_sub')
+
+        if not cognito_sub:
+            return {
+                'statusCode': 401,
+                'headers': headers,
+                'body': json.dumps({'error': 'Unauthorized'})
+            }
+
+        try:
+            body = json.loads(event.get('body') or '{}')
+            selection, selection_params = parse_selection(body)
+        except json.JSONDecodeError:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': 'Invalid JSON in request body'})
+            }
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': str(e)})
+            }
+
+        # Connect to database
+        conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
+        try:
+            with conn.cursor() as cursor:
+                user = resolve_identity(cursor, cognito_sub, authorizer.get('claims'), require_active=True)
+
+                if not user:
+                    return {
+                        'statusCode': 404,
+                        'headers': headers,
+                        'body': json.dumps({'error': 'User not found'})
+                    }
+
+                user_id = user['user_id']
+
+                # Only unread rows change, so rowcount is exactly the counter delta
+                cursor.execute(f"""
+                    UPDATE notifications
+                    SET is_read = TRUE
+                    WHERE user_id = %s AND is_read = FALSE AND {selection}
+                """, [user_id] + selection_params)
+
+                updated_count = cursor.rowcount
+                if updated_count:
+                    record_unread_change(cursor, {user_id: -updated_count})
+                conn.commit()
+
+                return {
+                    'statusCode': 200,
+                    'headers': headers,
+                    'body': json.dumps({
+                        'message': f'{updated_count} notifications marked as read',
+                        'updated_count': updated_count,
+                        'unread_count': get_unread_count(cursor, user_id)
+                    })
+                }
+
+        finally:
+            release_connection(conn)
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+
+        return {
+            'statusCode': 500,
+            'headers': headers,
+            'body': json.dumps({
+                'error': 'Internal server error',
+                'details': str(e)
+            })
+        }
@@ -218,6 +218,9 @@ def send_password_change_notification(access_token):
             return
         
         import pymysql
+        from db_connection import acquire_connection, release_connection
+        from query_metrics import begin_invocation, end_invocation
+        from notification_service import NotificationService
         
         # Get user info from Cognito
         user_info = cognito_client.get_user(AccessToken=access_token)
@@ -233,13 +236,8 @@ def send_password_change_notification(access_token):
             return
         
         # Connect to database
-        conn = pymysql.connect(
-            host=os.environ.get('DB_HOST'),
-            user=os.environ.get('DB_USER'),
-            password=os.environ.get('DB_PASSWORD'),
-            database=os.environ.get('DB_NAME'),
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        begin_invocation()
+        conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with conn.cursor() as cursor:
@@ -252,22 +250,16 @@ def send_password_change_notification(access_token):
                 
                 if user:
                     # Create notification
-                    cursor.execute("""
-                        INSERT INTO notifications (user_id, message, type, audience_type, is_read)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """, (
-                        user['user_id'],
-                        'Your password was successfully changed. If you did not make this change, please contact support immediately.',
-                        'security',
-                        'all',
-                        False
-                    ))
+                    notif_service = NotificationService(conn)
+                    notif_service.notify_password_changed(user['user_id'])
+                    notif_service.flush(cursor)
                     conn.commit()
                     print(f"Notification sent to user {user['user_id']}")
                 else:
                     print("User not found in database")
         finally:
-            conn.close()
+            release_connection(conn)
+            end_invocation()
             
     except ImportError:
         print("pymysql not available, skipping notification")
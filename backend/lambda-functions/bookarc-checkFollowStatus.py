@@ -1,6 +1,8 @@
 import json
 import pymysql
 import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
 # RDS Configuration - UPDATED variable names
 DB_HOST = os.environ.get('DB_HOST')
@@ -12,20 +14,14 @@ def get_db_connection():
     """Create database connection with error handling"""
     try:
         print(f"Attempting DB connection to {DB_HOST}")
-        connection = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5,
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         print("Database connection successful")
         return connection
     except Exception as e:
         print(f"Database connection failed: {str(e)}")
         raise
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Check if current user is following a specific user
@@ -178,8 +174,8 @@ def lambda_handler(event, context):
                 }
         
         finally:
-            conn.close()
-            print("Database connection closed")
+            release_connection(conn)
+            print("Database connection released")
     
     except pymysql.Error as e:
         print(f"Database error: {str(e)}")
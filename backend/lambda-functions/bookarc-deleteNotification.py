@@ -1,7 +1,10 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import record_unread_change
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     DELETE /notifications/{notification_id}
@@ -34,13 +37,7 @@ def lambda_handler(event, context):
         notification_id = event['pathParameters']['notification_id']
         
         # Connect to database
-        conn = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with conn.cursor() as cursor:
@@ -61,19 +58,32 @@ def lambda_handler(event, context):
                 
                 user_id = user['user_id']
                 
-                # Delete notification (only if it belongs to user)
+                # Lock the row so a concurrent mark-read can't double-count it
                 cursor.execute("""
-                    DELETE FROM notifications 
+                    SELECT is_read FROM notifications 
                     WHERE notification_id = %s AND user_id = %s
+                    FOR UPDATE
                 """, (notification_id, user_id))
                 
-                if cursor.rowcount == 0:
+                notification = cursor.fetchone()
+                
+                if not notification:
+                    conn.rollback()
                     return {
                         'statusCode': 404,
                         'headers': headers,
                         'body': json.dumps({'error': 'Notification not found'})
                     }
                 
+                # Delete notification (only if it belongs to user)
+                cursor.execute("""
+                    DELETE FROM notifications 
+                    WHERE notification_id = %s AND user_id = %s
+                """, (notification_id, user_id))
+                
+                if not notification['is_read']:
+                    record_unread_change(cursor, {user_id: -1})
+                
                 conn.commit()
                 
                 return {
@@ -86,7 +96,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            conn.close()
+            release_connection(conn)
             
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -3,16 +3,12 @@ import pymysql
 import os
 import boto3
 from typing import Dict, Any, Optional
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from book_stats import remove_user_contributions
+from user_counters import remove_user_follows
 
 # Environment configuration
-DB_CONFIG = {
-    'host': os.environ['DB_HOST'],
-    'user': os.environ['DB_USER'],
-    'password': os.environ['DB_PASSWORD'],
-    'database': os.environ['DB_NAME'],
-    'connect_timeout': 5
-}
-
 COGNITO_USER_POOL_ID = os.environ['COGNITO_USER_POOL_ID']
 S3_BUCKET = os.environ.get('S3_BUCKET')
 
@@ -119,6 +115,16 @@ def delete_user_from_db(connection, user_id: int) -> bool:
             
             delete_from_table(cursor, 'lists', 'user_id = %s', (user_id,))
         
+        # Take the user's ratings/reviews out of the per-book aggregates first
+        if table_exists(cursor, 'book_stats'):
+            remove_user_contributions(cursor, user_id)
+            print("Removed rating/review contributions from book_stats")
+        
+        # Take the user's follow edges out of other users' counters before they cascade away
+        if table_exists(cursor, 'user_counters'):
+            remove_user_follows(cursor, user_id)
+            print("Removed follow edges from user_counters")
+        
         # Delete from all other tables
         for table, where, params in tables_to_delete:
             delete_from_table(cursor, table, where, params)
@@ -144,6 +150,7 @@ def get_user_info(connection, cognito_sub: str) -> Optional[Dict[str, Any]]:
         )
         return cursor.fetchone()
 
+@measure_invocation
 def lambda_handler(event, context):
     """Delete user account completely (DB + S3 + Cognito)"""
     print(f"Event: {json.dumps(event)}")
@@ -176,7 +183,7 @@ def lambda_handler(event, context):
     connection = None
     try:
         # Connect to database
-        connection = pymysql.connect(**DB_CONFIG)
+        connection = acquire_connection()
         
         # Get user info
         user = get_user_info(connection, cognito_sub)
@@ -229,4 +236,4 @@ def lambda_handler(event, context):
     
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
@@ -1,22 +1,13 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_user_id
 
-# Database configuration
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME', 'bookarcdb')
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def get_user_id_from_token(event):
     """Extract user_id from JWT token claims"""
@@ -27,20 +18,14 @@ def get_user_id_from_token(event):
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT user_id FROM users WHERE cognito_sub = %s",
-                    (cognito_sub,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    return result['user_id']
-                return None
+                return resolve_user_id(cursor, cognito_sub, claims)
         finally:
-            conn.close()
+            release_connection(conn)
     except Exception as e:
         print(f"Error extracting user_id: {str(e)}")
         return None
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Delete a custom list
@@ -125,7 +110,7 @@ def lambda_handler(event, context):
                 }
         
         finally:
-            conn.close()
+            release_connection(conn)
     
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -0,0 +1,76 @@
+"""
+Lambda Function: bookarc-drainNotificationOutbox
+Expand queued notification fan-outs (notification_outbox) into notifications
+
+Runs from an EventBridge schedule (e.g. every minute) and is also invoked
+asynchronously right after an enqueue when NOTIFICATION_OUTBOX_WORKER is
+set on the enqueuing function. Invoke manually with:
+    {}                                  -> drain due entries
+    {"max_entries": 50, "chunk_size": 1000}
+    {"mode": "retry_failed"}            -> requeue entries that hit MAX_ATTEMPTS
+"""
+
+import json
+import time
+import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_outbox import drain, get_outbox, CHUNK_SIZE
+
+VALID_MODES = ['drain', 'retry_failed']
+# Stop starting new chunks this long before the Lambda timeout
+DEADLINE_MARGIN_MS = 10000
+
+
+@measure_invocation
+def lambda_handler(event, context):
+    """Drain the notification outbox"""
+    event = event or {}
+    mode = event.get('mode', 'drain')
+    max_entries = int(event.get('max_entries', 10))
+    chunk_size = int(event.get('chunk_size', CHUNK_SIZE))
+
+    if mode not in VALID_MODES:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f"mode must be one of: {', '.join(VALID_MODES)}"})
+        }
+
+    deadline = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        remaining_ms = context.get_remaining_time_in_millis() - DEADLINE_MARGIN_MS
+        deadline = time.monotonic() + max(remaining_ms, 0) / 1000
+
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
+    try:
+        outbox = get_outbox(connection)
+
+        if mode == 'retry_failed':
+            moved = outbox.retry_failed(max_entries)
+            print(f"Requeued {moved} failed outbox entries")
+            return {
+                'statusCode': 200,
+                'body': json.dumps({'mode': mode, 'requeued': moved})
+            }
+
+        stats = drain(outbox, connection, max_entries=max_entries,
+                      chunk_size=chunk_size, deadline=deadline)
+        print(f"✅ Outbox drained: {stats}")
+
+        return {
+            'statusCode': 200,
+            'body': json.dumps({'mode': mode, **stats})
+        }
+
+    except Exception as e:
+        print(f"Error draining notification outbox: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
+        }
+
+    finally:
+        release_connection(connection)
@@ -7,27 +7,17 @@ Runtime: Python 3.14
 
 import json
 import pymysql
-import os
 from typing import Dict, Any
-
-# Database configuration from environment variables
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME')
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
 
 def get_db_connection():
     """Create and return a database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 
+@measure_invocation
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Main Lambda handler for favoriting/unfavoriting genres
@@ -179,4 +169,4 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
@@ -1,40 +1,38 @@
 import json
-import os
 import pymysql
 from datetime import datetime
 from decimal import Decimal
-
-# Database configuration
-db_config = {
-    'host': os.environ['DB_HOST'],
-    'user': os.environ['DB_USER'],
-    'password': os.environ['DB_PASSWORD'],
-    'database': os.environ['DB_NAME'],
-    'charset': 'utf8mb4',
-    'cursorclass': pymysql.cursors.DictCursor
-}
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_identity
+from user_counters import record_author_follow_change, get_author_follower_counts
+from follow_graph import (
+    follower_page, following_page, author_list_stats, invalidate_adjacency, parse_limit, decode_cursor
+)
 
 def decimal_default(obj):
     if isinstance(obj, Decimal):
         return float(obj)
     raise TypeError
 
+def json_default(obj):
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return decimal_default(obj)
+
 def get_db_connection():
-    return pymysql.connect(**db_config)
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def get_user_from_token(event):
-    """Extract user_id from Cognito JWT token"""
+    """Extract user_id/role from the Cognito claims (identity cache, then users)"""
     try:
-        cognito_sub = event['requestContext']['authorizer']['claims']['sub']
+        claims = event['requestContext']['authorizer']['claims']
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute("""
-                    SELECT user_id, role FROM users WHERE cognito_sub = %s AND is_active = 1
-                """, (cognito_sub,))
-                return cursor.fetchone()
+                return resolve_identity(cursor, claims['sub'], claims, require_active=True)
         finally:
-            conn.close()
+            release_connection(conn)
     except Exception as e:
         print(f"Error getting user from token: {str(e)}")
         return None
@@ -65,7 +63,7 @@ def extract_author_id(event):
                     if result:
                         return result['author_id']
             finally:
-                conn.close()
+                release_connection(conn)
         except Exception as e:
             print(f"Error converting user_id to author_id: {str(e)}")
     
@@ -92,12 +90,13 @@ def extract_author_id(event):
                         if result:
                             return result['author_id']
                 finally:
-                    conn.close()
+                    release_connection(conn)
     except Exception as e:
         print(f"Error parsing from path: {str(e)}")
     
     return None
 
+@measure_invocation
 def lambda_handler(event, context):
     """Handle author follow/unfollow operations"""
     
@@ -126,7 +125,7 @@ def lambda_handler(event, context):
         elif path.endswith('/follow-status') and http_method == 'GET':
             return handle_follow_status(event, author_id, headers)
         elif path.endswith('/followers') and http_method == 'GET':
-            return handle_get_followers(author_id, headers)
+            return handle_get_followers(event, author_id, headers)
         elif path == '/author/following' or path.endswith('/author/following'):
             return handle_get_following(event, headers)
         else:
@@ -141,7 +140,13 @@ def lambda_handler(event, context):
                'body': json.dumps({'message': f'Internal server error: {str(e)}'})}
 
 def handle_follow_unfollow(event, author_id, headers):
-    """Handle follow/unfollow action"""
+    """
+    Handle follow/unfollow action
+
+    Idempotent: repeating an action returns 200 with changed=false. A
+    change is one INSERT IGNORE / DELETE plus the counter upserts in one
+    transaction.
+    """
     
     print(f"Starting follow/unfollow for author_id: {author_id}")
     
@@ -174,57 +179,44 @@ def handle_follow_unfollow(event, author_id, headers):
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("""
-                SELECT author_id, name, is_registered_author, user_id, average_rating
-                FROM authors WHERE author_id = %s
-            """, (author_id,))
-            
-            author = cursor.fetchone()
-            
-            if not author:
-                return {'statusCode': 404, 'headers': headers,
-                       'body': json.dumps({'message': 'Author not found', 'author_id': author_id})}
-            
-            print(f"Found author: {author['name']} (author_id={author['author_id']}, is_registered={author['is_registered_author']})")
-            
-            if author['is_registered_author'] and author['user_id'] == user_id:
-                return {'statusCode': 403, 'headers': headers,
-                       'body': json.dumps({'message': 'You cannot follow yourself'})}
-            
             if action == 'follow':
+                # One idempotent statement: inserts only if the author exists,
+                # is not the caller's own profile and is not followed yet
                 cursor.execute("""
-                    SELECT * FROM user_follow_author WHERE user_id = %s AND author_id = %s
-                """, (user_id, author_id))
-                
-                if cursor.fetchone():
-                    return {'statusCode': 400, 'headers': headers,
-                           'body': json.dumps({'message': f'Already following {author["name"]}'})}
-                
-                cursor.execute("""
-                    INSERT INTO user_follow_author (user_id, author_id, followed_at)
-                    VALUES (%s, %s, NOW())
-                """, (user_id, author_id))
-                
-                conn.commit()
-                print(f"Follow inserted! Rows affected: {cursor.rowcount}")
-                message = f'Successfully followed {author["name"]}'
-                
+                    INSERT IGNORE INTO user_follow_author (user_id, author_id, followed_at)
+                    SELECT %s, author_id, NOW()
+                    FROM authors
+                    WHERE author_id = %s
+                      AND NOT (is_registered_author AND user_id <=> %s)
+                """, (user_id, author_id, user_id))
             else:  # unfollow
-                cursor.execute("""
-                    SELECT * FROM user_follow_author WHERE user_id = %s AND author_id = %s
-                """, (user_id, author_id))
-                
-                if not cursor.fetchone():
-                    return {'statusCode': 400, 'headers': headers,
-                           'body': json.dumps({'message': f'Not following {author["name"]}'})}
-                
                 cursor.execute("""
                     DELETE FROM user_follow_author WHERE user_id = %s AND author_id = %s
                 """, (user_id, author_id))
-                
+            changed = cursor.rowcount == 1
+            
+            if changed:
+                record_author_follow_change(cursor, user_id, author_id, 1 if action == 'follow' else -1)
                 conn.commit()
-                print(f"Unfollow deleted! Rows affected: {cursor.rowcount}")
-                message = f'Successfully unfollowed {author["name"]}'
+                invalidate_adjacency('author', author_id)
+                print(f"{action} applied for user {user_id} -> author {author_id}")
+            elif action == 'follow':
+                # Slow path only: tell a missing author or self-follow from a repeated click
+                cursor.execute("""
+                    SELECT is_registered_author, user_id FROM authors WHERE author_id = %s
+                """, (author_id,))
+                author = cursor.fetchone()
+                if not author:
+                    return {'statusCode': 404, 'headers': headers,
+                           'body': json.dumps({'message': 'Author not found', 'author_id': author_id})}
+                if author['is_registered_author'] and author['user_id'] == user_id:
+                    return {'statusCode': 403, 'headers': headers,
+                           'body': json.dumps({'message': 'You cannot follow yourself'})}
+        
+        if action == 'follow':
+            message = 'Successfully followed author' if changed else 'Already following author'
+        else:
+            message = 'Successfully unfollowed author' if changed else 'Not following author'
         
         return {
             'statusCode': 200,
@@ -233,9 +225,9 @@ def handle_follow_unfollow(event, author_id, headers):
                 'message': message,
                 'userId': user_id,
                 'authorId': author_id,
-                'authorType': 'registered' if author['is_registered_author'] else 'external',
-                'action': action
-            }, default=decimal_default)
+                'action': action,
+                'changed': changed
+            })
         }
         
     except Exception as e:
@@ -246,7 +238,7 @@ def handle_follow_unfollow(event, author_id, headers):
         return {'statusCode': 500, 'headers': headers,
                'body': json.dumps({'message': f'Failed to {action} author: {str(e)}'})}
     finally:
-        conn.close()
+        release_connection(conn)
 
 def handle_follow_status(event, author_id, headers):
     """Check if user is following an author"""
@@ -279,40 +271,72 @@ def handle_follow_status(event, author_id, headers):
             return {'statusCode': 200, 'headers': headers,
                    'body': json.dumps({'isFollowing': is_following, 'userId': user_id, 'authorId': author_id})}
     finally:
-        conn.close()
+        release_connection(conn)
 
-def handle_get_followers(author_id, headers):
-    """Get all followers of an author"""
+def parse_page_params(event):
+    """(limit, cursor) from the query string; raises ValueError"""
+    params = event.get('queryStringParameters') or {}
+    limit = parse_limit(params.get('limit'))
+    cursor_value = params.get('cursor')
+    if cursor_value:
+        decode_cursor(cursor_value)
+    return limit, cursor_value
+
+def handle_get_followers(event, author_id, headers):
+    """Get one page of an author's followers, newest first (limit, cursor)"""
     
     if not author_id:
         return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'message': 'Author ID is required'})}
     
+    try:
+        limit, cursor_value = parse_page_params(event)
+    except ValueError as e:
+        return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'message': str(e)})}
+    
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
-            cursor.execute("SELECT author_id, name FROM authors WHERE author_id = %s", (author_id,))
+            cursor.execute("""
+                SELECT a.author_id, a.name, COALESCE(ac.followers, 0) as followers
+                FROM authors a
+                LEFT JOIN author_counters ac ON ac.author_id = a.author_id
+                WHERE a.author_id = %s
+            """, (author_id,))
             
-            if not cursor.fetchone():
+            author = cursor.fetchone()
+            if not author:
                 return {'statusCode': 404, 'headers': headers, 'body': json.dumps({'message': 'Author not found'})}
             
-            cursor.execute("""
-                SELECT 
-                    u.user_id, u.username, u.profile_image as avatar_url, u.bio, ufa.followed_at
-                FROM user_follow_author ufa
-                JOIN users u ON ufa.user_id = u.user_id
-                WHERE ufa.author_id = %s AND u.is_active = 1 AND u.is_public = 1
-                ORDER BY ufa.followed_at DESC
-            """, (author_id,))
+            total = max(int(author['followers']), 0)
+            
+            # Hot authors page from the per-container adjacency cache
+            edges, next_cursor = follower_page(cursor, 'author', author_id, limit, cursor_value, total)
             
-            followers = cursor.fetchall()
+            users = {}
+            if edges:
+                cursor.execute(f"""
+                    SELECT u.user_id, u.username, u.profile_image as avatar_url, u.bio
+                    FROM users u
+                    WHERE u.user_id IN ({', '.join(['%s'] * len(edges))})
+                      AND u.is_active = 1 AND u.is_public = 1
+                """, [user_id for user_id, _ in edges])
+                users = {row['user_id']: row for row in cursor.fetchall()}
+            
+            # Private/inactive followers are skipped, so a page can be short
+            followers = [
+                {**users[user_id], 'followed_at': followed_at}
+                for user_id, followed_at in edges if user_id in users
+            ]
             
             return {'statusCode': 200, 'headers': headers,
-                   'body': json.dumps({'followers': followers, 'total': len(followers)}, default=decimal_default)}
+                   'body': json.dumps({'followers': followers, 'total': total, 'limit': limit,
+                                       'has_more': next_cursor is not None, 'next_cursor': next_cursor},
+                                      default=json_default)}
     finally:
-        conn.close()
+        release_connection(conn)
 
 def handle_get_following(event, headers):
-    """Get all authors the user is following"""
+    """Get one page of the authors the user is following, newest first (limit, cursor)"""
     
     user = get_user_from_token(event)
     if not user:
@@ -320,26 +344,35 @@ def handle_get_following(event, headers):
     
     user_id = user['user_id']
     
+    try:
+        limit, cursor_value = parse_page_params(event)
+    except ValueError as e:
+        return {'statusCode': 400, 'headers': headers, 'body': json.dumps({'message': str(e)})}
+    
     conn = get_db_connection()
     try:
         with conn.cursor() as cursor:
             cursor.execute("""
-                SELECT 
-                    a.author_id, a.name, a.bio, a.verified, a.average_rating,
-                    a.is_registered_author, a.user_id, a.external_source_id, ufa.followed_at,
-                    COUNT(DISTINCT ba.book_id) as total_books,
-                    COUNT(DISTINCT ufa2.user_id) as followers
-                FROM user_follow_author ufa
-                JOIN authors a ON ufa.author_id = a.author_id
-                LEFT JOIN book_author ba ON a.author_id = ba.author_id
-                LEFT JOIN user_follow_author ufa2 ON a.author_id = ufa2.author_id
-                WHERE ufa.user_id = %s
-                GROUP BY a.author_id, a.name, a.bio, a.verified, a.average_rating,
-                         a.is_registered_author, a.user_id, a.external_source_id, ufa.followed_at
-                ORDER BY ufa.followed_at DESC
+                SELECT COALESCE(MAX(following_authors), 0) as following_authors
+                FROM user_counters WHERE user_id = %s
             """, (user_id,))
+            total = max(int(cursor.fetchone()['following_authors']), 0)
+            
+            edges, next_cursor = following_page(cursor, user_id, limit, cursor_value, kinds=('author',))
+            author_ids = [author_id for _, author_id, _ in edges]
             
-            authors = cursor.fetchall()
+            authors = {}
+            if author_ids:
+                cursor.execute(f"""
+                    SELECT 
+                        a.author_id, a.name, a.bio, a.verified, a.average_rating,
+                        a.is_registered_author, a.user_id, a.external_source_id
+                    FROM authors a
+                    WHERE a.author_id IN ({', '.join(['%s'] * len(author_ids))})
+                """, author_ids)
+                authors = {row['author_id']: row for row in cursor.fetchall()}
+            book_counts = author_list_stats(cursor, author_ids)
+            follower_counts = get_author_follower_counts(cursor, author_ids)
             
             formatted_authors = [{
                 'author_id': author['author_id'],
@@ -350,11 +383,14 @@ def handle_get_following(event, headers):
                 'is_registered_author': bool(author['is_registered_author']),
                 'user_id': author['user_id'],
                 'external_source_id': author['external_source_id'],
-                'followed_at': author['followed_at'].isoformat() if author['followed_at'] else None,
-                'stats': {'totalBooks': author['total_books'], 'followers': author['followers']}
-            } for author in authors]
+                'followed_at': followed_at.isoformat() if followed_at else None,
+                'stats': {'totalBooks': book_counts[author_id]['books'],
+                          'followers': follower_counts[author_id]}
+            } for _, author_id, followed_at in edges for author in [authors.get(author_id)] if author]
             
             return {'statusCode': 200, 'headers': headers,
-                   'body': json.dumps({'authors': formatted_authors, 'total': len(formatted_authors)}, default=decimal_default)}
+                   'body': json.dumps({'authors': formatted_authors, 'total': total, 'limit': limit,
+                                       'has_more': next_cursor is not None, 'next_cursor': next_cursor},
+                                      default=decimal_default)}
     finally:
-        conn.close()
+        release_connection(conn)
@@ -1,58 +1,26 @@
 """
 Lambda Function: bookarc-followUser
-Follow/Unfollow a user (including users who are authors) with EMBEDDED notifications
+Follow/Unfollow a user (including users who are authors) with notifications
 Endpoint: POST /users/{user_id}/follow
-Uses display_name in notifications
+
+Idempotent: following twice or unfollowing a user you do not follow
+returns 200 with changed=false. A change is one INSERT IGNORE / DELETE
+plus the counter upsert in one transaction; the new-follower notification
+is queued in the outbox and written (with the follower's display_name)
+by bookarc-drainNotificationOutbox.
 """
 
 import json
 import pymysql
 import os
-from datetime import datetime
-from typing import Optional
-
-# ============================================================================
-# EMBEDDED NOTIFICATION SERVICE - NO LAYER NEEDED
-# ============================================================================
-
-class NotificationService:
-    """Service for creating and managing notifications"""
-    
-    def __init__(self, connection):
-        self.connection = connection
-    
-    def create_notification(
-        self, 
-        user_id: int, 
-        message: str, 
-        notification_type: str,
-        audience_type: str = 'all'
-    ) -> Optional[int]:
-        """Create a single notification"""
-        try:
-            with self.connection.cursor() as cursor:
-                sql = """
-                    INSERT INTO notifications 
-                    (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """
-                cursor.execute(sql, (user_id, message, notification_type, audience_type))
-                self.connection.commit()
-                notification_id = cursor.lastrowid
-                print(f"Created notification {notification_id} for user {user_id}: {message}")
-                return notification_id
-        except Exception as e:
-            print(f"Error creating notification: {str(e)}")
-            return None
-    
-    def notify_user_new_follower(self, user_id: int, follower_name: str) -> Optional[int]:
-        """Notify user of a new follower"""
-        message = f'👥 {follower_name} is now following you!'
-        return self.create_notification(user_id, message, 'new_follower', 'all')
-
-# ============================================================================
-# END OF EMBEDDED NOTIFICATION SERVICE
-# ============================================================================
+from datetime import date
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_identity
+from user_counters import record_follow_change
+from follow_graph import invalidate_adjacency
+from notification_outbox import enqueue, wake_worker
+from notification_service import SELF_GROUP
 
 # RDS Configuration
 DB_HOST = os.environ.get('DB_HOST')
@@ -64,20 +32,14 @@ def get_db_connection():
     """Create database connection with error handling"""
     try:
         print(f"Attempting DB connection to {DB_HOST}")
-        connection = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5,
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         print("Database connection successful")
         return connection
     except Exception as e:
         print(f"Database connection failed: {str(e)}")
         raise
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Follow or unfollow a user
@@ -123,6 +85,7 @@ def lambda_handler(event, context):
         
         # Get authenticated user from authorizer
         follower_cognito_sub = None
+        claims = None
         
         try:
             request_context = event.get('requestContext', {})
@@ -134,9 +97,11 @@ def lambda_handler(event, context):
             # Try multiple possible locations for the user identity
             if 'claims' in authorizer and 'sub' in authorizer['claims']:
                 follower_cognito_sub = authorizer['claims']['sub']
+                claims = authorizer['claims']
                 print(f"Found user in claims: {follower_cognito_sub}")
             elif 'jwt' in authorizer and 'claims' in authorizer['jwt'] and 'sub' in authorizer['jwt']['claims']:
                 follower_cognito_sub = authorizer['jwt']['claims']['sub']
+                claims = authorizer['jwt']['claims']
                 print(f"Found user in JWT: {follower_cognito_sub}")
             elif 'sub' in authorizer:
                 follower_cognito_sub = authorizer['sub']
@@ -191,24 +156,26 @@ def lambda_handler(event, context):
                 })
             }
         
+        try:
+            following_id = int(following_id)
+        except (TypeError, ValueError):
+            return {
+                'statusCode': 400,
+                'headers': cors_headers,
+                'body': json.dumps({
+                    'error': 'Bad Request',
+                    'message': 'Invalid user_id format'
+                })
+            }
+        
         conn = get_db_connection()
         
         try:
             with conn.cursor() as cursor:
-                # Get follower's database user_id and display_name
-                print(f"Looking up user with cognito_sub: {follower_cognito_sub}")
-                cursor.execute(
-                    """
-                    SELECT user_id, username, role, 
-                           COALESCE(display_name, username) as display_name
-                    FROM users 
-                    WHERE cognito_sub = %s
-                    """,
-                    (follower_cognito_sub,)
-                )
-                follower_result = cursor.fetchone()
+                # Follower identity from the token claims / container cache
+                follower = resolve_identity(cursor, follower_cognito_sub, claims, require_active=True)
                 
-                if not follower_result:
+                if not follower:
                     print(f"Follower not found")
                     return {
                         'statusCode': 404,
@@ -219,14 +186,11 @@ def lambda_handler(event, context):
                         })
                     }
                 
-                follower_db_id = follower_result['user_id']
-                follower_username = follower_result['username']
-                follower_display_name = follower_result['display_name']
-                follower_role = follower_result['role']
-                print(f"Follower: user_id={follower_db_id}, username={follower_username}, display_name={follower_display_name}, role={follower_role}")
+                follower_db_id = follower['user_id']
+                print(f"Follower: user_id={follower_db_id}, role={follower['role']}")
                 
                 # Only prevent admins from following
-                if follower_role == 'admin':
+                if follower['role'] == 'admin':
                     print(f"Admin cannot follow users")
                     return {
                         'statusCode': 403,
@@ -237,42 +201,8 @@ def lambda_handler(event, context):
                         })
                     }
                 
-                # Validate target user exists and is active
-                print(f"Checking target user {following_id}")
-                cursor.execute(
-                    "SELECT user_id, username, is_active, role FROM users WHERE user_id = %s",
-                    (following_id,)
-                )
-                following_result = cursor.fetchone()
-                
-                if not following_result:
-                    print(f"Target user not found")
-                    return {
-                        'statusCode': 404,
-                        'headers': cors_headers,
-                        'body': json.dumps({
-                            'error': 'User not found',
-                            'message': 'The user you are trying to follow does not exist'
-                        })
-                    }
-                
-                if not following_result['is_active']:
-                    print(f"Target user is not active")
-                    return {
-                        'statusCode': 404,
-                        'headers': cors_headers,
-                        'body': json.dumps({
-                            'error': 'User not found',
-                            'message': 'The user you are trying to follow does not exist'
-                        })
-                    }
-                
-                target_username = following_result['username']
-                target_role = following_result['role']
-                print(f"Target user: user_id={following_id}, username={target_username}, role={target_role}")
-                
                 # Prevent self-follow
-                if str(follower_db_id) == str(following_id):
+                if follower_db_id == following_id:
                     print(f"Cannot follow yourself")
                     return {
                         'statusCode': 400,
@@ -284,80 +214,64 @@ def lambda_handler(event, context):
                     }
                 
                 if action == 'follow':
-                    # Check if already following
-                    print(f"Checking if already following")
+                    # One idempotent statement: inserts only if the target is an
+                    # active user and the edge does not exist yet
                     cursor.execute(
                         """
-                        SELECT * FROM user_follow_user 
-                        WHERE follower_id = %s AND following_id = %s
+                        INSERT IGNORE INTO user_follow_user (follower_id, following_id, followed_at)
+                        SELECT %s, user_id, NOW()
+                        FROM users
+                        WHERE user_id = %s AND is_active = 1
                         """,
                         (follower_db_id, following_id)
                     )
+                    changed = cursor.rowcount == 1
                     
-                    if cursor.fetchone():
-                        print(f"Already following")
-                        return {
-                            'statusCode': 400,
-                            'headers': cors_headers,
-                            'body': json.dumps({
-                                'error': 'Already following',
-                                'message': f'You are already following {target_username}'
-                            })
-                        }
-                    
-                    # Create follow relationship
-                    print(f"Creating follow relationship")
-                    cursor.execute(
-                        """
-                        INSERT INTO user_follow_user (follower_id, following_id, followed_at)
-                        VALUES (%s, %s, %s)
-                        """,
-                        (follower_db_id, following_id, datetime.now())
-                    )
-                    
-                    conn.commit()
-                    print(f"Database updated - follow relationship created")
-                    
-                    # SEND NOTIFICATION
-                    print(f"\n{'='*60}")
-                    print(f"NOTIFICATION PROCESS START")
-                    print(f"{'='*60}")
-                    
-                    try:
-                        notif_service = NotificationService(conn)
-                        print(f"📧 Creating notification for user {following_id}")
-                        print(f"   Message: '{follower_display_name} is now following you!'")
-                        
-                        notif_id = notif_service.notify_user_new_follower(
-                            int(following_id), 
-                            follower_display_name 
+                    if not changed:
+                        # Slow path only: tell a missing user from a repeated click
+                        cursor.execute(
+                            "SELECT is_active FROM users WHERE user_id = %s",
+                            (following_id,)
                         )
-                        
-                        if notif_id:
-                            print(f"Notification created successfully: ID {notif_id}")
-                        else:
-                            print(f"Notification was not created (returned None)")
-                        
-                    except Exception as notif_error:
-                        print(f"Notification error: {str(notif_error)}")
-                        import traceback
-                        traceback.print_exc()
-                        # Don't fail the request if notification fails
-                    
-                    print(f"{'='*60}\n")
+                        target = cursor.fetchone()
+                        if not target or not target['is_active']:
+                            print(f"Target user not found or inactive")
+                            return {
+                                'statusCode': 404,
+                                'headers': cors_headers,
+                                'body': json.dumps({
+                                    'error': 'User not found',
+                                    'message': 'The user you are trying to follow does not exist'
+                                })
+                            }
+                        print(f"Already following")
+                    else:
+                        record_follow_change(cursor, follower_db_id, following_id, 1)
+                        # Delivered by the outbox worker; at most one per pair per day
+                        enqueue(conn, cursor, 'new_follower', {
+                            'follower_id': follower_db_id,
+                            'user_id': following_id,
+                            'type': 'new_follower',
+                            'audience_type': 'all',
+                            'group_key': SELF_GROUP
+                        }, f"new_follower:{follower_db_id}:{following_id}:{date.today().isoformat()}")
+                        conn.commit()
+                        invalidate_adjacency('user', following_id)
+                        wake_worker()
+                        print(f"Database updated - follow relationship created")
                     
                     return {
                         'statusCode': 200,
                         'headers': cors_headers,
                         'body': json.dumps({
-                            'message': f'Successfully followed {target_username}',
+                            'message': 'Successfully followed user' if changed else 'Already following user',
                             'followerId': follower_db_id,
-                            'followingId': int(following_id)
+                            'followingId': following_id,
+                            'changed': changed
                         })
                     }
                 
                 else:  # unfollow
-                    # Delete follow relationship
                     print(f"Removing follow relationship")
                     cursor.execute(
                         """
@@ -366,34 +280,30 @@ def lambda_handler(event, context):
                         """,
                         (follower_db_id, following_id)
                     )
+                    changed = cursor.rowcount == 1
                     
-                    if cursor.rowcount == 0:
+                    if changed:
+                        record_follow_change(cursor, follower_db_id, following_id, -1)
+                        conn.commit()
+                        invalidate_adjacency('user', following_id)
+                        print(f"✅ Successfully unfollowed")
+                    else:
                         print(f"⚠️ Not following this user")
-                        return {
-                            'statusCode': 400,
-                            'headers': cors_headers,
-                            'body': json.dumps({
-                                'error': 'Not following',
-                                'message': f'You are not following {target_username}'
-                            })
-                        }
-                    
-                    conn.commit()
-                    print(f"✅ Successfully unfollowed")
                     
                     return {
                         'statusCode': 200,
                         'headers': cors_headers,
                         'body': json.dumps({
-                            'message': f'Successfully unfollowed {target_username}',
+                            'message': 'Successfully unfollowed user' if changed else 'Not following user',
                             'followerId': follower_db_id,
-                            'followingId': int(following_id)
+                            'followingId': following_id,
+                            'changed': changed
                         })
                     }
         
         finally:
-            conn.close()
-            print("Database connection closed")
+            release_connection(conn)
+            print("Database connection released")
     
     except json.JSONDecodeError as e:
         print(f"JSON Error: {str(e)}")
@@ -1,17 +1,16 @@
 import json
 import pymysql
-import os
 from datetime import datetime
+from decimal import Decimal
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_identity
+
+MAX_PAGE_SIZE = 500
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=os.environ['DB_HOST'],
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        database=os.environ['DB_NAME'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def cors_response(status_code, body):
     """Helper function to return CORS-enabled responses"""
@@ -26,25 +25,58 @@ def cors_response(status_code, body):
         'body': json.dumps(body)
     }
 
-def check_admin_role(cognito_sub, cursor):
-    """Check if user is admin by querying database"""
-    cursor.execute("""
-        SELECT role 
-        FROM users 
-        WHERE cognito_sub = %s
-    """, (cognito_sub,))
-    
-    result = cursor.fetchone()
-    if not result:
+def check_admin_role(cognito_sub, cursor, claims=None):
+    """Check if user is an active admin (role and status read from the database)"""
+    identity = resolve_identity(cursor, cognito_sub, claims, require_active=True)
+    if not identity:
         return False
     
-    return result['role'] == 'admin'
+    return identity['role'] == 'admin'
+
+def attach_related_names(cursor, books):
+    """
+    Fill in authors/genres for a page of books with one batched
+    IN (...) query per relation, so the round-trip count does not grow
+    with the page size
+    """
+    if not books:
+        return
 
+    book_ids = [book['book_id'] for book in books]
+    placeholders = ', '.join(['%s'] * len(book_ids))
+
+    cursor.execute(f"""
+        SELECT ba.book_id, a.name
+        FROM book_author ba
+        JOIN authors a ON a.author_id = ba.author_id
+        WHERE ba.book_id IN ({placeholders})
+    """, book_ids)
+    authors = {}
+    for row in cursor.fetchall():
+        authors.setdefault(row['book_id'], []).append(row['name'])
+
+    cursor.execute(f"""
+        SELECT bg.book_id, g.genre_name
+        FROM book_genre bg
+        JOIN genres g ON g.genre_id = bg.genre_id
+        WHERE bg.book_id IN ({placeholders})
+    """, book_ids)
+    genres = {}
+    for row in cursor.fetchall():
+        genres.setdefault(row['book_id'], []).append(row['genre_name'])
+
+    for book in books:
+        book_authors = authors.get(book['book_id'])
+        book_genres = genres.get(book['book_id'])
+        book['authors'] = ', '.join(book_authors) if book_authors else 'Unknown'
+        book['genres'] = ', '.join(book_genres) if book_genres else 'N/A'
+
+@measure_invocation
 def lambda_handler(event, context):
     """
     Get all books for admin
     GET /admin/books
-    Query params: page, limit, search, status
+    Query params: page, limit (max 500), search, status
     """
     
     # Handle OPTIONS preflight request
@@ -63,8 +95,8 @@ def lambda_handler(event, context):
         
         # Get query parameters
         query_params = event.get('queryStringParameters', {}) or {}
-        page = int(query_params.get('page', 1))
-        limit = int(query_params.get('limit', 20))
+        page = max(int(query_params.get('page', 1)), 1)
+        limit = min(max(int(query_params.get('limit', 20)), 1), MAX_PAGE_SIZE)
         search = query_params.get('search', '')
         status = query_params.get('status', 'approved')
         
@@ -82,13 +114,13 @@ def lambda_handler(event, context):
         try:
             with connection.cursor() as cursor:
                 # Check if user is admin
-                if not check_admin_role(cognito_sub, cursor):
+                if not check_admin_role(cognito_sub, cursor, claims):
                     print(f"User {cognito_sub} is not admin")
                     return cors_response(403, {'error': 'Forbidden - Admin access required'})
                 
                 print(f"User {cognito_sub} is admin")
                 
-                # Simpler approach: Get books first, then get authors/genres separately
+                # Get the page of books first, then authors/genres for the whole page
                 base_query = """
                     SELECT 
                         b.book_id,
@@ -130,37 +162,12 @@ def lambda_handler(event, context):
                 
                 print(f"Retrieved {len(books)} books for current page")
                 
-                # For each book, get authors and genres
+                # Convert Decimal to float for JSON serialization
                 for book in books:
-                    book_id = book['book_id']
-                    
-                    # Convert Decimal to float for JSON serialization
-                    if book.get('average_rating') is not None:
-                        from decimal import Decimal
-                        if isinstance(book['average_rating'], Decimal):
-                            book['average_rating'] = float(book['average_rating'])
-                    
-                    # Get authors for this book
-                    cursor.execute("""
-                        SELECT a.name
-                        FROM authors a
-                        JOIN book_author ba ON a.author_id = ba.author_id
-                        WHERE ba.book_id = %s
-                    """, (book_id,))
-                    
-                    authors = cursor.fetchall()
-                    book['authors'] = ', '.join([a['name'] for a in authors]) if authors else 'Unknown'
-                    
-                    # Get genres for this book
-                    cursor.execute("""
-                        SELECT g.genre_name
-                        FROM genres g
-                        JOIN book_genre bg ON g.genre_id = bg.genre_id
-                        WHERE bg.book_id = %s
-                    """, (book_id,))
-                    
-                    genres = cursor.fetchall()
-                    book['genres'] = ', '.join([g['genre_name'] for g in genres]) if genres else 'N/A'
+                    if isinstance(book.get('average_rating'), Decimal):
+                        book['average_rating'] = float(book['average_rating'])
+                
+                attach_related_names(cursor, books)
                 
                 result = {
                     'books': books,
@@ -174,7 +181,7 @@ def lambda_handler(event, context):
                 return cors_response(200, result)
                 
         finally:
-            connection.close()
+            release_connection(connection)
         
     except Exception as e:
         print(f"Error getting admin books: {str(e)}")
@@ -1,17 +1,13 @@
 import json
 import pymysql
-import os
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_identity
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=os.environ['DB_HOST'],
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        database=os.environ['DB_NAME'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def cors_response(status_code, body):
     """Helper function to return CORS-enabled responses"""
@@ -26,20 +22,15 @@ def cors_response(status_code, body):
         'body': json.dumps(body)
     }
 
-def check_admin_role(cognito_sub, cursor):
-    """Check if user is admin by querying database"""
-    cursor.execute("""
-        SELECT role 
-        FROM users 
-        WHERE cognito_sub = %s
-    """, (cognito_sub,))
-    
-    result = cursor.fetchone()
-    if not result:
+def check_admin_role(cognito_sub, cursor, claims=None):
+    """Check if user is an active admin (role and status read from the database)"""
+    identity = resolve_identity(cursor, cognito_sub, claims, require_active=True)
+    if not identity:
         return False
     
-    return result['role'] == 'admin'
+    return identity['role'] == 'admin'
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Get all users for admin
@@ -77,7 +68,7 @@ def lambda_handler(event, context):
         try:
             with connection.cursor() as cursor:
                 # Check if user is admin
-                if not check_admin_role(cognito_sub, cursor):
+                if not check_admin_role(cognito_sub, cursor, claims):
                     print(f"User {cognito_sub} is not admin")
                     return cors_response(403, {'error': 'Forbidden - Admin access required'})
                 
@@ -138,7 +129,7 @@ def lambda_handler(event, context):
                 })
                 
         finally:
-            connection.close()
+            release_connection(connection)
         
     except Exception as e:
         print(f"Error getting admin users: {str(e)}")
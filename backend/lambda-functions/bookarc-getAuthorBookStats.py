@@ -1,8 +1,10 @@
 import json
 import pymysql
-import os
 from decimal import Decimal
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     GET /author/books/stats
@@ -16,13 +18,7 @@ def lambda_handler(event, context):
             return float(obj)
         raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
     
-    connection = pymysql.connect(
-        host=os.environ['DB_HOST'],
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        database=os.environ['DB_NAME'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
     
     try:
         # Extract user_id from authorizer context
@@ -103,15 +99,20 @@ def lambda_handler(event, context):
                     b.average_rating,
                     GROUP_CONCAT(DISTINCT g.genre_name ORDER BY g.genre_name SEPARATOR ', ') as genres,
                     GROUP_CONCAT(DISTINCT a.name ORDER BY a.name SEPARATOR ', ') as authors,
-                    COUNT(DISTINCT rev.review_id) as total_reviews,
-                    COUNT(DISTINCT rat.rating_id) as total_ratings
+                    COALESCE(bs.review_count, 0) as total_reviews,
+                    COALESCE(bs.rating_count, 0) as total_ratings,
+                    COALESCE(bs.rating_sum, 0) as rating_sum,
+                    COALESCE(bs.stars_5, 0) as stars_5,
+                    COALESCE(bs.stars_4, 0) as stars_4,
+                    COALESCE(bs.stars_3, 0) as stars_3,
+                    COALESCE(bs.stars_2, 0) as stars_2,
+                    COALESCE(bs.stars_1, 0) as stars_1
                 FROM books b
+                LEFT JOIN book_stats bs ON bs.book_id = b.book_id
                 LEFT JOIN book_genre bg ON b.book_id = bg.book_id
                 LEFT JOIN genres g ON bg.genre_id = g.genre_id
                 LEFT JOIN book_author ba ON b.book_id = ba.book_id
                 LEFT JOIN authors a ON ba.author_id = a.author_id
-                LEFT JOIN reviews rev ON b.book_id = rev.book_id
-                LEFT JOIN ratings rat ON b.book_id = rat.book_id
                 WHERE b.uploaded_by = %s
                 GROUP BY b.book_id
                 ORDER BY b.created_at DESC
@@ -119,26 +120,10 @@ def lambda_handler(event, context):
             
             books = cursor.fetchall()
             
-            # For each book, get rating breakdown
+            # Rating breakdown comes from the book_stats histogram
             books_with_stats = []
             for book in books:
-                # Get rating breakdown (count of each rating 1-5)
-                cursor.execute("""
-                    SELECT 
-                        rating_value,
-                        COUNT(*) as count
-                    FROM ratings
-                    WHERE book_id = %s
-                    GROUP BY rating_value
-                    ORDER BY rating_value DESC
-                """, (book['book_id'],))
-                
-                rating_data = cursor.fetchall()
-                
-                # Create rating breakdown dict
-                rating_breakdown = {5: 0, 4: 0, 3: 0, 2: 0, 1: 0}
-                for rating in rating_data:
-                    rating_breakdown[rating['rating_value']] = rating['count']
+                rating_breakdown = {stars: book[f'stars_{stars}'] for stars in (5, 4, 3, 2, 1)}
                 
                 books_with_stats.append({
                     'book_id': book['book_id'],
@@ -167,16 +152,9 @@ def lambda_handler(event, context):
             total_reviews = sum(b['total_reviews'] for b in books)
             total_ratings_count = sum(b['total_ratings'] for b in books)
             
-            # Calculate overall average rating for books
+            # Calculate overall average rating for books from the aggregates
             if total_ratings_count > 0:
-                cursor.execute("""
-                    SELECT AVG(r.rating_value) as avg_rating
-                    FROM ratings r
-                    JOIN books b ON r.book_id = b.book_id
-                    WHERE b.uploaded_by = %s
-                """, (user_id,))
-                avg_result = cursor.fetchone()
-                overall_avg_rating = float(avg_result['avg_rating']) if avg_result['avg_rating'] else 0.0
+                overall_avg_rating = float(sum(b['rating_sum'] for b in books)) / total_ratings_count
             else:
                 overall_avg_rating = 0.0
             
@@ -279,4 +257,4 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
         }
     finally:
-        connection.close()
+        release_connection(connection)
@@ -1,94 +1,19 @@
 """
 Lambda Function: bookarc-getBooks
-Handle all book-related operations with EMBEDDED notifications
+Handle all book-related operations with notifications
 """
 
 import json
-import os
+import re
+import base64
 import pymysql
 from decimal import Decimal
 from datetime import datetime
-from typing import Optional
-
-# ============================================================================
-# EMBEDDED NOTIFICATION SERVICE - NO LAYER NEEDED
-# ============================================================================
-
-class NotificationService:
-    """Service for creating and managing notifications"""
-    
-    def __init__(self, connection):
-        self.connection = connection
-    
-    def create_notification(
-        self, 
-        user_id: int, 
-        message: str, 
-        notification_type: str,
-        audience_type: str = 'all'
-    ) -> Optional[int]:
-        """Create a single notification"""
-        try:
-            with self.connection.cursor() as cursor:
-                sql = """
-                    INSERT INTO notifications 
-                    (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """
-                cursor.execute(sql, (user_id, message, notification_type, audience_type))
-                self.connection.commit()
-                notification_id = cursor.lastrowid
-                print(f"✅ Created notification {notification_id} for user {user_id}: {message}")
-                return notification_id
-        except Exception as e:
-            print(f"❌ Error creating notification: {str(e)}")
-            return None
-    
-    def notify_user_rated_book(
-        self, 
-        user_id: int, 
-        book_title: str, 
-        rating_value: int
-    ) -> Optional[int]:
-        """Notify user that they successfully rated a book"""
-        stars = '⭐' * rating_value
-        message = f'You have successfully rated "{book_title}" {stars} ({rating_value}/5)'
-        return self.create_notification(user_id, message, 'book_rating_success', 'all')
-    
-    def notify_author_book_rated(
-        self, 
-        author_user_id: int, 
-        book_title: str,
-        rater_name: str,
-        rating_value: int
-    ) -> Optional[int]:
-        """Notify author that their book received a rating"""
-        stars = '⭐' * rating_value
-        message = f'{rater_name} rated your book "{book_title}" {stars} ({rating_value}/5)'
-        return self.create_notification(author_user_id, message, 'book_rated', 'author')
-    
-    def notify_user_submitted_book_review(
-        self, 
-        user_id: int, 
-        book_title: str
-    ) -> Optional[int]:
-        """Notify user that their book review was successfully submitted"""
-        message = f'✅ Your review has been successfully submitted for "{book_title}"'
-        return self.create_notification(user_id, message, 'book_review_success', 'all')
-    
-    def notify_author_book_reviewed(
-        self, 
-        author_user_id: int, 
-        book_title: str,
-        reviewer_name: str
-    ) -> Optional[int]:
-        """Notify author that their book received a review"""
-        message = f'📝 {reviewer_name} submitted a review for your book "{book_title}"'
-        return self.create_notification(author_user_id, message, 'book_reviewed', 'author')
-
-# ============================================================================
-# END OF EMBEDDED NOTIFICATION SERVICE
-# ============================================================================
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from book_stats import apply_rating_change, apply_review_change
+from user_counters import record_activity_change
+from notification_service import NotificationService
 
 # ==================================================
 # AUTH HELPERS
@@ -143,19 +68,265 @@ def decimal_default(obj):
     raise TypeError
 
 
+# ==================================================
+# BOOK LIST PAGINATION
+# ==================================================
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Output field -> (SQL expression, joins it needs)
+BOOK_LIST_FIELDS = {
+    "id": ("b.book_id", ()),
+    "title": ("b.title", ()),
+    "author": ("COALESCE(GROUP_CONCAT(DISTINCT a.name SEPARATOR ', '), 'Unknown Author')", ("author",)),
+    "rating": ("COALESCE(bs.rating_sum / NULLIF(bs.rating_count, 0), 0)", ("stats",)),
+    "totalRatings": ("COALESCE(bs.rating_count, 0)", ("stats",)),
+    "reviews": ("COALESCE(bs.review_count, 0)", ("stats",)),
+    "cover": ("COALESCE(b.cover_image_url, '')", ()),
+    "coverUrl": ("COALESCE(b.cover_image_url, '')", ()),
+    "genre": ("COALESCE(MAX(g.genre_name), 'Unknown')", ("genre",)),
+    "description": ("COALESCE(b.summary, '')", ()),
+    "publishYear": ("COALESCE(YEAR(b.publish_date), 2024)", ()),
+    "isTrending": ("FALSE", ()),
+}
+
+BOOK_LIST_JOINS = {
+    "stats": """
+                    LEFT JOIN book_stats bs ON bs.book_id = b.book_id""",
+    "author": """
+                    LEFT JOIN book_author ba ON b.book_id = ba.book_id
+                    LEFT JOIN authors a ON ba.author_id = a.author_id""",
+    "genre": """
+                    LEFT JOIN book_genre bg ON b.book_id = bg.book_id
+                    LEFT JOIN genres g ON bg.genre_id = g.genre_id""",
+}
+
+
+def encode_cursor(last_book_id):
+    """Build an opaque cursor pointing after the given book"""
+    raw = json.dumps({"id": int(last_book_id)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor_value):
+    """Return the last book_id seen from an opaque cursor"""
+    try:
+        padded = cursor_value + "=" * (-len(cursor_value) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def parse_limit(raw_limit):
+    """Clamp the requested page size to a sane range"""
+    if raw_limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(raw_limit), MAX_PAGE_SIZE))
+
+
+def parse_fields(raw_fields):
+    """Return the list of output fields to select (id is always included)"""
+    if not raw_fields:
+        return list(BOOK_LIST_FIELDS)
+    requested = [f.strip() for f in raw_fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in BOOK_LIST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [f for f in requested if f != "id"]
+
+
+def build_book_list_query(params, fields, limit):
+    """
+    Build the keyset-paginated GET /books query
+
+    The inner query pages over approved book ids only (filters pushed down,
+    ordered by book_id), so the joins/aggregates run on at most limit+1 rows
+    no matter how large the catalog is.
+    """
+    where = ["b.approval_status = 'approved'"]
+    sql_params = []
+
+    if params.get("cursor"):
+        where.append("b.book_id < %s")
+        sql_params.append(decode_cursor(params["cursor"]))
+
+    if params.get("genre"):
+        where.append("""EXISTS (
+                        SELECT 1 FROM book_genre fbg
+                        JOIN genres fg ON fbg.genre_id = fg.genre_id
+                        WHERE fbg.book_id = b.book_id AND fg.genre_name = %s
+                    )""")
+        sql_params.append(params["genre"])
+
+    if params.get("author"):
+        where.append("""EXISTS (
+                        SELECT 1 FROM book_author fba
+                        JOIN authors fa ON fba.author_id = fa.author_id
+                        WHERE fba.book_id = b.book_id AND fa.name = %s
+                    )""")
+        sql_params.append(params["author"])
+
+    if params.get("year"):
+        year = int(params["year"])
+        # Range instead of YEAR(publish_date) so an index on publish_date can be used
+        where.append("b.publish_date >= %s AND b.publish_date < %s")
+        sql_params.extend([f"{year}-01-01", f"{year + 1}-01-01"])
+
+    sql_params.append(limit + 1)
+
+    joins = []
+    for field in fields:
+        for join in BOOK_LIST_FIELDS[field][1]:
+            if join not in joins:
+                joins.append(join)
+
+    select_list = ",\n                    ".join(
+        f"{BOOK_LIST_FIELDS[field][0]} AS {field}" for field in fields
+    )
+
+    sql = f"""
+                SELECT
+                    {select_list}
+                FROM (
+                    SELECT b.book_id
+                    FROM books b
+                    WHERE {" AND ".join(where)}
+                    ORDER BY b.book_id DESC
+                    LIMIT %s
+                ) page
+                JOIN books b ON b.book_id = page.book_id{"".join(BOOK_LIST_JOINS[j] for j in joins)}
+                GROUP BY b.book_id
+                ORDER BY b.book_id DESC
+            """
+    return sql, sql_params
+
+
+# ==================================================
+# BOOK SEARCH
+# ==================================================
+MIN_SEARCH_LENGTH = 2
+MAX_SEARCH_LENGTH = 200
+
+# Relevance weights per matched source; FULLTEXT natural-language scores
+# are IDF-weighted term frequencies (migration 007)
+TITLE_WEIGHT = 2.0
+AUTHOR_WEIGHT = 1.5
+GENRE_WEIGHT = 1.0
+
+SEARCH_RESULT_FIELDS = [f for f in BOOK_LIST_FIELDS if f != "isTrending"]
+HIGHLIGHT_FIELDS = ("title", "author", "description")
+
+
+def encode_search_cursor(score, last_book_id):
+    """Build an opaque cursor pointing after the given (score, book) position"""
+    raw = json.dumps({"s": str(score), "id": int(last_book_id)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor_value):
+    """Return (score, book_id) of the last result seen from an opaque cursor"""
+    try:
+        padded = cursor_value + "=" * (-len(cursor_value) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return Decimal(data["s"]), int(data["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def build_book_search_query(params, query, limit):
+    """
+    Build the ranked, keyset-paginated GET /books/search query
+
+    Matches come from the title/summary FULLTEXT indexes, the author name
+    index and genre names; each approved book's score is the weighted sum
+    of its matches. Pages walk (score, book_id) downwards, and details are
+    joined for the page rows only.
+    """
+    hit_params = [query, query, query, f'"{query.replace(chr(34), " ")}"', query]
+
+    filters = ["b.approval_status = 'approved'"]
+    filter_params = []
+
+    if params.get("genre"):
+        filters.append("""EXISTS (
+                        SELECT 1 FROM book_genre fbg
+                        JOIN genres fg ON fbg.genre_id = fg.genre_id
+                        WHERE fbg.book_id = b.book_id AND fg.genre_name = %s
+                    )""")
+        filter_params.append(params["genre"])
+
+    if params.get("year"):
+        year = int(params["year"])
+        filters.append("b.publish_date >= %s AND b.publish_date < %s")
+        filter_params.extend([f"{year}-01-01", f"{year + 1}-01-01"])
+
+    if params.get("min_rating"):
+        filters.append("bs.rating_sum >= %s * bs.rating_count AND bs.rating_count > 0")
+        filter_params.append(float(params["min_rating"]))
+
+    having = ""
+    page_params = []
+    if params.get("cursor"):
+        last_score, last_id = decode_search_cursor(params["cursor"])
+        having = "HAVING score < %s OR (score = %s AND hits.book_id < %s)"
+        page_params = [last_score, last_score, last_id]
+
+    select_list = ",\n                    ".join(
+        f"{BOOK_LIST_FIELDS[field][0]} AS {field}" for field in SEARCH_RESULT_FIELDS
+    )
+
+    sql = f"""
+                SELECT
+                    {select_list},
+                    page.score
+                FROM (
+                    SELECT hits.book_id, ROUND(SUM(hits.score), 6) AS score
+                    FROM (
+                        SELECT b.book_id,
+                               MATCH(b.title, b.summary) AGAINST (%s)
+                               + {TITLE_WEIGHT} * MATCH(b.title) AGAINST (%s) AS score
+                        FROM books b
+                        WHERE MATCH(b.title, b.summary) AGAINST (%s)
+                        UNION ALL
+                        SELECT ba.book_id, {AUTHOR_WEIGHT} AS score
+                        FROM authors a
+                        JOIN book_author ba ON ba.author_id = a.author_id
+                        WHERE MATCH(a.name) AGAINST (%s IN BOOLEAN MODE)
+                        UNION ALL
+                        SELECT bg.book_id, {GENRE_WEIGHT} AS score
+                        FROM genres g
+                        JOIN book_genre bg ON bg.genre_id = g.genre_id
+                        WHERE g.genre_name = %s
+                    ) hits
+                    JOIN books b ON b.book_id = hits.book_id
+                    LEFT JOIN book_stats bs ON bs.book_id = b.book_id
+                    WHERE {" AND ".join(filters)}
+                    GROUP BY hits.book_id
+                    {having}
+                    ORDER BY score DESC, hits.book_id DESC
+                    LIMIT %s
+                ) page
+                JOIN books b ON b.book_id = page.book_id{"".join(BOOK_LIST_JOINS.values())}
+                GROUP BY b.book_id, page.score
+                ORDER BY page.score DESC, b.book_id DESC
+            """
+    return sql, hit_params + filter_params + page_params + [limit + 1]
+
+
+def highlight_offsets(text, terms):
+    """[start, end) character offsets of words in text starting with any query term"""
+    if not text or not terms:
+        return []
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\w*", re.IGNORECASE)
+    return [[m.start(), m.end()] for m in pattern.finditer(text)]
+
+
 # ==================================================
 # DATABASE CONNECTION
 # ==================================================
 def get_connection():
     """Create MySQL database connection"""
-    return pymysql.connect(
-        host=os.environ["DB_HOST"],
-        user=os.environ["DB_USER"],
-        password=os.environ["DB_PASSWORD"],
-        database=os.environ["DB_NAME"],
-        connect_timeout=5,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 
 # ==================================================
@@ -178,6 +349,7 @@ def response(status, body):
 # ==================================================
 # MAIN HANDLER
 # ==================================================
+@measure_invocation
 def handler(event, context):
     """Main Lambda handler for all book-related operations"""
     print("📥 EVENT:", json.dumps(event))
@@ -196,49 +368,65 @@ def handler(event, context):
         with conn.cursor() as cursor:
 
             # ==================== GET /books ====================
-            # Public endpoint - list all approved books
+            # Public endpoint - keyset-paginated list of approved books
             if http_method == "GET" and resource == "/books":
-                print("📚 Fetching all books")
-                
-                cursor.execute("""
-                    SELECT
-                        b.book_id AS id,
-                        b.title,
-                        COALESCE(GROUP_CONCAT(DISTINCT a.name SEPARATOR ', '), 'Unknown Author') AS author,
-                        COALESCE((
-                            SELECT AVG(r.rating_value)
-                            FROM ratings r
-                            WHERE r.book_id = b.book_id
-                        ), 0) AS rating,
-                        COALESCE((
-                            SELECT COUNT(*)
-                            FROM ratings r
-                            WHERE r.book_id = b.book_id
-                        ), 0) AS totalRatings,
-                        COALESCE((
-                            SELECT COUNT(*)
-                            FROM reviews r
-                            WHERE r.book_id = b.book_id
-                        ), 0) AS reviews,
-                        COALESCE(b.cover_image_url, '') AS cover,
-                        COALESCE(b.cover_image_url, '') AS coverUrl,
-                        COALESCE(MAX(g.genre_name), 'Unknown') AS genre,
-                        COALESCE(b.summary, '') AS description,
-                        COALESCE(YEAR(b.publish_date), 2024) AS publishYear,
-                        FALSE AS isTrending
-                    FROM books b
-                    LEFT JOIN book_author ba ON b.book_id = ba.book_id
-                    LEFT JOIN authors a ON ba.author_id = a.author_id
-                    LEFT JOIN book_genre bg ON b.book_id = bg.book_id
-                    LEFT JOIN genres g ON bg.genre_id = g.genre_id
-                    WHERE b.approval_status = 'approved'
-                    GROUP BY b.book_id
-                    ORDER BY b.book_id DESC;
-                """)
-                
+                params = event.get("queryStringParameters") or {}
+                limit = parse_limit(params.get("limit"))
+                fields = parse_fields(params.get("fields"))
+                print(f"📚 Fetching books page (limit={limit}, cursor={params.get('cursor')})")
+
+                sql, sql_params = build_book_list_query(params, fields, limit)
+                cursor.execute(sql, sql_params)
+                books = cursor.fetchall()
+
+                # We fetch one extra row to know whether another page exists
+                next_cursor = None
+                if len(books) > limit:
+                    books = books[:limit]
+                    next_cursor = encode_cursor(books[-1]["id"])
+
+                print(f"✅ Found {len(books)} books (more: {next_cursor is not None})")
+                return response(200, {
+                    "books": books,
+                    "next_cursor": next_cursor,
+                    "limit": limit
+                })
+
+
+            # ==================== GET /books/search ====================
+            # Public endpoint - ranked full-text search over approved books
+            elif http_method == "GET" and resource == "/books/search":
+                params = event.get("queryStringParameters") or {}
+                query = " ".join((params.get("q") or "").split())
+                if not MIN_SEARCH_LENGTH <= len(query) <= MAX_SEARCH_LENGTH:
+                    return response(400, {
+                        "message": f"q must be {MIN_SEARCH_LENGTH}-{MAX_SEARCH_LENGTH} characters"
+                    })
+                limit = parse_limit(params.get("limit"))
+                print(f"🔎 Searching books for '{query}' (limit={limit}, cursor={params.get('cursor')})")
+
+                sql, sql_params = build_book_search_query(params, query, limit)
+                cursor.execute(sql, sql_params)
                 books = cursor.fetchall()
-                print(f"✅ Found {len(books)} books")
-                return response(200, books)
+
+                next_cursor = None
+                if len(books) > limit:
+                    books = books[:limit]
+                    next_cursor = encode_search_cursor(books[-1]["score"], books[-1]["id"])
+
+                terms = [t for t in re.findall(r"\w+", query.lower()) if len(t) >= MIN_SEARCH_LENGTH]
+                for book in books:
+                    book["highlights"] = {
+                        field: highlight_offsets(book[field], terms) for field in HIGHLIGHT_FIELDS
+                    }
+
+                print(f"✅ Found {len(books)} matching books (more: {next_cursor is not None})")
+                return response(200, {
+                    "query": query,
+                    "books": books,
+                    "next_cursor": next_cursor,
+                    "limit": limit
+                })
 
 
             # ==================== GET /books/{id} ====================
@@ -252,29 +440,23 @@ def handler(event, context):
                         b.book_id AS id,
                         b.title,
                         COALESCE(GROUP_CONCAT(DISTINCT a.name SEPARATOR ', '), 'Unknown Author') AS author,
-                        COALESCE((
-                            SELECT AVG(r.rating_value)
-                            FROM ratings r
-                            WHERE r.book_id = b.book_id
-                        ), 0) AS rating,
-                        COALESCE((
-                            SELECT COUNT(*)
-                            FROM ratings r
-                            WHERE r.book_id = b.book_id
-                        ), 0) AS totalRatings,
-                        COALESCE((
-                            SELECT COUNT(*)
-                            FROM reviews r
-                            WHERE r.book_id = b.book_id
-                        ), 0) AS reviews,
+                        COALESCE(bs.rating_sum / NULLIF(bs.rating_count, 0), 0) AS rating,
+                        COALESCE(bs.rating_count, 0) AS totalRatings,
+                        COALESCE(bs.review_count, 0) AS reviews,
                         COALESCE(b.cover_image_url, '') AS cover,
                         COALESCE(b.cover_image_url, '') AS coverUrl,
                         COALESCE(MAX(g.genre_name), 'Unknown') AS genre,
                         COALESCE(b.summary, '') AS description,
                         COALESCE(YEAR(b.publish_date), 2024) AS publishYear,
                         b.isbn,
-                        FALSE AS isTrending
+                        FALSE AS isTrending,
+                        COALESCE(bs.stars_5, 0) AS stars_5,
+                        COALESCE(bs.stars_4, 0) AS stars_4,
+                        COALESCE(bs.stars_3, 0) AS stars_3,
+                        COALESCE(bs.stars_2, 0) AS stars_2,
+                        COALESCE(bs.stars_1, 0) AS stars_1
                     FROM books b
+                    LEFT JOIN book_stats bs ON bs.book_id = b.book_id
                     LEFT JOIN book_author ba ON b.book_id = ba.book_id
                     LEFT JOIN authors a ON ba.author_id = a.author_id
                     LEFT JOIN book_genre bg ON b.book_id = bg.book_id
@@ -289,31 +471,11 @@ def handler(event, context):
                     print(f"❌ Book {book_id} not found")
                     return response(404, {"message": "Book not found"})
 
-                # Get rating breakdown for this book
-                cursor.execute("""
-                    SELECT 
-                        rating_value,
-                        COUNT(*) as count
-                    FROM ratings
-                    WHERE book_id = %s
-                    GROUP BY rating_value
-                """, (book_id,))
-                
-                rating_breakdown_raw = cursor.fetchall()
-                
-                # Convert to the format frontend expects
+                # Rating breakdown comes from the book_stats histogram
                 rating_breakdown = {
-                    '5': 0,
-                    '4': 0,
-                    '3': 0,
-                    '2': 0,
-                    '1': 0
+                    str(stars): book.pop(f"stars_{stars}") for stars in (5, 4, 3, 2, 1)
                 }
                 
-                for row in rating_breakdown_raw:
-                    rating_value = str(row['rating_value'])
-                    rating_breakdown[rating_value] = row['count']
-                
                 book['ratingBreakdown'] = rating_breakdown
 
                 print(f"✅ Found book: {book['title']}")
@@ -433,12 +595,15 @@ def handler(event, context):
                 
                 book_title = book_data["title"]
 
-                # Check if this is a new rating
+                # Check if this is a new rating (lock the row so the stats delta is exact)
                 cursor.execute("""
-                    SELECT rating_id FROM ratings 
+                    SELECT rating_value FROM ratings 
                     WHERE book_id = %s AND user_id = %s
+                    FOR UPDATE
                 """, (book_id, user_id))
-                is_new_rating = cursor.fetchone() is None
+                existing_rating = cursor.fetchone()
+                is_new_rating = existing_rating is None
+                old_rating_value = None if is_new_rating else existing_rating["rating_value"]
 
                 # Upsert rating (insert or update if exists)
                 cursor.execute("""
@@ -447,46 +612,27 @@ def handler(event, context):
                     ON DUPLICATE KEY UPDATE rating_value = VALUES(rating_value);
                 """, (book_id, user_id, rating_value))
 
-                # Update book's average rating
-                cursor.execute("""
-                    UPDATE books
-                    SET average_rating = (
-                        SELECT AVG(rating_value)
-                        FROM ratings
-                        WHERE book_id = %s
+                # Update book_stats and the book's average rating incrementally
+                apply_rating_change(cursor, book_id, old_rating_value, rating_value)
+                if is_new_rating:
+                    record_activity_change(cursor, user_id, ratings=1)
+
+                # 🔔 Notify the rater, and the author (registered, new ratings only),
+                # in the same transaction
+                notif_service = NotificationService(conn)
+                notif_service.notify_user_rated_book(user_id, book_title, rating_value)
+                if is_new_rating and book_data.get("author_user_id"):
+                    notif_service.notify_author_book_rated(
+                        book_data["author_user_id"],
+                        book_title,
+                        user_name,
+                        rating_value,
+                        book_id=book_id
                     )
-                    WHERE book_id = %s;
-                """, (book_id, book_id))
+                notified = notif_service.flush(cursor)
 
                 conn.commit()
-                print("✅ Rating saved successfully")
-                
-                # 🔔 SEND NOTIFICATIONS
-                try:
-                    print(f"\n📧 Creating NotificationService...")
-                    notif_service = NotificationService(conn)
-                    
-                    # 1. Notify the user who rated
-                    print(f"📬 Sending notification to user {user_id}")
-                    user_notif_id = notif_service.notify_user_rated_book(user_id, book_title, rating_value)
-                    print(f"✅ User notification created: {user_notif_id}")
-                    
-                    # 2. Notify the author if it's a new rating and they're registered
-                    if is_new_rating and book_data.get("author_user_id"):
-                        print(f"📬 Sending notification to author user_id {book_data['author_user_id']}")
-                        author_notif_id = notif_service.notify_author_book_rated(
-                            book_data["author_user_id"],
-                            book_title,
-                            user_name,
-                            rating_value
-                        )
-                        print(f"✅ Author notification created: {author_notif_id}")
-                    
-                    print(f"✅ All notifications sent successfully\n")
-                except Exception as notif_error:
-                    print(f"⚠️ Failed to send notifications: {str(notif_error)}")
-                    import traceback
-                    traceback.print_exc()
+                print(f"✅ Rating saved successfully ({notified} notifications)")
                 
                 return response(201, {"message": "Rating submitted successfully"})
 
@@ -540,6 +686,16 @@ def handler(event, context):
                     INSERT INTO reviews (book_id, user_id, review_text, created_at)
                     VALUES (%s, %s, %s, NOW());
                 """, (book_id, user_id, review_text))
+                apply_review_change(cursor, book_id, 1)
+
+                # Existing rating (locked) so the stats delta is exact
+                cursor.execute("""
+                    SELECT rating_value FROM ratings
+                    WHERE book_id = %s AND user_id = %s
+                    FOR UPDATE
+                """, (book_id, user_id))
+                existing_rating = cursor.fetchone()
+                old_rating_value = existing_rating["rating_value"] if existing_rating else None
 
                 # Upsert rating
                 cursor.execute("""
@@ -548,45 +704,26 @@ def handler(event, context):
                     ON DUPLICATE KEY UPDATE rating_value = VALUES(rating_value);
                 """, (book_id, user_id, rating_value))
 
-                # Update book's average rating
-                cursor.execute("""
-                    UPDATE books
-                    SET average_rating = (
-                        SELECT AVG(rating_value)
-                        FROM ratings
-                        WHERE book_id = %s
+                # Update book_stats and the book's average rating incrementally
+                apply_rating_change(cursor, book_id, old_rating_value, rating_value)
+                record_activity_change(
+                    cursor, user_id, reviews=1, ratings=1 if old_rating_value is None else 0
+                )
+
+                # 🔔 Notify the reviewer, and the author if registered, in the same transaction
+                notif_service = NotificationService(conn)
+                notif_service.notify_user_submitted_book_review(user_id, book_title)
+                if book_data.get("author_user_id"):
+                    notif_service.notify_author_book_reviewed(
+                        book_data["author_user_id"],
+                        book_title,
+                        user_name,
+                        book_id=book_id
                     )
-                    WHERE book_id = %s;
-                """, (book_id, book_id))
+                notified = notif_service.flush(cursor)
 
                 conn.commit()
-                print("✅ Review submitted successfully")
-                
-                # 🔔 SEND NOTIFICATIONS
-                try:
-                    print(f"\n📧 Creating NotificationService...")
-                    notif_service = NotificationService(conn)
-                    
-                    # 1. Notify the user who submitted the review
-                    print(f"📬 Sending notification to user {user_id}")
-                    user_notif_id = notif_service.notify_user_submitted_book_review(user_id, book_title)
-                    print(f"✅ User notification created: {user_notif_id}")
-                    
-                    # 2. Notify the author if they're a registered user
-                    if book_data.get("author_user_id"):
-                        print(f"📬 Sending notification to author user_id {book_data['author_user_id']}")
-                        author_notif_id = notif_service.notify_author_book_reviewed(
-                            book_data["author_user_id"],
-                            book_title,
-                            user_name
-                        )
-                        print(f"✅ Author notification created: {author_notif_id}")
-                    
-                    print(f"✅ All notifications sent successfully\n")
-                except Exception as notif_error:
-                    print(f"⚠️ Failed to send notifications: {str(notif_error)}")
-                    import traceback
-                    traceback.print_exc()
+                print(f"✅ Review submitted successfully ({notified} notifications)")
                 
                 return response(201, {"message": "Review submitted successfully"})
 
@@ -631,6 +768,9 @@ def handler(event, context):
                     DELETE FROM reviews 
                     WHERE review_id = %s AND user_id = %s
                 """, (review_id, user_id))
+                deleted = cursor.rowcount
+                apply_review_change(cursor, book_id, -deleted)
+                record_activity_change(cursor, user_id, reviews=-deleted)
                 
                 conn.commit()
                 print("✅ Review deleted successfully")
@@ -655,5 +795,5 @@ def handler(event, context):
         })
 
     finally:
-        conn.close()
-        print("🔒 Database connection closed")
+        release_connection(conn)
+        print("🔒 Database connection released")
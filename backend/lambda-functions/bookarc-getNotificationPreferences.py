@@ -1,16 +1,9 @@
 import json
 import pymysql
-import os
-
-# Database configuration
-DB_CONFIG = {
-    'host': os.environ['DB_HOST'],
-    'user': os.environ['DB_USER'],
-    'password': os.environ['DB_PASSWORD'],
-    'database': os.environ['DB_NAME'],
-    'port': 3306
-}
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Lambda: GET /notifications/preferences
@@ -42,7 +35,7 @@ def lambda_handler(event, context):
                 'body': json.dumps({'message': 'Unauthorized - No user ID found'})
             }
         
-        connection = pymysql.connect(**DB_CONFIG)
+        connection = acquire_connection()
         
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
             # Get user's database ID from cognito_sub
@@ -65,7 +58,8 @@ def lambda_handler(event, context):
                     user_id,
                     allow_email,
                     allow_author_updates,
-                    allow_premium_offers
+                    allow_premium_offers,
+                    digest_mode
                 FROM notification_preferences
                 WHERE user_id = %s
             """, (db_user_id,))
@@ -88,7 +82,8 @@ def lambda_handler(event, context):
                         user_id,
                         allow_email,
                         allow_author_updates,
-                        allow_premium_offers
+                        allow_premium_offers,
+                        digest_mode
                     FROM notification_preferences
                     WHERE user_id = %s
                 """, (db_user_id,))
@@ -103,7 +98,8 @@ def lambda_handler(event, context):
                     'user_id': prefs['user_id'],
                     'allow_email': bool(prefs['allow_email']),
                     'allow_author_updates': bool(prefs['allow_author_updates']),
-                    'allow_premium_offers': bool(prefs['allow_premium_offers'])
+                    'allow_premium_offers': bool(prefs['allow_premium_offers']),
+                    'digest_mode': prefs['digest_mode']
                 })
             }
             
@@ -119,4 +115,4 @@ def lambda_handler(event, context):
         }
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
@@ -1,152 +1,190 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_identity
+from user_counters import get_unread_count
+from notification_selection import encode_cursor, decode_cursor
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+NOTIFICATION_COLUMNS = """
+    notification_id,
+    user_id,
+    message,
+    type,
+    audience_type,
+    is_read,
+    created_at
+"""
+
+def parse_limit(raw_limit):
+    try:
+        limit = int(raw_limit) if raw_limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+@measure_invocation
 def lambda_handler(event, context):
     """
     GET /notifications
-    Get all notifications for the current user (REAL DATA from database)
-    Query params: page, limit, is_read, type
+    Get notifications for the current user, newest first
+    Query params: limit, cursor, since, is_read, type
+
+    - cursor: next_cursor from the previous page (older notifications)
+    - since:  latest_cursor from an earlier response; returns only
+              notifications created after it (delta polling)
+
+    unread_count comes from user_counters instead of counting the inbox.
     """
-    
+
     headers = {
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Headers': 'Content-Type,Authorization',
         'Access-Control-Allow-Methods': 'GET,OPTIONS',
         'Content-Type': 'application/json'
     }
-    
+
     if event['httpMethod'] == 'OPTIONS':
         return {'statusCode': 200, 'headers': headers, 'body': ''}
-    
+
     try:
         # Get user from JWT token
         authorizer = event.get('requestContext', {}).get('authorizer', {})
         cognito_sub = authorizer.get('claims', {}).get('sub') if 'claims' in authorizer else authorizer.get('cognito_sub')
-        
+
         if not cognito_sub:
             return {
                 'statusCode': 401,
                 'headers': headers,
                 'body': json.dumps({'error': 'Unauthorized'})
             }
-        
+
         # Parse query parameters
         params = event.get('queryStringParameters') or {}
-        page = int(params.get('page', 1))
-        limit = int(params.get('limit', 20))
         is_read = params.get('is_read')  # 'true', 'false', or None for all
         notification_type = params.get('type')  # Optional filter by type
-        
-        offset = (page - 1) * limit
-        
+
+        try:
+            limit = parse_limit(params.get('limit'))
+            before = decode_cursor(params['cursor']) if params.get('cursor') else None
+            since = decode_cursor(params['since']) if params.get('since') else None
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': str(e)})
+            }
+
+        if before and since:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'error': 'Use either cursor or since, not both'})
+            }
+
         # Connect to database
-        conn = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
-        
+        conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
         try:
             with conn.cursor() as cursor:
                 # Get user_id from cognito_sub
-                cursor.execute("""
-                    SELECT user_id, role FROM users 
-                    WHERE cognito_sub = %s AND is_active = 1
-                """, (cognito_sub,))
-                
-                user = cursor.fetchone()
-                
+                user = resolve_identity(cursor, cognito_sub, authorizer.get('claims'), require_active=True)
+
                 if not user:
                     return {
                         'statusCode': 404,
                         'headers': headers,
                         'body': json.dumps({'error': 'User not found'})
                     }
-                
+
                 user_id = user['user_id']
-                user_role = user['role']
-                
+
                 # Build WHERE clause for filters
                 where_conditions = ["user_id = %s"]
                 query_params = [user_id]
-                
+
                 if is_read is not None:
                     where_conditions.append("is_read = %s")
                     query_params.append(is_read.lower() == 'true')
-                
+
                 if notification_type:
                     where_conditions.append("type = %s")
                     query_params.append(notification_type)
-                
+
+                # Keyset on (created_at, notification_id): older pages walk
+                # backwards from cursor, delta polls walk forwards from since
+                if since:
+                    where_conditions.append("(created_at > %s OR (created_at = %s AND notification_id > %s))")
+                    query_params.extend([since[0], since[0], since[1]])
+                    order = "ASC"
+                else:
+                    if before:
+                        where_conditions.append("(created_at < %s OR (created_at = %s AND notification_id < %s))")
+                        query_params.extend([before[0], before[0], before[1]])
+                    order = "DESC"
+
                 where_clause = " AND ".join(where_conditions)
-                
-                # Get total count
-                count_sql = f"""
-                    SELECT COUNT(*) as total
-                    FROM notifications
-                    WHERE {where_clause}
-                """
-                cursor.execute(count_sql, query_params)
-                total_count = cursor.fetchone()['total']
-                
-                # Get unread count
-                cursor.execute("""
-                    SELECT COUNT(*) as unread_count
-                    FROM notifications
-                    WHERE user_id = %s AND is_read = FALSE
-                """, (user_id,))
-                unread_count = cursor.fetchone()['unread_count']
-                
-                # Get notifications with pagination
-                notifications_sql = f"""
-                    SELECT 
-                        notification_id,
-                        user_id,
-                        message,
-                        type,
-                        audience_type,
-                        is_read,
-                        created_at
+
+                cursor.execute(f"""
+                    SELECT {NOTIFICATION_COLUMNS}
                     FROM notifications
                     WHERE {where_clause}
-                    ORDER BY created_at DESC
-                    LIMIT %s OFFSET %s
-                """
-                
-                cursor.execute(notifications_sql, query_params + [limit, offset])
+                    ORDER BY created_at {order}, notification_id {order}
+                    LIMIT %s
+                """, query_params + [limit + 1])
                 notifications = cursor.fetchall()
-                
+
+                has_more = len(notifications) > limit
+                notifications = notifications[:limit]
+
+                if since:
+                    # Newest delta row becomes the next poll position
+                    latest = notifications[-1] if notifications else None
+                    notifications.reverse()
+                    next_cursor = None
+                else:
+                    latest = notifications[0] if notifications and not before else None
+                    last = notifications[-1] if notifications else None
+                    next_cursor = encode_cursor(last['created_at'], last['notification_id']) if has_more else None
+
+                if latest:
+                    latest_cursor = encode_cursor(latest['created_at'], latest['notification_id'])
+                elif since:
+                    latest_cursor = params['since']
+                else:
+                    latest_cursor = None
+
+                unread_count = get_unread_count(cursor, user_id)
+
                 # Format timestamps to ISO format
                 for notif in notifications:
                     if notif['created_at']:
                         notif['created_at'] = notif['created_at'].isoformat()
-                
-                total_pages = (total_count + limit - 1) // limit
-                
+
                 return {
                     'statusCode': 200,
                     'headers': headers,
                     'body': json.dumps({
                         'notifications': notifications,
-                        'total': total_count,
                         'unread_count': unread_count,
-                        'page': page,
-                        'total_pages': total_pages,
-                        'limit': limit
+                        'limit': limit,
+                        'has_more': has_more,
+                        'next_cursor': next_cursor,
+                        'latest_cursor': latest_cursor
                     })
                 }
-                
+
         finally:
-            conn.close()
-            
+            release_connection(conn)
+
     except Exception as e:
         print(f"Error: {str(e)}")
         import traceback
         traceback.print_exc()
-        
+
         return {
             'statusCode': 500,
             'headers': headers,
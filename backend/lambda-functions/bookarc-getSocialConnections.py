@@ -0,0 +1,181 @@
+"""
+Lambda Function: bookarc-getSocialConnections
+Graph questions about the signed-in user, answered from the follow snapshot
+
+GET /users/{user_id}/mutual-followers   users who follow both you and user_id
+GET /social/follows-back                users you follow who follow you back
+GET /social/suggestions                 people you may know (followed by people you follow)
+
+Query params: limit, cursor (lists); limit (suggestions)
+
+Served from the adjacency snapshot built by bookarc-buildFollowSnapshot
+(follow_snapshot.py layer) with sorted-array intersections; the database
+is only used to resolve the caller and hydrate the page. Results can lag
+follows made since the last build; suggestions drop anyone the caller
+already follows live.
+"""
+
+import json
+import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import COUNTER_SELECT
+from identity_cache import resolve_identity
+from follow_graph import followed_users, parse_limit
+from follow_snapshot import load_follow_snapshot, page_after
+
+DEFAULT_SUGGESTIONS = 20
+MAX_SUGGESTIONS = 50
+
+headers = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'GET,OPTIONS',
+    'Content-Type': 'application/json'
+}
+
+
+def response(status_code, body):
+    return {'statusCode': status_code, 'headers': headers, 'body': json.dumps(body)}
+
+
+def parse_after(raw_cursor):
+    """Cursor of an id-ordered list: the last id of the previous page"""
+    if not raw_cursor:
+        return None
+    try:
+        return int(raw_cursor)
+    except ValueError:
+        raise ValueError('Invalid cursor')
+
+
+def hydrate_users(cursor, user_ids, public_only=False):
+    """Display rows for active users, keyed by id"""
+    if not user_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    visibility = "AND u.is_public = TRUE AND u.role != 'admin'" if public_only else ''
+    cursor.execute(f"""
+        SELECT
+            u.user_id as id,
+            COALESCE(u.display_name, u.username) as username,
+            u.role,
+            COALESCE(u.profile_image, '') as avatarUrl,
+            COALESCE(u.bio, '') as bio,
+            u.is_public,{COUNTER_SELECT}
+        FROM users u
+        LEFT JOIN user_counters uc ON uc.user_id = u.user_id
+        WHERE u.user_id IN ({placeholders}) AND u.is_active = 1 {visibility}
+    """, list(user_ids))
+    return {row['id']: row for row in cursor.fetchall()}
+
+
+def format_user(user):
+    return {
+        'id': int(user['id']),
+        'username': str(user['username']),
+        'role': str(user['role']),
+        'avatarUrl': str(user['avatarUrl']),
+        'bio': str(user['bio']),
+        'isPrivate': not bool(user['is_public']),
+        'stats': {
+            'totalReviews': int(user['totalReviews'] or 0),
+            'booksRead': int(user['booksRead'] or 0),
+            'followers': int(user['followers'] or 0)
+        }
+    }
+
+
+def list_page(cursor, ids, params):
+    """One id-ordered page of a snapshot result"""
+    limit = parse_limit(params.get('limit'))
+    page_ids, next_after = page_after(ids, parse_after(params.get('cursor')), limit)
+    users = hydrate_users(cursor, page_ids)
+    return {
+        'users': [format_user(users[user_id]) for user_id in page_ids if user_id in users],
+        'total': int(len(ids)),
+        'limit': limit,
+        'has_more': next_after is not None,
+        'next_cursor': str(next_after) if next_after is not None else None
+    }
+
+
+def suggestions_page(cursor, graph, viewer_id, params):
+    try:
+        limit = int(params.get('limit') or DEFAULT_SUGGESTIONS)
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    limit = max(1, min(limit, MAX_SUGGESTIONS))
+
+    # Over-fetch so live follows and hidden accounts do not empty the page
+    ranked = graph.suggestions(viewer_id, limit=limit * 2)
+    candidate_ids = [user_id for user_id, _ in ranked]
+    already_followed = followed_users(cursor, viewer_id, candidate_ids)
+    candidate_ids = [user_id for user_id in candidate_ids if user_id not in already_followed]
+    users = hydrate_users(cursor, candidate_ids, public_only=True)
+
+    mutual_counts = dict(ranked)
+    suggestions = []
+    for user_id in candidate_ids:
+        if user_id in users:
+            entry = format_user(users[user_id])
+            entry['mutualCount'] = mutual_counts[user_id]
+            suggestions.append(entry)
+        if len(suggestions) == limit:
+            break
+    return {'users': suggestions, 'limit': limit}
+
+
+@measure_invocation
+def lambda_handler(event, context):
+    if event.get('httpMethod') == 'OPTIONS':
+        return response(200, {'message': 'OK'})
+
+    path = event.get('path') or event.get('resource') or ''
+    params = event.get('queryStringParameters') or {}
+    claims = ((event.get('requestContext') or {}).get('authorizer') or {}).get('claims') or {}
+
+    if not claims.get('sub'):
+        return response(401, {'message': 'Unauthorized'})
+
+    connection = None
+    try:
+        graph = load_follow_snapshot()
+        if graph is None:
+            return response(503, {'message': 'Follow graph snapshot is not available yet'})
+
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+        with connection.cursor() as cursor:
+            viewer = resolve_identity(cursor, claims['sub'], claims, require_active=True)
+            if not viewer:
+                return response(404, {'message': 'User not found'})
+            viewer_id = viewer['user_id']
+
+            if path.endswith('/mutual-followers'):
+                try:
+                    other_id = int((event.get('pathParameters') or {}).get('user_id'))
+                except (TypeError, ValueError):
+                    return response(400, {'message': 'Invalid user_id format'})
+                result = list_page(cursor, graph.mutual_followers(viewer_id, other_id), params)
+            elif path.endswith('/follows-back'):
+                result = list_page(cursor, graph.follows_back(viewer_id), params)
+            elif path.endswith('/suggestions'):
+                result = suggestions_page(cursor, graph, viewer_id, params)
+            else:
+                return response(404, {'message': 'Endpoint not found', 'path': path})
+
+        result['snapshotBuiltAt'] = graph.meta.get('built_at')
+        return response(200, result)
+
+    except ValueError as e:
+        return response(400, {'message': str(e)})
+
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return response(500, {'message': 'Internal server error', 'error': str(e)})
+
+    finally:
+        if connection:
+            release_connection(connection)
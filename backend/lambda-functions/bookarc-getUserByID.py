@@ -1,17 +1,10 @@
 import json
 import pymysql
-import os
 from decimal import Decimal
 from typing import Dict, Any, List
-
-# Database configuration
-DB_CONFIG = {
-    'host': os.environ.get('DB_HOST'),
-    'user': os.environ.get('DB_USER'),
-    'password': os.environ.get('DB_PASSWORD'),
-    'database': os.environ.get('DB_NAME'),
-    'cursorclass': pymysql.cursors.DictCursor
-}
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import COUNTER_SELECT
 
 CORS_HEADERS = {
     'Access-Control-Allow-Origin': '*',
@@ -30,7 +23,7 @@ def response(status_code: int, body: Dict[str, Any]) -> Dict[str, Any]:
 
 def get_user_profile(cursor, user_id: int) -> Dict[str, Any]:
     """Get user profile with stats"""
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT 
             u.user_id as id,
             u.username,
@@ -40,14 +33,9 @@ def get_user_profile(cursor, user_id: int) -> Dict[str, Any]:
             u.bio,
             u.location,
             u.is_public as isPublic,
-            u.created_at as joinDate,
-            (SELECT COUNT(*) FROM reviews r WHERE r.user_id = u.user_id) as totalReviews,
-            (SELECT COUNT(*) FROM ratings rat WHERE rat.user_id = u.user_id) as totalRatings,
-            (SELECT COUNT(DISTINCT urs.book_id) FROM user_reading_status urs 
-             WHERE urs.user_id = u.user_id AND urs.status = 'completed') as booksRead,
-            (SELECT COUNT(*) FROM user_follow_user ufu WHERE ufu.following_id = u.user_id) as followers,
-            (SELECT COUNT(*) FROM user_follow_user ufu WHERE ufu.follower_id = u.user_id) as following
+            u.created_at as joinDate,{COUNTER_SELECT}
         FROM users u
+        LEFT JOIN user_counters uc ON uc.user_id = u.user_id
         WHERE u.user_id = %s
     """, (user_id,))
     
@@ -166,6 +154,7 @@ def format_profile_response(user: Dict[str, Any], lists: List, reviews: List, ge
         'favoriteGenres': genres
     }
 
+@measure_invocation
 def lambda_handler(event, context):
     """Get detailed user profile by user ID"""
     print(f"Incoming event: {json.dumps(event)}")
@@ -191,7 +180,7 @@ def lambda_handler(event, context):
             })
         
         # Connect to database
-        connection = pymysql.connect(**DB_CONFIG)
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with connection.cursor() as cursor:
@@ -218,7 +207,7 @@ def lambda_handler(event, context):
                 return response(200, profile_data)
         
         finally:
-            connection.close()
+            release_connection(connection)
     
     except pymysql.MySQLError as e:
         print(f"Database error: {str(e)}")
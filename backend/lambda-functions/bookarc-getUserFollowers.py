@@ -1,12 +1,24 @@
 import json
 import pymysql
-import os
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import COUNTER_SELECT
+from identity_cache import resolve_identity
+from follow_graph import follow_status, follower_page, parse_limit, decode_cursor
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Get list of users that follow a specific user (followers)
     GET /users/{user_id}/followers
+    Query params: limit, cursor, includeFollowStatus
+
+    - cursor: next_cursor from the previous page (newest first)
+    - includeFollowStatus=true adds isFollowing (does the signed-in
+      caller follow each entry) when the request carries claims
+
+    total is the maintained follower counter, not a count of the page.
     """
     
     # Enable CORS
@@ -48,61 +60,77 @@ def lambda_handler(event, context):
                 'body': json.dumps({'message': 'Invalid user_id format'})
             }
         
+        params = event.get('queryStringParameters') or {}
+        include_follow_status = (params.get('includeFollowStatus') or '').lower() == 'true'
+        claims = ((event.get('requestContext') or {}).get('authorizer') or {}).get('claims') or {}
+        
+        try:
+            limit = parse_limit(params.get('limit'))
+            if params.get('cursor'):
+                decode_cursor(params['cursor'])
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'message': str(e)})
+            }
+        
         print(f"🔍 Getting followers for user {user_id}")
         
         # Connect to database
-        connection = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with connection.cursor() as cursor:
-                # Check if user exists
-                cursor.execute(
-                    "SELECT user_id FROM users WHERE user_id = %s",
-                    (user_id,)
-                )
+                # Check if user exists (and read the maintained follower count)
+                cursor.execute("""
+                    SELECT u.user_id, COALESCE(uc.followers, 0) as followers
+                    FROM users u
+                    LEFT JOIN user_counters uc ON uc.user_id = u.user_id
+                    WHERE u.user_id = %s
+                """, (user_id,))
                 
-                if not cursor.fetchone():
+                target = cursor.fetchone()
+                if not target:
                     return {
                         'statusCode': 404,
                         'headers': headers,
                         'body': json.dumps({'message': 'User not found'})
                     }
                 
-                # UPDATED: Get users that follow this user (followers) + include role + use display_name
-                query = """
-                SELECT 
-                    u.user_id as id,
-                    COALESCE(u.display_name, u.username) as username,
-                    u.role,
-                    COALESCE(u.profile_image, '') as avatarUrl,
-                    COALESCE(u.bio, '') as bio,
-                    u.is_public,
-                    f.followed_at as followedAt,
-                    (SELECT COUNT(*) FROM reviews r WHERE r.user_id = u.user_id) as totalReviews,
-                    (SELECT COUNT(DISTINCT urs.book_id) 
-                     FROM user_reading_status urs 
-                     WHERE urs.user_id = u.user_id AND urs.status = 'completed') as booksRead
-                FROM user_follow_user f
-                INNER JOIN users u ON f.follower_id = u.user_id
-                WHERE f.following_id = %s
-                ORDER BY f.followed_at DESC
-                """
+                total = max(int(target['followers']), 0)
                 
-                print(f"Executing query for followers of user {user_id}")
-                cursor.execute(query, (user_id,))
-                followers = cursor.fetchall()
+                # One keyset page of follower ids (from the adjacency cache for hot users)
+                edges, next_cursor = follower_page(
+                    cursor, 'user', user_id, limit, params.get('cursor'), total
+                )
+                
+                followers = {}
+                if edges:
+                    placeholders = ', '.join(['%s'] * len(edges))
+                    query = f"""
+                    SELECT 
+                        u.user_id as id,
+                        COALESCE(u.display_name, u.username) as username,
+                        u.role,
+                        COALESCE(u.profile_image, '') as avatarUrl,
+                        COALESCE(u.bio, '') as bio,
+                        u.is_public,{COUNTER_SELECT}
+                    FROM users u
+                    LEFT JOIN user_counters uc ON uc.user_id = u.user_id
+                    WHERE u.user_id IN ({placeholders})
+                    """
+                    cursor.execute(query, [follower_id for follower_id, _ in edges])
+                    followers = {row['id']: row for row in cursor.fetchall()}
                 
-                print(f"Found {len(followers)} followers")
+                print(f"Found {len(edges)} of {total} followers")
                 
-                # Format the response
+                # Format the response in page order
                 formatted_followers = []
-                for user in followers:
+                for follower_id, followed_at in edges:
+                    user = followers.get(follower_id)
+                    if not user:
+                        continue
                     formatted_followers.append({
                         'id': int(user['id']),
                         'username': str(user['username']),
@@ -110,25 +138,38 @@ def lambda_handler(event, context):
                         'avatarUrl': str(user['avatarUrl']),
                         'bio': str(user['bio']),
                         'isPrivate': not bool(user['is_public']),
-                        'followedAt': user['followedAt'].isoformat() if user['followedAt'] else '',
+                        'followedAt': followed_at.isoformat() if followed_at else '',
                         'stats': {
                             'totalReviews': int(user['totalReviews'] or 0),
                             'booksRead': int(user['booksRead'] or 0)
                         }
                     })
                 
+                # Follow state of the caller towards every row: one IN query
+                if include_follow_status:
+                    viewer = resolve_identity(cursor, claims.get('sub'), claims, require_active=True)
+                    followed_user_ids, _ = follow_status(
+                        cursor, viewer['user_id'] if viewer else None,
+                        user_ids=[entry['id'] for entry in formatted_followers]
+                    )
+                    for entry in formatted_followers:
+                        entry['isFollowing'] = entry['id'] in followed_user_ids
+                
                 return {
                     'statusCode': 200,
                     'headers': headers,
                     'body': json.dumps({
                         'followers': formatted_followers,
-                        'total': len(formatted_followers)
+                        'total': total,
+                        'limit': limit,
+                        'has_more': next_cursor is not None,
+                        'next_cursor': next_cursor
                     })
                 }
                 
         finally:
-            connection.close()
-            print("Database connection closed")
+            release_connection(connection)
+            print("Database connection released")
             
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -1,12 +1,25 @@
 import json
 import pymysql
-import os
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import COUNTER_SELECT
+from identity_cache import resolve_identity
+from follow_graph import follow_status, following_page, author_list_stats, parse_limit, decode_cursor
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Get list of users AND authors that a specific user is following
     GET /users/{user_id}/following
+    Query params: limit, cursor, includeFollowStatus
+
+    - cursor: next_cursor from the previous page; users and authors are
+      merged into one list, newest follow first
+    - includeFollowStatus=true adds isFollowing (does the signed-in
+      caller follow each entry) when the request carries claims
+
+    total is the maintained following + following_authors counters.
     PUBLIC ACCESS - No authentication required
     UPDATED: Now returns both users AND authors
     """
@@ -50,151 +63,173 @@ def lambda_handler(event, context):
                 'body': json.dumps({'message': 'Invalid user_id format'})
             }
         
+        params = event.get('queryStringParameters') or {}
+        include_follow_status = (params.get('includeFollowStatus') or '').lower() == 'true'
+        claims = ((event.get('requestContext') or {}).get('authorizer') or {}).get('claims') or {}
+        
+        try:
+            limit = parse_limit(params.get('limit'))
+            if params.get('cursor'):
+                decode_cursor(params['cursor'])
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'message': str(e)})
+            }
+        
         print(f"🔍 Getting users AND authors that user {user_id} is following")
         
         # Connect to database
-        connection = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with connection.cursor() as cursor:
-                # Check if user exists
-                cursor.execute(
-                    "SELECT user_id FROM users WHERE user_id = %s",
-                    (user_id,)
-                )
+                # Check if user exists (and read the maintained following counts)
+                cursor.execute("""
+                    SELECT u.user_id,
+                           COALESCE(uc.following, 0) + COALESCE(uc.following_authors, 0) as following
+                    FROM users u
+                    LEFT JOIN user_counters uc ON uc.user_id = u.user_id
+                    WHERE u.user_id = %s
+                """, (user_id,))
                 
-                if not cursor.fetchone():
+                target = cursor.fetchone()
+                if not target:
                     return {
                         'statusCode': 404,
                         'headers': headers,
                         'body': json.dumps({'message': 'User not found'})
                     }
                 
-                # QUERY 1: Get USERS that this user is following
-                user_query = """
-                SELECT 
-                    u.user_id as id,
-                    COALESCE(u.display_name, u.username) as username,
-                    u.role,
-                    COALESCE(u.profile_image, '') as avatarUrl,
-                    COALESCE(u.bio, '') as bio,
-                    u.is_public,
-                    f.followed_at as followedAt,
-                    'user' as type,
-                    (SELECT COUNT(*) FROM reviews r WHERE r.user_id = u.user_id) as totalReviews,
-                    (SELECT COUNT(DISTINCT urs.book_id) 
-                     FROM user_reading_status urs 
-                     WHERE urs.user_id = u.user_id AND urs.status = 'completed') as booksRead
-                FROM user_follow_user f
-                INNER JOIN users u ON f.following_id = u.user_id
-                WHERE f.follower_id = %s
-                """
+                total = max(int(target['following']), 0)
                 
-                print(f"🔍 Executing query for user {user_id}'s following (USERS)")
-                cursor.execute(user_query, (user_id,))
-                following_users = cursor.fetchall()
-                print(f"Found {len(following_users)} USERS that user {user_id} is following")
+                # One keyset page over both relations, merged newest first
+                edges, next_cursor = following_page(cursor, user_id, limit, params.get('cursor'))
+                user_ids = [other_id for kind, other_id, _ in edges if kind == 'user']
+                author_ids = [other_id for kind, other_id, _ in edges if kind == 'author']
                 
-                # QUERY 2: Get AUTHORS that this user is following
-                author_query = """
-                SELECT 
-                    a.author_id,
-                    a.name as username,
-                    a.user_id as linked_user_id,
-                    a.is_registered_author,
-                    COALESCE(a.bio, '') as bio,
-                    a.verified,
-                    ufa.followed_at as followedAt,
-                    'author' as type,
-                    -- For registered authors, get their user info
-                    CASE 
-                        WHEN a.is_registered_author = 1 THEN COALESCE(u.profile_image, '')
-                        ELSE ''
-                    END as avatarUrl,
-                    CASE 
-                        WHEN a.is_registered_author = 1 THEN u.is_public
-                        ELSE 1
-                    END as is_public,
-                    -- Get author stats
-                    (SELECT COUNT(DISTINCT ba.book_id) 
-                     FROM book_author ba 
-                     WHERE ba.author_id = a.author_id) as totalBooks,
-                    (SELECT COUNT(*) 
-                     FROM author_reviews ar 
-                     WHERE ar.author_id = a.author_id) as totalReviews
-                FROM user_follow_author ufa
-                INNER JOIN authors a ON ufa.author_id = a.author_id
-                LEFT JOIN users u ON a.user_id = u.user_id AND a.is_registered_author = 1
-                WHERE ufa.user_id = %s
-                """
+                # QUERY 1: the USERS on this page
+                following_users = {}
+                if user_ids:
+                    user_query = f"""
+                    SELECT 
+                        u.user_id as id,
+                        COALESCE(u.display_name, u.username) as username,
+                        u.role,
+                        COALESCE(u.profile_image, '') as avatarUrl,
+                        COALESCE(u.bio, '') as bio,
+                        u.is_public,{COUNTER_SELECT}
+                    FROM users u
+                    LEFT JOIN user_counters uc ON uc.user_id = u.user_id
+                    WHERE u.user_id IN ({', '.join(['%s'] * len(user_ids))})
+                    """
+                    cursor.execute(user_query, user_ids)
+                    following_users = {row['id']: row for row in cursor.fetchall()}
                 
-                print(f"Executing query for user {user_id}'s following (AUTHORS)")
-                cursor.execute(author_query, (user_id,))
-                following_authors = cursor.fetchall()
-                print(f"Found {len(following_authors)} AUTHORS that user {user_id} is following")
+                # QUERY 2: the AUTHORS on this page, stats batched per page
+                following_authors = {}
+                if author_ids:
+                    author_query = f"""
+                    SELECT 
+                        a.author_id,
+                        a.name as username,
+                        a.user_id as linked_user_id,
+                        a.is_registered_author,
+                        COALESCE(a.bio, '') as bio,
+                        a.verified,
+                        -- For registered authors, get their user info
+                        CASE 
+                            WHEN a.is_registered_author = 1 THEN COALESCE(u.profile_image, '')
+                            ELSE ''
+                        END as avatarUrl,
+                        CASE 
+                            WHEN a.is_registered_author = 1 THEN u.is_public
+                            ELSE 1
+                        END as is_public
+                    FROM authors a
+                    LEFT JOIN users u ON a.user_id = u.user_id AND a.is_registered_author = 1
+                    WHERE a.author_id IN ({', '.join(['%s'] * len(author_ids))})
+                    """
+                    cursor.execute(author_query, author_ids)
+                    following_authors = {row['author_id']: row for row in cursor.fetchall()}
+                author_stats = author_list_stats(cursor, author_ids)
                 
-                # Format the response - USERS
-                formatted_following = []
+                print(f"Found {len(user_ids)} users and {len(author_ids)} authors of {total} followed by user {user_id}")
                 
-                for user in following_users:
-                    formatted_following.append({
-                        'id': int(user['id']),
-                        'username': str(user['username']),
-                        'role': str(user['role']),
-                        'avatarUrl': str(user['avatarUrl']),
-                        'bio': str(user['bio']),
-                        'isPrivate': not bool(user['is_public']),
-                        'followedAt': user['followedAt'].isoformat() if user['followedAt'] else '',
-                        'type': 'user',  # 
-                        'stats': {
-                            'totalReviews': int(user['totalReviews'] or 0),
-                            'booksRead': int(user['booksRead'] or 0)
-                        }
-                    })
-                
-                # Format the response - AUTHORS
-                for author in following_authors:
-                    formatted_following.append({
-                        'id': int(author['linked_user_id']) if author['linked_user_id'] else int(author['author_id']),
-                        'authorId': int(author['author_id']), 
-                        'username': str(author['username']),
-                        'role': 'author',  
-                        'avatarUrl': str(author['avatarUrl']),
-                        'bio': str(author['bio']),
-                        'isPrivate': not bool(author['is_public']),
-                        'followedAt': author['followedAt'].isoformat() if author['followedAt'] else '',
-                        'type': 'author', 
-                        'authorType': 'registered' if author['is_registered_author'] else 'external',
-                        'verified': bool(author['verified']),
-                        'stats': {
-                            'totalReviews': int(author['totalReviews'] or 0),
-                            'booksRead': int(author['totalBooks'] or 0)  # Using totalBooks for authors
-                        }
-                    })
+                # Format the response in page order
+                formatted_following = []
                 
-                # Sort by followedAt (most recent first)
-                formatted_following.sort(key=lambda x: x['followedAt'], reverse=True)
+                for kind, other_id, followed_at in edges:
+                    if kind == 'user':
+                        user = following_users.get(other_id)
+                        if not user:
+                            continue
+                        formatted_following.append({
+                            'id': int(user['id']),
+                            'username': str(user['username']),
+                            'role': str(user['role']),
+                            'avatarUrl': str(user['avatarUrl']),
+                            'bio': str(user['bio']),
+                            'isPrivate': not bool(user['is_public']),
+                            'followedAt': followed_at.isoformat() if followed_at else '',
+                            'type': 'user',
+                            'stats': {
+                                'totalReviews': int(user['totalReviews'] or 0),
+                                'booksRead': int(user['booksRead'] or 0)
+                            }
+                        })
+                    else:
+                        author = following_authors.get(other_id)
+                        if not author:
+                            continue
+                        formatted_following.append({
+                            'id': int(author['linked_user_id']) if author['linked_user_id'] else int(author['author_id']),
+                            'authorId': int(author['author_id']), 
+                            'username': str(author['username']),
+                            'role': 'author',  
+                            'avatarUrl': str(author['avatarUrl']),
+                            'bio': str(author['bio']),
+                            'isPrivate': not bool(author['is_public']),
+                            'followedAt': followed_at.isoformat() if followed_at else '',
+                            'type': 'author', 
+                            'authorType': 'registered' if author['is_registered_author'] else 'external',
+                            'verified': bool(author['verified']),
+                            'stats': {
+                                'totalReviews': author_stats[other_id]['reviews'],
+                                'booksRead': author_stats[other_id]['books']  # Using totalBooks for authors
+                            }
+                        })
                 
-                print(f"Total following (users + authors): {len(formatted_following)}")
+                # Follow state of the caller towards every row: one IN query per relation
+                if include_follow_status:
+                    viewer = resolve_identity(cursor, claims.get('sub'), claims, require_active=True)
+                    followed_user_ids, followed_author_ids = follow_status(
+                        cursor, viewer['user_id'] if viewer else None,
+                        user_ids=[entry['id'] for entry in formatted_following if entry['type'] == 'user'],
+                        author_ids=[entry['authorId'] for entry in formatted_following if entry['type'] == 'author']
+                    )
+                    for entry in formatted_following:
+                        if entry['type'] == 'author':
+                            entry['isFollowing'] = entry['authorId'] in followed_author_ids
+                        else:
+                            entry['isFollowing'] = entry['id'] in followed_user_ids
                 
                 return {
                     'statusCode': 200,
                     'headers': headers,
                     'body': json.dumps({
                         'following': formatted_following,
-                        'total': len(formatted_following)
+                        'total': total,
+                        'limit': limit,
+                        'has_more': next_cursor is not None,
+                        'next_cursor': next_cursor
                     })
                 }
                 
         finally:
-            connection.close()
-            print("Database connection closed")
+            release_connection(connection)
+            print("Database connection released")
             
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -1,23 +1,14 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
-# Database configuration
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME', 'bookarcdb')
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     GET /users/{user_id}/lists
@@ -166,4 +157,4 @@ def lambda_handler(event, context):
             'body': json.dumps({'message': f'Database error: {str(e)}'})
         }
     finally:
-        conn.close()
+        release_connection(conn)
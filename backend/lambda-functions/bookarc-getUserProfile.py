@@ -1,13 +1,9 @@
 import json
 import pymysql
-import os
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
-# RDS Configuration from environment variables
-DB_HOST = os.environ['DB_HOST']
-DB_USER = os.environ['DB_USER']
-DB_PASSWORD = os.environ['DB_PASSWORD']
-DB_NAME = os.environ['DB_NAME']
 
 # CORS headers - apply to all responses
 CORS_HEADERS = {
@@ -17,6 +13,7 @@ CORS_HEADERS = {
     'Content-Type': 'application/json'
 }
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Lambda function to get user profile from RDS
@@ -49,13 +46,7 @@ def lambda_handler(event, context):
     
     try:
         # Connect to RDS
-        connection = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5
-        )
+        connection = acquire_connection()
         
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
             # Query user from RDS using cognito_sub
@@ -138,4 +129,4 @@ def lambda_handler(event, context):
     
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
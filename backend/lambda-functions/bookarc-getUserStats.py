@@ -1,14 +1,12 @@
 import json
+import base64
 import pymysql
-import os
 from decimal import Decimal
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_user_id
 
-# Environment variables
-DB_HOST = os.environ['DB_HOST']
-DB_NAME = os.environ['DB_NAME']
-DB_USER = os.environ['DB_USER']
-DB_PASSWORD = os.environ['DB_PASSWORD']
 
 # CORS headers
 CORS_HEADERS = {
@@ -18,16 +16,98 @@ CORS_HEADERS = {
     'Content-Type': 'application/json'
 }
 
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+LIST_SECTIONS = ('author_ratings', 'book_ratings', 'author_reviews', 'book_reviews')
+SECTIONS = ('stats',) + LIST_SECTIONS
+
+# All counters in one round trip; each subquery is an index lookup on user_id
+STATS_COLUMNS = """,
+                        (SELECT COUNT(DISTINCT lb.book_id)
+                         FROM lists l
+                         JOIN list_books lb ON l.list_id = lb.list_id
+                         WHERE l.user_id = u.user_id AND l.name = 'Completed') as books_read,
+                        (SELECT COUNT(*) FROM reviews WHERE user_id = u.user_id) as total_book_reviews,
+                        (SELECT COUNT(*) FROM author_reviews WHERE user_id = u.user_id) as total_author_reviews,
+                        (SELECT COUNT(*) FROM ratings WHERE user_id = u.user_id) +
+                        (SELECT COUNT(*) FROM author_ratings WHERE user_id = u.user_id) as total_ratings,
+                        (SELECT COUNT(*) FROM user_follow_user WHERE follower_id = u.user_id) as following_users,
+                        (SELECT COUNT(*) FROM user_follow_user WHERE following_id = u.user_id) as followers,
+                        (SELECT COUNT(*) FROM user_follow_author WHERE user_id = u.user_id) as following_authors"""
+
+# section -> (page query, table alias, id column)
+# Pages walk (created_at, id) downwards; migration 005 indexes (user_id, created_at)
+LIST_QUERIES = {
+    'author_ratings': ("""
+                    SELECT
+                        ar.author_rating_id,
+                        ar.rating_value,
+                        ar.created_at as rated_at,
+                        a.author_id,
+                        a.name as author_name,
+                        a.user_id,
+                        COALESCE(u.profile_image, '') as author_avatar
+                    FROM author_ratings ar
+                    JOIN authors a ON ar.author_id = a.author_id
+                    LEFT JOIN users u ON a.user_id = u.user_id
+                    WHERE ar.user_id = %s {keyset}
+                    ORDER BY ar.created_at DESC, ar.author_rating_id DESC
+                    LIMIT %s
+    """, 'ar', 'author_rating_id'),
+    'book_ratings': ("""
+                    SELECT
+                        r.rating_id,
+                        r.rating_value,
+                        r.created_at as rated_at,
+                        b.book_id,
+                        b.title as book_title,
+                        b.cover_image_url as book_cover
+                    FROM ratings r
+                    JOIN books b ON r.book_id = b.book_id
+                    WHERE r.user_id = %s {keyset}
+                    ORDER BY r.created_at DESC, r.rating_id DESC
+                    LIMIT %s
+    """, 'r', 'rating_id'),
+    'author_reviews': ("""
+                    SELECT
+                        ar.author_review_id,
+                        ar.review_text,
+                        ar.created_at,
+                        ar.updated_at,
+                        a.author_id,
+                        a.name as author_name,
+                        COALESCE(u.profile_image, '') as author_avatar
+                    FROM author_reviews ar
+                    JOIN authors a ON ar.author_id = a.author_id
+                    LEFT JOIN users u ON a.user_id = u.user_id
+                    WHERE ar.user_id = %s {keyset}
+                    ORDER BY ar.created_at DESC, ar.author_review_id DESC
+                    LIMIT %s
+    """, 'ar', 'author_review_id'),
+    'book_reviews': ("""
+                    SELECT
+                        rev.review_id,
+                        rev.review_text,
+                        rev.created_at,
+                        rev.updated_at,
+                        b.book_id,
+                        b.title as book_title,
+                        b.cover_image_url as book_cover,
+                        COALESCE(r.rating_value, 0) as rating_value
+                    FROM reviews rev
+                    JOIN books b ON rev.book_id = b.book_id
+                    LEFT JOIN ratings r ON rev.book_id = r.book_id AND rev.user_id = r.user_id
+                    WHERE rev.user_id = %s {keyset}
+                    ORDER BY rev.created_at DESC, rev.review_id DESC
+                    LIMIT %s
+    """, 'rev', 'review_id'),
+}
+
+
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor,
-        connect_timeout=5
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def decimal_default(obj):
     """Handle Decimal and datetime objects in JSON serialization"""
@@ -37,6 +117,90 @@ def decimal_default(obj):
         return obj.isoformat()
     raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
+def error_response(status_code, message):
+    return {
+        'statusCode': status_code,
+        'headers': CORS_HEADERS,
+        'body': json.dumps({'error': message})
+    }
+
+def encode_cursor(created_at, row_id):
+    """Build an opaque cursor pointing after the given row"""
+    raw = json.dumps({'t': created_at.isoformat(), 'id': int(row_id)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor_value):
+    """Return (created_at, id) of the last row seen from an opaque cursor"""
+    try:
+        padded = cursor_value + '=' * (-len(cursor_value) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(data['t']), int(data['id'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def parse_include(raw_include):
+    """Return the requested response sections (all of them by default)"""
+    if not raw_include:
+        return set(SECTIONS)
+    requested = {s.strip() for s in raw_include.split(',') if s.strip()}
+    unknown = requested - set(SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown include sections: {', '.join(sorted(unknown))}. "
+                         f"Must be any of: {', '.join(SECTIONS)}")
+    return requested
+
+def parse_limit(raw_limit):
+    """Clamp the requested page size to a sane range"""
+    if raw_limit is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        return max(1, min(int(raw_limit), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+
+def fetch_page(cursor, section, user_id, limit, cursor_value):
+    """
+    Fetch one page of an activity list
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    sql, alias, id_column = LIST_QUERIES[section]
+    params = [user_id]
+    keyset = ''
+    if cursor_value:
+        created_at, row_id = decode_cursor(cursor_value)
+        keyset = (f"AND ({alias}.created_at < %s OR "
+                  f"({alias}.created_at = %s AND {alias}.{id_column} < %s))")
+        params += [created_at, created_at, row_id]
+    params.append(limit + 1)
+
+    cursor.execute(sql.format(keyset=keyset), params)
+    rows = cursor.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.get('rated_at') or last['created_at'], last[id_column])
+    return rows, next_cursor
+
+def get_book_authors(cursor, book_ids):
+    """Author names per book for every book on the returned pages, in one query"""
+    if not book_ids:
+        return {}
+    placeholders = ','.join(['%s'] * len(book_ids))
+    cursor.execute(f"""
+        SELECT ba.book_id,
+               GROUP_CONCAT(DISTINCT a.name ORDER BY a.name SEPARATOR ', ') as book_author
+        FROM book_author ba
+        JOIN authors a ON ba.author_id = a.author_id
+        WHERE ba.book_id IN ({placeholders})
+        GROUP BY ba.book_id
+    """, sorted(book_ids))
+    return {row['book_id']: row['book_author'] for row in cursor.fetchall()}
+
+@measure_invocation
 def lambda_handler(event, context):
     """
     Get comprehensive user statistics including:
@@ -45,11 +209,14 @@ def lambda_handler(event, context):
     - Book ratings list
     - Author reviews list
     - Book reviews list
+
+    Query parameters:
+    - include: comma-separated sections to return
+      (stats, author_ratings, book_ratings, author_reviews, book_reviews; default all)
+    - limit: page size for each list (default 20, max 100)
+    - <section>_cursor: next_cursors.<section> from the previous response
     """
     
-    print(f"=== Full Event ===")
-    print(json.dumps(event, indent=2))
-    
     # Handle OPTIONS request for CORS preflight
     if event.get('httpMethod') == 'OPTIONS':
         return {
@@ -59,54 +226,53 @@ def lambda_handler(event, context):
         }
     
     try:
+        params = event.get('queryStringParameters') or {}
+
         # Try to get user_id from different sources
         user_id = None
         cognito_sub = None
+        claims = None
         
         # 1. Check query parameters
-        if event.get('queryStringParameters'):
-            user_id = event['queryStringParameters'].get('userId')
-            print(f"Found userId in query params: {user_id}")
+        user_id = params.get('userId')
         
         # 2. Check path parameters
         if not user_id and event.get('pathParameters'):
             user_id = event['pathParameters'].get('userId')
-            print(f"Found userId in path params: {user_id}")
         
         # 3. Check JWT token from API Gateway authorizer
         if not user_id:
-            print("Checking requestContext for authorizer...")
-            print(f"RequestContext keys: {event.get('requestContext', {}).keys()}")
-            
             request_context = event.get('requestContext', {})
             authorizer = request_context.get('authorizer', {})
             
-            print(f"Authorizer keys: {authorizer.keys()}")
-            
             # Try different locations where cognito_sub might be
             if 'claims' in authorizer:
-                cognito_sub = authorizer['claims'].get('sub')
-                print(f"Found cognito_sub in claims: {cognito_sub}")
+                claims = authorizer['claims']
+                cognito_sub = claims.get('sub')
             elif 'sub' in authorizer:
                 cognito_sub = authorizer.get('sub')
-                print(f"Found cognito_sub directly in authorizer: {cognito_sub}")
             
             # Sometimes it's in principalId
             if not cognito_sub and 'principalId' in authorizer:
                 cognito_sub = authorizer.get('principalId')
-                print(f"Found cognito_sub in principalId: {cognito_sub}")
         
         # Validate that we have either user_id or cognito_sub
         if not user_id and not cognito_sub:
             print("ERROR: No user_id or cognito_sub found anywhere!")
-            return {
-                'statusCode': 400,
-                'headers': CORS_HEADERS,
-                'body': json.dumps({
-                    'error': 'userId parameter or valid JWT token required'
-                })
-            }
+            return error_response(400, 'userId parameter or valid JWT token required')
+
+        try:
+            include = parse_include(params.get('include'))
+            limit = parse_limit(params.get('limit'))
+            list_cursors = {section: params.get(f'{section}_cursor') for section in LIST_SECTIONS}
+            for cursor_value in list_cursors.values():
+                if cursor_value:
+                    decode_cursor(cursor_value)
+        except ValueError as e:
+            return error_response(400, str(e))
         
+        print(f"📊 Stats request: userId={user_id}, sub={cognito_sub}, include={sorted(include)}, limit={limit}")
+
         # Connect to database
         connection = get_db_connection()
         
@@ -114,199 +280,80 @@ def lambda_handler(event, context):
             with connection.cursor() as cursor:
                 # Get user_id from cognito_sub if needed
                 if cognito_sub and not user_id:
-                    print(f"Looking up user_id for cognito_sub: {cognito_sub}")
-                    cursor.execute(
-                        "SELECT user_id FROM users WHERE cognito_sub = %s",
-                        (cognito_sub,)
-                    )
-                    result = cursor.fetchone()
-                    if not result:
+                    user_id = resolve_user_id(cursor, cognito_sub, claims)
+                    if not user_id:
                         print(f"No user found with cognito_sub: {cognito_sub}")
-                        return {
-                            'statusCode': 404,
-                            'headers': CORS_HEADERS,
-                            'body': json.dumps({'error': 'User not found'})
-                        }
-                    user_id = result['user_id']
-                    print(f"Found user_id: {user_id}")
-                
-                # Verify user exists
-                cursor.execute(
-                    "SELECT user_id, username, display_name, role FROM users WHERE user_id = %s",
-                    (user_id,)
-                )
-                user = cursor.fetchone()
-                
-                if not user:
-                    return {
-                        'statusCode': 404,
-                        'headers': CORS_HEADERS,
-                        'body': json.dumps({'error': 'User not found'})
-                    }
+                        return error_response(404, 'User not found')
                 
                 # ========================================
-                # BASIC STATS
+                # USER + BASIC STATS (one round trip)
                 # ========================================
                 
-                # ✅ 1. Count books in "Completed" list (books_read)
-                cursor.execute("""
-                    SELECT COUNT(DISTINCT lb.book_id) as count
-                    FROM lists l
-                    JOIN list_books lb ON l.list_id = lb.list_id
-                    WHERE l.user_id = %s AND l.name = 'Completed'
-                """, (user_id,))
-                
-                books_read = cursor.fetchone()['count']
-                print(f"Books read (from Completed list): {books_read}")
-                
-                # 2. Count total BOOK reviews
-                cursor.execute("""
-                    SELECT COUNT(*) as count
-                    FROM reviews
-                    WHERE user_id = %s
-                """, (user_id,))
-                
-                total_book_reviews = cursor.fetchone()['count']
-                print(f"Total book reviews: {total_book_reviews}")
-                
-                # 2b. Count total AUTHOR reviews
-                cursor.execute("""
-                    SELECT COUNT(*) as count
-                    FROM author_reviews
-                    WHERE user_id = %s
-                """, (user_id,))
-                
-                total_author_reviews = cursor.fetchone()['count']
-                print(f"Total author reviews: {total_author_reviews}")
-                
-                # 3. Count total ratings (BOTH book ratings AND author ratings)
-                cursor.execute("""
-                    SELECT 
-                        (SELECT COUNT(*) FROM ratings WHERE user_id = %s) +
-                        (SELECT COUNT(*) FROM author_ratings WHERE user_id = %s) as count
-                """, (user_id, user_id))
-                
-                total_ratings = cursor.fetchone()['count']
-                print(f"Total ratings (books + authors): {total_ratings}")
-                
-                # 4. Count following users
-                cursor.execute("""
-                    SELECT COUNT(*) as count
-                    FROM user_follow_user
-                    WHERE follower_id = %s
-                """, (user_id,))
-                
-                following_users = cursor.fetchone()['count']
-                
-                # 5. Count followers
-                cursor.execute("""
-                    SELECT COUNT(*) as count
-                    FROM user_follow_user
-                    WHERE following_id = %s
-                """, (user_id,))
-                
-                followers_count = cursor.fetchone()['count']
-                
-                # 6. Count following authors
-                cursor.execute("""
-                    SELECT COUNT(*) as count
-                    FROM user_follow_author
-                    WHERE user_id = %s
+                cursor.execute(f"""
+                    SELECT
+                        u.user_id, u.username, u.display_name, u.role{STATS_COLUMNS if 'stats' in include else ''}
+                    FROM users u
+                    WHERE u.user_id = %s
                 """, (user_id,))
+                user = cursor.fetchone()
                 
-                following_authors = cursor.fetchone()['count']
+                if not user:
+                    return error_response(404, 'User not found')
+
+                user_id = user['user_id']
+                response_data = {'user_id': user_id}
+
+                if 'stats' in include:
+                    response_data.update({
+                        'total_book_reviews': user['total_book_reviews'],
+                        'total_author_reviews': user['total_author_reviews'],
+                        'total_ratings': user['total_ratings'],
+                        'books_read': user['books_read'],  # ✅ From Completed list
+                        'followers': user['followers'],
+                        'following': user['following_users'] + user['following_authors'],
+                    })
                 
                 # ========================================
-                # AUTHOR RATINGS LIST
+                # ACTIVITY LISTS (one page each)
                 # ========================================
-                
-                cursor.execute("""
-                    SELECT 
-                        ar.author_rating_id,
-                        ar.rating_value,
-                        ar.created_at as rated_at,
-                        a.author_id,
-                        a.name as author_name,
-                        a.user_id,
-                        COALESCE(u.profile_image, '') as author_avatar
-                    FROM author_ratings ar
-                    JOIN authors a ON ar.author_id = a.author_id
-                    LEFT JOIN users u ON a.user_id = u.user_id
-                    WHERE ar.user_id = %s
-                    ORDER BY ar.created_at DESC
-                """, (user_id,))
-                
-                author_ratings = []
-                for row in cursor.fetchall():
-                    author_ratings.append({
+
+                pages = {}
+                next_cursors = {}
+                for section in LIST_SECTIONS:
+                    if section in include:
+                        pages[section], next_cursors[section] = fetch_page(
+                            cursor, section, user_id, limit, list_cursors[section]
+                        )
+
+                book_ids = {
+                    row['book_id']
+                    for section in ('book_ratings', 'book_reviews')
+                    for row in pages.get(section, [])
+                }
+                book_authors = get_book_authors(cursor, book_ids)
+
+                if 'author_ratings' in pages:
+                    response_data['author_ratings'] = [{
                         'author_id': row['author_id'],
                         'author_name': row['author_name'],
                         'author_avatar': row['author_avatar'],
                         'rating_value': row['rating_value'],
                         'rated_at': row['rated_at'],
                         'user_id': row['user_id']
-                    })
-                
-                print(f"Author ratings: {len(author_ratings)}")
-                
-                # ========================================
-                # BOOK RATINGS LIST
-                # ========================================
-                
-                cursor.execute("""
-                    SELECT 
-                        r.rating_id,
-                        r.rating_value,
-                        r.created_at as rated_at,
-                        b.book_id,
-                        b.title as book_title,
-                        b.cover_image_url as book_cover,
-                        GROUP_CONCAT(DISTINCT a.name ORDER BY a.name SEPARATOR ', ') as book_author
-                    FROM ratings r
-                    JOIN books b ON r.book_id = b.book_id
-                    LEFT JOIN book_author ba ON b.book_id = ba.book_id
-                    LEFT JOIN authors a ON ba.author_id = a.author_id
-                    WHERE r.user_id = %s
-                    GROUP BY r.rating_id, r.rating_value, r.created_at, b.book_id, b.title, b.cover_image_url
-                    ORDER BY r.created_at DESC
-                """, (user_id,))
-                
-                book_ratings = []
-                for row in cursor.fetchall():
-                    book_ratings.append({
+                    } for row in pages['author_ratings']]
+
+                if 'book_ratings' in pages:
+                    response_data['book_ratings'] = [{
                         'book_id': row['book_id'],
                         'book_title': row['book_title'],
                         'book_cover': row['book_cover'] or '',
-                        'book_author': row['book_author'] or 'Unknown',
+                        'book_author': book_authors.get(row['book_id']) or 'Unknown',
                         'rating_value': row['rating_value'],
                         'rated_at': row['rated_at']
-                    })
-                
-                print(f"Book ratings: {len(book_ratings)}")
-                
-                # ========================================
-                # AUTHOR REVIEWS LIST
-                # ========================================
-                
-                cursor.execute("""
-                    SELECT 
-                        ar.author_review_id,
-                        ar.review_text,
-                        ar.created_at,
-                        ar.updated_at,
-                        a.author_id,
-                        a.name as author_name,
-                        COALESCE(u.profile_image, '') as author_avatar
-                    FROM author_reviews ar
-                    JOIN authors a ON ar.author_id = a.author_id
-                    LEFT JOIN users u ON a.user_id = u.user_id
-                    WHERE ar.user_id = %s
-                    ORDER BY ar.created_at DESC
-                """, (user_id,))
-                
-                author_reviews = []
-                for row in cursor.fetchall():
-                    author_reviews.append({
+                    } for row in pages['book_ratings']]
+
+                if 'author_reviews' in pages:
+                    response_data['author_reviews'] = [{
                         'author_review_id': row['author_review_id'],
                         'author_id': row['author_id'],
                         'author_name': row['author_name'],
@@ -314,74 +361,27 @@ def lambda_handler(event, context):
                         'review_text': row['review_text'],
                         'created_at': row['created_at'],
                         'updated_at': row['updated_at']
-                    })
-                
-                print(f"Author reviews: {len(author_reviews)}")
-                
-                # ========================================
-                # BOOK REVIEWS LIST
-                # ========================================
-                
-                cursor.execute("""
-                    SELECT 
-                        rev.review_id,
-                        rev.review_text,
-                        rev.created_at,
-                        rev.updated_at,
-                        b.book_id,
-                        b.title as book_title,
-                        b.cover_image_url as book_cover,
-                        GROUP_CONCAT(DISTINCT a.name ORDER BY a.name SEPARATOR ', ') as book_author,
-                        COALESCE(r.rating_value, 0) as rating_value
-                    FROM reviews rev
-                    JOIN books b ON rev.book_id = b.book_id
-                    LEFT JOIN book_author ba ON b.book_id = ba.book_id
-                    LEFT JOIN authors a ON ba.author_id = a.author_id
-                    LEFT JOIN ratings r ON rev.book_id = r.book_id AND rev.user_id = r.user_id
-                    WHERE rev.user_id = %s
-                    GROUP BY rev.review_id, rev.review_text, rev.created_at, rev.updated_at, 
-                             b.book_id, b.title, b.cover_image_url, r.rating_value
-                    ORDER BY rev.created_at DESC
-                """, (user_id,))
-                
-                book_reviews = []
-                for row in cursor.fetchall():
-                    book_reviews.append({
+                    } for row in pages['author_reviews']]
+
+                if 'book_reviews' in pages:
+                    response_data['book_reviews'] = [{
                         'review_id': row['review_id'],
                         'book_id': row['book_id'],
                         'book_title': row['book_title'],
                         'book_cover': row['book_cover'] or '',
-                        'book_author': row['book_author'] or 'Unknown',
+                        'book_author': book_authors.get(row['book_id']) or 'Unknown',
                         'review_text': row['review_text'],
                         'rating_value': row['rating_value'],
                         'created_at': row['created_at'],
                         'updated_at': row['updated_at']
-                    })
-                
-                print(f"Book reviews: {len(book_reviews)}")
-                
-                # ========================================
-                # BUILD COMPREHENSIVE RESPONSE
-                # ========================================
-                
-                response_data = {
-                    # Basic stats
-                    'user_id': user_id,
-                    'total_book_reviews': total_book_reviews,
-                    'total_author_reviews': total_author_reviews,
-                    'total_ratings': total_ratings,
-                    'books_read': books_read,  # ✅ Now from Completed list
-                    'followers': followers_count,
-                    'following': following_users + following_authors,
-                    
-                    # Detailed lists
-                    'author_ratings': author_ratings,
-                    'book_ratings': book_ratings,
-                    'author_reviews': author_reviews,
-                    'book_reviews': book_reviews
-                }
-                
-                print(f"Successfully retrieved all stats and details")
+                    } for row in pages['book_reviews']]
+
+                if next_cursors:
+                    response_data['next_cursors'] = next_cursors
+
+                print(f"✅ Stats for user {user_id}: " + ', '.join(
+                    f"{section}={len(rows)}" for section, rows in pages.items()
+                ))
                 
                 return {
                     'statusCode': 200,
@@ -390,7 +390,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            connection.close()
+            release_connection(connection)
             
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -1,23 +1,17 @@
 import json
 import pymysql
-import os
 import re
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_user_id
 
-# ==================== DATABASE CONFIG ====================
-
-DB_CONFIG = {
-    'host': os.environ.get('DB_HOST'),
-    'user': os.environ.get('DB_USER'),
-    'password': os.environ.get('DB_PASSWORD'),
-    'database': os.environ.get('DB_NAME'),
-    'charset': 'utf8mb4',
-    'cursorclass': pymysql.cursors.DictCursor
-}
+MAX_BULK_OPERATIONS = 500
+BULK_OPS = ('add', 'remove', 'move')
 
 # ==================== HELPERS ====================
 
 def get_connection():
-    return pymysql.connect(**DB_CONFIG)
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def success_response(data, status_code=200):
     return {
@@ -49,16 +43,12 @@ def get_param(params, *names):
             return int(params[name])
     raise ValueError(f"Missing path parameter: {names}")
 
-def get_user_id(connection, cognito_sub):
+def get_user_id(connection, cognito_sub, claims=None):
     with connection.cursor() as cursor:
-        cursor.execute(
-            'SELECT user_id FROM users WHERE cognito_sub = %s',
-            (cognito_sub,)
-        )
-        user = cursor.fetchone()
-        if not user:
+        user_id = resolve_user_id(cursor, cognito_sub, claims)
+        if not user_id:
             raise ValueError('User not found')
-        return user['user_id']
+        return user_id
 
 # ==================== LIST HANDLERS ====================
 
@@ -211,6 +201,123 @@ def remove_book_from_list(connection, user_id, list_id, book_id):
 
         return success_response({'message': 'Book removed from list successfully'})
 
+def parse_id(value):
+    """int() for an id field; JSON true/false (bool is an int subclass) are not ids"""
+    if isinstance(value, bool):
+        raise TypeError('id must be an integer')
+    return int(value)
+
+def parse_bulk_operations(body):
+    """
+    Validate {"operations": [{"op", "book_id", "list_id"[, "from_list_id"]}, ...]}
+
+    op is add, remove or move; a move takes the book out of from_list_id
+    and puts it in list_id.
+
+    Returns:
+        [(op, book_id, list_id, from_list_id or None), ...] in request order
+    """
+    operations = body.get('operations')
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty array')
+    if len(operations) > MAX_BULK_OPERATIONS:
+        raise ValueError(f'At most {MAX_BULK_OPERATIONS} operations per request')
+
+    parsed = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in BULK_OPS:
+            raise ValueError(f'operations[{index}].op must be one of: {", ".join(BULK_OPS)}')
+        try:
+            book_id = parse_id(operation['book_id'])
+            list_id = parse_id(operation['list_id'])
+            from_list_id = parse_id(operation['from_list_id']) if operation['op'] == 'move' else None
+        except (KeyError, TypeError, ValueError):
+            required = 'book_id, list_id and from_list_id' if operation['op'] == 'move' else 'book_id and list_id'
+            raise ValueError(f'operations[{index}] needs integer {required}')
+        if from_list_id == list_id:
+            raise ValueError(f'operations[{index}] moves a book to the list it is in')
+        parsed.append((operation['op'], book_id, list_id, from_list_id))
+    return parsed
+
+def bulk_update_list_books(connection, user_id, body):
+    """
+    Apply up to MAX_BULK_OPERATIONS add/remove/move operations atomically
+
+    Every list is checked once with one ownership query and every added
+    book with one existence query; then the net effect per (list, book),
+    where later operations win, is written with one multi-row INSERT and
+    one multi-row DELETE in a single transaction. Nothing is written if
+    any list or book is invalid.
+    """
+    operations = parse_bulk_operations(body)
+
+    # Net state per (list_id, book_id): True = in the list, False = not
+    final_state = {}
+    for op, book_id, list_id, from_list_id in operations:
+        if op == 'move':
+            final_state[(from_list_id, book_id)] = False
+        final_state[(list_id, book_id)] = op != 'remove'
+    to_add = [pair for pair, present in final_state.items() if present]
+    to_remove = [pair for pair, present in final_state.items() if not present]
+
+    list_ids = sorted({list_id for list_id, _ in final_state})
+    book_ids = sorted({book_id for _, book_id in to_add})
+
+    try:
+        with connection.cursor() as cursor:
+            # Verify every list belongs to user (locks them until commit)
+            placeholders = ', '.join(['%s'] * len(list_ids))
+            cursor.execute(f"""
+                SELECT list_id FROM lists
+                WHERE user_id = %s AND list_id IN ({placeholders})
+                FOR UPDATE
+            """, [user_id] + list_ids)
+            owned = {row['list_id'] for row in cursor.fetchall()}
+            missing_lists = [list_id for list_id in list_ids if list_id not in owned]
+            if missing_lists:
+                raise ValueError(f'List not found or access denied: {missing_lists}')
+
+            if book_ids:
+                placeholders = ', '.join(['%s'] * len(book_ids))
+                cursor.execute(
+                    f'SELECT book_id FROM books WHERE book_id IN ({placeholders})',
+                    book_ids
+                )
+                found = {row['book_id'] for row in cursor.fetchall()}
+                missing_books = [book_id for book_id in book_ids if book_id not in found]
+                if missing_books:
+                    raise ValueError(f'Book not found: {missing_books}')
+
+            removed = 0
+            if to_remove:
+                placeholders = ', '.join(['(%s, %s)'] * len(to_remove))
+                cursor.execute(
+                    f'DELETE FROM list_books WHERE (list_id, book_id) IN ({placeholders})',
+                    [value for pair in to_remove for value in pair]
+                )
+                removed = cursor.rowcount
+
+            if to_add:
+                placeholders = ', '.join(['(%s, %s, NOW())'] * len(to_add))
+                cursor.execute(f"""
+                    INSERT INTO list_books (list_id, book_id, added_at)
+                    VALUES {placeholders}
+                    ON DUPLICATE KEY UPDATE added_at = NOW()
+                """, [value for pair in to_add for value in pair])
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+    return success_response({
+        'message': 'List books updated successfully',
+        'operations': len(operations),
+        'added': len(to_add),
+        'removed': removed,
+        'lists': list_ids
+    })
+
 def get_book_lists(connection, user_id, book_id):
     """
     Returns ALL user lists with is_added flag for a specific book
@@ -330,6 +437,7 @@ def delete_list(connection, user_id, list_id):
 
 # ==================== MAIN HANDLER ====================
 
+@measure_invocation
 def lambda_handler(event, context):
     connection = None
 
@@ -359,7 +467,7 @@ def lambda_handler(event, context):
 
         # -------- DB --------
         connection = get_connection()
-        user_id = get_user_id(connection, cognito_sub)
+        user_id = get_user_id(connection, cognito_sub, authorizer['claims'])
 
         print("USER ID:", user_id)
 
@@ -399,6 +507,10 @@ def lambda_handler(event, context):
             book_id = get_param(path_parameters, 'book_id', 'id')
             return remove_book_from_list(connection, user_id, list_id, book_id)
 
+        # POST /lists/books/bulk - Add/remove/move many books in one transaction
+        if http_method == 'POST' and path == '/lists/books/bulk':
+            return bulk_update_list_books(connection, user_id, body)
+
         # GET /books/{book_id}/lists - Get all lists with is_added flag for this book
         if http_method == 'GET' and re.match(r'^/books/\d+/lists$', path):
             book_id = get_param(path_parameters, 'book_id', 'id')
@@ -418,4 +530,4 @@ def lambda_handler(event, context):
 
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
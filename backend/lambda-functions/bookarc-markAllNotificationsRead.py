@@ -1,7 +1,10 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import record_unread_change
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     PATCH /notifications/mark-all-read
@@ -36,13 +39,7 @@ def lambda_handler(event, context):
             }
         
         # Connect to database
-        conn = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with conn.cursor() as cursor:
@@ -71,6 +68,7 @@ def lambda_handler(event, context):
                 """, (user_id,))
                 
                 updated_count = cursor.rowcount
+                record_unread_change(cursor, {user_id: -updated_count})
                 conn.commit()
                 
                 return {
@@ -83,7 +81,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            conn.close()
+            release_connection(conn)
             
     except Exception as e:
         print(f"Error: {str(e)}")
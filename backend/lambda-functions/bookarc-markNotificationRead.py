@@ -1,7 +1,10 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import record_unread_change
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     PATCH /notifications/{notification_id}/read
@@ -34,13 +37,7 @@ def lambda_handler(event, context):
         notification_id = event['pathParameters']['notification_id']
         
         # Connect to database
-        conn = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        conn = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with conn.cursor() as cursor:
@@ -77,13 +74,16 @@ def lambda_handler(event, context):
                         'body': json.dumps({'error': 'Notification not found'})
                     }
                 
-                # Mark as read
+                # Mark as read (only an unread row changes the counter)
                 cursor.execute("""
                     UPDATE notifications 
                     SET is_read = TRUE 
-                    WHERE notification_id = %s
+                    WHERE notification_id = %s AND is_read = FALSE
                 """, (notification_id,))
                 
+                if cursor.rowcount:
+                    record_unread_change(cursor, {user_id: -1})
+                
                 conn.commit()
                 
                 return {
@@ -97,7 +97,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            conn.close()
+            release_connection(conn)
             
     except Exception as e:
         print(f"Error: {str(e)}")
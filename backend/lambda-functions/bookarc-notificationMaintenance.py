@@ -0,0 +1,438 @@
+"""
+Lambda Function: bookarc-notificationMaintenance
+Scheduled retention job for the notifications table
+
+Steps, run in this order (pick some with {"steps": ["archive"]}):
+    hourly_digest
+               -> turn each closed hour in notification_digest_buffer into
+                  one notification per user (users with digest_mode =
+                  'hourly', see the notification_preferences layer)
+    compact    -> collapse notifications with the same user, type and
+                  group_key that are older than COMPACT_AFTER_HOURS into one
+                  digest row ("... (+11 more ratings)")
+    archive    -> move read notifications older than ARCHIVE_AFTER_DAYS to
+                  gzip JSONL files in s3://NOTIFICATION_ARCHIVE_BUCKET (or
+                  NOTIFICATION_ARCHIVE_DIR) and delete them from the table
+    partitions -> add monthly partitions PARTITIONS_AHEAD months ahead and
+                  drop old partitions that archival has emptied
+
+Run daily from an EventBridge schedule with {}, and hourly (a few minutes
+past the hour) with {"steps": ["hourly_digest"]}.
+"""
+
+import os
+import re
+import gzip
+import json
+import time
+import pymysql
+from datetime import datetime, timedelta
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import record_unread_change
+from notification_outbox import write_notifications
+from notification_preferences import DIGEST_TYPES
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get('NOTIFICATION_ARCHIVE_AFTER_DAYS', '90'))
+COMPACT_AFTER_HOURS = int(os.environ.get('NOTIFICATION_COMPACT_AFTER_HOURS', '24'))
+PARTITIONS_AHEAD = int(os.environ.get('NOTIFICATION_PARTITIONS_AHEAD', '3'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('NOTIFICATION_ARCHIVE_BATCH_SIZE', '5000'))
+DIGEST_BATCH_SIZE = int(os.environ.get('NOTIFICATION_DIGEST_BATCH_SIZE', '500'))
+COMPACT_BATCH_SIZE = int(os.environ.get('NOTIFICATION_COMPACT_BATCH_SIZE', '500'))
+ARCHIVE_BUCKET = os.environ.get('NOTIFICATION_ARCHIVE_BUCKET')
+ARCHIVE_PREFIX = os.environ.get('NOTIFICATION_ARCHIVE_PREFIX', 'notifications/archive/')
+# Local-directory stand-in for the bucket (tests, local runs)
+ARCHIVE_DIR = os.environ.get('NOTIFICATION_ARCHIVE_DIR')
+
+STEPS = ['hourly_digest', 'compact', 'archive', 'partitions']
+# Stop starting new batches this long before the Lambda timeout
+DEADLINE_MARGIN_MS = 15000
+
+# What a digest row counts, per notification type
+DIGEST_NOUNS = {
+    'book_rated': 'ratings',
+    'book_reviewed': 'reviews',
+    'author_rating': 'ratings',
+    'author_review': 'reviews',
+    'new_follower': 'followers',
+}
+DIGEST_SUFFIX = re.compile(r' \(\+\d+ more [^)]*\)$')
+
+ARCHIVE_COLUMNS = ['notification_id', 'user_id', 'message', 'type', 'audience_type',
+                   'group_key', 'group_count', 'is_read', 'created_at']
+
+
+def past_deadline(deadline):
+    return deadline is not None and time.monotonic() >= deadline
+
+
+# ============================================================================
+# HOURLY DIGESTS
+# ============================================================================
+
+def hourly_digest_message(period_start, rows):
+    """One notification for a user's buffered hour"""
+    if len(rows) == 1 and rows[0]['event_count'] == 1:
+        return rows[0]['last_message'], rows[0]['type']
+    parts = [f"{row['event_count']} {DIGEST_TYPES.get(row['type'], row['type'])}" for row in rows]
+    return f"🔔 Your hour on BookArc ({period_start:%b %d, %H:00} UTC): {', '.join(parts)}", 'digest'
+
+
+def flush_hourly_digests(connection, deadline=None):
+    """Write one notification per (user, closed hour) and clear the buffer"""
+    stats = {'digests': 0, 'events': 0}
+
+    while not past_deadline(deadline):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT user_id, period_start
+                FROM notification_digest_buffer
+                WHERE period_start < TIMESTAMP(CURDATE(), MAKETIME(HOUR(NOW()), 0, 0))
+                ORDER BY period_start, user_id
+                LIMIT %s
+            """, (DIGEST_BATCH_SIZE,))
+            periods = [(row['user_id'], row['period_start']) for row in cursor.fetchall()]
+            if not periods:
+                break
+
+            # Locking read: waits for a writer still adding to one of these hours
+            pairs = ', '.join(['(%s, %s)'] * len(periods))
+            params = [value for period in periods for value in period]
+            cursor.execute(f"""
+                SELECT user_id, period_start, type, event_count, last_message, audience_type
+                FROM notification_digest_buffer
+                WHERE (user_id, period_start) IN ({pairs})
+                ORDER BY user_id, period_start, event_count DESC, type
+                FOR UPDATE
+            """, params)
+            grouped = {}
+            for row in cursor.fetchall():
+                grouped.setdefault((row['user_id'], row['period_start']), []).append(row)
+
+            notifications = []
+            for (user_id, period_start), rows in grouped.items():
+                message, notification_type = hourly_digest_message(period_start, rows)
+                audiences = {row['audience_type'] for row in rows}
+                audience_type = audiences.pop() if len(audiences) == 1 else 'all'
+                notifications.append((user_id, message, notification_type, audience_type))
+                stats['events'] += sum(row['event_count'] for row in rows)
+
+            write_notifications(cursor, notifications)
+            cursor.execute(f"""
+                DELETE FROM notification_digest_buffer
+                WHERE (user_id, period_start) IN ({pairs})
+            """, params)
+        connection.commit()
+
+        stats['digests'] += len(notifications)
+        if len(periods) < DIGEST_BATCH_SIZE:
+            break
+
+    return stats
+
+
+# ============================================================================
+# COMPACTION
+# ============================================================================
+
+def digest_message(latest_message, notification_type, total):
+    """Latest message of the group plus how many others it stands for"""
+    base = DIGEST_SUFFIX.sub('', latest_message)
+    noun = DIGEST_NOUNS.get(notification_type, 'notifications')
+    return f"{base} (+{total - 1} more {noun})"
+
+
+def compact_group(cursor, group, cutoff):
+    """
+    Collapse one (user_id, type, group_key) group into its newest row
+
+    Returns the unread counter delta for the group's user.
+    """
+    # Lock the group so a concurrent mark-read can't skew the unread delta
+    cursor.execute("""
+        SELECT notification_id, message, is_read, group_count
+        FROM notifications
+        WHERE user_id = %s AND type = %s AND group_key = %s AND created_at < %s
+        ORDER BY created_at DESC, notification_id DESC
+        FOR UPDATE
+    """, (group['user_id'], group['type'], group['group_key'], cutoff))
+    rows = cursor.fetchall()
+    if len(rows) < 2:
+        return 0
+
+    keep = rows[0]
+    total = sum(row['group_count'] for row in rows)
+    unread_before = sum(1 for row in rows if not row['is_read'])
+    digest_unread = unread_before > 0
+
+    cursor.execute("""
+        UPDATE notifications
+        SET message = %s, group_count = %s, is_read = %s
+        WHERE notification_id = %s AND user_id = %s
+    """, (digest_message(keep['message'], group['type'], total), total,
+          not digest_unread, keep['notification_id'], group['user_id']))
+
+    other_ids = [row['notification_id'] for row in rows[1:]]
+    placeholders = ', '.join(['%s'] * len(other_ids))
+    cursor.execute(f"""
+        DELETE FROM notifications
+        WHERE user_id = %s AND notification_id IN ({placeholders})
+    """, [group['user_id']] + other_ids)
+
+    return int(digest_unread) - unread_before
+
+
+def compact(connection, cutoff, deadline=None):
+    """Collapse every group with more than one row older than cutoff"""
+    stats = {'groups': 0, 'rows_removed': 0}
+    after = (0, '', '')
+
+    while not past_deadline(deadline):
+        with connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT user_id, type, group_key, COUNT(*) AS row_count
+                FROM notifications
+                WHERE group_key IS NOT NULL AND created_at < %s
+                  AND (user_id, type, group_key) > (%s, %s, %s)
+                GROUP BY user_id, type, group_key
+                HAVING row_count > 1
+                ORDER BY user_id, type, group_key
+                LIMIT %s
+            """, (cutoff, *after, COMPACT_BATCH_SIZE))
+            groups = cursor.fetchall()
+            if not groups:
+                break
+
+            unread_deltas = {}
+            for group in groups:
+                delta = compact_group(cursor, group, cutoff)
+                if delta:
+                    unread_deltas[group['user_id']] = unread_deltas.get(group['user_id'], 0) + delta
+                stats['groups'] += 1
+                stats['rows_removed'] += group['row_count'] - 1
+
+            record_unread_change(cursor, unread_deltas)
+        connection.commit()
+
+        last = groups[-1]
+        after = (last['user_id'], last['type'], last['group_key'])
+        if len(groups) < COMPACT_BATCH_SIZE:
+            break
+
+    return stats
+
+
+# ============================================================================
+# ARCHIVAL
+# ============================================================================
+
+def write_archive(rows, day):
+    """Store rows as gzip JSONL; returns the file's location"""
+    lines = []
+    for row in rows:
+        record = {column: row[column] for column in ARCHIVE_COLUMNS}
+        record['is_read'] = bool(record['is_read'])
+        record['created_at'] = record['created_at'].isoformat()
+        lines.append(json.dumps(record, ensure_ascii=False))
+    body = gzip.compress(('\n'.join(lines) + '\n').encode('utf-8'))
+
+    # Named after the id range, so re-archiving a batch after a crash
+    # overwrites the same object instead of adding a duplicate
+    name = f"dt={day}/{rows[0]['notification_id']}-{rows[-1]['notification_id']}.jsonl.gz"
+
+    if ARCHIVE_DIR:
+        path = os.path.join(ARCHIVE_DIR, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        return path
+
+    if not ARCHIVE_BUCKET:
+        raise ValueError('Set NOTIFICATION_ARCHIVE_BUCKET or NOTIFICATION_ARCHIVE_DIR')
+
+    import boto3
+    key = f"{ARCHIVE_PREFIX}{name}"
+    boto3.client('s3').put_object(
+        Bucket=ARCHIVE_BUCKET,
+        Key=key,
+        Body=body,
+        ContentType='application/x-ndjson',
+        ContentEncoding='gzip'
+    )
+    return f"s3://{ARCHIVE_BUCKET}/{key}"
+
+
+def archive(connection, cutoff, deadline=None):
+    """Ship read notifications older than cutoff to the archive, then delete them"""
+    stats = {'files': 0, 'rows_archived': 0}
+    day = datetime.utcnow().strftime('%Y-%m-%d')
+    after_id = 0
+
+    while not past_deadline(deadline):
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT {', '.join(ARCHIVE_COLUMNS)}
+                FROM notifications
+                WHERE is_read = TRUE AND created_at < %s AND notification_id > %s
+                ORDER BY notification_id
+                LIMIT %s
+            """, (cutoff, after_id, ARCHIVE_BATCH_SIZE))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            # Upload first: a crash before the DELETE only re-archives the batch
+            location = write_archive(rows, day)
+
+            ids = [row['notification_id'] for row in rows]
+            placeholders = ', '.join(['%s'] * len(ids))
+            cursor.execute(f"""
+                DELETE FROM notifications
+                WHERE notification_id IN ({placeholders}) AND is_read = TRUE
+            """, ids)
+            cursor.execute("""
+                INSERT INTO notification_archive_log
+                (location, first_notification_id, last_notification_id, row_count)
+                VALUES (%s, %s, %s, %s)
+            """, (location, ids[0], ids[-1], len(ids)))
+        connection.commit()
+
+        stats['files'] += 1
+        stats['rows_archived'] += len(rows)
+        after_id = rows[-1]['notification_id']
+        print(f"Archived {len(rows)} notifications to {location}")
+        if len(rows) < ARCHIVE_BATCH_SIZE:
+            break
+
+    return stats
+
+
+# ============================================================================
+# PARTITIONS
+# ============================================================================
+
+def month_start(day):
+    return datetime(day.year, day.month, 1)
+
+
+def next_month(day):
+    return datetime(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def list_partitions(cursor):
+    """[(name, upper bound datetime or None for MAXVALUE)] in partition order"""
+    cursor.execute("""
+        SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'notifications'
+          AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """)
+    partitions = []
+    for row in cursor.fetchall():
+        bound = row['bound'].strip("'")
+        partitions.append((row['name'], None if bound == 'MAXVALUE' else datetime.fromisoformat(bound)))
+    return partitions
+
+
+def maintain_partitions(connection, cutoff, now):
+    """Split p_future into upcoming months; drop emptied partitions below cutoff"""
+    stats = {'added': [], 'dropped': []}
+
+    with connection.cursor() as cursor:
+        partitions = list_partitions(cursor)
+        if not partitions:
+            print("notifications is not partitioned; skipping")
+            return stats
+
+        highest = max((bound for _, bound in partitions if bound), default=month_start(now))
+        target = month_start(now)
+        for _ in range(PARTITIONS_AHEAD + 1):
+            target = next_month(target)
+        while highest < target:
+            upper = next_month(highest)
+            name = f"p{highest:%Y%m}"
+            cursor.execute(f"""
+                ALTER TABLE notifications REORGANIZE PARTITION p_future INTO (
+                    PARTITION {name} VALUES LESS THAN ('{upper:%Y-%m-%d}'),
+                    PARTITION p_future VALUES LESS THAN (MAXVALUE)
+                )
+            """)
+            stats['added'].append(name)
+            highest = upper
+
+        # Keep at least one bounded partition below p_future
+        droppable = [(name, bound) for name, bound in partitions if bound and bound <= cutoff]
+        bounded = sum(1 for _, bound in partitions if bound)
+        for name, _ in droppable:
+            if bounded - len(stats['dropped']) <= 1:
+                break
+            cursor.execute(f"SELECT 1 FROM notifications PARTITION ({name}) LIMIT 1")
+            if cursor.fetchone():
+                # Unread history still lives here
+                continue
+            cursor.execute(f"ALTER TABLE notifications DROP PARTITION {name}")
+            stats['dropped'].append(name)
+
+    connection.commit()
+    return stats
+
+
+@measure_invocation
+def lambda_handler(event, context):
+    """Compact, archive and re-partition notifications"""
+    event = event or {}
+    steps = event.get('steps') or STEPS
+    archive_after_days = int(event.get('archive_after_days', ARCHIVE_AFTER_DAYS))
+    compact_after_hours = int(event.get('compact_after_hours', COMPACT_AFTER_HOURS))
+
+    unknown = [step for step in steps if step not in STEPS]
+    if unknown:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f"Unknown steps: {', '.join(unknown)}. Must be any of: {', '.join(STEPS)}"})
+        }
+
+    deadline = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        remaining_ms = context.get_remaining_time_in_millis() - DEADLINE_MARGIN_MS
+        deadline = time.monotonic() + max(remaining_ms, 0) / 1000
+
+    now = datetime.utcnow()
+    archive_cutoff = now - timedelta(days=archive_after_days)
+    compact_cutoff = now - timedelta(hours=compact_after_hours)
+    print(f"Notification maintenance {steps}: archive < {archive_cutoff}, compact < {compact_cutoff}")
+
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
+    try:
+        result = {}
+        if 'hourly_digest' in steps:
+            result['hourly_digest'] = flush_hourly_digests(connection, deadline)
+        if 'compact' in steps:
+            result['compact'] = compact(connection, compact_cutoff, deadline)
+        if 'archive' in steps:
+            result['archive'] = archive(connection, archive_cutoff, deadline)
+        if 'partitions' in steps:
+            result['partitions'] = maintain_partitions(connection, archive_cutoff, now)
+
+        print(f"✅ Notification maintenance done: {result}")
+        return {
+            'statusCode': 200,
+            'body': json.dumps(result)
+        }
+
+    except Exception as e:
+        connection.rollback()
+        print(f"Error in notification maintenance: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
+        }
+
+    finally:
+        release_connection(connection)
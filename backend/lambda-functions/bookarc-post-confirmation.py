@@ -1,21 +1,13 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
-DB_HOST = os.environ['DB_HOST']
-DB_USER = os.environ['DB_USER']
-DB_PASSWORD = os.environ['DB_PASSWORD']
-DB_NAME = os.environ['DB_NAME']
 
 def get_db_connection():
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
+@measure_invocation
 def lambda_handler(event, context):
     print("Post-confirmation event received:", json.dumps(event))
 
@@ -105,7 +97,7 @@ def lambda_handler(event, context):
                 print(f"Default lists created for user_id: {user_id}")
 
         finally:
-            connection.close()
+            release_connection(connection)
 
         return event
 
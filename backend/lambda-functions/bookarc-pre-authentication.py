@@ -1,7 +1,9 @@
 import json
 import pymysql
-import os
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Cognito Pre-Authentication Trigger
@@ -21,13 +23,7 @@ def lambda_handler(event, context):
             raise Exception("Authentication failed: Invalid user")
         
         # Connect to database
-        connection = pymysql.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         try:
             with connection.cursor() as cursor:
@@ -56,7 +52,7 @@ def lambda_handler(event, context):
                 print(f"✅ User {user['username']} ({user['email']}) is active - allowing login")
                 
         finally:
-            connection.close()
+            release_connection(connection)
         
         # Return event to allow authentication
         return event
@@ -1,85 +1,17 @@
 """
 Lambda Function: bookarc-rateAuthor
-Rate an author (1-5 stars) with EMBEDDED notifications
+Rate an author (1-5 stars) with notifications
 Endpoint: POST/GET/DELETE /authors/{author_id}/rating
 
 """
 
 import json
 import pymysql
-import os
 from decimal import Decimal
 from typing import Dict, Any, Optional
-
-# ============================================================================
-# EMBEDDED NOTIFICATION SERVICE - NO LAYER NEEDED
-# ============================================================================
-
-class NotificationService:
-    """Service for creating and managing notifications"""
-    
-    def __init__(self, connection):
-        self.connection = connection
-    
-    def create_notification(
-        self, 
-        user_id: int, 
-        message: str, 
-        notification_type: str,
-        audience_type: str = 'all'
-    ) -> Optional[int]:
-        """Create a single notification"""
-        try:
-            with self.connection.cursor() as cursor:
-                sql = """
-                    INSERT INTO notifications 
-                    (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """
-                cursor.execute(sql, (user_id, message, notification_type, audience_type))
-                self.connection.commit()
-                notification_id = cursor.lastrowid
-                print(f"Created notification {notification_id} for user {user_id}: {message}")
-                return notification_id
-        except Exception as e:
-            print(f"Error creating notification: {str(e)}")
-            return None
-    
-    def notify_user_rated_author(
-        self, 
-        user_id: int, 
-        author_name: str, 
-        rating_value: int
-    ) -> Optional[int]:
-        """Notify user that they successfully rated an author"""
-        stars = '⭐' * rating_value
-        message = f'You have successfully rated {author_name} {stars} ({rating_value}/5)'
-        return self.create_notification(user_id, message, 'author_rating_success', 'all')
-    
-    def notify_author_received_rating(
-        self, 
-        author_user_id: int, 
-        rater_name: str, 
-        rating_value: int
-    ) -> Optional[int]:
-        """Notify author that they received a rating"""
-        stars = '⭐' * rating_value
-        message = f'⭐ {rater_name} rated you {stars} ({rating_value}/5)'
-        return self.create_notification(author_user_id, message, 'author_rating', 'author')
-
-# ============================================================================
-# END OF EMBEDDED NOTIFICATION SERVICE
-# ============================================================================
-
-# Database configuration
-DB_CONFIG = {
-    'host': os.environ.get('DB_HOST'),
-    'user': os.environ.get('DB_USER'),
-    'password': os.environ.get('DB_PASSWORD'),
-    'database': os.environ.get('DB_NAME'),
-    'charset': 'utf8mb4',
-    'cursorclass': pymysql.cursors.DictCursor
-}
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_service import NotificationService
 
 CORS_HEADERS = {
     'Content-Type': 'application/json',
@@ -233,35 +165,17 @@ def rate_author(connection, user_id: int, author_id: int, author: Dict, event: D
             """, (author_id,))
             total_ratings = cursor.fetchone()['total']
             
+            # Notify the rater, and the author (registered, new ratings only),
+            # in the same transaction
+            notif_service = NotificationService(connection)
+            notif_service.notify_user_rated_author(user_id, author['name'], rating_value)
+            if is_new_rating and author.get('user_id'):
+                notif_service.notify_author_received_rating(author['user_id'], user_name, rating_value)
+            notif_service.flush(cursor)
+            
             connection.commit()
             print(f"Database updated - avg_rating={avg_rating:.2f}, total={total_ratings}")
             
-            try:
-                print(f"\nCreating NotificationService...")
-                notif_service = NotificationService(connection)
-                
-                # 1. Notify the user who rated
-                author_name = author['name']
-                print(f"Sending notification to user {user_id}")
-                user_notif_id = notif_service.notify_user_rated_author(user_id, author_name, rating_value)
-                print(f"User notification created: {user_notif_id}")
-                
-                # 2. Notify the author if registered (ONLY for new ratings)
-                if is_new_rating and author.get('user_id'):
-                    print(f"Sending notification to author user_id {author['user_id']}")
-                    author_notif_id = notif_service.notify_author_received_rating(
-                        author['user_id'], 
-                        user_name, 
-                        rating_value
-                    )
-                    print(f"Author notification created: {author_notif_id}")
-                
-                print(f"All notifications sent successfully\n")
-            except Exception as notif_error:
-                print(f"Notification error: {str(notif_error)}")
-                import traceback
-                traceback.print_exc()
-            
             return response(200, {
                 'message': message,
                 'rating': {
@@ -323,6 +237,7 @@ def delete_rating(connection, user_id: int, author_id: int) -> Dict[str, Any]:
         connection.rollback()
         raise e
 
+@measure_invocation
 def lambda_handler(event, context):
     """Handle author rating operations"""
     print(f"===== bookarc-rateAuthor =====")
@@ -347,7 +262,7 @@ def lambda_handler(event, context):
     
     connection = None
     try:
-        connection = pymysql.connect(**DB_CONFIG)
+        connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
         
         with connection.cursor() as cursor:
             cursor.execute("""
@@ -394,4 +309,4 @@ def lambda_handler(event, context):
         return response(500, {'message': f'Internal server error: {str(e)}'})
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
@@ -0,0 +1,80 @@
+"""
+Lambda Function: bookarc-rebuildBookStats
+Verify or rebuild the book_stats aggregate from ratings/reviews
+
+Invoke manually or from an EventBridge schedule with:
+    {"mode": "verify"}                 -> report drifted book ids only
+    {"mode": "repair"}                 -> rebuild only the drifted books
+    {"mode": "rebuild"}                -> recompute every book
+    {"mode": "rebuild", "book_ids": [1, 2, 3]}
+"""
+
+import json
+import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from book_stats import rebuild_book_stats, find_drifted_books
+
+VALID_MODES = ['verify', 'repair', 'rebuild']
+
+
+@measure_invocation
+def lambda_handler(event, context):
+    """Reconcile book_stats drift"""
+    event = event or {}
+    mode = event.get('mode', 'verify')
+    book_ids = event.get('book_ids')
+    drift_limit = int(event.get('limit', 1000))
+
+    print(f"Book stats {mode} requested (book_ids={book_ids}, limit={drift_limit})")
+
+    if mode not in VALID_MODES:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f"mode must be one of: {', '.join(VALID_MODES)}"})
+        }
+
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
+    try:
+        with connection.cursor() as cursor:
+            if mode == 'rebuild':
+                ids = [int(b) for b in book_ids] if book_ids else None
+                rebuilt = rebuild_book_stats(cursor, ids)
+                connection.commit()
+                print(f"Rebuilt stats for {rebuilt} books")
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({'mode': mode, 'rebuilt': rebuilt})
+                }
+
+            drifted = find_drifted_books(cursor, drift_limit)
+            print(f"Found {len(drifted)} drifted books")
+
+            rebuilt = 0
+            if mode == 'repair' and drifted:
+                rebuilt = rebuild_book_stats(cursor, drifted)
+                connection.commit()
+                print(f"Repaired stats for {rebuilt} books")
+
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'mode': mode,
+                    'drifted': len(drifted),
+                    'drifted_book_ids': drifted,
+                    'rebuilt': rebuilt
+                })
+            }
+
+    except Exception as e:
+        print(f"Error reconciling book stats: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
+        }
+
+    finally:
+        release_connection(connection)
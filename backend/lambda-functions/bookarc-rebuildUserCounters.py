@@ -0,0 +1,94 @@
+"""
+Lambda Function: bookarc-rebuildUserCounters
+Verify or rebuild user_counters from follows, reviews, ratings, reading status
+and unread notifications, and author_counters from author follows
+
+Invoke manually or from an EventBridge schedule with:
+    {"mode": "verify"}                 -> report drifted user ids only
+    {"mode": "repair"}                 -> rebuild only the drifted users
+    {"mode": "rebuild"}                -> recompute every user
+    {"mode": "rebuild", "user_ids": [1, 2, 3]}
+    {"mode": "rebuild", "author_ids": [4, 5]}
+"""
+
+import json
+import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import (
+    rebuild_user_counters, find_drifted_users, rebuild_author_counters, find_drifted_authors
+)
+
+VALID_MODES = ['verify', 'repair', 'rebuild']
+
+
+@measure_invocation
+def lambda_handler(event, context):
+    """Reconcile user_counters drift"""
+    event = event or {}
+    mode = event.get('mode', 'verify')
+    user_ids = event.get('user_ids')
+    author_ids = event.get('author_ids')
+    drift_limit = int(event.get('limit', 1000))
+
+    print(f"User counters {mode} requested (user_ids={user_ids}, limit={drift_limit})")
+
+    if mode not in VALID_MODES:
+        return {
+            'statusCode': 400,
+            'body': json.dumps({'error': f"mode must be one of: {', '.join(VALID_MODES)}"})
+        }
+
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
+    try:
+        with connection.cursor() as cursor:
+            if mode == 'rebuild':
+                rebuilt = rebuilt_authors = 0
+                if user_ids or not author_ids:
+                    ids = [int(u) for u in user_ids] if user_ids else None
+                    rebuilt = rebuild_user_counters(cursor, ids)
+                if author_ids or not user_ids:
+                    ids = [int(a) for a in author_ids] if author_ids else None
+                    rebuilt_authors = rebuild_author_counters(cursor, ids)
+                connection.commit()
+                print(f"Rebuilt counters for {rebuilt} users and {rebuilt_authors} authors")
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps({'mode': mode, 'rebuilt': rebuilt, 'rebuilt_authors': rebuilt_authors})
+                }
+
+            drifted = find_drifted_users(cursor, drift_limit)
+            drifted_authors = find_drifted_authors(cursor, drift_limit)
+            print(f"Found {len(drifted)} drifted users and {len(drifted_authors)} drifted authors")
+
+            rebuilt = rebuilt_authors = 0
+            if mode == 'repair' and (drifted or drifted_authors):
+                rebuilt = rebuild_user_counters(cursor, drifted)
+                rebuilt_authors = rebuild_author_counters(cursor, drifted_authors)
+                connection.commit()
+                print(f"Repaired counters for {rebuilt} users and {rebuilt_authors} authors")
+
+            return {
+                'statusCode': 200,
+                'body': json.dumps({
+                    'mode': mode,
+                    'drifted': len(drifted),
+                    'drifted_user_ids': drifted,
+                    'drifted_author_ids': drifted_authors,
+                    'rebuilt': rebuilt,
+                    'rebuilt_authors': rebuilt_authors
+                })
+            }
+
+    except Exception as e:
+        print(f"Error reconciling user counters: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return {
+            'statusCode': 500,
+            'body': json.dumps({'error': 'Internal server error', 'details': str(e)})
+        }
+
+    finally:
+        release_connection(connection)
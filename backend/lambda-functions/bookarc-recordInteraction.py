@@ -1,33 +1,125 @@
 """
 Lambda Function: Record User Book Interactions
 Stores user interactions for recommendation algorithm improvement
+
+Accepts a single event (legacy body) or a batch:
+    {"events": [{"book_id": 1, "event_type": "view",
+                 "client_timestamp": 1700000000, "event_id": "c1f0..."}, ...]}
+
+A batch resolves the user once and is written with one multi-row INSERT.
+event_id is a client-generated dedup id, so retried batches are safe.
 """
 
 import json
 import pymysql
 import os
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_user_id
+
+VALID_EVENT_TYPES = ['view', 'rate', 'review', 'add_to_list', 'complete']
+MAX_BATCH_SIZE = 100
+MAX_EVENT_ID_LENGTH = 64
+# Client timestamps outside this window are rejected
+MAX_EVENT_AGE_SECONDS = int(os.environ.get('MAX_EVENT_AGE_SECONDS', str(7 * 24 * 3600)))
+MAX_CLOCK_SKEW_SECONDS = int(os.environ.get('MAX_CLOCK_SKEW_SECONDS', '300'))
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Credentials': True,
+}
 
-# Environment variables
-DB_HOST = os.environ['DB_HOST']
-DB_NAME = os.environ['DB_NAME']
-DB_USER = os.environ['DB_USER']
-DB_PASSWORD = os.environ['DB_PASSWORD']
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+
+
+def response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'headers': CORS_HEADERS,
+        'body': json.dumps(body)
+    }
+
+
+def normalize_timestamp(value, now):
+    """Convert a client timestamp (epoch seconds or milliseconds) to epoch seconds"""
+    if value is None:
+        return now
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError('client_timestamp must be epoch seconds or milliseconds')
+    timestamp = int(value / 1000) if value > 1e12 else int(value)
+    if timestamp < now - MAX_EVENT_AGE_SECONDS or timestamp > now + MAX_CLOCK_SKEW_SECONDS:
+        raise ValueError('client_timestamp is outside the accepted window')
+    return timestamp
+
+
+def validate_events(events, now):
+    """
+    Validate the whole batch in one pass
+
+    Returns:
+        (results, accepted) where results holds one status dict per input
+        event and accepted is a list of (index, row) for valid events
+    """
+    results = []
+    accepted = []
+    seen_ids = set()
+
+    for index, item in enumerate(events):
+        result = {'index': index, 'event_id': None, 'status': 'invalid'}
+        results.append(result)
+
+        if not isinstance(item, dict):
+            result['error'] = 'Event must be an object'
+            continue
+
+        event_id = item.get('event_id')
+        result['event_id'] = event_id
+        book_id = item.get('book_id')
+        event_type = item.get('event_type')
+        event_value = item.get('event_value')
+
+        if event_id is not None and (not isinstance(event_id, str) or not 0 < len(event_id) <= MAX_EVENT_ID_LENGTH):
+            result['error'] = f'event_id must be a string of at most {MAX_EVENT_ID_LENGTH} characters'
+            continue
+        if not book_id or not event_type:
+            result['error'] = 'Missing required fields: book_id, event_type'
+            continue
+        if event_type not in VALID_EVENT_TYPES:
+            result['error'] = f'Invalid event_type. Must be one of: {", ".join(VALID_EVENT_TYPES)}'
+            continue
+        try:
+            book_id = int(book_id)
+            if event_value is not None:
+                event_value = int(event_value)
+        except (TypeError, ValueError):
+            result['error'] = 'book_id and event_value must be integers'
+            continue
+        try:
+            timestamp = normalize_timestamp(item.get('client_timestamp'), now)
+        except ValueError as e:
+            result['error'] = str(e)
+            continue
+
+        if event_id is not None:
+            if event_id in seen_ids:
+                result['status'] = 'duplicate'
+                continue
+            seen_ids.add(event_id)
+
+        accepted.append((index, (book_id, event_type, event_value, timestamp, event_id)))
 
+    return results, accepted
+
+
+@measure_invocation
 def lambda_handler(event, context):
     """
-    Records a user interaction event
-    
+    Records user interaction events
+
     Event types:
     - view: User viewed book details
     - rate: User rated a book (event_value = rating 1-5)
@@ -35,107 +127,113 @@ def lambda_handler(event, context):
     - add_to_list: User added book to reading list
     - complete: User marked book as completed
     """
-    
+
     try:
         # Parse request body
-        body = json.loads(event.get('body', '{}'))
-        
+        body = json.loads(event.get('body') or '{}')
+
         # Get user ID from Cognito token
-        cognito_sub = event['requestContext']['authorizer']['claims']['sub']
-        
-        # Extract parameters
-        book_id = body.get('book_id')
-        event_type = body.get('event_type')  # view, rate, review, add_to_list, complete
-        event_value = body.get('event_value')  # optional, used for ratings
-        
-        # Validate required fields
-        if not all([book_id, event_type]):
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Credentials': True,
-                },
-                'body': json.dumps({
-                    'error': 'Missing required fields: book_id, event_type'
-                })
-            }
-        
-        # Validate event type
-        valid_event_types = ['view', 'rate', 'review', 'add_to_list', 'complete']
-        if event_type not in valid_event_types:
-            return {
-                'statusCode': 400,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Credentials': True,
-                },
-                'body': json.dumps({
-                    'error': f'Invalid event_type. Must be one of: {", ".join(valid_event_types)}'
-                })
-            }
-        
-        conn = get_db_connection()
-        try:
-            # Get database user_id from cognito_sub
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT user_id FROM users WHERE cognito_sub = %s", (cognito_sub,))
-                user_row = cursor.fetchone()
-                if not user_row:
-                    return {
-                        'statusCode': 404,
-                        'headers': {
-                            'Access-Control-Allow-Origin': '*',
-                            'Access-Control-Allow-Credentials': True,
-                        },
-                        'body': json.dumps({'error': 'User not found'})
-                    }
-                user_id = user_row['user_id']
-            
-            # Get current timestamp (Unix epoch in seconds)
-            timestamp = int(datetime.now().timestamp())
-            
-            # Record interaction in database
-            with conn.cursor() as cursor:
-                sql = """
-                    INSERT INTO interaction_events 
-                    (user_id, book_id, event_type, event_value, timestamp)
-                    VALUES (%s, %s, %s, %s, %s)
-                """
-                cursor.execute(sql, (user_id, book_id, event_type, event_value, timestamp))
-            
-            conn.commit()
-            
-            return {
-                'statusCode': 200,
-                'headers': {
-                    'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Credentials': True,
-                },
-                'body': json.dumps({
-                    'message': 'Interaction recorded successfully',
-                    'event_type': event_type,
-                    'book_id': book_id,
-                    'timestamp': timestamp
-                })
-            }
-            
-        finally:
-            conn.close()
-        
+        claims = event['requestContext']['authorizer']['claims']
+        cognito_sub = claims['sub']
+
+        is_batch = isinstance(body, dict) and 'events' in body
+        events = body.get('events') if is_batch else [body]
+
+        if not isinstance(events, list) or not events:
+            return response(400, {'error': 'events must be a non-empty array'})
+        if len(events) > MAX_BATCH_SIZE:
+            return response(400, {'error': f'At most {MAX_BATCH_SIZE} events per batch'})
+
+        # Current timestamp (Unix epoch in seconds)
+        now = int(datetime.now().timestamp())
+        results, accepted = validate_events(events, now)
+
+        if not is_batch and not accepted:
+            return response(400, {'error': results[0].get('error', 'Invalid event')})
+
+        if accepted:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as cursor:
+                    # Get database user_id from cognito_sub
+                    user_id = resolve_user_id(cursor, cognito_sub, claims)
+                    if not user_id:
+                        return response(404, {'error': 'User not found'})
+
+                    # Unknown books would fail the whole multi-row insert
+                    book_ids = sorted({row[0] for _, row in accepted})
+                    placeholders = ','.join(['%s'] * len(book_ids))
+                    cursor.execute(f"SELECT book_id FROM books WHERE book_id IN ({placeholders})", book_ids)
+                    existing_books = {row['book_id'] for row in cursor.fetchall()}
+
+                    # Events already stored by an earlier (retried) request
+                    event_ids = [row[4] for _, row in accepted if row[4] is not None]
+                    stored_ids = set()
+                    if event_ids:
+                        placeholders = ','.join(['%s'] * len(event_ids))
+                        cursor.execute(f"""
+                            SELECT client_event_id FROM interaction_events
+                            WHERE user_id = %s AND client_event_id IN ({placeholders})
+                        """, [user_id] + event_ids)
+                        stored_ids = {row['client_event_id'] for row in cursor.fetchall()}
+
+                    values = []
+                    for index, row in accepted:
+                        if row[0] not in existing_books:
+                            results[index]['error'] = 'Book not found'
+                        elif row[4] is not None and row[4] in stored_ids:
+                            results[index]['status'] = 'duplicate'
+                        else:
+                            results[index]['status'] = 'recorded'
+                            values.append((user_id,) + row)
+
+                    if values:
+                        # INSERT IGNORE keeps a concurrent retry from failing the batch
+                        row_placeholders = ','.join(['(%s, %s, %s, %s, %s, %s)'] * len(values))
+                        cursor.execute(f"""
+                            INSERT IGNORE INTO interaction_events
+                            (user_id, book_id, event_type, event_value, timestamp, client_event_id)
+                            VALUES {row_placeholders}
+                        """, [value for row in values for value in row])
+
+                conn.commit()
+
+            finally:
+                release_connection(conn)
+
+        if not is_batch:
+            result = results[0]
+            if result['status'] == 'invalid':
+                return response(404, {'error': result.get('error', 'Book not found')})
+            _, (book_id, event_type, _, timestamp, _) = accepted[0]
+            return response(200, {
+                'message': 'Interaction recorded successfully',
+                'event_type': event_type,
+                'book_id': book_id,
+                'timestamp': timestamp
+            })
+
+        summary = {status: 0 for status in ('recorded', 'duplicate', 'invalid')}
+        for result in results:
+            summary[result['status']] += 1
+
+        print(f"Interaction batch: {summary}")
+
+        return response(200, {
+            'message': 'Interactions processed',
+            'summary': summary,
+            'results': results
+        })
+
+    except json.JSONDecodeError:
+        return response(400, {'error': 'Invalid JSON body'})
+
     except Exception as e:
         print(f"Error recording interaction: {str(e)}")
         import traceback
         traceback.print_exc()
-        
-        return {
-            'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Credentials': True,
-            },
-            'body': json.dumps({
-                'error': 'Failed to record interaction',
-                'details': str(e)
-            })
-        }
+
+        return response(500, {
+            'error': 'Failed to record interaction',
+            'details': str(e)
+        })
@@ -1,13 +1,9 @@
 import json
 import pymysql
-import os
 from decimal import Decimal
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
-# Database configuration
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME')
 
 def decimal_default(obj):
     """Convert Decimal to float for JSON serialization"""
@@ -17,14 +13,9 @@ def decimal_default(obj):
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Main Lambda handler for author search and profile endpoints
@@ -76,12 +67,86 @@ def cors_response(status_code, data):
         'body': json.dumps(data, default=decimal_default)
     }
 
+# Registered (users) and external (authors) hits in one statement.
+# Each branch is answered by its ngram FULLTEXT index (migration 006) and
+# keeps its own top-N before the merged ranking.
+SEARCH_SQL = """
+    SELECT * FROM (
+        (
+            SELECT
+                u.user_id as id,
+                COALESCE(u.display_name, u.username) as name,
+                u.email,
+                u.profile_image as avatarUrl,
+                u.bio,
+                u.location,
+                u.created_at,
+                u.verification_status,
+                COALESCE(a.verified, 0) as author_verified,
+                COALESCE(a.author_id, 0) as author_id,
+                'registered' as author_type,
+                MATCH(u.display_name, u.username) AGAINST (%(phrase)s IN BOOLEAN MODE) as relevance
+            FROM users u
+            LEFT JOIN authors a ON u.user_id = a.user_id AND a.is_registered_author = TRUE
+            WHERE MATCH(u.display_name, u.username) AGAINST (%(phrase)s IN BOOLEAN MODE)
+            AND u.role = 'author' AND u.is_active = 1
+            ORDER BY relevance DESC
+            LIMIT %(limit)s
+        )
+        UNION ALL
+        (
+            SELECT
+                a.author_id as id,
+                a.name,
+                '' as email,
+                '' as avatarUrl,
+                COALESCE(a.bio, '') as bio,
+                '' as location,
+                NOW() as created_at,
+                'none' as verification_status,
+                COALESCE(a.verified, 0) as author_verified,
+                a.author_id,
+                'external' as author_type,
+                MATCH(a.name) AGAINST (%(phrase)s IN BOOLEAN MODE) as relevance
+            FROM authors a
+            WHERE MATCH(a.name) AGAINST (%(phrase)s IN BOOLEAN MODE)
+            AND a.is_registered_author = FALSE
+            ORDER BY relevance DESC
+            LIMIT %(limit)s
+        )
+    ) hits
+    ORDER BY
+        (LOWER(hits.name) = LOWER(%(query)s)) DESC,
+        (hits.name LIKE %(prefix)s) DESC,
+        hits.relevance DESC,
+        hits.id
+    LIMIT %(limit)s
+"""
+
+
+def to_phrase(search_query):
+    """
+    Quote the query as a boolean-mode phrase
+
+    With the ngram parser a phrase matches names containing the query's
+    n-grams in sequence, i.e. the old LIKE '%q%' semantics.
+    """
+    return '"' + search_query.replace('"', ' ') + '"'
+
+
+def escape_like(value):
+    """Escape LIKE wildcards so user input is matched literally"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
 def search_authors(query_params):
     """
     Search for authors - includes BOTH registered users and external authors
     GET /author?q=search&limit=20
     ✅ PUBLIC ACCESS
-    🔧 FIXED: Returns proper IDs and types for navigation
+
+    Ranking: exact name match, then prefix match, then FULLTEXT relevance.
+    Followers and book stats for every hit are loaded in two batched queries.
     """
     search_query = query_params.get('q', '').strip()
     limit = min(int(query_params.get('limit', 20)), 50)
@@ -100,81 +165,28 @@ def search_authors(query_params):
     
     try:
         with connection.cursor() as cursor:
-            # FIXED: Separate queries to ensure correct ID mapping
-            
-            # Query 1: Registered authors (return user_id as 'id')
-            registered_sql = """
-                SELECT 
-                    u.user_id as id,
-                    COALESCE(u.display_name, u.username) as name,
-                    u.email,
-                    u.profile_image as avatarUrl,
-                    u.bio,
-                    u.location,
-                    u.created_at,
-                    u.verification_status,
-                    COALESCE(a.verified, 0) as author_verified,
-                    COALESCE(a.author_id, 0) as author_id,
-                    COALESCE(a.average_rating, 0.00) as author_avg_rating,
-                    (SELECT COUNT(*) FROM user_follow_user WHERE following_id = u.user_id) +
-                    COALESCE((SELECT COUNT(*) FROM user_follow_author WHERE author_id = a.author_id), 0) as followers,
-                    'registered' as author_type
-                FROM users u
-                LEFT JOIN authors a ON u.user_id = a.user_id AND a.is_registered_author = TRUE
-                WHERE u.role = 'author' AND u.is_active = 1
-                AND COALESCE(u.display_name, u.username) LIKE %s
-                LIMIT %s
-            """
-            
-            # Query 2: External authors (return author_id as 'id')
-            external_sql = """
-                SELECT 
-                    a.author_id as id,
-                    a.name,
-                    '' as email,
-                    '' as avatarUrl,
-                    COALESCE(a.bio, '') as bio,
-                    '' as location,
-                    NOW() as created_at,
-                    'none' as verification_status,
-                    COALESCE(a.verified, 0) as author_verified,
-                    a.author_id,
-                    COALESCE(a.average_rating, 0.00) as author_avg_rating,
-                    COALESCE((SELECT COUNT(*) FROM user_follow_author WHERE author_id = a.author_id), 0) as followers,
-                    'external' as author_type
-                FROM authors a
-                WHERE a.is_registered_author = FALSE
-                AND a.name LIKE %s
-                LIMIT %s
-            """
-            
-            search_pattern = f"%{search_query}%"
-            
-            # Execute both queries
-            cursor.execute(registered_sql, (search_pattern, limit))
-            registered_results = cursor.fetchall()
-            
-            cursor.execute(external_sql, (search_pattern, limit))
-            external_results = cursor.fetchall()
-            
-            # Combine results
-            all_results = list(registered_results) + list(external_results)
-            
-            # Limit total results
-            results = all_results[:limit]
+            cursor.execute(SEARCH_SQL, {
+                'phrase': to_phrase(search_query),
+                'query': search_query,
+                'prefix': escape_like(search_query) + '%',
+                'limit': limit,
+            })
+            results = cursor.fetchall()
             
-            print(f"Found {len(registered_results)} registered + {len(external_results)} external = {len(results)} total authors")
+            print(f"Found {len(results)} authors for '{search_query}'")
             
-            # Debug: Log each result
-            for idx, row in enumerate(results):
-                print(f"   Result {idx + 1}: id={row['id']}, name={row['name']}, type={row['author_type']}")
+            registered_ids = [row['id'] for row in results if row['author_type'] == 'registered']
+            author_ids = [row['author_id'] for row in results if row['author_id']]
+            followers = get_follower_counts(cursor, registered_ids, author_ids)
+            stats_by_author = get_author_stats_batch(cursor, author_ids)
             
-            # Get stats for each author
             authors = []
             for row in results:
-                stats = get_author_stats(cursor, row['author_id'], row['author_type'])
-                formatted = format_author(row, stats)
-                authors.append(formatted)
+                row['followers'] = followers['authors'].get(row['author_id'], 0)
+                if row['author_type'] == 'registered':
+                    row['followers'] += followers['users'].get(row['id'], 0)
+                stats = stats_by_author.get(row['author_id']) or empty_author_stats()
+                authors.append(format_author(row, stats))
             
             return cors_response(200, {
                 'authors': authors,
@@ -183,7 +195,41 @@ def search_authors(query_params):
             })
     
     finally:
-        connection.close()
+        release_connection(connection)
+
+def get_follower_counts(cursor, user_ids, author_ids):
+    """
+    Follower counts for a page of hits in one query
+
+    Returns:
+        {'users': {user_id: count}, 'authors': {author_id: count}}
+    """
+    counts = {'users': {}, 'authors': {}}
+    branches = []
+    params = []
+    if user_ids:
+        branches.append(f"""
+            SELECT 'users' as kind, following_id as id, COUNT(*) as followers
+            FROM user_follow_user
+            WHERE following_id IN ({','.join(['%s'] * len(user_ids))})
+            GROUP BY following_id
+        """)
+        params += user_ids
+    if author_ids:
+        branches.append(f"""
+            SELECT 'authors' as kind, author_id as id, COUNT(*) as followers
+            FROM user_follow_author
+            WHERE author_id IN ({','.join(['%s'] * len(author_ids))})
+            GROUP BY author_id
+        """)
+        params += author_ids
+    if not branches:
+        return counts
+    
+    cursor.execute(' UNION ALL '.join(branches), params)
+    for row in cursor.fetchall():
+        counts[row['kind']][row['id']] = int(row['followers'])
+    return counts
 
 def get_author_profile(author_or_user_id, author_type_hint='auto'):
     """
@@ -246,7 +292,7 @@ def get_author_profile(author_or_user_id, author_type_hint='auto'):
             return cors_response(404, {'message': f'Author with ID {author_or_user_id} not found'})
     
     finally:
-        connection.close()
+        release_connection(connection)
 
 def build_registered_author_response(cursor, author):
     """Build response for registered author"""
@@ -346,14 +392,14 @@ def get_author_books(cursor, author_id):
             YEAR(b.publish_date) as publish_year,
             GROUP_CONCAT(DISTINCT a2.name ORDER BY a2.name SEPARATOR ', ') as all_authors,
             GROUP_CONCAT(DISTINCT g.genre_name ORDER BY g.genre_name SEPARATOR ', ') as genres,
-            COUNT(DISTINCT r.rating_id) as rating_count
+            COALESCE(bs.rating_count, 0) as rating_count
         FROM books b
         JOIN book_author ba ON b.book_id = ba.book_id
+        LEFT JOIN book_stats bs ON bs.book_id = b.book_id
         LEFT JOIN book_author ba2 ON b.book_id = ba2.book_id
         LEFT JOIN authors a2 ON ba2.author_id = a2.author_id
         LEFT JOIN book_genre bg ON b.book_id = bg.book_id
         LEFT JOIN genres g ON bg.genre_id = g.genre_id
-        LEFT JOIN ratings r ON b.book_id = r.book_id
         WHERE ba.author_id = %s AND b.approval_status = 'approved'
         GROUP BY b.book_id
         ORDER BY b.publish_date DESC
@@ -375,32 +421,46 @@ def get_author_books(cursor, author_id):
         'publishYear': int(book['publish_year']) if book['publish_year'] else 2024
     } for book in results]
 
-def get_author_stats(cursor, author_id, author_type):
-    """Calculate author statistics"""
-    if not author_id:
-        return {'totalBooks': 0, 'totalReads': 0, 'totalRatings': 0, 'avgRating': 0, 'followers': 0}
-    
-    sql = """
+def empty_author_stats():
+    return {'totalBooks': 0, 'totalReads': 0, 'totalRatings': 0, 'avgRating': 0, 'followers': 0}
+
+def get_author_stats_batch(cursor, author_ids):
+    """Calculate author statistics for many authors in one query (rating counts from book_stats)"""
+    author_ids = sorted(set(author_ids))
+    if not author_ids:
+        return {}
+    
+    placeholders = ','.join(['%s'] * len(author_ids))
+    cursor.execute(f"""
         SELECT 
-            COUNT(DISTINCT b.book_id) as total_books,
-            COUNT(DISTINCT r.rating_id) as total_ratings,
+            ba.author_id,
+            COUNT(*) as total_books,
+            COALESCE(SUM(bs.rating_count), 0) as total_ratings,
             COALESCE(AVG(b.average_rating), 0) as avg_rating
         FROM book_author ba
         JOIN books b ON ba.book_id = b.book_id AND b.approval_status = 'approved'
-        LEFT JOIN ratings r ON b.book_id = r.book_id
-        WHERE ba.author_id = %s
-    """
-    
-    cursor.execute(sql, (author_id,))
-    result = cursor.fetchone()
-    
-    return {
-        'totalBooks': int(result['total_books'] or 0),
-        'totalReads': int(result['total_ratings'] or 0) * 5,
-        'totalRatings': int(result['total_ratings'] or 0),
-        'avgRating': round(float(result['avg_rating'] or 0), 2),
-        'followers': 0
-    }
+        LEFT JOIN book_stats bs ON bs.book_id = b.book_id
+        WHERE ba.author_id IN ({placeholders})
+        GROUP BY ba.author_id
+    """, author_ids)
+    
+    stats = {}
+    for row in cursor.fetchall():
+        total_ratings = int(row['total_ratings'] or 0)
+        stats[row['author_id']] = {
+            'totalBooks': int(row['total_books'] or 0),
+            'totalReads': total_ratings * 5,
+            'totalRatings': total_ratings,
+            'avgRating': round(float(row['avg_rating'] or 0), 2),
+            'followers': 0
+        }
+    return stats
+
+def get_author_stats(cursor, author_id, author_type):
+    """Calculate author statistics"""
+    if not author_id:
+        return empty_author_stats()
+    return get_author_stats_batch(cursor, [author_id]).get(author_id) or empty_author_stats()
 
 def get_author_rating_stats(cursor, author_id):
     """Get author-specific rating statistics"""
@@ -1,13 +1,10 @@
 import json
 import pymysql
-import os
 from decimal import Decimal
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from user_counters import COUNTER_SELECT
 
-# Database Configuration
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME')
 
 def decimal_default(obj):
     """Helper to serialize Decimal objects"""
@@ -17,14 +14,9 @@ def decimal_default(obj):
 
 def get_db_connection():
     """Create and return database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Search for users by display name only (excludes authors)
@@ -92,7 +84,7 @@ def lambda_handler(event, context):
                 
                 # Base query - searches display_name only
                 # EXCLUDES users with role='author' to separate them
-                base_query = """
+                base_query = f"""
                     SELECT 
                         u.user_id as id,
                         u.username,
@@ -103,14 +95,9 @@ def lambda_handler(event, context):
                         COALESCE(u.bio, '') as bio,
                         COALESCE(u.location, '') as location,
                         u.is_public as isPublic,
-                        u.created_at as joinDate,
-                        (SELECT COUNT(*) FROM reviews r WHERE r.user_id = u.user_id) as totalReviews,
-                        (SELECT COUNT(*) FROM ratings rat WHERE rat.user_id = u.user_id) as totalRatings,
-                        (SELECT COUNT(DISTINCT urs.book_id) FROM user_reading_status urs 
-                         WHERE urs.user_id = u.user_id AND urs.status = 'completed') as booksRead,
-                        (SELECT COUNT(*) FROM user_follow_user ufu WHERE ufu.following_id = u.user_id) as followers,
-                        (SELECT COUNT(*) FROM user_follow_user ufu WHERE ufu.follower_id = u.user_id) as following
+                        u.created_at as joinDate,{COUNTER_SELECT}
                     FROM users u
+                    LEFT JOIN user_counters uc ON uc.user_id = u.user_id
                     WHERE u.display_name LIKE %s
                     AND u.role != 'author'
                     AND u.is_active = 1
@@ -182,7 +169,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            connection.close()
+            release_connection(connection)
             
     except ValueError as e:
         print(f"ValueError: {str(e)}")
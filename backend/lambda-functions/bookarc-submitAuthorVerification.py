@@ -5,6 +5,8 @@ from datetime import datetime
 import base64
 import uuid
 import pymysql
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
 # Import notification service (from Lambda Layer)
 try:
@@ -17,23 +19,14 @@ except ImportError:
 
 s3 = boto3.client('s3')
 
-# Database configuration from environment variables
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME')
+# Configuration from environment variables
 VERIFICATION_BUCKET = os.environ.get('VERIFICATION_BUCKET', 'bookarc-verification-documents')
 
 def get_db_connection():
     """Create and return a database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     POST /author/verification
@@ -237,30 +230,17 @@ def lambda_handler(event, context):
             
             cursor.execute(update_user_query, (db_user_id,))
             
-            connection.commit()
-            
-            print(f"Verification request submitted successfully for user {db_user_id}")
-            
-            # SEND NOTIFICATION
+            # Notify the applicant in the same transaction
             if NOTIFICATIONS_ENABLED and NotificationService:
-                try:
-                    notif_service = NotificationService(connection)
-                    
-                    # Create notification for submission
-                    message = "Your author verification has been successfully submitted and is now pending review. We'll notify you once it's been reviewed."
-                    notif_service.create_notification(
-                        user_id=db_user_id,
-                        message=message,
-                        notification_type='verification_submitted',
-                        audience_type='normal'
-                    )
-                    
-                    print(f"Notification sent to user {db_user_id}")
-                except Exception as notif_error:
-                    print(f"Failed to send notification: {str(notif_error)}")
-                    # Don't fail the request if notification fails
+                notif_service = NotificationService(connection)
+                notif_service.notify_verification_submitted(db_user_id)
+                notif_service.flush(cursor)
             else:
                 print("Notifications disabled or service unavailable")
+            
+            connection.commit()
+            
+            print(f"Verification request submitted successfully for user {db_user_id}")
         
         return {
             'statusCode': 201,
@@ -295,4 +275,4 @@ def lambda_handler(event, context):
         }
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
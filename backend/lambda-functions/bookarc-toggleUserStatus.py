@@ -2,16 +2,16 @@ import json
 import pymysql
 import os
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_identity
+
+# Optional: when set, deactivation also revokes the user's Cognito tokens
+COGNITO_USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=os.environ['DB_HOST'],
-        user=os.environ['DB_USER'],
-        password=os.environ['DB_PASSWORD'],
-        database=os.environ['DB_NAME'],
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def cors_response(status_code, body):
     """Helper function to return CORS-enabled responses"""
@@ -26,20 +26,30 @@ def cors_response(status_code, body):
         'body': json.dumps(body)
     }
 
-def check_admin_role(cognito_sub, cursor):
-    """Check if user is admin by querying database"""
-    cursor.execute("""
-        SELECT user_id, role 
-        FROM users 
-        WHERE cognito_sub = %s
-    """, (cognito_sub,))
-    
-    result = cursor.fetchone()
-    if not result:
+def sign_out_cognito_user(cognito_sub):
+    """Revoke a deactivated user's refresh tokens so no new ID token is issued"""
+    if not COGNITO_USER_POOL_ID or not cognito_sub:
+        return
+    try:
+        import boto3
+        boto3.client('cognito-idp').admin_user_global_sign_out(
+            UserPoolId=COGNITO_USER_POOL_ID,
+            Username=cognito_sub
+        )
+        print(f"Signed out user from Cognito: {cognito_sub}")
+    except Exception as e:
+        # The database flag already blocks every API call; this is best effort
+        print(f"Error signing out Cognito user: {e}")
+
+def check_admin_role(cognito_sub, cursor, claims=None):
+    """Check if user is an active admin (role and status read from the database)"""
+    identity = resolve_identity(cursor, cognito_sub, claims, require_active=True)
+    if not identity:
         return None, False
     
-    return result['user_id'], result['role'] == 'admin'
+    return identity['user_id'], identity['role'] == 'admin'
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Toggle user active status (activate/deactivate)
@@ -84,7 +94,7 @@ def lambda_handler(event, context):
         try:
             with connection.cursor() as cursor:
                 # Check if requesting user is admin
-                admin_user_id, is_admin = check_admin_role(cognito_sub, cursor)
+                admin_user_id, is_admin = check_admin_role(cognito_sub, cursor, claims)
                 
                 if not is_admin:
                     print(f"User {cognito_sub} is not admin")
@@ -92,7 +102,7 @@ def lambda_handler(event, context):
                 
                 # Check if target user exists
                 cursor.execute("""
-                    SELECT user_id, username, email, role, COALESCE(is_active, TRUE) as is_active 
+                    SELECT user_id, username, email, role, cognito_sub, COALESCE(is_active, TRUE) as is_active 
                     FROM users 
                     WHERE user_id = %s
                 """, (user_id,))
@@ -141,6 +151,9 @@ def lambda_handler(event, context):
                 
                 connection.commit()
                 
+                if not new_status:
+                    sign_out_cognito_user(user['cognito_sub'])
+                
                 # Get updated user data
                 cursor.execute("""
                     SELECT user_id, username, email, role, is_active 
@@ -160,7 +173,7 @@ def lambda_handler(event, context):
                 })
                 
         finally:
-            connection.close()
+            release_connection(connection)
         
     except Exception as e:
         print(f"Error toggling user status: {str(e)}")
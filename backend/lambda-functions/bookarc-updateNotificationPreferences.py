@@ -1,16 +1,10 @@
 import json
 import pymysql
-import os
-
-# Database configuration
-DB_CONFIG = {
-    'host': os.environ['DB_HOST'],
-    'user': os.environ['DB_USER'],
-    'password': os.environ['DB_PASSWORD'],
-    'database': os.environ['DB_NAME'],
-    'port': 3306
-}
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_preferences import DIGEST_MODES
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Lambda: PUT /notifications/preferences
@@ -48,8 +42,16 @@ def lambda_handler(event, context):
         allow_email = body.get('allow_email')
         allow_author_updates = body.get('allow_author_updates')
         allow_premium_offers = body.get('allow_premium_offers')
+        digest_mode = body.get('digest_mode')
+        
+        if digest_mode is not None and digest_mode not in DIGEST_MODES:
+            return {
+                'statusCode': 400,
+                'headers': headers,
+                'body': json.dumps({'message': f"digest_mode must be one of: {', '.join(DIGEST_MODES)}"})
+            }
         
-        connection = pymysql.connect(**DB_CONFIG)
+        connection = acquire_connection()
         
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
             # Get user's database ID from cognito_sub
@@ -88,6 +90,10 @@ def lambda_handler(event, context):
                 update_fields.append("allow_premium_offers = %s")
                 update_values.append(allow_premium_offers)
             
+            if digest_mode is not None:
+                update_fields.append("digest_mode = %s")
+                update_values.append(digest_mode)
+            
             if not update_fields:
                 return {
                     'statusCode': 400,
@@ -108,16 +114,19 @@ def lambda_handler(event, context):
                 # Create new preferences with provided values
                 cursor.execute("""
                     INSERT INTO notification_preferences 
-                    (user_id, allow_email, allow_author_updates, allow_premium_offers)
-                    VALUES (%s, %s, %s, %s)
+                    (user_id, allow_email, allow_author_updates, allow_premium_offers, digest_mode)
+                    VALUES (%s, %s, %s, %s, %s)
                 """, (
                     db_user_id,
                     allow_email if allow_email is not None else True,
                     allow_author_updates if allow_author_updates is not None else True,
-                    allow_premium_offers if allow_premium_offers is not None else True
+                    allow_premium_offers if allow_premium_offers is not None else True,
+                    digest_mode if digest_mode is not None else 'off'
                 ))
             
             connection.commit()
+            # Notification writers run in other Lambdas and pick the change
+            # up within PREFERENCES_CACHE_TTL seconds
             
             # Fetch updated preferences
             cursor.execute("""
@@ -126,7 +135,8 @@ def lambda_handler(event, context):
                     user_id,
                     allow_email,
                     allow_author_updates,
-                    allow_premium_offers
+                    allow_premium_offers,
+                    digest_mode
                 FROM notification_preferences
                 WHERE user_id = %s
             """, (db_user_id,))
@@ -143,7 +153,8 @@ def lambda_handler(event, context):
                         'user_id': updated_prefs['user_id'],
                         'allow_email': bool(updated_prefs['allow_email']),
                         'allow_author_updates': bool(updated_prefs['allow_author_updates']),
-                        'allow_premium_offers': bool(updated_prefs['allow_premium_offers'])
+                        'allow_premium_offers': bool(updated_prefs['allow_premium_offers']),
+                        'digest_mode': updated_prefs['digest_mode']
                     }
                 })
             }
@@ -166,4 +177,4 @@ def lambda_handler(event, context):
         }
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
@@ -2,12 +2,11 @@ import json
 import pymysql
 import os
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
 
 # RDS Configuration from environment variables
 DB_HOST = os.environ['DB_HOST']
-DB_USER = os.environ['DB_USER']
-DB_PASSWORD = os.environ['DB_PASSWORD']
-DB_NAME = os.environ['DB_NAME']
 
 # CORS headers - apply to all responses
 CORS_HEADERS = {
@@ -17,6 +16,7 @@ CORS_HEADERS = {
     'Content-Type': 'application/json'
 }
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Lambda function to update user profile in RDS
@@ -70,13 +70,7 @@ def lambda_handler(event, context):
     try:
         # Connect to RDS
         print(f"Connecting to database: {DB_HOST}")
-        connection = pymysql.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME,
-            connect_timeout=5
-        )
+        connection = acquire_connection()
         print("Database connection successful")
         
         with connection.cursor(pymysql.cursors.DictCursor) as cursor:
@@ -242,5 +236,5 @@ def lambda_handler(event, context):
     
     finally:
         if connection:
-            connection.close()
-            print("Database connection closed")
+            release_connection(connection)
+            print("Database connection released")
@@ -5,15 +5,14 @@ import os
 import base64
 import uuid
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_service import NotificationService
 
 s3_client = boto3.client('s3')
 
 # Environment variables
 S3_BUCKET = os.environ['S3_BUCKET_NAME']
-DB_HOST = os.environ['DB_HOST']
-DB_NAME = os.environ['DB_NAME']
-DB_USER = os.environ['DB_USER']
-DB_PASSWORD = os.environ['DB_PASSWORD']
 
 # Allowed image types
 ALLOWED_TYPES = ['image/jpeg', 'image/png', 'image/jpg', 'image/webp']
@@ -21,38 +20,9 @@ MAX_SIZE = 5 * 1024 * 1024  # 5MB
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
-
-def send_notification(connection, user_id, message, notification_type='profile_update'):
-    """
-    Send a notification to the user
-    
-    Args:
-        connection: Database connection
-        user_id: User ID to notify
-        message: Notification message
-        notification_type: Type of notification
-    """
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO notifications 
-                (user_id, message, type, audience_type, is_read, created_at)
-                VALUES (%s, %s, %s, 'all', FALSE, NOW())
-            """, (user_id, message, notification_type))
-            connection.commit()
-            print(f"Notification sent to user {user_id}: {message}")
-            return True
-    except Exception as e:
-        print(f"Failed to send notification: {str(e)}")
-        return False
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Upload profile picture to S3 and update user record
@@ -194,25 +164,16 @@ def lambda_handler(event, context):
                     "UPDATE users SET profile_image = %s, updated_at = NOW() WHERE user_id = %s",
                     (s3_url, user_id)
                 )
-                connection.commit()
-                
-                print(f"Database updated for user {user_id}")
                 
-                # SEND NOTIFICATION
+                # Notify the user in the same transaction
                 is_first_upload = not old_profile_image or old_profile_image == ''
+                notif_service = NotificationService(connection)
+                notif_service.notify_profile_picture_updated(user_id, is_first_upload)
+                notif_service.flush(cursor)
                 
-                if is_first_upload:
-                    notification_message = "🎉 Welcome! Your profile picture has been uploaded successfully."
-                else:
-                    notification_message = "✨ Your profile picture has been updated successfully."
+                connection.commit()
                 
-                # Send the notification
-                send_notification(
-                    connection=connection,
-                    user_id=user_id,
-                    message=notification_message,
-                    notification_type='profile_update'
-                )
+                print(f"Database updated for user {user_id}")
                 
                 # Delete old profile image from S3 if exists
                 if old_profile_image and old_profile_image.startswith(f"https://{S3_BUCKET}"):
@@ -239,7 +200,7 @@ def lambda_handler(event, context):
                 }
                 
         finally:
-            connection.close()
+            release_connection(connection)
             
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -2,23 +2,18 @@ import json
 import pymysql
 import os
 from datetime import datetime
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from identity_cache import resolve_user_id
 
 # Database configuration
 DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
 DB_NAME = os.environ.get('DB_NAME', 'bookarcdb')
 
 def get_db_connection():
     """Create database connection"""
     print(f"Connecting to database: {DB_HOST}/{DB_NAME}")
-    return pymysql.connect(
-        host=DB_HOST,
-        user=DB_USER,
-        password=DB_PASSWORD,
-        database=DB_NAME,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def get_user_id_from_token(event):
     """Extract user_id from JWT token claims"""
@@ -30,22 +25,19 @@ def get_user_id_from_token(event):
         conn = get_db_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute(
-                    "SELECT user_id FROM users WHERE cognito_sub = %s",
-                    (cognito_sub,)
-                )
-                result = cursor.fetchone()
-                if result:
-                    print(f"Found user_id: {result['user_id']}")
-                    return result['user_id']
+                user_id = resolve_user_id(cursor, cognito_sub, claims)
+                if user_id:
+                    print(f"Found user_id: {user_id}")
+                    return user_id
                 print("No user found for cognito_sub")
                 return None
         finally:
-            conn.close()
+            release_connection(conn)
     except Exception as e:
         print(f"Error extracting user_id: {str(e)}")
         return None
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Create a new custom list for the authenticated user
@@ -170,7 +162,7 @@ def lambda_handler(event, context):
             }
         
         finally:
-            conn.close()
+            release_connection(conn)
     
     except json.JSONDecodeError as e:
         print(f"JSON decode error: {str(e)}")
@@ -1,85 +1,15 @@
 """
 Lambda Function: bookarc-writeAnAuthorReview
-Handle author review operations with EMBEDDED notifications
+Handle author review operations with notifications
 Endpoints: POST/GET/PUT/DELETE /authors/{author_id}/review(s)
 """
 
 import json
 import pymysql
-import os
 from datetime import datetime
-from typing import Optional
-
-# ============================================================================
-# EMBEDDED NOTIFICATION SERVICE - NO LAYER NEEDED
-# ============================================================================
-
-class NotificationService:
-    """Service for creating and managing notifications"""
-    
-    def __init__(self, connection):
-        self.connection = connection
-    
-    def create_notification(
-        self, 
-        user_id: int, 
-        message: str, 
-        notification_type: str,
-        audience_type: str = 'all'
-    ) -> Optional[int]:
-        """Create a single notification"""
-        try:
-            with self.connection.cursor() as cursor:
-                sql = """
-                    INSERT INTO notifications 
-                    (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """
-                cursor.execute(sql, (user_id, message, notification_type, audience_type))
-                self.connection.commit()
-                notification_id = cursor.lastrowid
-                print(f"Created notification {notification_id} for user {user_id}: {message}")
-                return notification_id
-        except Exception as e:
-            print(f"Error creating notification: {str(e)}")
-            return None
-    
-    def notify_user_submitted_author_review(
-        self, 
-        user_id: int, 
-        author_name: str
-    ) -> Optional[int]:
-        """Notify user that their author review was successfully submitted"""
-        message = f'Your review has been successfully submitted for {author_name}'
-        return self.create_notification(user_id, message, 'author_review_success', 'all')
-    
-    def notify_author_received_review(
-        self, 
-        author_user_id: int, 
-        reviewer_name: str
-    ) -> Optional[int]:
-        """Notify author that they received a review"""
-        message = f'{reviewer_name} submitted a review about you'
-        return self.create_notification(author_user_id, message, 'author_review', 'author')
-    
-    def notify_user_updated_author_review(
-        self, 
-        user_id: int, 
-        author_name: str
-    ) -> Optional[int]:
-        """Notify user that their author review was updated"""
-        message = f'Your review for {author_name} has been updated successfully'
-        return self.create_notification(user_id, message, 'author_review_updated', 'all')
-
-# ============================================================================
-# END OF EMBEDDED NOTIFICATION SERVICE
-# ============================================================================
-
-# Database configuration
-DB_HOST = os.environ.get('DB_HOST')
-DB_USER = os.environ.get('DB_USER')
-DB_PASSWORD = os.environ.get('DB_PASSWORD')
-DB_NAME = os.environ.get('DB_NAME')
+from db_connection import acquire_connection, release_connection
+from query_metrics import measure_invocation
+from notification_service import NotificationService
 
 CORS_HEADERS = {
     'Content-Type': 'application/json',
@@ -90,14 +20,7 @@ CORS_HEADERS = {
 
 def get_db_connection():
     """Create database connection"""
-    return pymysql.connect(
-        host=DB_HOST, 
-        user=DB_USER, 
-        password=DB_PASSWORD,
-        database=DB_NAME, 
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
+    return acquire_connection(cursorclass=pymysql.cursors.DictCursor)
 
 def response(status_code, body):
     """Helper to create consistent API responses"""
@@ -132,6 +55,7 @@ def get_author_by_id(connection, author_id):
         
         return author
 
+@measure_invocation
 def lambda_handler(event, context):
     """
     Handle author review operations
@@ -230,7 +154,7 @@ def lambda_handler(event, context):
     
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
 
 def validate_review_text(review_text):
     """Validate review text"""
@@ -272,38 +196,21 @@ def create_review(connection, user_id, user, author, author_id, event):
             )
             
             review_id = cursor.lastrowid
+            
+            # Notify the reviewer, and the author if registered, in the same transaction
+            notif_service = NotificationService(connection)
+            notif_service.notify_user_submitted_author_review(user_id, author['name'])
+            if author.get('author_user_id'):
+                notif_service.notify_author_received_review(
+                    author['author_user_id'],
+                    user['display_name'] or user['username']
+                )
+            notif_service.flush(cursor)
+            
             connection.commit()
             
             print(f"Created review: id={review_id}, user_id={user_id}, author_id={author_id}")
             
-            # SEND NOTIFICATIONS
-            try:
-                print(f"\nCreating NotificationService...")
-                notif_service = NotificationService(connection)
-                
-                user_name = user['display_name'] or user['username']
-                author_name = author['name']
-                
-                # 1. Notify the user who submitted the review
-                print(f"Sending notification to user {user_id}")
-                user_notif_id = notif_service.notify_user_submitted_author_review(user_id, author_name)
-                print(f"User notification created: {user_notif_id}")
-                
-                # 2. Notify the author if they're a registered user
-                if author.get('author_user_id'):
-                    print(f"Sending notification to author user_id {author['author_user_id']}")
-                    author_notif_id = notif_service.notify_author_received_review(
-                        author['author_user_id'], 
-                        user_name
-                    )
-                    print(f"Author notification created: {author_notif_id}")
-                
-                print(f"All notifications sent successfully\n")
-            except Exception as notif_error:
-                print(f"Failed to send notifications: {str(notif_error)}")
-                import traceback
-                traceback.print_exc()
-            
             return response(201, {
                 'message': 'Review submitted successfully',
                 'review': {
@@ -377,24 +284,14 @@ def update_review(connection, user_id, user, author, author_id, event):
             if cursor.rowcount == 0:
                 return response(404, {'message': 'No review found to update'})
             
+            notif_service = NotificationService(connection)
+            notif_service.notify_user_updated_author_review(user_id, author['name'])
+            notif_service.flush(cursor)
+            
             connection.commit()
             
             print(f"Updated review: user_id={user_id}, author_id={author_id}")
             
-            # SEND NOTIFICATION
-            try:
-                print(f"\n📧 Creating NotificationService...")
-                notif_service = NotificationService(connection)
-                author_name = author['name']
-                
-                print(f"Sending update notification to user {user_id}")
-                notif_id = notif_service.notify_user_updated_author_review(user_id, author_name)
-                print(f"Update notification created: {notif_id}\n")
-            except Exception as notif_error:
-                print(f"Failed to send notification: {str(notif_error)}")
-                import traceback
-                traceback.print_exc()
-            
             return response(200, {
                 'message': 'Review updated successfully',
                 'review_text': review_text
@@ -478,4 +375,4 @@ def get_all_reviews(author_id):
     
     finally:
         if connection:
-            connection.close()
+            release_connection(connection)
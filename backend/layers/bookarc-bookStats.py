@@ -0,0 +1,229 @@
+"""
+Book Stats Service for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Maintains the book_stats aggregate (rating sum/count, per-star histogram
+and review count per book) incrementally, so read paths never have to
+run AVG()/COUNT() over ratings and reviews.
+
+Every write here is an upsert of deltas, so a missing book_stats row is
+created on first use. Call these inside the same transaction as the
+rating/review write they describe; the caller commits.
+"""
+
+from typing import Optional, List, Iterable
+
+STAR_COLUMNS = ['stars_1', 'stars_2', 'stars_3', 'stars_4', 'stars_5']
+STAT_COLUMNS = ['rating_sum', 'rating_count'] + STAR_COLUMNS + ['review_count']
+
+_UPSERT_DELTA_SQL = """
+    INSERT INTO book_stats
+    (book_id, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5, review_count)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        rating_sum = rating_sum + VALUES(rating_sum),
+        rating_count = rating_count + VALUES(rating_count),
+        stars_1 = stars_1 + VALUES(stars_1),
+        stars_2 = stars_2 + VALUES(stars_2),
+        stars_3 = stars_3 + VALUES(stars_3),
+        stars_4 = stars_4 + VALUES(stars_4),
+        stars_5 = stars_5 + VALUES(stars_5),
+        review_count = review_count + VALUES(review_count)
+"""
+
+# Recomputed aggregate per book, used by rebuild and verify
+_RECOMPUTE_SQL = """
+    SELECT
+        b.book_id,
+        COALESCE(r.rating_sum, 0) AS rating_sum,
+        COALESCE(r.rating_count, 0) AS rating_count,
+        COALESCE(r.stars_1, 0) AS stars_1,
+        COALESCE(r.stars_2, 0) AS stars_2,
+        COALESCE(r.stars_3, 0) AS stars_3,
+        COALESCE(r.stars_4, 0) AS stars_4,
+        COALESCE(r.stars_5, 0) AS stars_5,
+        COALESCE(rv.review_count, 0) AS review_count
+    FROM books b
+    LEFT JOIN (
+        SELECT
+            book_id,
+            SUM(rating_value) AS rating_sum,
+            COUNT(*) AS rating_count,
+            SUM(rating_value = 1) AS stars_1,
+            SUM(rating_value = 2) AS stars_2,
+            SUM(rating_value = 3) AS stars_3,
+            SUM(rating_value = 4) AS stars_4,
+            SUM(rating_value = 5) AS stars_5
+        FROM ratings
+        GROUP BY book_id
+    ) r ON r.book_id = b.book_id
+    LEFT JOIN (
+        SELECT book_id, COUNT(*) AS review_count
+        FROM reviews
+        GROUP BY book_id
+    ) rv ON rv.book_id = b.book_id
+"""
+
+
+def _star_deltas(old_value: Optional[int], new_value: Optional[int]) -> List[int]:
+    deltas = [0] * 5
+    if old_value:
+        deltas[old_value - 1] -= 1
+    if new_value:
+        deltas[new_value - 1] += 1
+    return deltas
+
+
+def apply_rating_change(
+    cursor,
+    book_id: int,
+    old_value: Optional[int],
+    new_value: Optional[int]
+) -> None:
+    """
+    Record a rating insert (old=None), update, or delete (new=None)
+
+    Also refreshes books.average_rating from the aggregate.
+    """
+    if old_value == new_value:
+        return
+
+    sum_delta = (new_value or 0) - (old_value or 0)
+    count_delta = (1 if new_value else 0) - (1 if old_value else 0)
+
+    cursor.execute(
+        _UPSERT_DELTA_SQL,
+        (book_id, sum_delta, count_delta, *_star_deltas(old_value, new_value), 0)
+    )
+    sync_average_rating(cursor, [book_id])
+
+
+def apply_review_change(cursor, book_id: int, delta: int) -> None:
+    """Record review inserts (+n) or deletes (-n) for a book"""
+    if not delta:
+        return
+    cursor.execute(_UPSERT_DELTA_SQL, (book_id, 0, 0, 0, 0, 0, 0, 0, delta))
+
+
+def remove_user_contributions(cursor, user_id: int) -> None:
+    """
+    Subtract every rating and review by a user from the aggregate
+
+    Must run BEFORE the user's ratings/reviews are deleted.
+    """
+    cursor.execute("""
+        INSERT INTO book_stats
+        (book_id, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5, review_count)
+        SELECT
+            book_id,
+            -SUM(rating_value),
+            -COUNT(*),
+            -SUM(rating_value = 1),
+            -SUM(rating_value = 2),
+            -SUM(rating_value = 3),
+            -SUM(rating_value = 4),
+            -SUM(rating_value = 5),
+            0
+        FROM ratings
+        WHERE user_id = %s
+        GROUP BY book_id
+        ON DUPLICATE KEY UPDATE
+            rating_sum = rating_sum + VALUES(rating_sum),
+            rating_count = rating_count + VALUES(rating_count),
+            stars_1 = stars_1 + VALUES(stars_1),
+            stars_2 = stars_2 + VALUES(stars_2),
+            stars_3 = stars_3 + VALUES(stars_3),
+            stars_4 = stars_4 + VALUES(stars_4),
+            stars_5 = stars_5 + VALUES(stars_5)
+    """, (user_id,))
+
+    cursor.execute("""
+        INSERT INTO book_stats (book_id, review_count)
+        SELECT book_id, -COUNT(*)
+        FROM reviews
+        WHERE user_id = %s
+        GROUP BY book_id
+        ON DUPLICATE KEY UPDATE review_count = review_count + VALUES(review_count)
+    """, (user_id,))
+
+    cursor.execute("""
+        UPDATE books b
+        JOIN book_stats s ON s.book_id = b.book_id
+        JOIN ratings r ON r.book_id = b.book_id AND r.user_id = %s
+        SET b.average_rating = s.rating_sum / NULLIF(s.rating_count, 0)
+    """, (user_id,))
+
+
+def sync_average_rating(cursor, book_ids: Iterable[int]) -> None:
+    """Copy the aggregate average into books.average_rating"""
+    book_ids = list(book_ids)
+    if not book_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    cursor.execute(f"""
+        UPDATE books b
+        JOIN book_stats s ON s.book_id = b.book_id
+        SET b.average_rating = s.rating_sum / NULLIF(s.rating_count, 0)
+        WHERE b.book_id IN ({placeholders})
+    """, book_ids)
+
+
+def rebuild_book_stats(cursor, book_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute book_stats from ratings/reviews (all books or the given ids)
+
+    Returns the number of books rebuilt.
+    """
+    sql = _RECOMPUTE_SQL
+    params = []
+    if book_ids is not None:
+        if not book_ids:
+            return 0
+        sql += f" WHERE b.book_id IN ({', '.join(['%s'] * len(book_ids))})"
+        params = list(book_ids)
+
+    cursor.execute(f"""
+        INSERT INTO book_stats
+        (book_id, rating_sum, rating_count, stars_1, stars_2, stars_3, stars_4, stars_5, review_count)
+        SELECT * FROM ({sql}) recomputed
+        ON DUPLICATE KEY UPDATE
+            rating_sum = VALUES(rating_sum),
+            rating_count = VALUES(rating_count),
+            stars_1 = VALUES(stars_1),
+            stars_2 = VALUES(stars_2),
+            stars_3 = VALUES(stars_3),
+            stars_4 = VALUES(stars_4),
+            stars_5 = VALUES(stars_5),
+            review_count = VALUES(review_count)
+    """, params or None)
+
+    where = ''
+    if book_ids is not None:
+        where = f"WHERE b.book_id IN ({', '.join(['%s'] * len(book_ids))})"
+    cursor.execute(f"""
+        UPDATE books b
+        JOIN book_stats s ON s.book_id = b.book_id
+        SET b.average_rating = s.rating_sum / NULLIF(s.rating_count, 0)
+        {where}
+    """, params or None)
+
+    if book_ids is not None:
+        return len(book_ids)
+    cursor.execute("SELECT COUNT(*) AS rebuilt FROM books")
+    row = cursor.fetchone()
+    return row['rebuilt'] if isinstance(row, dict) else row[0]
+
+
+def find_drifted_books(cursor, limit: int = 1000) -> List[int]:
+    """Return ids of books whose stored aggregate differs from a recount"""
+    mismatch = ' OR '.join(f"NOT (s.{col} <=> c.{col})" for col in STAT_COLUMNS)
+    cursor.execute(f"""
+        SELECT c.book_id
+        FROM ({_RECOMPUTE_SQL}) c
+        LEFT JOIN book_stats s ON s.book_id = c.book_id
+        WHERE {mismatch}
+        ORDER BY c.book_id
+        LIMIT %s
+    """, (limit,))
+    rows = cursor.fetchall()
+    return [row['book_id'] if isinstance(row, dict) else row[0] for row in rows]
@@ -0,0 +1,156 @@
+"""
+Database Connection Manager for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Keeps one MySQL connection per Lambda container alive across warm
+invocations so each request does not pay a fresh TCP/TLS/auth handshake.
+
+Every cursor of the shared connection is counted and timed by the
+query_metrics layer; wrap the handler with @measure_invocation to get one
+summary line per invocation.
+
+Usage:
+    from db_connection import acquire_connection, release_connection
+
+    connection = acquire_connection(cursorclass=pymysql.cursors.DictCursor)
+    try:
+        ...
+    finally:
+        release_connection(connection)
+"""
+
+import os
+import time
+import pymysql
+from typing import Dict
+from query_metrics import instrumented_connection_class
+
+
+# Idle time (seconds) after which a warm connection is pinged before reuse
+PING_INTERVAL = int(os.environ.get('DB_PING_INTERVAL', '30'))
+CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+
+_connection = None
+_last_used = 0.0
+_depth = 0
+_stats = {'hits': 0, 'misses': 0, 'reconnects': 0}
+_connection_class = instrumented_connection_class(pymysql.connections.Connection)
+
+
+def _open_connection():
+    """Open a brand new connection using the standard Lambda environment"""
+    return _connection_class(
+        host=os.environ['DB_HOST'],
+        port=int(os.environ.get('DB_PORT', '3306')),
+        user=os.environ['DB_USER'],
+        password=os.environ['DB_PASSWORD'],
+        database=os.environ['DB_NAME'],
+        charset='utf8mb4',
+        connect_timeout=CONNECT_TIMEOUT
+    )
+
+
+def _discard_connection():
+    """Drop the cached connection without raising"""
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception:
+            pass
+    _connection = None
+
+
+def _is_alive(connection) -> bool:
+    """Check whether a cached connection can still be used"""
+    if not connection.open:
+        return False
+    if time.monotonic() - _last_used < PING_INTERVAL:
+        return True
+    try:
+        connection.ping(reconnect=False)
+        return True
+    except Exception as e:
+        print(f"Warm connection is stale: {str(e)}")
+        return False
+
+
+def acquire_connection(cursorclass=pymysql.cursors.Cursor):
+    """
+    Get the container's shared connection, opening or reviving it if needed
+
+    Nested acquire/release pairs (e.g. a helper that looks up the user while
+    the handler already holds the connection) share the same connection and
+    only the outermost release resets it.
+
+    Args:
+        cursorclass: Default cursor class for this invocation
+
+    Returns:
+        An open pymysql connection
+    """
+    global _connection, _depth
+
+    if _depth > 0 and _connection is not None and _connection.open:
+        _depth += 1
+        _stats['hits'] += 1
+        return _connection
+
+    if _connection is not None and _is_alive(_connection):
+        _stats['hits'] += 1
+    else:
+        if _connection is not None:
+            _stats['reconnects'] += 1
+            _discard_connection()
+        _stats['misses'] += 1
+        _connection = _open_connection()
+
+    _connection.cursorclass = cursorclass
+    _depth = 1
+    return _connection
+
+
+def release_connection(connection) -> None:
+    """
+    Hand the connection back for reuse by the next invocation
+
+    Anything not committed by the caller is rolled back, matching what
+    closing the connection used to do, and autocommit is restored.
+    """
+    global _depth, _last_used
+
+    if connection is not _connection:
+        # Not managed here (e.g. opened directly) - just close it
+        try:
+            connection.close()
+        except Exception:
+            pass
+        return
+
+    _depth = max(_depth - 1, 0)
+    if _depth > 0:
+        return
+
+    try:
+        if connection.open:
+            connection.rollback()
+            if connection.get_autocommit():
+                connection.autocommit(False)
+        _last_used = time.monotonic()
+    except Exception as e:
+        print(f"Error resetting connection, discarding it: {str(e)}")
+        _discard_connection()
+
+
+def close_connection() -> None:
+    """Close the shared connection (it will be reopened on next acquire)"""
+    global _depth
+    _depth = 0
+    _discard_connection()
+
+
+def connection_stats() -> Dict[str, int]:
+    """Return hit/miss/reconnect counters for this container"""
+    stats = dict(_stats)
+    stats['warm'] = _connection is not None and _connection.open
+    return stats
@@ -0,0 +1,353 @@
+"""
+Follow Graph helpers for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Reads over user_follow_user / user_follow_author:
+
+- follow_status(): follow state for a whole page of users/authors with
+  one IN query per relation instead of one request per row
+- follower_page() / following_page(): keyset pages newest first on
+  (followed_at, id), cursors are opaque strings (encode_cursor)
+
+Follower lists of hot targets (at least ADJACENCY_MIN_EDGES followers,
+e.g. celebrity authors) are served from a per-container adjacency cache:
+the whole list is loaded once per ADJACENCY_TTL into two array('q')
+columns (epoch seconds, follower id), about 16 bytes per edge instead of
+a Python tuple per row, and every page is a binary search into them.
+Call invalidate_adjacency() after a follow/unfollow; other containers
+catch up when their entry expires.
+
+Usage:
+    from follow_graph import follow_status, follower_page
+
+    users, authors = follow_status(cursor, viewer_id, user_ids, author_ids)
+    edges, next_cursor = follower_page(cursor, 'author', author_id, 50, cursor_value, total)
+"""
+
+import os
+import json
+import time
+import base64
+import calendar
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+MAX_STATUS_IDS = 200
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+ADJACENCY_MIN_EDGES = int(os.environ.get('FOLLOW_ADJACENCY_MIN_EDGES', '1000'))
+ADJACENCY_TTL = int(os.environ.get('FOLLOW_ADJACENCY_TTL', '60'))
+# Upper bound on cached edges across all targets in one container
+ADJACENCY_MAX_EDGES = int(os.environ.get('FOLLOW_ADJACENCY_MAX_EDGES', '2000000'))
+
+# kind -> (edge table, column of the followed side, column of the follower)
+FOLLOWER_EDGES = {
+    'user': ('user_follow_user', 'following_id', 'follower_id'),
+    'author': ('user_follow_author', 'author_id', 'user_id'),
+}
+# kind -> (edge table, column of the follower, column of the followed side)
+FOLLOWING_EDGES = {
+    'user': ('user_follow_user', 'follower_id', 'following_id'),
+    'author': ('user_follow_author', 'user_id', 'author_id'),
+}
+
+_EPOCH = datetime(1970, 1, 1)
+
+# (kind, target_id) -> (expires_at, followed_at seconds, follower ids), oldest first
+_adjacency = OrderedDict()
+_adjacency_stats = {'hits': 0, 'misses': 0, 'edges': 0}
+
+
+def _ids(rows, key):
+    return {row[key] if isinstance(row, dict) else row[0] for row in rows}
+
+
+def followed_users(cursor, viewer_id: int, user_ids: Iterable[int]) -> Set[int]:
+    """The subset of user_ids that viewer_id follows (one IN query)"""
+    user_ids = sorted(set(user_ids))
+    if not viewer_id or not user_ids:
+        return set()
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    cursor.execute(f"""
+        SELECT following_id
+        FROM user_follow_user
+        WHERE follower_id = %s AND following_id IN ({placeholders})
+    """, [viewer_id] + user_ids)
+    return _ids(cursor.fetchall(), 'following_id')
+
+
+def followed_authors(cursor, viewer_id: int, author_ids: Iterable[int]) -> Set[int]:
+    """The subset of author_ids that viewer_id follows (one IN query)"""
+    author_ids = sorted(set(author_ids))
+    if not viewer_id or not author_ids:
+        return set()
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    cursor.execute(f"""
+        SELECT author_id
+        FROM user_follow_author
+        WHERE user_id = %s AND author_id IN ({placeholders})
+    """, [viewer_id] + author_ids)
+    return _ids(cursor.fetchall(), 'author_id')
+
+
+def follow_status(
+    cursor,
+    viewer_id: int,
+    user_ids: Iterable[int] = (),
+    author_ids: Iterable[int] = ()
+) -> Tuple[Set[int], Set[int]]:
+    """(followed user ids, followed author ids) among the given ids"""
+    return followed_users(cursor, viewer_id, user_ids), followed_authors(cursor, viewer_id, author_ids)
+
+
+# ============================================================================
+# CURSORS
+# ============================================================================
+
+def parse_limit(raw_limit) -> int:
+    try:
+        limit = int(raw_limit) if raw_limit is not None else DEFAULT_PAGE_SIZE
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def encode_cursor(followed_at: datetime, other_id: int, kind: Optional[str] = None) -> str:
+    """Opaque cursor pointing at an edge (kind only for mixed user/author lists)"""
+    data = {'t': followed_at.isoformat(), 'id': int(other_id)}
+    if kind:
+        data['k'] = kind
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor_value: str) -> Tuple[datetime, int, Optional[str]]:
+    """Return (followed_at, id, kind) from an opaque cursor"""
+    try:
+        padded = cursor_value + '=' * (-len(cursor_value) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(data['t']), int(data['id']), data.get('k')
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+# ============================================================================
+# KEYSET PAGES
+# ============================================================================
+
+def _edges(rows, other_col):
+    edges = []
+    for row in rows:
+        if isinstance(row, dict):
+            edges.append((row[other_col], row['followed_at']))
+        else:
+            edges.append((row[0], row[1]))
+    return edges
+
+
+def edge_page(
+    cursor,
+    table: str,
+    owner_col: str,
+    other_col: str,
+    owner_id: int,
+    limit: int,
+    before: Optional[Tuple[datetime, int]] = None,
+    inclusive_at: bool = False
+) -> List[Tuple[int, datetime]]:
+    """
+    Up to limit + 1 (other id, followed_at) edges of owner_id, newest first
+
+    before: (followed_at, id) position; only edges strictly older are
+    returned, or every edge at the same followed_at too when inclusive_at
+    is set (used when another kind sorts first at equal times).
+    """
+    conditions = [f"{owner_col} = %s"]
+    params = [owner_id]
+    if before:
+        if inclusive_at:
+            conditions.append("followed_at <= %s")
+            params.append(before[0])
+        else:
+            conditions.append(f"(followed_at < %s OR (followed_at = %s AND {other_col} < %s))")
+            params.extend([before[0], before[0], before[1]])
+    cursor.execute(f"""
+        SELECT {other_col}, followed_at
+        FROM {table}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY followed_at DESC, {other_col} DESC
+        LIMIT %s
+    """, params + [limit + 1])
+    return _edges(cursor.fetchall(), other_col)
+
+
+def _to_seconds(value: datetime) -> int:
+    return calendar.timegm(value.timetuple())
+
+
+def _from_seconds(value: int) -> datetime:
+    return _EPOCH + timedelta(seconds=value)
+
+
+def _load_adjacency(cursor, kind: str, target_id: int):
+    table, owner_col, other_col = FOLLOWER_EDGES[kind]
+    cursor.execute(f"""
+        SELECT {other_col}, followed_at
+        FROM {table}
+        WHERE {owner_col} = %s
+        ORDER BY followed_at, {other_col}
+    """, (target_id,))
+    seconds, ids = array('q'), array('q')
+    for other_id, followed_at in _edges(cursor.fetchall(), other_col):
+        seconds.append(_to_seconds(followed_at))
+        ids.append(other_id)
+    return seconds, ids
+
+
+def _cached_adjacency(cursor, kind: str, target_id: int):
+    key = (kind, target_id)
+    entry = _adjacency.get(key)
+    if entry is not None and entry[0] >= time.monotonic():
+        _adjacency.move_to_end(key)
+        _adjacency_stats['hits'] += 1
+        return entry[1], entry[2]
+
+    _adjacency_stats['misses'] += 1
+    invalidate_adjacency(kind, target_id)
+    seconds, ids = _load_adjacency(cursor, kind, target_id)
+    _adjacency[key] = (time.monotonic() + ADJACENCY_TTL, seconds, ids)
+    _adjacency_stats['edges'] += len(ids)
+    while _adjacency_stats['edges'] > ADJACENCY_MAX_EDGES and len(_adjacency) > 1:
+        _, evicted = _adjacency.popitem(last=False)
+        _adjacency_stats['edges'] -= len(evicted[2])
+    return seconds, ids
+
+
+def invalidate_adjacency(kind: str, target_id: int) -> None:
+    """Forget a cached follower list in this container"""
+    entry = _adjacency.pop((kind, target_id), None)
+    if entry is not None:
+        _adjacency_stats['edges'] -= len(entry[2])
+
+
+def adjacency_cache_stats() -> dict:
+    return {**_adjacency_stats, 'targets': len(_adjacency)}
+
+
+def follower_page(
+    cursor,
+    kind: str,
+    target_id: int,
+    limit: int,
+    cursor_value: Optional[str] = None,
+    total: Optional[int] = None
+) -> Tuple[List[Tuple[int, datetime]], Optional[str]]:
+    """
+    A page of (follower user id, followed_at) for a user or author, newest first
+
+    Args:
+        kind: 'user' or 'author'
+        total: the maintained follower count; targets with at least
+               ADJACENCY_MIN_EDGES followers are paged from the cache
+
+    Returns:
+        (edges, next_cursor); next_cursor is None on the last page
+    """
+    before = decode_cursor(cursor_value)[:2] if cursor_value else None
+
+    if total is not None and total >= ADJACENCY_MIN_EDGES:
+        seconds, ids = _cached_adjacency(cursor, kind, target_id)
+        if before:
+            position = bisect_left(range(len(ids)), (_to_seconds(before[0]), before[1]),
+                                   key=lambda i: (seconds[i], ids[i]))
+        else:
+            position = len(ids)
+        start = max(position - limit - 1, 0)
+        edges = [(ids[i], _from_seconds(seconds[i])) for i in range(position - 1, start - 1, -1)]
+    else:
+        table, owner_col, other_col = FOLLOWER_EDGES[kind]
+        edges = edge_page(cursor, table, owner_col, other_col, target_id, limit, before)
+
+    if len(edges) > limit:
+        edges = edges[:limit]
+        return edges, encode_cursor(edges[-1][1], edges[-1][0])
+    return edges, None
+
+
+def following_page(
+    cursor,
+    user_id: int,
+    limit: int,
+    cursor_value: Optional[str] = None,
+    kinds: Tuple[str, ...] = ('user', 'author')
+) -> Tuple[List[Tuple[str, int, datetime]], Optional[str]]:
+    """
+    A page of (kind, followed id, followed_at) that user_id follows, newest first
+
+    With both kinds, one keyset query per kind is merged; at equal
+    followed_at users sort before authors, then by id descending.
+
+    Returns:
+        (edges, next_cursor); next_cursor is None on the last page
+    """
+    before = decode_cursor(cursor_value) if cursor_value else None
+
+    merged = []
+    for kind in kinds:
+        table, owner_col, other_col = FOLLOWING_EDGES[kind]
+        position = None
+        inclusive_at = False
+        if before:
+            followed_at, other_id, cursor_kind = before
+            cursor_kind = cursor_kind or kinds[0]
+            position = (followed_at, other_id)
+            # At the cursor's time, a kind sorting after the cursor's kind is
+            # entirely ahead; one sorting before it is entirely behind
+            if kind != cursor_kind:
+                if kind == 'author':
+                    inclusive_at = True
+                else:
+                    position = (followed_at, 0)
+        for other_id, followed_at in edge_page(cursor, table, owner_col, other_col,
+                                               user_id, limit, position, inclusive_at):
+            merged.append((kind, other_id, followed_at))
+
+    merged.sort(key=lambda edge: (edge[2], edge[0] == 'user', edge[1]), reverse=True)
+    if len(merged) > limit:
+        merged = merged[:limit]
+        last = merged[-1]
+        return merged, encode_cursor(last[2], last[1], last[0] if len(kinds) > 1 else None)
+    return merged, None
+
+
+def author_list_stats(cursor, author_ids: List[int]) -> dict:
+    """
+    {author_id: {'books': n, 'reviews': n}} for one page of authors
+
+    One grouped query per statistic over the page's ids, instead of a
+    correlated subquery (or an extra join) per listed author.
+    """
+    stats = {author_id: {'books': 0, 'reviews': 0} for author_id in author_ids}
+    if not author_ids:
+        return stats
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    cursor.execute(f"""
+        SELECT 'books' as stat, author_id, COUNT(DISTINCT book_id) as value
+        FROM book_author
+        WHERE author_id IN ({placeholders})
+        GROUP BY author_id
+        UNION ALL
+        SELECT 'reviews' as stat, author_id, COUNT(*) as value
+        FROM author_reviews
+        WHERE author_id IN ({placeholders})
+        GROUP BY author_id
+    """, list(author_ids) * 2)
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = dict(zip(('stat', 'author_id', 'value'), row))
+        stats[row['author_id']][row['stat']] = int(row['value'])
+    return stats
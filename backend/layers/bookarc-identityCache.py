@@ -0,0 +1,171 @@
+"""
+Identity Cache for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Resolves a Cognito sub to the BookArc user:
+
+- resolve_user_id() only maps the sub to a user_id. The mapping never
+  changes, so it is taken from the bookarc_user_id claim that the
+  pre-token-generation trigger stamps into the ID token, then from a
+  per-container LRU cache, then from the users table.
+- resolve_identity() is for authorization: admin checks and "is this user
+  still active". Role and is_active are always read from the users table,
+  never from token claims or the cache. A deactivation or role change made
+  by another Lambda therefore applies on the very next request.
+
+Usage:
+    from identity_cache import resolve_identity, resolve_user_id
+
+    identity = resolve_identity(cursor, cognito_sub, claims, require_active=True)
+    if not identity:
+        return 404
+    user_id, role = identity['user_id'], identity['role']
+
+    user_id = resolve_user_id(cursor, cognito_sub, claims)
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+CLAIM_USER_ID = 'bookarc_user_id'
+CLAIM_ROLE = 'bookarc_role'
+
+CACHE_TTL = int(os.environ.get('IDENTITY_CACHE_TTL', '60'))
+CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE', '1024'))
+
+# cognito_sub -> (expires_at, user_id)
+_cache = OrderedDict()
+_stats = {'claims': 0, 'hits': 0, 'misses': 0}
+
+
+def identity_claims(user_id: int, role: str) -> Dict[str, str]:
+    """Claims the pre-token-generation trigger adds to the ID token"""
+    return {CLAIM_USER_ID: str(user_id), CLAIM_ROLE: role}
+
+
+def _user_id_from_claims(claims: Optional[dict]) -> Optional[int]:
+    """The user_id hint from the token; never used for role or status"""
+    if not claims or not claims.get(CLAIM_USER_ID):
+        return None
+    try:
+        return int(claims[CLAIM_USER_ID])
+    except (TypeError, ValueError):
+        return None
+
+
+def _cache_get(cognito_sub: str) -> Optional[int]:
+    entry = _cache.get(cognito_sub)
+    if entry is None:
+        return None
+    expires_at, user_id = entry
+    if expires_at < time.monotonic():
+        del _cache[cognito_sub]
+        return None
+    _cache.move_to_end(cognito_sub)
+    return user_id
+
+
+def _cache_put(cognito_sub: str, user_id: int) -> None:
+    _cache[cognito_sub] = (time.monotonic() + CACHE_TTL, user_id)
+    _cache.move_to_end(cognito_sub)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def _read_identity(cursor, cognito_sub: str) -> Optional[dict]:
+    cursor.execute("""
+        SELECT user_id, role, COALESCE(is_active, TRUE) AS is_active
+        FROM users
+        WHERE cognito_sub = %s
+    """, (cognito_sub,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    if not isinstance(row, dict):
+        row = {'user_id': row[0], 'role': row[1], 'is_active': row[2]}
+    return {
+        'user_id': row['user_id'],
+        'role': row['role'],
+        'is_active': bool(row['is_active']),
+    }
+
+
+def resolve_user_id(cursor, cognito_sub: str, claims: Optional[dict] = None) -> Optional[int]:
+    """
+    Map a Cognito sub to its user_id, for handlers that only need the id
+
+    Args:
+        cursor: Open cursor (only used on a claims/cache miss)
+        cognito_sub: Cognito sub from the authorizer claims
+        claims: The authorizer claims, if any
+
+    Returns:
+        The user_id, or None if the user does not exist
+    """
+    if not cognito_sub:
+        return None
+
+    user_id = _user_id_from_claims(claims)
+    if user_id is not None:
+        _stats['claims'] += 1
+        return user_id
+
+    user_id = _cache_get(cognito_sub)
+    if user_id is not None:
+        _stats['hits'] += 1
+        return user_id
+
+    _stats['misses'] += 1
+    identity = _read_identity(cursor, cognito_sub)
+    if not identity:
+        return None
+    _cache_put(cognito_sub, identity['user_id'])
+    return identity['user_id']
+
+
+def resolve_identity(
+    cursor,
+    cognito_sub: str,
+    claims: Optional[dict] = None,
+    require_active: bool = False
+) -> Optional[dict]:
+    """
+    Get {'user_id', 'role', 'is_active'} for a Cognito sub, read from the
+    database so role and activation changes apply immediately
+
+    Args:
+        cursor: Open cursor
+        cognito_sub: Cognito sub from the authorizer claims
+        claims: The authorizer claims, if any; accepted so callers can pass
+            them uniformly, but role and status never come from them
+        require_active: Treat deactivated users as not found
+
+    Returns:
+        The identity, or None if the user does not exist (or is inactive
+        and require_active is set)
+    """
+    if not cognito_sub:
+        return None
+
+    identity = _read_identity(cursor, cognito_sub)
+    if not identity:
+        return None
+    _cache_put(cognito_sub, identity['user_id'])
+
+    if require_active and not identity['is_active']:
+        return None
+    return identity
+
+
+def clear_identity_cache() -> None:
+    _cache.clear()
+
+
+def identity_cache_stats() -> Dict[str, int]:
+    """Return claims/hit/miss counters for this container"""
+    stats = dict(_stats)
+    stats['size'] = len(_cache)
+    return stats
@@ -0,0 +1,492 @@
+"""
+Notification Outbox for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Large notification fan-outs (every follower of an author, ...) and
+notifications off a hot write path (new follower) are not written inside
+the API request. The request records one outbox entry in
+its own transaction with enqueue(); bookarc-drainNotificationOutbox then
+expands the entry into notifications, CHUNK_SIZE recipients at a time,
+with one multi-row INSERT per chunk.
+
+Recipients' notification_preferences are applied per chunk (see
+deliver_notifications()). Each chunk's INSERT and the entry's progress (last recipient user_id)
+commit together, so a retried or re-claimed entry resumes after the last
+committed chunk instead of notifying anyone twice. idempotency_key is
+UNIQUE, so enqueueing the same event twice is a no-op. Failed entries are
+retried with exponential backoff up to MAX_ATTEMPTS.
+
+Set NOTIFICATION_OUTBOX_BACKEND=local to use an in-process queue instead
+of the notification_outbox table (tests, local runs):
+
+    outbox = LocalOutbox()
+    outbox.enqueue(None, 'followers_new_book', payload, 'book_published:42')
+    drain(outbox, connection)
+"""
+
+import os
+import json
+import time
+import uuid
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional
+from user_counters import record_unread_change
+from notification_preferences import route_notifications, buffer_digest
+
+CHUNK_SIZE = int(os.environ.get('NOTIFICATION_OUTBOX_CHUNK_SIZE', '500'))
+MAX_ATTEMPTS = int(os.environ.get('NOTIFICATION_OUTBOX_MAX_ATTEMPTS', '5'))
+LEASE_SECONDS = int(os.environ.get('NOTIFICATION_OUTBOX_LEASE_SECONDS', '300'))
+RETRY_BASE_SECONDS = int(os.environ.get('NOTIFICATION_OUTBOX_RETRY_SECONDS', '30'))
+BACKEND = os.environ.get('NOTIFICATION_OUTBOX_BACKEND', 'mysql')
+# Optional: worker Lambda to invoke asynchronously after an enqueue commits
+WORKER_FUNCTION = os.environ.get('NOTIFICATION_OUTBOX_WORKER')
+
+
+def _value(row, key):
+    return row[key] if isinstance(row, dict) else row[0]
+
+
+# ============================================================================
+# NOTIFICATION ROWS
+# ============================================================================
+
+def write_notifications(cursor, rows: List[tuple]) -> int:
+    """
+    Insert (user_id, message, type, audience_type[, group_key]) rows with one statement
+
+    Also bumps each recipient's unread counter. Runs in the caller's
+    transaction; the caller commits. Returns the number of rows inserted.
+    """
+    if not rows:
+        return 0
+    placeholders = ', '.join(['(%s, %s, %s, %s, %s, FALSE, NOW())'] * len(rows))
+    params = []
+    for row in rows:
+        params.extend(row[:4])
+        params.append(row[4] if len(row) > 4 else None)
+    cursor.execute(f"""
+        INSERT INTO notifications
+        (user_id, message, type, audience_type, group_key, is_read, created_at)
+        VALUES {placeholders}
+    """, params)
+    record_unread_change(cursor, dict(Counter(row[0] for row in rows)))
+    return len(rows)
+
+
+def deliver_notifications(cursor, rows: List[tuple]) -> int:
+    """
+    Apply recipients' notification_preferences, then write the rows
+
+    Rows switched off by a preference are dropped and rows for hourly
+    digest users are counted in notification_digest_buffer. Returns the
+    number of rows inserted or buffered.
+    """
+    immediate, digested = route_notifications(cursor, rows)
+    return write_notifications(cursor, immediate) + buffer_digest(cursor, digested)
+
+
+# ============================================================================
+# RECIPIENT RESOLVERS
+# ============================================================================
+
+def _followers_of_author(cursor, payload: dict, after_id: int, limit: int) -> List[int]:
+    """Users following the author profile(s) of payload['author_user_id']"""
+    cursor.execute("""
+        SELECT DISTINCT ufa.user_id
+        FROM user_follow_author ufa
+        JOIN authors a ON ufa.author_id = a.author_id
+        WHERE a.user_id = %s AND ufa.user_id > %s
+        ORDER BY ufa.user_id
+        LIMIT %s
+    """, (payload['author_user_id'], after_id, limit))
+    return [_value(row, 'user_id') for row in cursor.fetchall()]
+
+
+def _new_follower(cursor, payload: dict, after_id: int, limit: int) -> List[int]:
+    """The followed user, unless the follow was undone before delivery"""
+    cursor.execute("""
+        SELECT following_id
+        FROM user_follow_user
+        WHERE follower_id = %s AND following_id = %s AND following_id > %s
+    """, (payload['follower_id'], payload['user_id'], after_id))
+    return [_value(row, 'following_id') for row in cursor.fetchall()]
+
+
+# event_type -> fn(cursor, payload, after_user_id, limit) -> ascending user ids
+RECIPIENT_RESOLVERS: Dict[str, Callable[..., List[int]]] = {
+    'followers_new_book': _followers_of_author,
+    'new_follower': _new_follower,
+}
+
+
+# ============================================================================
+# MESSAGE RENDERERS
+# ============================================================================
+
+NEW_FOLLOWER_MESSAGE = '👥 {name} is now following you!'
+
+
+def _render_new_follower(cursor, payload: dict) -> str:
+    cursor.execute("""
+        SELECT COALESCE(display_name, username) AS name
+        FROM users
+        WHERE user_id = %s
+    """, (payload['follower_id'],))
+    row = cursor.fetchone()
+    return NEW_FOLLOWER_MESSAGE.format(name=_value(row, 'name') if row else 'Someone')
+
+
+# event_type -> fn(cursor, payload) -> message, for entries enqueued without
+# payload['message'] so the request path skips the lookup the text needs
+MESSAGE_RENDERERS: Dict[str, Callable[..., str]] = {
+    'new_follower': _render_new_follower,
+}
+
+
+def _notification(cursor, entry: dict) -> tuple:
+    """(message, type, audience_type, group_key) shared by every recipient of an entry"""
+    payload = entry['payload']
+    message = payload.get('message') or MESSAGE_RENDERERS[entry['event_type']](cursor, payload)
+    return (message, payload['type'], payload.get('audience_type', 'all'), payload.get('group_key'))
+
+
+# ============================================================================
+# OUTBOX BACKENDS
+# ============================================================================
+
+class MySQLOutbox:
+    """Outbox stored in the notification_outbox table"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def enqueue(self, cursor, event_type: str, payload: dict, idempotency_key: str) -> bool:
+        """
+        Record an entry in the caller's transaction (the caller commits)
+
+        Returns False when an entry with the same idempotency_key exists.
+        """
+        if event_type not in RECIPIENT_RESOLVERS:
+            raise ValueError(f"Unknown outbox event type: {event_type}")
+        cursor.execute("""
+            INSERT IGNORE INTO notification_outbox
+            (event_type, idempotency_key, payload)
+            VALUES (%s, %s, %s)
+        """, (event_type, idempotency_key, json.dumps(payload)))
+        return cursor.rowcount == 1
+
+    def claim(self, limit: int) -> List[dict]:
+        """Lease up to limit due entries (pending, or processing with an expired lease)"""
+        token = uuid.uuid4().hex
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT outbox_id
+                FROM notification_outbox
+                WHERE (status = 'pending' AND next_attempt_at <= NOW())
+                   OR (status = 'processing' AND locked_until < NOW())
+                ORDER BY outbox_id
+                LIMIT %s
+            """, (limit,))
+            candidate_ids = [_value(row, 'outbox_id') for row in cursor.fetchall()]
+            if not candidate_ids:
+                self.connection.commit()
+                return []
+
+            # Conditional update: a concurrent worker that got there first wins
+            placeholders = ', '.join(['%s'] * len(candidate_ids))
+            cursor.execute(f"""
+                UPDATE notification_outbox
+                SET status = 'processing',
+                    claim_token = %s,
+                    locked_until = NOW() + INTERVAL %s SECOND
+                WHERE outbox_id IN ({placeholders})
+                  AND ((status = 'pending' AND next_attempt_at <= NOW())
+                       OR (status = 'processing' AND locked_until < NOW()))
+            """, [token, LEASE_SECONDS] + candidate_ids)
+
+            cursor.execute("""
+                SELECT outbox_id, event_type, idempotency_key, payload,
+                       progress, delivered, attempts, claim_token
+                FROM notification_outbox
+                WHERE claim_token = %s
+                ORDER BY outbox_id
+            """, (token,))
+            entries = [dict(row) for row in cursor.fetchall()]
+        self.connection.commit()
+
+        for entry in entries:
+            if isinstance(entry['payload'], (str, bytes)):
+                entry['payload'] = json.loads(entry['payload'])
+        return entries
+
+    def checkpoint(self, cursor, entry: dict, progress: int, delivered: int) -> bool:
+        """
+        Advance an entry in the same transaction as its chunk INSERT
+
+        Returns False if the lease was lost; the caller must roll back.
+        """
+        cursor.execute("""
+            UPDATE notification_outbox
+            SET progress = %s,
+                delivered = delivered + %s,
+                locked_until = NOW() + INTERVAL %s SECOND
+            WHERE outbox_id = %s AND claim_token = %s
+        """, (progress, delivered, LEASE_SECONDS, entry['outbox_id'], entry['claim_token']))
+        if cursor.rowcount != 1:
+            return False
+        entry['progress'] = progress
+        entry['delivered'] += delivered
+        return True
+
+    def complete(self, entry: dict) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE notification_outbox
+                SET status = 'done', claim_token = NULL, locked_until = NULL,
+                    last_error = NULL, processed_at = NOW()
+                WHERE outbox_id = %s AND claim_token = %s
+            """, (entry['outbox_id'], entry['claim_token']))
+        self.connection.commit()
+
+    def release(self, entry: dict) -> None:
+        """Hand an unfinished entry back without counting an attempt"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE notification_outbox
+                SET status = 'pending', claim_token = NULL, locked_until = NULL
+                WHERE outbox_id = %s AND claim_token = %s
+            """, (entry['outbox_id'], entry['claim_token']))
+        self.connection.commit()
+
+    def fail(self, entry: dict, error: str) -> str:
+        """Schedule a retry with backoff, or park the entry as failed"""
+        attempts = entry['attempts'] + 1
+        status = 'failed' if attempts >= MAX_ATTEMPTS else 'pending'
+        delay = RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE notification_outbox
+                SET status = %s, attempts = %s, last_error = %s,
+                    claim_token = NULL, locked_until = NULL,
+                    next_attempt_at = NOW() + INTERVAL %s SECOND
+                WHERE outbox_id = %s AND claim_token = %s
+            """, (status, attempts, error[:2000], delay, entry['outbox_id'], entry['claim_token']))
+        self.connection.commit()
+        return status
+
+    def retry_failed(self, limit: int = 100) -> int:
+        """Move parked entries back to pending (after fixing the cause)"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                UPDATE notification_outbox
+                SET status = 'pending', attempts = 0, next_attempt_at = NOW()
+                WHERE status = 'failed'
+                ORDER BY outbox_id
+                LIMIT %s
+            """, (limit,))
+            moved = cursor.rowcount
+        self.connection.commit()
+        return moved
+
+
+class LocalOutbox:
+    """
+    In-process stand-in for MySQLOutbox
+
+    Same interface, entries live in this object. enqueue() is visible
+    immediately (there is no transaction to wait for); notification rows
+    are still written through the connection given to drain().
+    """
+
+    def __init__(self):
+        self.entries: Dict[int, dict] = {}
+        self.keys: Dict[str, int] = {}
+        self.queue = deque()
+        self._next_id = 1
+
+    def enqueue(self, cursor, event_type: str, payload: dict, idempotency_key: str) -> bool:
+        if event_type not in RECIPIENT_RESOLVERS:
+            raise ValueError(f"Unknown outbox event type: {event_type}")
+        if idempotency_key in self.keys:
+            return False
+        outbox_id = self._next_id
+        self._next_id += 1
+        self.entries[outbox_id] = {
+            'outbox_id': outbox_id,
+            'event_type': event_type,
+            'idempotency_key': idempotency_key,
+            # Round-trip like the JSON column does
+            'payload': json.loads(json.dumps(payload)),
+            'status': 'pending',
+            'progress': 0,
+            'delivered': 0,
+            'attempts': 0,
+            'claim_token': None,
+            'last_error': None,
+            'next_attempt_at': 0.0,
+        }
+        self.keys[idempotency_key] = outbox_id
+        self.queue.append(outbox_id)
+        return True
+
+    def claim(self, limit: int) -> List[dict]:
+        now = time.monotonic()
+        claimed = []
+        for _ in range(len(self.queue)):
+            if len(claimed) >= limit:
+                break
+            outbox_id = self.queue.popleft()
+            entry = self.entries[outbox_id]
+            if entry['next_attempt_at'] > now:
+                self.queue.append(outbox_id)
+                continue
+            entry['status'] = 'processing'
+            entry['claim_token'] = uuid.uuid4().hex
+            claimed.append(entry)
+        return claimed
+
+    def checkpoint(self, cursor, entry: dict, progress: int, delivered: int) -> bool:
+        entry['progress'] = progress
+        entry['delivered'] += delivered
+        return True
+
+    def complete(self, entry: dict) -> None:
+        entry.update(status='done', claim_token=None, last_error=None)
+
+    def release(self, entry: dict) -> None:
+        entry.update(status='pending', claim_token=None)
+        self.queue.append(entry['outbox_id'])
+
+    def fail(self, entry: dict, error: str) -> str:
+        entry['attempts'] += 1
+        entry['last_error'] = error
+        entry['claim_token'] = None
+        if entry['attempts'] >= MAX_ATTEMPTS:
+            entry['status'] = 'failed'
+        else:
+            entry['status'] = 'pending'
+            entry['next_attempt_at'] = time.monotonic() + RETRY_BASE_SECONDS * 2 ** (entry['attempts'] - 1)
+            self.queue.append(entry['outbox_id'])
+        return entry['status']
+
+    def retry_failed(self, limit: int = 100) -> int:
+        failed = [e for e in self.entries.values() if e['status'] == 'failed'][:limit]
+        for entry in failed:
+            entry.update(status='pending', attempts=0, next_attempt_at=0.0)
+            self.queue.append(entry['outbox_id'])
+        return len(failed)
+
+
+_local_outbox = None
+
+
+def get_outbox(connection):
+    """The configured outbox backend (NOTIFICATION_OUTBOX_BACKEND)"""
+    global _local_outbox
+    if BACKEND == 'local':
+        if _local_outbox is None:
+            _local_outbox = LocalOutbox()
+        return _local_outbox
+    return MySQLOutbox(connection)
+
+
+def enqueue(connection, cursor, event_type: str, payload: dict, idempotency_key: str) -> bool:
+    """Record an outbox entry in the caller's transaction (the caller commits)"""
+    return get_outbox(connection).enqueue(cursor, event_type, payload, idempotency_key)
+
+
+def wake_worker() -> None:
+    """
+    Best-effort async invoke of the drain worker after an enqueue commits
+
+    The scheduled run picks the entry up anyway if this fails or
+    NOTIFICATION_OUTBOX_WORKER is not set.
+    """
+    if not WORKER_FUNCTION or BACKEND == 'local':
+        return
+    try:
+        import boto3
+        boto3.client('lambda').invoke(
+            FunctionName=WORKER_FUNCTION,
+            InvocationType='Event',
+            Payload=b'{}'
+        )
+    except Exception as e:
+        print(f"Could not wake notification outbox worker: {str(e)}")
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+def _deliver(outbox, connection, entry: dict, chunk_size: int, deadline: Optional[float]) -> bool:
+    """
+    Expand one entry chunk by chunk
+
+    Returns True when every recipient was written, False when the deadline
+    was reached or the lease was lost.
+    """
+    resolve = RECIPIENT_RESOLVERS[entry['event_type']]
+    payload = entry['payload']
+    notification = None
+
+    while True:
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        with connection.cursor() as cursor:
+            recipients = resolve(cursor, payload, entry['progress'], chunk_size)
+            if not recipients:
+                return True
+            if notification is None:
+                notification = _notification(cursor, entry)
+            delivered = deliver_notifications(cursor, [(user_id,) + notification for user_id in recipients])
+            if not outbox.checkpoint(cursor, entry, recipients[-1], delivered):
+                connection.rollback()
+                print(f"Lost lease on outbox entry {entry['outbox_id']}")
+                entry['claim_token'] = None
+                return False
+        connection.commit()
+        if len(recipients) < chunk_size:
+            return True
+
+
+def drain(
+    outbox,
+    connection,
+    max_entries: int = 10,
+    chunk_size: int = CHUNK_SIZE,
+    deadline: Optional[float] = None
+) -> Dict[str, int]:
+    """
+    Claim due entries and deliver them
+
+    Args:
+        deadline: time.monotonic() value after which no new chunk starts;
+                  unfinished entries are released and resume next run
+
+    Returns:
+        counters: entries claimed/done/released/retried/failed, notifications written
+    """
+    stats = {'claimed': 0, 'done': 0, 'released': 0, 'retried': 0, 'failed': 0, 'notifications': 0}
+
+    entries = outbox.claim(max_entries)
+    stats['claimed'] = len(entries)
+
+    for entry in entries:
+        delivered_before = entry['delivered']
+        try:
+            finished = _deliver(outbox, connection, entry, chunk_size, deadline)
+            if finished:
+                outbox.complete(entry)
+                stats['done'] += 1
+            elif entry.get('claim_token'):
+                outbox.release(entry)
+                stats['released'] += 1
+        except Exception as e:
+            connection.rollback()
+            print(f"Outbox entry {entry['outbox_id']} failed: {str(e)}")
+            status = outbox.fail(entry, str(e))
+            stats['failed' if status == 'failed' else 'retried'] += 1
+        stats['notifications'] += entry['delivered'] - delivered_before
+
+    return stats
@@ -0,0 +1,181 @@
+"""
+Notification Preferences for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Applies notification_preferences before notifications are written instead
+of storing rows the user has switched off:
+
+- a type mapped in TYPE_PREFERENCES is dropped when that preference is off
+  (e.g. 'author_update' with allow_author_updates = FALSE)
+- for users with digest_mode = 'hourly', types in DIGEST_TYPES are counted
+  in notification_digest_buffer instead; bookarc-notificationMaintenance
+  turns each closed hour into one notification
+
+Preferences are loaded for a whole batch of recipients with one query and
+kept in a per-container LRU cache with a short TTL, so writers pick up a
+preference change within PREFERENCES_CACHE_TTL seconds.
+
+Usage:
+    from notification_preferences import route_notifications, buffer_digest
+
+    immediate, digested = route_notifications(cursor, rows)
+"""
+
+import os
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+CACHE_TTL = int(os.environ.get('PREFERENCES_CACHE_TTL', '60'))
+CACHE_SIZE = int(os.environ.get('PREFERENCES_CACHE_SIZE', '4096'))
+
+DIGEST_MODES = ['off', 'hourly']
+
+# Users without a notification_preferences row get these
+DEFAULT_PREFERENCES = {
+    'allow_author_updates': True,
+    'allow_premium_offers': True,
+    'digest_mode': 'off',
+}
+
+# notification type -> preference column that switches it off
+TYPE_PREFERENCES = {
+    'author_update': 'allow_author_updates',
+    'premium_offer': 'allow_premium_offers',
+}
+
+# High-volume types folded into the hourly digest -> how the digest counts them
+DIGEST_TYPES = {
+    'book_rated': 'book ratings',
+    'book_reviewed': 'book reviews',
+    'author_rating': 'ratings',
+    'author_review': 'reviews',
+    'new_follower': 'new followers',
+    'author_update': 'new books from authors you follow',
+}
+
+# user_id -> (expires_at, preferences)
+_cache = OrderedDict()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _cache_get(user_id: int):
+    entry = _cache.get(user_id)
+    if entry is None:
+        return None
+    expires_at, preferences = entry
+    if expires_at < time.monotonic():
+        del _cache[user_id]
+        return None
+    _cache.move_to_end(user_id)
+    return preferences
+
+
+def _cache_put(user_id: int, preferences: dict) -> None:
+    _cache[user_id] = (time.monotonic() + CACHE_TTL, preferences)
+    _cache.move_to_end(user_id)
+    while len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+
+
+def cache_stats() -> Dict[str, int]:
+    return {**_stats, 'size': len(_cache)}
+
+
+def load_preferences(cursor, user_ids: Iterable[int]) -> Dict[int, dict]:
+    """
+    Preferences for every user in user_ids, with one query for the cache misses
+
+    Works with tuple and dict cursors.
+    """
+    preferences = {}
+    missing = []
+    for user_id in set(user_ids):
+        cached = _cache_get(user_id)
+        if cached is None:
+            missing.append(user_id)
+        else:
+            preferences[user_id] = cached
+    _stats['hits'] += len(preferences)
+    _stats['misses'] += len(missing)
+
+    if missing:
+        placeholders = ', '.join(['%s'] * len(missing))
+        cursor.execute(f"""
+            SELECT user_id, allow_author_updates, allow_premium_offers, digest_mode
+            FROM notification_preferences
+            WHERE user_id IN ({placeholders})
+        """, missing)
+        found = {}
+        for row in cursor.fetchall():
+            if not isinstance(row, dict):
+                row = dict(zip(('user_id', 'allow_author_updates', 'allow_premium_offers', 'digest_mode'), row))
+            found[row['user_id']] = {
+                'allow_author_updates': bool(row['allow_author_updates']),
+                'allow_premium_offers': bool(row['allow_premium_offers']),
+                'digest_mode': row['digest_mode'] or 'off',
+            }
+        for user_id in missing:
+            preferences[user_id] = found.get(user_id, DEFAULT_PREFERENCES)
+            _cache_put(user_id, preferences[user_id])
+
+    return preferences
+
+
+def route_notifications(cursor, rows: List[tuple]) -> Tuple[List[tuple], List[tuple]]:
+    """
+    Split (user_id, message, type, audience_type[, group_key]) rows
+
+    Returns:
+        (rows to insert now, rows for the hourly digest); rows switched
+        off by a preference are in neither
+    """
+    if not rows:
+        return [], []
+    preferences = load_preferences(cursor, (row[0] for row in rows))
+
+    immediate, digested = [], []
+    for row in rows:
+        user_preferences = preferences[row[0]]
+        column = TYPE_PREFERENCES.get(row[2])
+        if column and not user_preferences[column]:
+            continue
+        if user_preferences['digest_mode'] == 'hourly' and row[2] in DIGEST_TYPES:
+            digested.append(row)
+        else:
+            immediate.append(row)
+    return immediate, digested
+
+
+def buffer_digest(cursor, rows: List[tuple]) -> int:
+    """
+    Count rows into notification_digest_buffer for the current hour
+
+    One upsert per (user, type) in the batch, in the caller's transaction.
+    The hour comes from the database clock, the same one the digest step
+    uses to decide which hours are closed.
+    """
+    if not rows:
+        return 0
+    grouped = defaultdict(lambda: [0, None, None])
+    for row in rows:
+        entry = grouped[(row[0], row[2])]
+        entry[0] += 1
+        entry[1] = row[1]
+        entry[2] = row[3]
+
+    placeholders = ', '.join(
+        ['(%s, TIMESTAMP(CURDATE(), MAKETIME(HOUR(NOW()), 0, 0)), %s, %s, %s, %s)'] * len(grouped)
+    )
+    params = []
+    for (user_id, notification_type), (count, message, audience_type) in grouped.items():
+        params.extend([user_id, notification_type, count, message, audience_type])
+    cursor.execute(f"""
+        INSERT INTO notification_digest_buffer
+        (user_id, period_start, type, event_count, last_message, audience_type)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            event_count = event_count + VALUES(event_count),
+            last_message = VALUES(last_message)
+    """, params)
+    return len(rows)
@@ -0,0 +1,95 @@
+"""
+Notification Selection for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Request parsing shared by the notification inbox handlers: the opaque
+keyset cursor of bookarc-getNotifications, and the {"ids"} / {"before"}
+selection accepted by bookarc-bulkMarkNotificationsRead and
+bookarc-bulkDeleteNotifications.
+
+Usage:
+    from notification_selection import parse_selection
+
+    condition, params = parse_selection(body)
+    cursor.execute(f"DELETE FROM notifications WHERE user_id = %s AND {condition}",
+                   [user_id] + params)
+"""
+
+import json
+import base64
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+MAX_BULK_IDS = 1000
+
+BEFORE_ERROR = 'before must be a cursor, a notification id or an ISO timestamp'
+
+
+def encode_cursor(created_at: datetime, notification_id: int) -> str:
+    """Build an opaque cursor pointing at the given notification"""
+    raw = json.dumps({'t': created_at.isoformat(), 'id': int(notification_id)}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor_value: str) -> Tuple[datetime, int]:
+    """Return (created_at, notification_id) from an opaque cursor"""
+    try:
+        padded = cursor_value + '=' * (-len(cursor_value) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(data['t']), int(data['id'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def parse_selection(body: dict) -> Tuple[str, List]:
+    """
+    Turn {"ids": [...]} or {"before": ...} into (sql, params)
+
+    before accepts:
+    - a cursor from getNotifications: that notification and everything older
+    - a notification id: that notification and every lower id
+    - an ISO timestamp: notifications created strictly before it
+
+    Raises:
+        ValueError: The selection is missing, ambiguous or malformed
+    """
+    ids = body.get('ids')
+    before = body.get('before')
+
+    if (ids is None) == (before is None):
+        raise ValueError('Provide either ids or before')
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise ValueError('ids must be a non-empty list')
+        if len(ids) > MAX_BULK_IDS:
+            raise ValueError(f'At most {MAX_BULK_IDS} ids per request')
+        if any(isinstance(notification_id, bool) for notification_id in ids):
+            raise ValueError('ids must be integers')
+        try:
+            ids = sorted({int(notification_id) for notification_id in ids})
+        except (TypeError, ValueError):
+            raise ValueError('ids must be integers')
+        placeholders = ', '.join(['%s'] * len(ids))
+        return f"notification_id IN ({placeholders})", ids
+
+    # JSON true/false arrive as bool, which is a subclass of int
+    if isinstance(before, bool):
+        raise ValueError(BEFORE_ERROR)
+    if isinstance(before, int) or (isinstance(before, str) and before.isdigit()):
+        return "notification_id <= %s", [int(before)]
+    if not isinstance(before, str):
+        raise ValueError(BEFORE_ERROR)
+    try:
+        timestamp = datetime.fromisoformat(before.replace('Z', '+00:00'))
+        if timestamp.tzinfo:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return "created_at < %s", [timestamp]
+    except ValueError:
+        pass
+    try:
+        created_at, notification_id = decode_cursor(before)
+    except ValueError:
+        raise ValueError(BEFORE_ERROR)
+    return ("(created_at < %s OR (created_at = %s AND notification_id <= %s))",
+            [created_at, created_at, notification_id])
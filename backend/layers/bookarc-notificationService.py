@@ -1,47 +1,123 @@
 """
 Notification Service for BookArc
 Add this as a Lambda Layer and import in your Lambda functions
+
+NotificationService collects a request's notifications and writes them
+with one multi-row INSERT in the caller's transaction (see flush()).
+Every insert also bumps user_counters.unread_notifications, which is what
+getNotifications reports as unread_count. Recipients' preferences are
+applied first: switched-off types are dropped and hourly-digest users'
+high-volume types are buffered (notification_preferences layer). Fan-outs
+to many users go through the notification_outbox layer.
 """
 
+import hashlib
 import pymysql
-from typing import Optional, List
+from typing import Optional, List, Tuple
+from notification_outbox import enqueue, deliver_notifications, write_notifications, NEW_FOLLOWER_MESSAGE
+from notification_preferences import route_notifications, buffer_digest
+
+# group_key for notifications about the recipient themself (followers, author ratings)
+SELF_GROUP = 'self'
+
+
+def _book_group(book_id: Optional[int], book_title: str) -> str:
+    return f'book:{book_id}' if book_id is not None else f'book:{book_title}'[:191]
 
 
 class NotificationService:
-    """Service for creating and managing notifications"""
+    """
+    Unit of work for notifications
+
+    notify_*() and add() only collect notifications; flush() writes them
+    all with one multi-row INSERT on the caller's cursor, inside the
+    caller's transaction, without committing:
+
+        notif_service = NotificationService(connection)
+        notif_service.notify_user_rated_book(user_id, title, 5)
+        notif_service.notify_author_book_rated(author_id, title, name, 5)
+        notif_service.flush(cursor)
+        connection.commit()
+    """
     
     def __init__(self, connection):
         self.connection = connection
+        self.pending: List[Tuple[int, str, str, str, Optional[str]]] = []
     
-    def create_notification(
+    def add(
         self, 
         user_id: int, 
         message: str, 
         notification_type: str,
-        audience_type: str = 'all'
-    ) -> Optional[int]:
+        audience_type: str = 'all',
+        group_key: Optional[str] = None
+    ) -> None:
         """
-        Create a single notification
+        Queue a notification until flush()
         
         Args:
             user_id: User to notify
             message: Notification message
             notification_type: Type (e.g., 'book_approval', 'new_follower')
             audience_type: 'normal', 'premium', 'author', 'admin', or 'all'
+            group_key: Subject shared by notifications that may later be
+                collapsed into one digest row (same user and type)
+        """
+        self.pending.append((user_id, message, notification_type, audience_type, group_key))
+    
+    def flush(self, cursor=None) -> int:
+        """
+        Write every queued notification in one INSERT (no commit)
+        
+        Recipients' preferences are loaded in one query (or from the
+        container cache) and applied before the INSERT.
+        
+        Returns:
+            Number of notifications written or buffered for a digest
+        """
+        if not self.pending:
+            return 0
+        rows, self.pending = self.pending, []
+        if cursor is not None:
+            return deliver_notifications(cursor, rows)
+        with self.connection.cursor() as own_cursor:
+            return deliver_notifications(own_cursor, rows)
+    
+    def discard(self) -> None:
+        """Drop queued notifications (e.g. when the caller rolls back)"""
+        self.pending = []
+    
+    def create_notification(
+        self, 
+        user_id: int, 
+        message: str, 
+        notification_type: str,
+        audience_type: str = 'all'
+    ) -> Optional[int]:
+        """
+        Create a single notification immediately and commit
+        
+        Prefer add()/flush() inside the caller's transaction; this is kept
+        for callers outside a unit of work.
             
         Returns:
-            notification_id or None if failed
+            notification_id, or None if failed or not inserted (switched off
+            or buffered for the user's digest)
         """
         try:
             with self.connection.cursor() as cursor:
-                sql = """
-                    INSERT INTO notifications 
-                    (user_id, message, type, audience_type, is_read, created_at)
-                    VALUES (%s, %s, %s, %s, FALSE, NOW())
-                """
-                cursor.execute(sql, (user_id, message, notification_type, audience_type))
+                immediate, digested = route_notifications(
+                    cursor, [(user_id, message, notification_type, audience_type)]
+                )
+                if not immediate:
+                    buffer_digest(cursor, digested)
+                    self.connection.commit()
+                    return None
+                write_notifications(cursor, immediate)
+                cursor.execute("SELECT LAST_INSERT_ID() AS notification_id")
+                row = cursor.fetchone()
                 self.connection.commit()
-                return cursor.lastrowid
+                return row['notification_id'] if isinstance(row, dict) else row[0]
         except Exception as e:
             print(f"Error creating notification: {str(e)}")
             return None
@@ -61,89 +137,181 @@ class NotificationService:
             return 'A user'
     
     # Author Notifications
-    def notify_book_submitted(self, user_id: int, book_title: str) -> Optional[int]:
+    def notify_book_submitted(self, user_id: int, book_title: str) -> None:
         """Notify author that their book was submitted"""
         message = f'Your book "{book_title}" has been successfully submitted and is pending review.'
-        return self.create_notification(user_id, message, 'book_submission', 'author')
+        self.add(user_id, message, 'book_submission', 'author')
     
-    def notify_book_approved(self, user_id: int, book_title: str) -> Optional[int]:
+    def notify_book_approved(self, user_id: int, book_title: str) -> None:
         """Notify author that their book was approved"""
         message = f'Congratulations! Your book "{book_title}" has been approved and is now live.'
-        return self.create_notification(user_id, message, 'book_approval', 'author')
+        self.add(user_id, message, 'book_approval', 'author')
     
     def notify_book_rejected(
         self, 
         user_id: int, 
         book_title: str, 
         rejection_reason: Optional[str] = None
-    ) -> Optional[int]:
+    ) -> None:
         """Notify author that their book was rejected"""
         message = f'Your book "{book_title}" was rejected.'
         if rejection_reason:
             message += f' Reason: {rejection_reason}'
-        return self.create_notification(user_id, message, 'book_rejection', 'author')
+        self.add(user_id, message, 'book_rejection', 'author')
     
-    def notify_user_new_follower(self, user_id: int, follower_name: str) -> Optional[int]:
+    def notify_author_book_rated(
+        self, 
+        author_user_id: int, 
+        book_title: str,
+        rater_name: str,
+        rating_value: int,
+        book_id: Optional[int] = None
+    ) -> None:
+        """Notify author that their book received a rating"""
+        stars = '⭐' * rating_value
+        message = f'{rater_name} rated your book "{book_title}" {stars} ({rating_value}/5)'
+        self.add(author_user_id, message, 'book_rated', 'author', _book_group(book_id, book_title))
+    
+    def notify_author_book_reviewed(
+        self, 
+        author_user_id: int, 
+        book_title: str,
+        reviewer_name: str,
+        book_id: Optional[int] = None
+    ) -> None:
+        """Notify author that their book received a review"""
+        message = f'📝 {reviewer_name} submitted a review for your book "{book_title}"'
+        self.add(author_user_id, message, 'book_reviewed', 'author', _book_group(book_id, book_title))
+    
+    def notify_author_received_rating(
+        self, 
+        author_user_id: int, 
+        rater_name: str, 
+        rating_value: int
+    ) -> None:
+        """Notify author that they received a rating"""
+        stars = '⭐' * rating_value
+        message = f'⭐ {rater_name} rated you {stars} ({rating_value}/5)'
+        self.add(author_user_id, message, 'author_rating', 'author', SELF_GROUP)
+    
+    def notify_author_received_review(self, author_user_id: int, reviewer_name: str) -> None:
+        """Notify author that they received a review"""
+        message = f'{reviewer_name} submitted a review about you'
+        self.add(author_user_id, message, 'author_review', 'author', SELF_GROUP)
+    
+    # Reader Notifications
+    def notify_user_rated_book(self, user_id: int, book_title: str, rating_value: int) -> None:
+        """Notify user that they successfully rated a book"""
+        stars = '⭐' * rating_value
+        message = f'You have successfully rated "{book_title}" {stars} ({rating_value}/5)'
+        self.add(user_id, message, 'book_rating_success', 'all')
+    
+    def notify_user_submitted_book_review(self, user_id: int, book_title: str) -> None:
+        """Notify user that their book review was successfully submitted"""
+        message = f'✅ Your review has been successfully submitted for "{book_title}"'
+        self.add(user_id, message, 'book_review_success', 'all')
+    
+    def notify_user_rated_author(self, user_id: int, author_name: str, rating_value: int) -> None:
+        """Notify user that they successfully rated an author"""
+        stars = '⭐' * rating_value
+        message = f'You have successfully rated {author_name} {stars} ({rating_value}/5)'
+        self.add(user_id, message, 'author_rating_success', 'all')
+    
+    def notify_user_submitted_author_review(self, user_id: int, author_name: str) -> None:
+        """Notify user that their author review was successfully submitted"""
+        message = f'Your review has been successfully submitted for {author_name}'
+        self.add(user_id, message, 'author_review_success', 'all')
+    
+    def notify_user_updated_author_review(self, user_id: int, author_name: str) -> None:
+        """Notify user that their author review was updated"""
+        message = f'Your review for {author_name} has been updated successfully'
+        self.add(user_id, message, 'author_review_updated', 'all')
+    
+    # Account Notifications
+    def notify_user_new_follower(self, user_id: int, follower_name: str) -> None:
         """Notify user of a new follower"""
-        message = f'{follower_name} is now following you!'
-        return self.create_notification(user_id, message, 'new_follower', 'all')
+        message = NEW_FOLLOWER_MESSAGE.format(name=follower_name)
+        self.add(user_id, message, 'new_follower', 'all', SELF_GROUP)
     
-    def notify_password_changed(self, user_id: int) -> Optional[int]:
+    def notify_password_changed(self, user_id: int) -> None:
         """Notify user that password was changed"""
-        message = 'Your password was successfully changed.'
-        return self.create_notification(user_id, message, 'password_change', 'all')
+        message = ('Your password was successfully changed. '
+                   'If you did not make this change, please contact support immediately.')
+        self.add(user_id, message, 'security', 'all')
     
-    def notify_verification_approved(self, user_id: int) -> Optional[int]:
+    def notify_profile_picture_updated(self, user_id: int, is_first_upload: bool) -> None:
+        """Notify user that their profile picture was uploaded or replaced"""
+        if is_first_upload:
+            message = '🎉 Welcome! Your profile picture has been uploaded successfully.'
+        else:
+            message = '✨ Your profile picture has been updated successfully.'
+        self.add(user_id, message, 'profile_update', 'all')
+    
+    # Verification Notifications
+    def notify_verification_submitted(self, user_id: int) -> None:
+        """Notify user that their author verification request was received"""
+        message = ("Your author verification has been successfully submitted and is now pending review. "
+                   "We'll notify you once it's been reviewed.")
+        self.add(user_id, message, 'verification_submitted', 'normal')
+    
+    def notify_verification_approved(self, user_id: int) -> None:
         """Notify user that author verification was approved"""
         message = 'Congratulations! Your author verification has been approved. You can now access your Author Dashboard.'
-        return self.create_notification(user_id, message, 'verification_approved', 'author')
+        self.add(user_id, message, 'verification_approved', 'author')
     
     def notify_verification_rejected(
         self, 
         user_id: int, 
         rejection_reason: Optional[str] = None
-    ) -> Optional[int]:
+    ) -> None:
         """Notify user that author verification was rejected"""
         message = 'Your author verification request was rejected.'
         if rejection_reason:
             message += f' Reason: {rejection_reason}'
-        return self.create_notification(user_id, message, 'verification_rejected', 'normal')
+        self.add(user_id, message, 'verification_rejected', 'normal')
     
-    def notify_followers_new_book(self, author_user_id: int, book_title: str) -> int:
-        """Notify all followers that author published a new book"""
-        try:
-            with self.connection.cursor() as cursor:
-                # Get all followers of this author
-                cursor.execute("""
-                    SELECT ufa.user_id
-                    FROM user_follow_author ufa
-                    JOIN authors a ON ufa.author_id = a.author_id
-                    WHERE a.user_id = %s
-                """, (author_user_id,))
-                
-                follower_ids = [row[0] for row in cursor.fetchall()]
-            
-            if follower_ids:
-                # Get author name
-                author_name = self.get_user_display_name(author_user_id)
-                
-                message = f'{author_name} just published a new book: "{book_title}"'
-                
-                # Create notifications for all followers
-                with self.connection.cursor() as cursor:
-                    sql = """
-                        INSERT INTO notifications 
-                        (user_id, message, type, audience_type, is_read, created_at)
-                        VALUES (%s, %s, 'author_update', 'normal', FALSE, NOW())
-                    """
-                    values = [(uid, message) for uid in follower_ids]
-                    cursor.executemany(sql, values)
-                    self.connection.commit()
-                    return cursor.rowcount
-            return 0
-        except Exception as e:
-            print(f"Error notifying followers: {str(e)}")
-            return 0
+    # Admin Notifications
+    def notify_admin_action(self, admin_user_id: int, message: str) -> None:
+        """Confirm an action back to the admin who performed it"""
+        self.add(admin_user_id, message, 'admin_action', 'admin')
+    
+    def notify_followers_new_book(
+        self,
+        author_user_id: int,
+        book_title: str,
+        book_id: Optional[int] = None,
+        cursor=None
+    ) -> bool:
+        """
+        Queue "new book" notifications for all followers of an author
+
+        Only one notification_outbox row is written, in the caller's
+        transaction: commit together with the triggering change, then call
+        notification_outbox.wake_worker(). bookarc-drainNotificationOutbox
+        writes the follower notifications in chunks.
+
+        Returns:
+            False if this book's fan-out was already queued
+        """
+        author_name = self.get_user_display_name(author_user_id)
+        message = f'{author_name} just published a new book: "{book_title}"'
+
+        if book_id is not None:
+            idempotency_key = f'followers_new_book:{book_id}'
+        else:
+            digest = hashlib.sha1(book_title.encode('utf-8')).hexdigest()
+            idempotency_key = f'followers_new_book:{author_user_id}:{digest}'
+
+        payload = {
+            'author_user_id': author_user_id,
+            'message': message,
+            'type': 'author_update',
+            'audience_type': 'normal',
+        }
+        if cursor is not None:
+            return enqueue(self.connection, cursor, 'followers_new_book', payload, idempotency_key)
+        with self.connection.cursor() as own_cursor:
+            return enqueue(self.connection, own_cursor, 'followers_new_book', payload, idempotency_key)
 
 
 # Standalone helper function for quick use
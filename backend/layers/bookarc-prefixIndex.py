@@ -0,0 +1,275 @@
+"""
+Prefix Index for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Compact, read-only typeahead index over books, authors and users. The
+bookarc-buildAutocompleteIndex batch job writes one binary snapshot
+(sorted key arrays + record table) to S3; each Lambda container downloads
+it to /tmp once, memory-maps it and answers prefix lookups with a binary
+search, so keystrokes never touch the database.
+
+Snapshot sections (snapshot_store.py layout):
+    records   rec_kind (u8), rec_id (i64), rec_score (f32),
+              rec_text_off (u32, n+1) + rec_text (label \\x1f subtitle)
+    postings  key_off (u32, n+1) + key_text, sorted by key then score desc;
+              post_rec (u32) -> record
+    head      top HEAD_TOP_K records per kind for every key prefix of up to
+              HEAD_PREFIX_LEN characters, and for every longer prefix that
+              matches more than meta['max_scan'] postings, so no lookup
+              scans a large posting range and every other range is scanned
+              in full (the top-N is exact either way)
+
+Usage:
+    from prefix_index import load_prefix_index, normalize
+
+    index = load_prefix_index()
+    suggestions = index.lookup(normalize(q), limit=8, kinds={'book', 'user'})
+"""
+
+import os
+import heapq
+import itertools
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional, Set, Tuple
+from snapshot_store import SnapshotCache, pack_snapshot, read_header
+
+
+MAGIC = b'BKPX'
+FORMAT_VERSION = 2
+
+KINDS = ('book', 'author_registered', 'author_external', 'user')
+
+# Prefixes up to this many characters are served from the precomputed head table
+HEAD_PREFIX_LEN = 3
+# Records kept per kind for each head prefix (upper bound on a page)
+HEAD_TOP_K = 20
+# Longer prefixes matching more postings than this are precomputed in the head table
+MAX_SCAN = 5000
+# Index the label from each of its first few word boundaries ("rings" finds "The Lord of the Rings")
+MAX_KEYS_PER_RECORD = 6
+TEXT_SEPARATOR = '\x1f'
+
+INDEX_PATH = os.environ.get('AUTOCOMPLETE_INDEX_PATH', '')
+INDEX_BUCKET = os.environ.get('AUTOCOMPLETE_BUCKET', '')
+INDEX_KEY = os.environ.get('AUTOCOMPLETE_KEY', 'autocomplete/index.bin')
+LOCAL_COPY = '/tmp/bookarc-autocomplete-index.bin'
+# How often (seconds) a warm container checks for a newer snapshot
+INDEX_CHECK_INTERVAL = int(os.environ.get('AUTOCOMPLETE_CHECK_INTERVAL', '300'))
+
+_SECTIONS = (
+    ('rec_kind', 'B'), ('rec_id', 'q'), ('rec_score', 'f'), ('rec_text_off', 'I'), ('rec_text', 'B'),
+    ('key_off', 'I'), ('key_text', 'B'), ('post_rec', 'I'),
+    ('head_key_off', 'I'), ('head_key_text', 'B'), ('head_off', 'I'), ('head_rec', 'I'),
+)
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse punctuation to single spaces"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', text)
+    chars = [c if c.isalnum() else ' ' for c in decomposed if not unicodedata.combining(c)]
+    return ' '.join(''.join(chars).lower().split())
+
+
+def index_keys(label: str) -> List[str]:
+    """Keys a label is reachable by: the full normalized label and its word-boundary suffixes"""
+    words = normalize(label).split()
+    return [' '.join(words[i:]) for i in range(min(len(words), MAX_KEYS_PER_RECORD))]
+
+
+def _strings(values: List[bytes]) -> Tuple[array, bytes]:
+    offsets = array('I', [0])
+    total = 0
+    for value in values:
+        total += len(value)
+        offsets.append(total)
+    return offsets, b''.join(values)
+
+
+def build_snapshot(entries: Iterable[Tuple[str, int, float, str, str]], meta: Optional[dict] = None) -> bytes:
+    """
+    Serialize (kind, entity_id, score, label, subtitle) entries into a snapshot
+
+    Returns:
+        The snapshot bytes, ready to upload
+    """
+    kind_codes = {kind: code for code, kind in enumerate(KINDS)}
+    rec_kind, rec_id, rec_score = array('B'), array('q'), array('f')
+    texts = []
+    postings = []
+
+    for kind, entity_id, score, label, subtitle in entries:
+        keys = index_keys(label)
+        if not keys:
+            continue
+        record = len(rec_id)
+        rec_kind.append(kind_codes[kind])
+        rec_id.append(int(entity_id))
+        rec_score.append(float(score))
+        texts.append(f"{label}{TEXT_SEPARATOR}{subtitle or ''}".encode())
+        postings.extend((key, record) for key in keys)
+
+    # Key order must match the byte order the lookup bisects on
+    postings.sort(key=lambda posting: (posting[0].encode(), -rec_score[posting[1]], posting[1]))
+
+    head_keys, head_off, head_rec = [], array('I', [0]), array('I')
+    head = []
+    # A prefix longer than HEAD_PREFIX_LEN can only be busy if the prefix one
+    # character shorter was, so each length only regroups the busy ranges
+    busy = []
+    for length in itertools.count(1):
+        ranges = [(0, len(postings))] if length <= HEAD_PREFIX_LEN else busy
+        if not ranges:
+            break
+        busy = []
+        for start, end in ranges:
+            positions = (i for i in range(start, end) if len(postings[i][0]) >= length)
+            for prefix, group in itertools.groupby(positions, key=lambda i: postings[i][0][:length]):
+                group = list(group)
+                if len(group) > MAX_SCAN:
+                    busy.append((group[0], group[-1] + 1))
+                elif length > HEAD_PREFIX_LEN:
+                    continue
+                records = {postings[i][1] for i in group}
+                per_kind = []
+                for code in range(len(KINDS)):
+                    per_kind.extend(heapq.nlargest(
+                        HEAD_TOP_K, (r for r in records if rec_kind[r] == code), key=lambda r: rec_score[r]
+                    ))
+                per_kind.sort(key=lambda r: -rec_score[r])
+                head.append((prefix.encode(), per_kind))
+    head.sort(key=lambda item: item[0])
+    for prefix, records in head:
+        head_keys.append(prefix)
+        head_rec.extend(records)
+        head_off.append(len(head_rec))
+
+    rec_text_off, rec_text = _strings(texts)
+    key_off, key_text = _strings([key.encode() for key, _ in postings])
+    head_key_off, head_key_text = _strings(head_keys)
+    arrays = {
+        'rec_kind': rec_kind, 'rec_id': rec_id, 'rec_score': rec_score,
+        'rec_text_off': rec_text_off, 'rec_text': array('B', rec_text),
+        'key_off': key_off, 'key_text': array('B', key_text),
+        'post_rec': array('I', (record for _, record in postings)),
+        'head_key_off': head_key_off, 'head_key_text': array('B', head_key_text),
+        'head_off': head_off, 'head_rec': head_rec,
+    }
+
+    header = dict(meta or {})
+    header.update({
+        'kinds': list(KINDS),
+        'records': len(rec_id),
+        'postings': len(postings),
+        'head_prefixes': len(head_keys),
+        'max_scan': MAX_SCAN,
+    })
+    return pack_snapshot(MAGIC, FORMAT_VERSION, [(name, arrays[name].tobytes()) for name, _ in _SECTIONS], header)
+
+
+class _Strings:
+    """Sequence view over an offsets array + blob, so bisect works without copying"""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+
+class PrefixIndex:
+    """A loaded snapshot; all arrays are zero-copy views over the mapped file"""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        self.meta, body_start = read_header(buffer, MAGIC, FORMAT_VERSION, 'autocomplete index snapshot')
+        self.kinds = self.meta['kinds']
+        self.max_scan = self.meta['max_scan']
+
+        for name, typecode in _SECTIONS:
+            offset, size = self.meta['sections'][name]
+            start = body_start + offset
+            setattr(self, name, view[start:start + size].cast(typecode))
+
+        self.keys = _Strings(self.key_off, self.key_text)
+        self.head_keys = _Strings(self.head_key_off, self.head_key_text)
+
+    def record(self, index: int) -> dict:
+        label, _, subtitle = bytes(
+            self.rec_text[self.rec_text_off[index]:self.rec_text_off[index + 1]]
+        ).decode().partition(TEXT_SEPARATOR)
+        return {
+            'kind': self.kinds[self.rec_kind[index]],
+            'id': self.rec_id[index],
+            'score': self.rec_score[index],
+            'label': label,
+            'subtitle': subtitle,
+        }
+
+    def _head(self, key: bytes):
+        pos = bisect_left(self.head_keys, key)
+        if pos < len(self.head_keys) and self.head_keys[pos] == key:
+            return self.head_rec[self.head_off[pos]:self.head_off[pos + 1]]
+        return ()
+
+    def _candidates(self, prefix: str):
+        key = prefix.encode()
+        if len(prefix) <= HEAD_PREFIX_LEN:
+            return self._head(key)
+
+        # UTF-8 never contains 0xff, so this bounds every key starting with the prefix
+        lo = bisect_left(self.keys, key)
+        hi = bisect_left(self.keys, key + b'\xff', lo)
+        if hi - lo > self.max_scan:
+            # Busy prefix: its per-kind top-K was precomputed at build time
+            return self._head(key)
+        return self.post_rec[lo:hi]
+
+    def lookup(self, prefix: str, limit: int = 8, kinds: Optional[Set[str]] = None) -> List[dict]:
+        """
+        Top `limit` records reachable by a normalized prefix, best score first
+
+        Args:
+            prefix: Output of normalize()
+            limit: Maximum number of suggestions
+            kinds: Restrict to these KINDS (all when None)
+        """
+        if not prefix:
+            return []
+        codes = None if kinds is None else {self.kinds.index(kind) for kind in kinds}
+        seen = set()
+        matches = []
+        for record in self._candidates(prefix):
+            if record in seen or (codes is not None and self.rec_kind[record] not in codes):
+                continue
+            seen.add(record)
+            matches.append(record)
+        best = heapq.nlargest(limit, matches, key=lambda r: (self.rec_score[r], -r))
+        return [self.record(r) for r in best]
+
+
+_cache = SnapshotCache(
+    'autocomplete index', PrefixIndex, INDEX_PATH, INDEX_BUCKET, INDEX_KEY, LOCAL_COPY,
+    INDEX_CHECK_INTERVAL, 'AUTOCOMPLETE_INDEX_PATH', 'AUTOCOMPLETE_BUCKET'
+)
+
+
+def load_prefix_index(force: bool = False) -> Optional[PrefixIndex]:
+    """
+    Get the container's prefix index, reloading when a newer snapshot exists
+
+    Reads AUTOCOMPLETE_INDEX_PATH when set (local file or a layer under
+    /opt), otherwise s3://AUTOCOMPLETE_BUCKET/AUTOCOMPLETE_KEY.
+
+    Returns:
+        The index, or None when no snapshot has been built yet
+    """
+    return _cache.load(force)
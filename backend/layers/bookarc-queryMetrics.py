@@ -0,0 +1,245 @@
+"""
+Query Metrics for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Instruments pymysql cursors to record, per Lambda invocation, the number
+of statements, per-statement latency grouped by a normalized SQL
+fingerprint, rows returned and total DB time. At the end of the
+invocation a single JSON line is printed in CloudWatch Embedded Metric
+Format, so the numbers become metrics without any extra API calls, and
+fingerprints executed more than DB_N_PLUS_ONE_THRESHOLD times are
+flagged as likely N+1 patterns.
+
+db_connection opens its connection with instrumented_connection_class(),
+so every cursor is measured, including ones created with an explicit
+cursor class. Handlers are wrapped with @measure_invocation, which emits
+exactly one summary per invocation however many times the connection is
+acquired and released.
+
+Usage:
+    from query_metrics import measure_invocation
+
+    @measure_invocation
+    def lambda_handler(event, context):
+        ...
+
+Environment:
+    DB_METRICS                  "0" disables instrumentation (default "1")
+    DB_N_PLUS_ONE_THRESHOLD     repeats of one fingerprint that flag N+1 (default 5)
+    DB_METRICS_NAMESPACE        CloudWatch namespace (default "BookArc/Database")
+"""
+
+import os
+import re
+import json
+import time
+import functools
+from typing import Dict, Optional
+
+
+ENABLED = os.environ.get('DB_METRICS', '1') != '0'
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('DB_N_PLUS_ONE_THRESHOLD', '5'))
+NAMESPACE = os.environ.get('DB_METRICS_NAMESPACE', 'BookArc/Database')
+# Statements listed individually in the summary line (slowest first)
+MAX_REPORTED_STATEMENTS = 10
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_REPEATED_ROWS = re.compile(r"(\(\?\+\))(?:\s*,\s*\(\?\+\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+_invocation = None
+_handler_depth = 0
+_cursor_classes = {}
+
+
+def fingerprint(sql: str) -> str:
+    """
+    Normalize a statement so every execution of the same query shape
+    groups together: literals and placeholders become ?, IN/VALUES lists
+    of any length collapse to (?+), whitespace and case are normalized
+    """
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER_LITERAL.sub('?', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip().lower()
+    sql = _VALUE_LIST.sub('(?+)', sql)
+    return _REPEATED_ROWS.sub(r'\1', sql)
+
+
+def begin_invocation() -> None:
+    """Start collecting for a new invocation (discards anything unreported)"""
+    global _invocation
+    if not ENABLED:
+        return
+    _invocation = {
+        'started': time.monotonic(),
+        'queries': 0,
+        'rows': 0,
+        'db_time': 0.0,
+        'statements': {},
+    }
+
+
+def record_statement(sql, elapsed: float, rows: int) -> None:
+    """Add one executed statement to the current invocation"""
+    if _invocation is None:
+        return
+    key = fingerprint(sql)
+    stats = _invocation['statements'].get(key)
+    if stats is None:
+        stats = _invocation['statements'][key] = {'count': 0, 'total': 0.0, 'max': 0.0, 'rows': 0}
+    stats['count'] += 1
+    stats['total'] += elapsed
+    stats['max'] = max(stats['max'], elapsed)
+    stats['rows'] += max(rows, 0)
+
+    _invocation['queries'] += 1
+    _invocation['rows'] += max(rows, 0)
+    _invocation['db_time'] += elapsed
+
+
+def invocation_summary() -> Optional[Dict]:
+    """Return the current invocation's summary as an EMF document"""
+    if _invocation is None:
+        return None
+
+    statements = [
+        {
+            'fingerprint': key,
+            'count': stats['count'],
+            'totalMs': round(stats['total'] * 1000, 2),
+            'maxMs': round(stats['max'] * 1000, 2),
+            'rows': stats['rows'],
+        }
+        for key, stats in _invocation['statements'].items()
+    ]
+    statements.sort(key=lambda s: s['totalMs'], reverse=True)
+    n_plus_one = [s['fingerprint'] for s in statements if s['count'] > N_PLUS_ONE_THRESHOLD]
+
+    function_name = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'local')
+    return {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [['FunctionName']],
+                'Metrics': [
+                    {'Name': 'QueryCount', 'Unit': 'Count'},
+                    {'Name': 'DbTimeMs', 'Unit': 'Milliseconds'},
+                    {'Name': 'RowsReturned', 'Unit': 'Count'},
+                    {'Name': 'NPlusOneSuspects', 'Unit': 'Count'},
+                ],
+            }],
+        },
+        'FunctionName': function_name,
+        'QueryCount': _invocation['queries'],
+        'DbTimeMs': round(_invocation['db_time'] * 1000, 2),
+        'RowsReturned': _invocation['rows'],
+        'NPlusOneSuspects': len(n_plus_one),
+        'UniqueStatements': len(statements),
+        'WallTimeMs': round((time.monotonic() - _invocation['started']) * 1000, 2),
+        'statements': statements[:MAX_REPORTED_STATEMENTS],
+        'nPlusOne': n_plus_one,
+    }
+
+
+def end_invocation() -> Optional[Dict]:
+    """Emit the summary line for the current invocation and reset"""
+    global _invocation
+    summary = invocation_summary()
+    _invocation = None
+    if summary is None or summary['QueryCount'] == 0:
+        return summary
+
+    if summary['nPlusOne']:
+        print(f"⚠️ Possible N+1 queries: {summary['nPlusOne']}")
+    print(json.dumps(summary))
+    return summary
+
+
+def measure_invocation(handler):
+    """
+    Decorator for a Lambda handler: collect every statement the handler
+    runs and emit one summary line when it returns
+
+    A decorated handler called from another one reports into the
+    caller's summary.
+    """
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        global _handler_depth
+        if _handler_depth > 0:
+            return handler(*args, **kwargs)
+
+        _handler_depth = 1
+        begin_invocation()
+        try:
+            return handler(*args, **kwargs)
+        finally:
+            _handler_depth = 0
+            end_invocation()
+
+    return wrapper
+
+
+def instrumented_cursor_class(base):
+    """
+    Return a subclass of the given pymysql cursor class that records
+    every execute()/executemany() in the current invocation
+    """
+    if not ENABLED or getattr(base, '_instrumented', False):
+        return base
+    cls = _cursor_classes.get(base)
+    if cls is not None:
+        return cls
+
+    class InstrumentedCursor(base):
+        _instrumented = True
+        _measuring = False
+
+        def _timed(self, method, query, args):
+            # pymysql's executemany() may call execute() per row;
+            # only the outermost call is recorded
+            if self._measuring:
+                return method(query, args)
+            self._measuring = True
+            started = time.perf_counter()
+            try:
+                return method(query, args)
+            finally:
+                self._measuring = False
+                # Only result sets count as rows returned (not affected rows)
+                rows = self.rowcount if self.description else 0
+                record_statement(query, time.perf_counter() - started, rows or 0)
+
+        def execute(self, query, args=None):
+            return self._timed(super().execute, query, args)
+
+        def executemany(self, query, args):
+            return self._timed(super().executemany, query, args)
+
+    InstrumentedCursor.__name__ = f"Instrumented{base.__name__}"
+    _cursor_classes[base] = InstrumentedCursor
+    return InstrumentedCursor
+
+
+def instrumented_connection_class(base):
+    """
+    Return a subclass of the given pymysql connection class whose cursor()
+    always hands out an instrumented cursor, whether the caller relies on
+    the connection's cursorclass or passes one explicitly
+    """
+    if not ENABLED:
+        return base
+
+    class InstrumentedConnection(base):
+        def cursor(self, cursor=None):
+            return super().cursor(instrumented_cursor_class(cursor or self.cursorclass))
+
+    InstrumentedConnection.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedConnection
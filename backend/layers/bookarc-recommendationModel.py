@@ -0,0 +1,204 @@
+"""
+Recommendation Model for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Serves item-item recommendations from the neighbour lists written by the
+bookarc-buildRecommendationModel batch job. Each request reads only the
+neighbour lists of the user's history books from the current model
+version (cached per container) and scores them in memory, so the request
+path never sorts the catalogue in SQL and never holds the whole model.
+
+Usage:
+    from recommendation_model import load_neighbor_model, get_user_signals, score_books
+
+    signals = get_user_signals(connection, user_id)
+    model = load_neighbor_model(connection, signals)
+    ranked = score_books(model, signals, exclude=signals.keys(), limit=10)
+"""
+
+import os
+import heapq
+import time
+from typing import Dict, List, Tuple, Iterable, Optional
+
+
+# How often (seconds) a warm container checks for a newer model version
+MODEL_CHECK_INTERVAL = int(os.environ.get('RECOMMENDATION_MODEL_CHECK_INTERVAL', '300'))
+# Strongest history books whose neighbour lists are read per request
+MAX_SEED_BOOKS = int(os.environ.get('RECOMMENDATION_MAX_SEED_BOOKS', '200'))
+
+# Implicit-feedback weight of each (user, book) signal, shared by the batch
+# build and the serving path so seeds are weighted like the training data.
+# Columns: user_id, book_id, weight, excludes (1 = never recommend it back)
+SIGNAL_SQL = """
+    SELECT user_id, book_id, rating_value / 5.0 AS weight, 1 AS excludes
+    FROM ratings
+    {ratings_where}
+    UNION ALL
+    SELECT user_id, book_id, 0.6 AS weight, 1 AS excludes
+    FROM reviews
+    {reviews_where}
+    UNION ALL
+    SELECT user_id, book_id,
+        CASE status
+            WHEN 'completed' THEN 1.0
+            WHEN 'reading' THEN 0.8
+            WHEN 'on_hold' THEN 0.5
+            WHEN 'planned' THEN 0.4
+            ELSE 0.1
+        END AS weight,
+        1 AS excludes
+    FROM user_reading_status
+    {status_where}
+    UNION ALL
+    SELECT l.user_id, lb.book_id, 0.5 AS weight, 1 AS excludes
+    FROM list_books lb
+    JOIN lists l ON l.list_id = lb.list_id
+    {lists_where}
+    UNION ALL
+    SELECT user_id, book_id,
+        CASE event_type
+            WHEN 'complete' THEN 1.0
+            WHEN 'rate' THEN COALESCE(event_value, 3) / 5.0
+            WHEN 'review' THEN 0.6
+            WHEN 'add_to_list' THEN 0.5
+            ELSE 0.1
+        END AS weight,
+        event_type <> 'view' AS excludes
+    FROM interaction_events
+    {events_where}
+"""
+
+_SIGNAL_SOURCES = {
+    'ratings_where': 'user_id',
+    'reviews_where': 'user_id',
+    'status_where': 'user_id',
+    'lists_where': 'l.user_id',
+    'events_where': 'user_id',
+}
+
+_model = {
+    'version': None,
+    'checked_at': 0.0,
+}
+
+
+def signal_sql(user_id: Optional[int] = None) -> Tuple[str, list]:
+    """
+    Build the signal query for one user, or for everyone when user_id is None
+
+    Returns:
+        (sql, params)
+    """
+    if user_id is None:
+        return SIGNAL_SQL.format(**{key: '' for key in _SIGNAL_SOURCES}), []
+
+    clauses = {key: f"WHERE {column} = %s" for key, column in _SIGNAL_SOURCES.items()}
+    return SIGNAL_SQL.format(**clauses), [user_id] * len(_SIGNAL_SOURCES)
+
+
+def get_user_signals(connection, user_id: int) -> Dict[int, Tuple[float, bool]]:
+    """
+    Get the user's weighted history
+
+    Returns:
+        {book_id: (weight, excludes)} keeping the strongest signal per book
+    """
+    sql, params = signal_sql(user_id)
+    signals = {}
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            if isinstance(row, dict):
+                book_id, weight, excludes = row['book_id'], row['weight'], row['excludes']
+            else:
+                _, book_id, weight, excludes = row
+            weight = float(weight)
+            previous = signals.get(book_id)
+            if previous is None:
+                signals[book_id] = (weight, bool(excludes))
+            else:
+                signals[book_id] = (max(previous[0], weight), previous[1] or bool(excludes))
+    return signals
+
+
+def current_model_version(connection, force: bool = False) -> Optional[int]:
+    """Latest ready model version, re-checked every MODEL_CHECK_INTERVAL seconds"""
+    now = time.monotonic()
+    if not force and _model['version'] is not None and now - _model['checked_at'] < MODEL_CHECK_INTERVAL:
+        return _model['version']
+
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT MAX(model_version) AS model_version
+            FROM recommendation_models
+            WHERE status = 'ready'
+        """)
+        row = cursor.fetchone()
+        version = (row['model_version'] if isinstance(row, dict) else row[0]) if row else None
+
+    if version != _model['version']:
+        print(f"Serving recommendation model v{version}")
+    _model['version'] = version
+    _model['checked_at'] = now
+    return version
+
+
+def load_neighbor_model(connection, signals: Dict[int, Tuple[float, bool]], force: bool = False) -> dict:
+    """
+    Get the neighbour lists of the user's strongest MAX_SEED_BOOKS history
+    books from the current model version
+
+    Only those rows are read (a primary-key range per book), so memory
+    stays proportional to one user's history rather than the catalogue.
+
+    Returns:
+        {'version': int or None, 'neighbors': {book_id: [(neighbor_id, score), ...]}}
+    """
+    version = current_model_version(connection, force)
+    if version is None or not signals:
+        return {'version': version, 'neighbors': {}}
+
+    seeds = heapq.nlargest(MAX_SEED_BOOKS, signals, key=lambda book_id: signals[book_id][0])
+    placeholders = ', '.join(['%s'] * len(seeds))
+    neighbors = {}
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT book_id, neighbor_id, score
+            FROM book_neighbors
+            WHERE model_version = %s AND book_id IN ({placeholders})
+            ORDER BY book_id, neighbor_rank
+        """, [version] + list(seeds))
+        for row in cursor.fetchall():
+            if isinstance(row, dict):
+                book_id, neighbor_id, score = row['book_id'], row['neighbor_id'], row['score']
+            else:
+                book_id, neighbor_id, score = row
+            neighbors.setdefault(book_id, []).append((neighbor_id, float(score)))
+
+    return {'version': version, 'neighbors': neighbors}
+
+
+def score_books(
+    model: dict,
+    signals: Dict[int, Tuple[float, bool]],
+    exclude: Iterable[int] = (),
+    limit: int = 10
+) -> List[Tuple[int, float]]:
+    """
+    Score candidate books as the weighted sum of their similarity to the history
+
+    Returns:
+        [(book_id, score), ...] best first, at most `limit` entries
+    """
+    neighbors = model['neighbors']
+    excluded = set(exclude)
+    scores = {}
+
+    for book_id, (weight, _) in signals.items():
+        for neighbor_id, similarity in neighbors.get(book_id, ()):
+            if neighbor_id in excluded:
+                continue
+            scores[neighbor_id] = scores.get(neighbor_id, 0.0) + weight * similarity
+
+    return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
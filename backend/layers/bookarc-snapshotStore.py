@@ -0,0 +1,164 @@
+"""
+Snapshot Store for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Shared plumbing for the read-only binary snapshots that batch jobs build
+and request handlers memory-map (prefix_index, follow_snapshot):
+
+- pack_snapshot() / read_header() define the common file layout
+- SnapshotCache keeps one mapped snapshot per container and reloads it
+  from a local path or S3 when a newer copy is published
+
+File layout (native byte order, every section 8-byte aligned):
+    MAGIC (4 bytes) | u32 meta length | meta JSON | sections listed in meta['sections']
+
+meta['sections'] maps each section name to [offset from body start, size].
+
+Usage:
+    from snapshot_store import SnapshotCache, pack_snapshot, read_header
+
+    snapshot = pack_snapshot(MAGIC, FORMAT_VERSION, [('ids', ids.tobytes())], meta)
+    meta, body_start = read_header(buffer, MAGIC, FORMAT_VERSION, 'follow graph snapshot')
+
+    _cache = SnapshotCache('follow snapshot', FollowSnapshot, path, bucket, key, local_copy,
+                           check_interval, 'FOLLOW_SNAPSHOT_PATH', 'FOLLOW_SNAPSHOT_BUCKET')
+    graph = _cache.load()
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+from typing import Callable, Iterable, Optional, Tuple
+
+
+def _align(buffer: bytearray) -> None:
+    buffer.extend(b'\0' * (-len(buffer) % 8))
+
+
+def pack_snapshot(magic: bytes, format_version: int, sections: Iterable[Tuple[str, bytes]],
+                  meta: Optional[dict] = None) -> bytes:
+    """
+    Lay out named byte sections behind a MAGIC + JSON meta header
+
+    Returns:
+        The snapshot bytes, ready to upload
+    """
+    body = bytearray()
+    offsets = {}
+    for name, data in sections:
+        _align(body)
+        offsets[name] = [len(body), len(data)]
+        body.extend(data)
+
+    header = dict(meta or {})
+    header.update({
+        'format_version': format_version,
+        'byteorder': sys.byteorder,
+        'sections': offsets,
+    })
+    meta_bytes = bytearray(json.dumps(header).encode())
+    # Keep the body 8-byte aligned relative to the start of the file
+    meta_bytes.extend(b' ' * (-(len(magic) + 4 + len(meta_bytes)) % 8))
+
+    return b''.join([magic, len(meta_bytes).to_bytes(4, sys.byteorder), bytes(meta_bytes), bytes(body)])
+
+
+def read_header(buffer, magic: bytes, format_version: int, description: str) -> Tuple[dict, int]:
+    """
+    Validate a snapshot header
+
+    Returns:
+        (meta, offset of the body in the buffer)
+
+    Raises:
+        ValueError: Wrong magic, format version or byte order
+    """
+    view = memoryview(buffer)
+    if bytes(view[:len(magic)]) != magic:
+        raise ValueError(f'Not a {description}')
+    meta_len = int.from_bytes(view[len(magic):len(magic) + 4], sys.byteorder)
+    body_start = len(magic) + 4 + meta_len
+    meta = json.loads(bytes(view[len(magic) + 4:body_start]))
+    if meta['format_version'] != format_version or meta['byteorder'] != sys.byteorder:
+        raise ValueError(f"Unsupported snapshot format {meta['format_version']}/{meta['byteorder']}")
+    return meta, body_start
+
+
+def map_file(path: str) -> mmap.mmap:
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SnapshotCache:
+    """
+    The container's copy of one published snapshot
+
+    Reads `path` when set (local file or a layer under /opt), otherwise
+    s3://bucket/key, downloaded to `local_copy`. A warm container checks
+    for a newer version at most every `check_interval` seconds.
+    """
+
+    def __init__(self, description: str, open_snapshot: Callable, path: str, bucket: str, key: str,
+                 local_copy: str, check_interval: int, path_variable: str, bucket_variable: str):
+        self.description = description
+        self.open_snapshot = open_snapshot
+        self.path = path
+        self.bucket = bucket
+        self.key = key
+        self.local_copy = local_copy
+        self.check_interval = check_interval
+        self.path_variable = path_variable
+        self.bucket_variable = bucket_variable
+        self.snapshot = None
+        self.version = None
+        self.checked_at = 0.0
+
+    def _refresh_from_s3(self) -> None:
+        import boto3
+
+        s3 = boto3.client('s3')
+        head = s3.head_object(Bucket=self.bucket, Key=self.key)
+        version = head['ETag']
+        if version == self.version:
+            return
+        print(f"Downloading {self.description} s3://{self.bucket}/{self.key} ({head['ContentLength']} bytes)")
+        # Download beside the live copy so the mapped file is never rewritten in place
+        tmp_path = f"{self.local_copy}.{int(time.time())}"
+        s3.download_file(self.bucket, self.key, tmp_path)
+        os.replace(tmp_path, self.local_copy)
+        self.snapshot = self.open_snapshot(map_file(self.local_copy))
+        self.version = version
+
+    def _refresh_from_path(self) -> None:
+        version = os.stat(self.path).st_mtime_ns
+        if version == self.version:
+            return
+        self.snapshot = self.open_snapshot(map_file(self.path))
+        self.version = version
+
+    def load(self, force: bool = False):
+        """
+        Get the snapshot, reloading when a newer one exists
+
+        Returns:
+            The opened snapshot, or None when none has been built yet
+        """
+        now = time.monotonic()
+        if not force and self.snapshot is not None and now - self.checked_at < self.check_interval:
+            return self.snapshot
+
+        try:
+            if self.path:
+                self._refresh_from_path()
+            elif self.bucket:
+                self._refresh_from_s3()
+            else:
+                print(f"⚠️ Neither {self.path_variable} nor {self.bucket_variable} is set")
+        except Exception as e:
+            # Keep serving the snapshot we have; retry after the next interval
+            print(f"⚠️ Could not refresh {self.description}: {str(e)}")
+
+        self.checked_at = now
+        return self.snapshot
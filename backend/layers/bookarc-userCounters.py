@@ -0,0 +1,314 @@
+"""
+User Counters Service for BookArc
+Add this as a Lambda Layer and import in your Lambda functions
+
+Maintains the user_counters row (followers, following, authors followed,
+reviews, ratings, books read and unread notifications per user) and the
+author_counters row (followers per author) incrementally, so profile,
+search and follower list reads join one row instead of running five COUNT()
+subqueries per returned user, and the notification inbox reads its unread
+badge without counting.
+
+Every write here is an upsert of deltas, so a missing user_counters row is
+created on first use. Call these inside the same transaction as the
+follow/review/rating write they describe; the caller commits.
+"""
+
+from typing import Dict, List, Optional
+
+COUNTER_COLUMNS = ['followers', 'following', 'total_reviews', 'total_ratings', 'books_read',
+                   'unread_notifications', 'following_authors']
+
+# Select-list fragment for read paths: LEFT JOIN user_counters uc ON uc.user_id = u.user_id
+COUNTER_SELECT = """
+    COALESCE(uc.total_reviews, 0) as totalReviews,
+    COALESCE(uc.total_ratings, 0) as totalRatings,
+    COALESCE(uc.books_read, 0) as booksRead,
+    COALESCE(uc.followers, 0) as followers,
+    COALESCE(uc.following, 0) as following"""
+
+# Recomputed counters per user, used by rebuild and verify
+_RECOMPUTE_SQL = """
+    SELECT
+        u.user_id,
+        COALESCE(fr.followers, 0) AS followers,
+        COALESCE(fg.following, 0) AS following,
+        COALESCE(rv.total_reviews, 0) AS total_reviews,
+        COALESCE(rt.total_ratings, 0) AS total_ratings,
+        COALESCE(rs.books_read, 0) AS books_read,
+        COALESCE(un.unread_notifications, 0) AS unread_notifications,
+        COALESCE(fa.following_authors, 0) AS following_authors
+    FROM users u
+    LEFT JOIN (
+        SELECT following_id AS user_id, COUNT(*) AS followers
+        FROM user_follow_user
+        GROUP BY following_id
+    ) fr ON fr.user_id = u.user_id
+    LEFT JOIN (
+        SELECT follower_id AS user_id, COUNT(*) AS following
+        FROM user_follow_user
+        GROUP BY follower_id
+    ) fg ON fg.user_id = u.user_id
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS total_reviews
+        FROM reviews
+        GROUP BY user_id
+    ) rv ON rv.user_id = u.user_id
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS total_ratings
+        FROM ratings
+        GROUP BY user_id
+    ) rt ON rt.user_id = u.user_id
+    LEFT JOIN (
+        SELECT user_id, COUNT(DISTINCT book_id) AS books_read
+        FROM user_reading_status
+        WHERE status = 'completed'
+        GROUP BY user_id
+    ) rs ON rs.user_id = u.user_id
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS unread_notifications
+        FROM notifications
+        WHERE is_read = FALSE
+        GROUP BY user_id
+    ) un ON un.user_id = u.user_id
+    LEFT JOIN (
+        SELECT user_id, COUNT(*) AS following_authors
+        FROM user_follow_author
+        GROUP BY user_id
+    ) fa ON fa.user_id = u.user_id
+"""
+
+# Recomputed follower count per author, used by rebuild and verify
+_RECOMPUTE_AUTHOR_SQL = """
+    SELECT a.author_id, COUNT(ufa.user_id) AS followers
+    FROM authors a
+    LEFT JOIN user_follow_author ufa ON ufa.author_id = a.author_id
+"""
+
+
+def apply_counter_deltas(cursor, deltas: Dict[int, Dict[str, int]]) -> None:
+    """
+    Add {user_id: {column: delta}} to the counters in one statement
+
+    Unknown columns raise KeyError; all-zero entries are skipped.
+    """
+    rows = []
+    for user_id, changes in deltas.items():
+        values = [int(changes.get(column, 0)) for column in COUNTER_COLUMNS]
+        unknown = set(changes) - set(COUNTER_COLUMNS)
+        if unknown:
+            raise KeyError(f"Unknown user counters: {', '.join(sorted(unknown))}")
+        if any(values):
+            rows.append((user_id, *values))
+    if not rows:
+        return
+
+    row_placeholder = '(' + ', '.join(['%s'] * (len(COUNTER_COLUMNS) + 1)) + ')'
+    placeholders = ', '.join([row_placeholder] * len(rows))
+    updates = ',\n            '.join(f"{c} = {c} + VALUES({c})" for c in COUNTER_COLUMNS)
+    cursor.execute(f"""
+        INSERT INTO user_counters
+        (user_id, {', '.join(COUNTER_COLUMNS)})
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE
+            {updates}
+    """, [value for row in rows for value in row])
+
+
+def record_follow_change(cursor, follower_id: int, following_id: int, delta: int) -> None:
+    """Record follow (+1) or unfollow (-1) between two users"""
+    if not delta:
+        return
+    apply_counter_deltas(cursor, {
+        follower_id: {'following': delta},
+        following_id: {'followers': delta},
+    })
+
+
+def record_author_follow_change(cursor, user_id: int, author_id: int, delta: int) -> None:
+    """Record a user following (+1) or unfollowing (-1) an author"""
+    if not delta:
+        return
+    apply_counter_deltas(cursor, {user_id: {'following_authors': delta}})
+    cursor.execute("""
+        INSERT INTO author_counters (author_id, followers)
+        VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE followers = followers + VALUES(followers)
+    """, (author_id, delta))
+
+
+def get_author_follower_counts(cursor, author_ids: List[int]) -> Dict[int, int]:
+    """{author_id: followers} for the given authors (0 when no row exists)"""
+    if not author_ids:
+        return {}
+    cursor.execute(f"""
+        SELECT author_id, followers
+        FROM author_counters
+        WHERE author_id IN ({', '.join(['%s'] * len(author_ids))})
+    """, list(author_ids))
+    counts = {author_id: 0 for author_id in author_ids}
+    for row in cursor.fetchall():
+        if not isinstance(row, dict):
+            row = {'author_id': row[0], 'followers': row[1]}
+        counts[row['author_id']] = max(int(row['followers']), 0)
+    return counts
+
+
+def record_activity_change(
+    cursor,
+    user_id: int,
+    reviews: int = 0,
+    ratings: int = 0,
+    books_read: int = 0
+) -> None:
+    """Record review/rating/completed-book inserts (+n) or deletes (-n) by a user"""
+    apply_counter_deltas(cursor, {
+        user_id: {'total_reviews': reviews, 'total_ratings': ratings, 'books_read': books_read}
+    })
+
+
+def record_unread_change(cursor, deltas: Dict[int, int]) -> None:
+    """
+    Record notifications created (+n) or read/deleted while unread (-n)
+
+    Args:
+        deltas: {user_id: delta}
+    """
+    apply_counter_deltas(cursor, {
+        user_id: {'unread_notifications': delta} for user_id, delta in deltas.items()
+    })
+
+
+def get_unread_count(cursor, user_id: int) -> int:
+    """Read a user's unread notification counter (0 when no row exists)"""
+    cursor.execute(
+        "SELECT unread_notifications FROM user_counters WHERE user_id = %s",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return 0
+    value = row['unread_notifications'] if isinstance(row, dict) else row[0]
+    # Concurrent read/delete races can briefly undershoot; never show a negative badge
+    return max(int(value), 0)
+
+
+def remove_user_follows(cursor, user_id: int) -> None:
+    """
+    Take a user's follow edges out of everyone else's counters
+
+    Must run BEFORE the user (and its cascading follow rows) is deleted.
+    """
+    cursor.execute("""
+        INSERT INTO user_counters (user_id, followers)
+        SELECT following_id, -COUNT(*)
+        FROM user_follow_user
+        WHERE follower_id = %s AND following_id <> %s
+        GROUP BY following_id
+        ON DUPLICATE KEY UPDATE followers = followers + VALUES(followers)
+    """, (user_id, user_id))
+
+    cursor.execute("""
+        INSERT INTO user_counters (user_id, following)
+        SELECT follower_id, -COUNT(*)
+        FROM user_follow_user
+        WHERE following_id = %s AND follower_id <> %s
+        GROUP BY follower_id
+        ON DUPLICATE KEY UPDATE following = following + VALUES(following)
+    """, (user_id, user_id))
+
+    cursor.execute("""
+        INSERT INTO author_counters (author_id, followers)
+        SELECT author_id, -COUNT(*)
+        FROM user_follow_author
+        WHERE user_id = %s
+        GROUP BY author_id
+        ON DUPLICATE KEY UPDATE followers = followers + VALUES(followers)
+    """, (user_id,))
+
+
+def rebuild_user_counters(cursor, user_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute user_counters from the source tables (all users or the given ids)
+
+    Returns the number of users rebuilt.
+    """
+    sql = _RECOMPUTE_SQL
+    params = []
+    if user_ids is not None:
+        if not user_ids:
+            return 0
+        sql += f" WHERE u.user_id IN ({', '.join(['%s'] * len(user_ids))})"
+        params = list(user_ids)
+
+    updates = ',\n            '.join(f"{c} = VALUES({c})" for c in COUNTER_COLUMNS)
+    cursor.execute(f"""
+        INSERT INTO user_counters
+        (user_id, {', '.join(COUNTER_COLUMNS)})
+        SELECT * FROM ({sql}) recomputed
+        ON DUPLICATE KEY UPDATE
+            {updates}
+    """, params or None)
+
+    if user_ids is not None:
+        return len(user_ids)
+    cursor.execute("SELECT COUNT(*) AS rebuilt FROM users")
+    row = cursor.fetchone()
+    return row['rebuilt'] if isinstance(row, dict) else row[0]
+
+
+def find_drifted_users(cursor, limit: int = 1000) -> List[int]:
+    """Return ids of users whose stored counters differ from a recount"""
+    mismatch = ' OR '.join(f"NOT (s.{col} <=> c.{col})" for col in COUNTER_COLUMNS)
+    cursor.execute(f"""
+        SELECT c.user_id
+        FROM ({_RECOMPUTE_SQL}) c
+        LEFT JOIN user_counters s ON s.user_id = c.user_id
+        WHERE {mismatch}
+        ORDER BY c.user_id
+        LIMIT %s
+    """, (limit,))
+    rows = cursor.fetchall()
+    return [row['user_id'] if isinstance(row, dict) else row[0] for row in rows]
+
+
+def rebuild_author_counters(cursor, author_ids: Optional[List[int]] = None) -> int:
+    """
+    Recompute author_counters from user_follow_author (all authors or the given ids)
+
+    Returns the number of authors rebuilt.
+    """
+    sql = _RECOMPUTE_AUTHOR_SQL
+    params = []
+    if author_ids is not None:
+        if not author_ids:
+            return 0
+        sql += f" WHERE a.author_id IN ({', '.join(['%s'] * len(author_ids))})"
+        params = list(author_ids)
+    sql += " GROUP BY a.author_id"
+
+    cursor.execute(f"""
+        INSERT INTO author_counters (author_id, followers)
+        SELECT * FROM ({sql}) recomputed
+        ON DUPLICATE KEY UPDATE followers = VALUES(followers)
+    """, params or None)
+
+    if author_ids is not None:
+        return len(author_ids)
+    cursor.execute("SELECT COUNT(*) AS rebuilt FROM authors")
+    row = cursor.fetchone()
+    return row['rebuilt'] if isinstance(row, dict) else row[0]
+
+
+def find_drifted_authors(cursor, limit: int = 1000) -> List[int]:
+    """Return ids of authors whose stored follower count differs from a recount"""
+    cursor.execute(f"""
+        SELECT c.author_id
+        FROM ({_RECOMPUTE_AUTHOR_SQL} GROUP BY a.author_id) c
+        LEFT JOIN author_counters s ON s.author_id = c.author_id
+        WHERE NOT (s.followers <=> c.followers)
+        ORDER BY c.author_id
+        LIMIT %s
+    """, (limit,))
+    rows = cursor.fetchall()
+    return [row['author_id'] if isinstance(row, dict) else row[0] for row in rows]
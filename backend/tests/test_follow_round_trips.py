@@ -0,0 +1,157 @@
+"""
+followUser and followAuthorHandler must change a follow edge in fewer
+round trips than before f42156e (single idempotent INSERT IGNORE / DELETE,
+notification deferred to the outbox)
+
+Both revisions run against the same recording connection, so no database
+is needed. The earlier handlers are read from git history and run against
+the current layers, so only the handler changes are measured.
+"""
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import bench_common  # noqa: E402
+
+BEFORE = 'f42156e~1'
+
+FOLLOWER_ID = 1
+TARGET_USER_ID = 2
+AUTHOR_ID = 7
+
+
+class FakeDatabase:
+    """One follow edge, plus the rows the handlers look up"""
+
+    def __init__(self):
+        self.following = False
+        self.round_trips = []
+
+
+class RecordingCursor:
+    """Records every statement and answers it from FakeDatabase"""
+
+    def __init__(self, db):
+        self.db = db
+        self.rowcount = 0
+        self._rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, args=None):
+        sql = ' '.join(query.split())
+        self.db.round_trips.append(sql)
+        self.rowcount = 1
+        self._rows = []
+        if 'WHERE cognito_sub' in sql:
+            self._rows = [{'user_id': FOLLOWER_ID, 'username': 'reader', 'display_name': 'Reader',
+                           'role': 'user', 'is_active': 1}]
+        elif sql.startswith('SELECT') and 'FROM users WHERE user_id' in sql:
+            self._rows = [{'user_id': TARGET_USER_ID, 'username': 'writer', 'role': 'user', 'is_active': 1}]
+        elif sql.startswith('SELECT') and 'FROM authors' in sql:
+            self._rows = [{'author_id': AUTHOR_ID, 'name': 'Author', 'is_registered_author': 0,
+                           'user_id': None, 'average_rating': 0}]
+        elif sql.startswith('SELECT * FROM user_follow_'):
+            self._rows = [{'follower_id': FOLLOWER_ID}] if self.db.following else []
+        elif 'INTO user_follow_' in sql:
+            self.rowcount = 0 if self.db.following else 1
+            self.db.following = True
+        elif sql.startswith('DELETE FROM user_follow_'):
+            self.rowcount = 1 if self.db.following else 0
+            self.db.following = False
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+class RecordingConnection:
+
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *args, **kwargs):
+        return RecordingCursor(self.db)
+
+    def commit(self):
+        self.db.round_trips.append('COMMIT')
+
+    def rollback(self):
+        self.db.round_trips.append('ROLLBACK')
+
+
+def git_show(revision, path):
+    try:
+        return subprocess.run(
+            ['git', 'show', f'{revision}:{path}'], cwd=bench_common.BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        pytest.skip(f'{revision} is not available in this checkout')
+
+
+def load_revision(name, revision, tmp_path):
+    """Load a handler as of revision, or the working tree when revision is None"""
+    if revision is None:
+        return bench_common.load_handler(name)
+    bench_common.load_layers()
+    path = tmp_path / f'bookarc-{name}.py'
+    path.write_text(git_show(revision, f'backend/lambda-functions/bookarc-{name}.py'))
+    return bench_common._load_file(f'bench_handler_{name}_before', str(path))
+
+
+def follow_user_event(action):
+    return {
+        'httpMethod': 'POST',
+        'path': f'/users/{TARGET_USER_ID}/follow',
+        'pathParameters': {'user_id': str(TARGET_USER_ID)},
+        'requestContext': {'authorizer': {'claims': {'sub': 'reader-sub'}}},
+        'body': json.dumps({'action': action}),
+    }
+
+
+def follow_author_event(action):
+    return {
+        'httpMethod': 'POST',
+        'path': f'/authors/{AUTHOR_ID}/follow',
+        'pathParameters': {'author_id': str(AUTHOR_ID)},
+        'requestContext': {'authorizer': {'claims': {'sub': 'reader-sub'}}},
+        'body': json.dumps({'action': action}),
+    }
+
+
+def count_round_trips(monkeypatch, handler, make_event):
+    """Round trips (statements and commits) of a follow, then an unfollow"""
+    db = FakeDatabase()
+    monkeypatch.setattr(handler, 'acquire_connection', lambda **kwargs: RecordingConnection(db))
+    monkeypatch.setattr(handler, 'release_connection', lambda connection: None)
+
+    counts = {}
+    for action in ('follow', 'unfollow'):
+        db.round_trips = []
+        response = handler.lambda_handler(make_event(action), None)
+        assert response['statusCode'] == 200, response['body']
+        counts[action] = len(db.round_trips)
+    assert not db.following
+    return counts
+
+
+@pytest.mark.parametrize('name, make_event, before, after', [
+    ('followUser', follow_user_event, {'follow': 9, 'unfollow': 5}, {'follow': 5, 'unfollow': 4}),
+    ('followAuthorHandler', follow_author_event, {'follow': 7, 'unfollow': 7}, {'follow': 5, 'unfollow': 5}),
+])
+def test_follow_toggle_needs_fewer_round_trips(monkeypatch, tmp_path, name, make_event, before, after):
+    assert count_round_trips(monkeypatch, load_revision(name, BEFORE, tmp_path), make_event) == before
+    assert count_round_trips(monkeypatch, load_revision(name, None, tmp_path), make_event) == after
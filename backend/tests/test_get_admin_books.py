@@ -0,0 +1,67 @@
+"""
+getAdminBooks must fetch authors/genres for a page with a fixed number of
+queries, whatever the page size
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+import bench_common  # noqa: E402
+
+get_admin_books = bench_common.load_handler('getAdminBooks')
+
+
+class FakeCursor:
+    """Answers the batched author/genre lookups from in-memory rows"""
+
+    def __init__(self, authors, genres):
+        self.authors = authors
+        self.genres = genres
+        self.executed = []
+        self._rows = []
+
+    def execute(self, query, args=None):
+        self.executed.append(query)
+        ids = set(args or [])
+        if 'FROM book_author' in query:
+            self._rows = [{'book_id': b, 'name': n} for b, n in self.authors if b in ids]
+        elif 'FROM book_genre' in query:
+            self._rows = [{'book_id': b, 'genre_name': g} for b, g in self.genres if b in ids]
+        else:
+            raise AssertionError(f"unexpected query: {query}")
+
+    def fetchall(self):
+        return self._rows
+
+
+def attach(page_size):
+    books = [{'book_id': book_id} for book_id in range(1, page_size + 1)]
+    authors = [(book_id, f'Author {book_id}') for book_id in range(1, page_size + 1)]
+    genres = [(book_id, 'Fantasy') for book_id in range(1, page_size + 1, 2)]
+    cursor = FakeCursor(authors, genres)
+    get_admin_books.attach_related_names(cursor, books)
+    return cursor, books
+
+
+def test_query_count_does_not_grow_with_page_size():
+    small, _ = attach(1)
+    large, _ = attach(get_admin_books.MAX_PAGE_SIZE)
+
+    assert len(small.executed) == 2
+    assert len(large.executed) == len(small.executed)
+
+
+def test_names_are_attached_per_book():
+    _, books = attach(3)
+
+    assert [book['authors'] for book in books] == ['Author 1', 'Author 2', 'Author 3']
+    assert [book['genres'] for book in books] == ['Fantasy', 'N/A', 'Fantasy']
+
+
+def test_empty_page_runs_no_queries():
+    cursor = FakeCursor([], [])
+    get_admin_books.attach_related_names(cursor, [])
+
+    assert cursor.executed == []
@@ -55,6 +55,11 @@ export function FollowersModal({
   const [following, setFollowing] = useState<UserItem[]>([]);
   const [isLoadingFollowers, setIsLoadingFollowers] = useState(false);
   const [isLoadingFollowing, setIsLoadingFollowing] = useState(false);
+  // Keyset paging: next_cursor of the last loaded page, null when done
+  const [followersCursor, setFollowersCursor] = useState<string | null>(null);
+  const [followingCursor, setFollowingCursor] = useState<string | null>(null);
+  const [followersTotal, setFollowersTotal] = useState(0);
+  const [followingTotal, setFollowingTotal] = useState(0);
 
   // Reset to default tab when modal opens
   useEffect(() => {
@@ -77,15 +82,19 @@ export function FollowersModal({
     }
   }, [isOpen, activeTab, userId]);
 
-  const loadFollowers = async () => {
-    if (isLoadingFollowers || followers.length > 0) return;
+  const loadFollowers = async (loadMore = false) => {
+    if (isLoadingFollowers || (!loadMore && followers.length > 0)) return;
     
     setIsLoadingFollowers(true);
     try {
       console.log(`🔍 Loading followers for user ${userId}`);
-      const result = await apiService.getUserFollowers(userId);
+      const result = await apiService.getUserFollowers(userId, {
+        cursor: loadMore ? followersCursor ?? undefined : undefined,
+      });
       console.log(`✅ Loaded ${result.followers.length} followers:`, result);
-      setFollowers(result.followers);
+      setFollowers(prev => (loadMore ? [...prev, ...result.followers] : result.followers));
+      setFollowersCursor(result.next_cursor);
+      setFollowersTotal(result.total);
     } catch (error: any) {
       console.error("Error loading followers:", error);
       toast.error(error.message || "Failed to load followers");
@@ -95,15 +104,19 @@ export function FollowersModal({
     }
   };
 
-  const loadFollowing = async () => {
-    if (isLoadingFollowing || following.length > 0) return;
+  const loadFollowing = async (loadMore = false) => {
+    if (isLoadingFollowing || (!loadMore && following.length > 0)) return;
     
     setIsLoadingFollowing(true);
     try {
       console.log(`🔍 Loading following for user ${userId}`);
-      const result = await apiService.getUserFollowing(userId);
+      const result = await apiService.getUserFollowing(userId, {
+        cursor: loadMore ? followingCursor ?? undefined : undefined,
+      });
       console.log(`✅ Loaded ${result.following.length} following users:`, result);
-      setFollowing(result.following);
+      setFollowing(prev => (loadMore ? [...prev, ...result.following] : result.following));
+      setFollowingCursor(result.next_cursor);
+      setFollowingTotal(result.total);
     } catch (error: any) {
       console.error("Error loading following:", error);
       toast.error(error.message || "Failed to load following");
@@ -117,6 +130,8 @@ export function FollowersModal({
   const handleClose = () => {
     setFollowers([]);
     setFollowing([]);
+    setFollowersCursor(null);
+    setFollowingCursor(null);
     onClose();
   };
 
@@ -254,22 +269,36 @@ const handleUserClick = (clickedUserId: number, itemType?: string, userRole?: st
         <Tabs value={activeTab} onValueChange={(v) => setActiveTab(v as "followers" | "following")}>
           <TabsList className="grid w-full grid-cols-2">
             <TabsTrigger value="followers">
-              Followers ({followers.length})
+              Followers ({Math.max(followersTotal, followers.length)})
             </TabsTrigger>
             <TabsTrigger value="following">
-              Following ({following.length})
+              Following ({Math.max(followingTotal, following.length)})
             </TabsTrigger>
           </TabsList>
 
           <TabsContent value="followers" className="mt-4">
             <ScrollArea className="h-[400px] pr-4">
-              {renderUserList(followers, isLoadingFollowers, "followers")}
+              {renderUserList(followers, isLoadingFollowers && followers.length === 0, "followers")}
+              {followersCursor && followers.length > 0 && (
+                <div className="flex justify-center py-3">
+                  <Button variant="outline" size="sm" disabled={isLoadingFollowers} onClick={() => loadFollowers(true)}>
+                    {isLoadingFollowers ? <Loader2 className="w-4 h-4 animate-spin" /> : "Load more"}
+                  </Button>
+                </div>
+              )}
             </ScrollArea>
           </TabsContent>
 
           <TabsContent value="following" className="mt-4">
             <ScrollArea className="h-[400px] pr-4">
-              {renderUserList(following, isLoadingFollowing, "following")}
+              {renderUserList(following, isLoadingFollowing && following.length === 0, "following")}
+              {followingCursor && following.length > 0 && (
+                <div className="flex justify-center py-3">
+                  <Button variant="outline" size="sm" disabled={isLoadingFollowing} onClick={() => loadFollowing(true)}>
+                    {isLoadingFollowing ? <Loader2 className="w-4 h-4 animate-spin" /> : "Load more"}
+                  </Button>
+                </div>
+              )}
             </ScrollArea>
           </TabsContent>
         </Tabs>
@@ -1040,10 +1040,10 @@ useEffect(() => {
                             key={book.book_id}
                             className="group cursor-pointer"
                             onClick={() => {
-                              apiService.recordInteraction({
+                              apiService.queueInteraction({
                                 book_id: book.book_id,
                                 event_type: 'view'
-                              }).catch(err => console.error('Failed to record interaction:', err));
+                              });
                               
                               if (onViewBookDetails) {
                                 onViewBookDetails(book.book_id);
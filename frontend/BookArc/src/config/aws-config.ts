@@ -51,6 +51,9 @@ export const awsConfig = {
       // Author search and profile endpoints (using /author)
       searchAuthors: '/author',      // GET /author?q=search
       authorProfile: '/author',       // GET /author/{user_id}
+
+      // Typeahead across books, authors and users
+      autocomplete: '/autocomplete',  // GET /autocomplete?q=prefix
       
       // Author verification endpoints
       submitAuthorVerification: '/author/verification',
@@ -65,11 +68,16 @@ export const awsConfig = {
       markNotificationRead: '/notifications',
       deleteNotification: '/notifications',
       markAllNotificationsRead: '/notifications/mark-all-read',
+      bulkMarkNotificationsRead: '/notifications/bulk-read',
+      bulkDeleteNotifications: '/notifications/bulk-delete',
       notificationPreferences: '/notifications/preferences',
 
       followAuthor: '/authors',        // POST /authors/{author_id}/follow
       checkAuthorFollow: '/authors',   // GET /authors/{author_id}/follow-status
+      batchFollowStatus: '/follow-status',   // GET /follow-status?userIds=..&authorIds=..
       getAuthorFollowers: '/authors',  // GET /authors/{author_id}/followers
+      followsBack: '/social/follows-back',   // GET /social/follows-back
+      followSuggestions: '/social/suggestions',  // GET /social/suggestions
     }
   },
   
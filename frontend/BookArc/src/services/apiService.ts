@@ -3,7 +3,45 @@
 import { awsConfig, getApiUrl } from '../config/aws-config';
 import { authService } from './authService';
 
+export interface InteractionEvent {
+  book_id: number;
+  event_type: 'view' | 'rate' | 'review' | 'add_to_list' | 'complete';
+  event_value?: number;
+  event_id?: string;
+  client_timestamp?: number;
+}
+
+export interface SocialConnectionUser {
+  id: number;
+  username: string;
+  role: string;
+  avatarUrl: string;
+  bio: string;
+  isPrivate: boolean;
+  stats: {
+    totalReviews: number;
+    booksRead: number;
+    followers: number;
+  };
+}
+
+export interface SocialConnectionsPage {
+  users: SocialConnectionUser[];
+  total: number;
+  limit: number;
+  has_more: boolean;
+  next_cursor: string | null;
+  snapshotBuiltAt: string | null;
+}
+
+const INTERACTION_BATCH_SIZE = 100;
+const INTERACTION_FLUSH_DELAY_MS = 5000;
+
 class ApiService {
+  private interactionQueue: InteractionEvent[] = [];
+  private interactionFlushTimer: ReturnType<typeof setTimeout> | null = null;
+  private interactionListenerAttached = false;
+
   // Helper method to make authenticated requests
     private getIdToken(): string | null {
     return authService.getIdToken();
@@ -120,8 +158,54 @@ async getUserProfile(): Promise<{
     });
   }
 
+  // Ranked server-side search (GET /books/search)
+  async searchBooks(params: {
+    q: string;
+    genre?: string;
+    year?: number;
+    min_rating?: number;
+    limit?: number;
+    cursor?: string;
+  }): Promise<{
+    query: string;
+    books: Array<{
+      id: number;
+      title: string;
+      author: string;
+      rating: number;
+      totalRatings: number;
+      reviews: number;
+      cover: string;
+      coverUrl: string;
+      genre: string;
+      description: string;
+      publishYear: number;
+      score: number;
+      highlights: Record<'title' | 'author' | 'description', Array<[number, number]>>;
+    }>;
+    next_cursor: string | null;
+    limit: number;
+  }> {
+    const queryString = new URLSearchParams(
+      Object.entries(params).reduce((acc, [key, value]) => {
+        if (value !== undefined) {
+          acc[key] = String(value);
+        }
+        return acc;
+      }, {} as Record<string, string>)
+    ).toString();
+
+    return this.makeRequest(`${awsConfig.api.endpoints.books}/search?${queryString}`, {
+      method: 'GET',
+    });
+  }
+
   // USER STATS & PROFILE PICTURE
-async getUserStats(): Promise<{
+async getUserStats(params?: {
+  include?: Array<'stats' | 'author_ratings' | 'book_ratings' | 'author_reviews' | 'book_reviews'>;
+  limit?: number;
+  cursors?: Partial<Record<'author_ratings' | 'book_ratings' | 'author_reviews' | 'book_reviews', string>>;
+}): Promise<{
   user_id: number;
   total_book_reviews: number;
   total_author_reviews: number;
@@ -165,8 +249,17 @@ async getUserStats(): Promise<{
     created_at: string;
     updated_at: string;
   }>;
+  next_cursors?: Partial<Record<'author_ratings' | 'book_ratings' | 'author_reviews' | 'book_reviews', string | null>>;
 }> {
-  return this.makeRequest(awsConfig.api.endpoints.userStats, {
+  const query = new URLSearchParams();
+  if (params?.include) query.set('include', params.include.join(','));
+  if (params?.limit) query.set('limit', String(params.limit));
+  Object.entries(params?.cursors || {}).forEach(([section, cursor]) => {
+    if (cursor) query.set(`${section}_cursor`, cursor);
+  });
+  const queryString = query.toString() ? `?${query.toString()}` : '';
+
+  return this.makeRequest(`${awsConfig.api.endpoints.userStats}${queryString}`, {
     method: 'GET',
   });
 }
@@ -560,6 +653,7 @@ async getUserById(userId: number): Promise<{
     message: string; 
     followerId: number; 
     followingId: number;
+    changed: boolean;
   }> {
     const endpoint = `${awsConfig.api.endpoints.users}/${userId}/follow`;
     
@@ -576,6 +670,7 @@ async getUserById(userId: number): Promise<{
     message: string; 
     followerId: number; 
     followingId: number;
+    changed: boolean;
   }> {
     const endpoint = `${awsConfig.api.endpoints.users}/${userId}/follow`;
     
@@ -585,7 +680,10 @@ async getUserById(userId: number): Promise<{
     });
   }
 
-async getUserFollowers(userId: number): Promise<{
+async getUserFollowers(
+  userId: number,
+  options: { cursor?: string; limit?: number; includeFollowStatus?: boolean } = {}
+): Promise<{
   followers: Array<{
     id: number;
     username: string;
@@ -597,10 +695,19 @@ async getUserFollowers(userId: number): Promise<{
       totalReviews: number;
       booksRead: number;
     };
+    isFollowing?: boolean;
   }>;
   total: number;
+  limit: number;
+  has_more: boolean;
+  next_cursor: string | null;
 }> {
-  const endpoint = `${awsConfig.api.endpoints.users}/${userId}/followers`;
+  const params = new URLSearchParams();
+  if (options.cursor) params.append('cursor', options.cursor);
+  if (options.limit) params.append('limit', String(options.limit));
+  if (options.includeFollowStatus) params.append('includeFollowStatus', 'true');
+  const query = params.toString() ? `?${params.toString()}` : '';
+  const endpoint = `${awsConfig.api.endpoints.users}/${userId}/followers${query}`;
   
   // âœ… Use makePublicRequest to allow viewing public follower lists
   return this.makePublicRequest(endpoint, {
@@ -608,7 +715,10 @@ async getUserFollowers(userId: number): Promise<{
   });
 }
 
-async getUserFollowing(userId: number): Promise<{
+async getUserFollowing(
+  userId: number,
+  options: { cursor?: string; limit?: number; includeFollowStatus?: boolean } = {}
+): Promise<{
   following: Array<{
     id: number;
     username: string;
@@ -620,10 +730,19 @@ async getUserFollowing(userId: number): Promise<{
       totalReviews: number;
       booksRead: number;
     };
+    isFollowing?: boolean;
   }>;
   total: number;
+  limit: number;
+  has_more: boolean;
+  next_cursor: string | null;
 }> {
-  const endpoint = `${awsConfig.api.endpoints.users}/${userId}/following`;
+  const params = new URLSearchParams();
+  if (options.cursor) params.append('cursor', options.cursor);
+  if (options.limit) params.append('limit', String(options.limit));
+  if (options.includeFollowStatus) params.append('includeFollowStatus', 'true');
+  const query = params.toString() ? `?${params.toString()}` : '';
+  const endpoint = `${awsConfig.api.endpoints.users}/${userId}/following${query}`;
   
   // âœ… Use makePublicRequest to allow viewing public following lists
   return this.makePublicRequest(endpoint, {
@@ -631,6 +750,56 @@ async getUserFollowing(userId: number): Promise<{
   });
 }
 
+/**
+ * Follow state of the current user towards up to 200 users and 200 authors
+ */
+async getBatchFollowStatus(userIds: number[], authorIds: number[] = []): Promise<{
+  viewerId: number | null;
+  users: Record<string, boolean>;
+  authors: Record<string, boolean>;
+}> {
+  const params = new URLSearchParams();
+  if (userIds.length) params.append('userIds', userIds.join(','));
+  if (authorIds.length) params.append('authorIds', authorIds.join(','));
+  const endpoint = `${awsConfig.api.endpoints.batchFollowStatus}?${params.toString()}`;
+
+  return this.makePublicRequest(endpoint, {
+    method: 'GET',
+  });
+}
+
+/**
+ * Social graph answers from the periodically rebuilt follow snapshot
+ */
+async getMutualFollowers(
+  userId: number,
+  options: { cursor?: string; limit?: number } = {}
+): Promise<SocialConnectionsPage> {
+  const endpoint = `${awsConfig.api.endpoints.users}/${userId}/mutual-followers${this.socialQuery(options)}`;
+  return this.makeRequest(endpoint, { method: 'GET' });
+}
+
+async getFollowsBack(options: { cursor?: string; limit?: number } = {}): Promise<SocialConnectionsPage> {
+  const endpoint = `${awsConfig.api.endpoints.followsBack}${this.socialQuery(options)}`;
+  return this.makeRequest(endpoint, { method: 'GET' });
+}
+
+async getFollowSuggestions(limit?: number): Promise<{
+  users: Array<SocialConnectionUser & { mutualCount: number }>;
+  limit: number;
+  snapshotBuiltAt: string | null;
+}> {
+  const endpoint = `${awsConfig.api.endpoints.followSuggestions}${this.socialQuery({ limit })}`;
+  return this.makeRequest(endpoint, { method: 'GET' });
+}
+
+private socialQuery(options: { cursor?: string; limit?: number }): string {
+  const params = new URLSearchParams();
+  if (options.cursor) params.append('cursor', options.cursor);
+  if (options.limit) params.append('limit', String(options.limit));
+  return params.toString() ? `?${params.toString()}` : '';
+}
+
 async checkFollowStatus(userId: number): Promise<{
   isFollowing: boolean;
   followerId: number;
@@ -976,6 +1145,68 @@ async getUserFavoriteGenres(): Promise<{
     });
   }
 
+  /**
+   * Record up to 100 interactions in one request
+   * event_id is a client dedup id so a retried batch is not double counted
+   */
+  async recordInteractions(events: InteractionEvent[]): Promise<{
+    message: string;
+    summary: { recorded: number; duplicate: number; invalid: number };
+    results: { index: number; event_id: string | null; status: 'recorded' | 'duplicate' | 'invalid'; error?: string }[];
+  }> {
+    return this.makeRequest(awsConfig.api.endpoints.recordInteraction, {
+      method: 'POST',
+      body: JSON.stringify({ events }),
+      keepalive: true,
+    });
+  }
+
+  /**
+   * Buffer an interaction and send it with the next batch
+   * The buffer flushes after a short delay, when it fills up, or when the page is hidden
+   */
+  queueInteraction(data: Omit<InteractionEvent, 'event_id' | 'client_timestamp'>): void {
+    this.interactionQueue.push({
+      ...data,
+      event_id: `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`,
+      client_timestamp: Date.now(),
+    });
+
+    if (this.interactionQueue.length >= INTERACTION_BATCH_SIZE) {
+      this.flushInteractions();
+    } else if (!this.interactionFlushTimer) {
+      this.interactionFlushTimer = setTimeout(() => this.flushInteractions(), INTERACTION_FLUSH_DELAY_MS);
+    }
+
+    if (!this.interactionListenerAttached && typeof document !== 'undefined') {
+      document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'hidden') {
+          this.flushInteractions();
+        }
+      });
+      this.interactionListenerAttached = true;
+    }
+  }
+
+  flushInteractions(): void {
+    if (this.interactionFlushTimer) {
+      clearTimeout(this.interactionFlushTimer);
+      this.interactionFlushTimer = null;
+    }
+    if (this.interactionQueue.length === 0) {
+      return;
+    }
+
+    const batch = this.interactionQueue.splice(0, INTERACTION_BATCH_SIZE);
+    this.recordInteractions(batch).catch(err => {
+      console.error('Failed to record interactions:', err);
+    });
+
+    if (this.interactionQueue.length > 0) {
+      this.flushInteractions();
+    }
+  }
+
     /**
    * Submit a new book for admin approval (author only)
    */
@@ -1217,6 +1448,31 @@ async searchAuthors(params: {
 }
 
 
+async autocomplete(params: {
+  q: string;
+  limit?: number;
+  types?: Array<'books' | 'authors' | 'users'>;
+}): Promise<{
+  query: string;
+  suggestions: Array<{
+    type: 'book' | 'author' | 'user';
+    id: number;
+    label: string;
+    subtitle: string;
+    authorType?: 'registered' | 'external';
+  }>;
+  index_built_at?: string;
+}> {
+  const query = new URLSearchParams({ q: params.q });
+  if (params.limit) query.set('limit', String(params.limit));
+  if (params.types) query.set('types', params.types.join(','));
+
+  return this.makePublicRequest(`${awsConfig.api.endpoints.autocomplete}?${query.toString()}`, {
+    method: 'GET',
+  });
+}
+
+
 async getAuthorProfile(
   id: number,
   authorType?: 'registered' | 'external'
@@ -1453,11 +1709,14 @@ async getAuthorBookStats(): Promise<{
 // ==================== NOTIFICATION ENDPOINTS ====================
 
 /**
- * Get all notifications for the current user
+ * Get notifications for the current user, newest first.
+ * Pass next_cursor as `cursor` for older pages, or latest_cursor as
+ * `since` to poll only notifications created after it.
  */
 async getNotifications(params?: {
-  page?: number;
   limit?: number;
+  cursor?: string;
+  since?: string;
   is_read?: boolean;
   type?: string;
 }): Promise<{
@@ -1470,10 +1729,11 @@ async getNotifications(params?: {
     is_read: boolean;
     created_at: string;
   }>;
-  total: number;
   unread_count: number;
-  page: number;
-  total_pages: number;
+  limit: number;
+  has_more: boolean;
+  next_cursor: string | null;
+  latest_cursor: string | null;
 }> {
   const queryString = params 
     ? '?' + new URLSearchParams(
@@ -1518,6 +1778,42 @@ async markAllNotificationsAsRead(): Promise<{
   });
 }
 
+/**
+ * Mark many notifications as read: up to 1000 ids, or everything up to
+ * `before` (a cursor from getNotifications, a notification id or an ISO
+ * timestamp).
+ */
+async bulkMarkNotificationsRead(selection: {
+  ids?: number[];
+  before?: string | number;
+}): Promise<{
+  message: string;
+  updated_count: number;
+  unread_count: number;
+}> {
+  return this.makeRequest(awsConfig.api.endpoints.bulkMarkNotificationsRead, {
+    method: 'PATCH',
+    body: JSON.stringify(selection),
+  });
+}
+
+/**
+ * Delete many notifications: up to 1000 ids, or everything up to `before`
+ */
+async bulkDeleteNotifications(selection: {
+  ids?: number[];
+  before?: string | number;
+}): Promise<{
+  message: string;
+  deleted_count: number;
+  unread_count: number;
+}> {
+  return this.makeRequest(awsConfig.api.endpoints.bulkDeleteNotifications, {
+    method: 'POST',
+    body: JSON.stringify(selection),
+  });
+}
+
 /**
  * Delete a notification
  */
@@ -1541,6 +1837,7 @@ async getNotificationPreferences(): Promise<{
   allow_email: boolean;
   allow_author_updates: boolean;
   allow_premium_offers: boolean;
+  digest_mode: 'off' | 'hourly';
 }> {
   return this.makeRequest(awsConfig.api.endpoints.notificationPreferences, {
     method: 'GET',
@@ -1554,6 +1851,7 @@ async updateNotificationPreferences(data: {
   allow_email?: boolean;
   allow_author_updates?: boolean;
   allow_premium_offers?: boolean;
+  digest_mode?: 'off' | 'hourly';
 }): Promise<{
   message: string;
   preferences: {
@@ -1562,6 +1860,7 @@ async updateNotificationPreferences(data: {
     allow_email: boolean;
     allow_author_updates: boolean;
     allow_premium_offers: boolean;
+    digest_mode: 'off' | 'hourly';
   };
 }> {
   return this.makeRequest(awsConfig.api.endpoints.notificationPreferences, {
@@ -1830,7 +2129,7 @@ async followAuthor(
   message: string; 
   userId: number; 
   authorId: number;
-  authorType: string;
+  changed: boolean;
 }> {
   const endpoint = `/authors/${authorId}/follow`;  // âœ… Using /authors/{author_id}/follow
   
@@ -1853,6 +2152,7 @@ async unfollowAuthor(
   message: string; 
   userId: number; 
   authorId: number;
+  changed: boolean;
 }> {
   const endpoint = `/authors/${authorId}/follow`; 
   
@@ -1884,7 +2184,7 @@ async checkAuthorFollowStatus(authorId: number): Promise<{
 /**
  * Get all authors the current user is following
  */
-async getFollowedAuthors(): Promise<{
+async getFollowedAuthors(options: { cursor?: string; limit?: number } = {}): Promise<{
   authors: Array<{
     author_id: number;
     name: string;
@@ -1901,8 +2201,15 @@ async getFollowedAuthors(): Promise<{
     };
   }>;
   total: number;
+  limit: number;
+  has_more: boolean;
+  next_cursor: string | null;
 }> {
-  return this.makeRequest('/author/following', {
+  const params = new URLSearchParams();
+  if (options.cursor) params.append('cursor', options.cursor);
+  if (options.limit) params.append('limit', String(options.limit));
+  const query = params.toString() ? `?${params.toString()}` : '';
+  return this.makeRequest(`/author/following${query}`, {
     method: 'GET',
   });
 }
@@ -1910,7 +2217,10 @@ async getFollowedAuthors(): Promise<{
 /**
  * Get followers of an author (public endpoint)
  */
-async getAuthorFollowers(authorId: number): Promise<{
+async getAuthorFollowers(
+  authorId: number,
+  options: { cursor?: string; limit?: number } = {}
+): Promise<{
   followers: Array<{
     user_id: number;
     username: string;
@@ -1919,8 +2229,15 @@ async getAuthorFollowers(authorId: number): Promise<{
     followed_at: string;
   }>;
   total: number;
+  limit: number;
+  has_more: boolean;
+  next_cursor: string | null;
 }> {
-  const endpoint = `/authors/${authorId}/followers`;
+  const params = new URLSearchParams();
+  if (options.cursor) params.append('cursor', options.cursor);
+  if (options.limit) params.append('limit', String(options.limit));
+  const query = params.toString() ? `?${params.toString()}` : '';
+  const endpoint = `/authors/${authorId}/followers${query}`;
   
   return this.makePublicRequest(endpoint, {
     method: 'GET',
@@ -1968,6 +2285,28 @@ async removeBookFromList(
   });
 }
 
+/**
+ * Add, remove or move up to 500 books across the user's lists atomically
+ * POST /lists/books/bulk
+ */
+async bulkUpdateListBooks(
+  operations: Array<
+    | { op: 'add' | 'remove'; book_id: number; list_id: number }
+    | { op: 'move'; book_id: number; list_id: number; from_list_id: number }
+  >
+): Promise<{
+  message: string;
+  operations: number;
+  added: number;
+  removed: number;
+  lists: number[];
+}> {
+  return this.makeRequest(`${awsConfig.api.endpoints.lists}/books/bulk`, {
+    method: 'POST',
+    body: JSON.stringify({ operations }),
+  });
+}
+
 /**
  * Get which lists contain a specific book
  * GET /books/{book_id}/lists
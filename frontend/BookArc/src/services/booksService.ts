@@ -45,40 +45,92 @@ async function getAuthHeaders(): Promise<Record<string, string>> {
 }
 
 /**
- * Fetch all books from backend (RDS)
+ * One page of the keyset-paginated GET /books endpoint
+ */
+export interface BookPage {
+  books: Book[];
+  next_cursor: string | null;
+  limit: number;
+}
+
+export interface BookPageParams {
+  limit?: number;
+  cursor?: string | null;
+  fields?: string[];
+  genre?: string;
+  author?: string;
+  year?: number;
+}
+
+// Transform API response to match Book interface
+function mapBook(book: any): Book {
+  return {
+    id: book.id || book.book_id,
+    title: book.title,
+    author: book.author,
+    rating: book.rating || book.average_rating || 0,
+    totalRatings: book.totalRatings || book.total_ratings || book.reviews || 0,
+    reviews: book.reviews || book.totalRatings || book.total_ratings || 0,
+    cover: book.cover || book.coverUrl || book.cover_image_url || "",
+    coverUrl: book.coverUrl || book.cover || book.cover_image_url || "",
+    genre: book.genre || "Unknown",
+    description: book.description || book.summary || "",
+    publishYear: book.publishYear || book.publish_year || new Date().getFullYear(),
+    isTrending: book.isTrending || book.is_trending || false,
+  };
+}
+
+/**
+ * Fetch a single page of books from backend (RDS)
+ * Pass the previous page's next_cursor to continue where it left off
+ */
+export async function getBooksPage(params: BookPageParams = {}): Promise<BookPage> {
+  const headers = await getAuthHeaders();
+
+  const query = new URLSearchParams();
+  if (params.limit) query.set("limit", String(params.limit));
+  if (params.cursor) query.set("cursor", params.cursor);
+  if (params.fields?.length) query.set("fields", params.fields.join(","));
+  if (params.genre) query.set("genre", params.genre);
+  if (params.author) query.set("author", params.author);
+  if (params.year) query.set("year", String(params.year));
+
+  const queryString = query.toString();
+  const response = await fetch(queryString ? `${API_URL}?${queryString}` : API_URL, {
+    headers,
+  });
+
+  if (!response.ok) {
+    const errorText = await response.text();
+    console.error("API Error Response:", errorText);
+    throw new Error(`Failed to fetch books: ${response.status} ${response.statusText}`);
+  }
+
+  const data = await response.json();
+
+  return {
+    books: data.books.map(mapBook),
+    next_cursor: data.next_cursor,
+    limit: data.limit,
+  };
+}
+
+/**
+ * Fetch all books from backend (RDS) by walking every page
  * Note: Books are publicly accessible, no authentication required
  */
 export async function getAllBooks(): Promise<Book[]> {
   try {
-    const headers = await getAuthHeaders();
-
-    const response = await fetch(API_URL, {
-      headers,
-    });
+    const books: Book[] = [];
+    let cursor: string | null = null;
 
-    if (!response.ok) {
-      const errorText = await response.text();
-      console.error("API Error Response:", errorText);
-      throw new Error(`Failed to fetch books: ${response.status} ${response.statusText}`);
-    }
+    do {
+      const page: BookPage = await getBooksPage({ limit: 200, cursor });
+      books.push(...page.books);
+      cursor = page.next_cursor;
+    } while (cursor);
 
-    const data = await response.json();
-    
-    // Transform API response to match Book interface
-    return data.map((book: any) => ({
-      id: book.id || book.book_id,
-      title: book.title,
-      author: book.author,
-      rating: book.rating || book.average_rating || 0,
-      totalRatings: book.totalRatings || book.total_ratings || book.reviews || 0,
-      reviews: book.reviews || book.totalRatings || book.total_ratings || 0,
-      cover: book.cover || book.coverUrl || book.cover_image_url || "",
-      coverUrl: book.coverUrl || book.cover || book.cover_image_url || "",
-      genre: book.genre || "Unknown",
-      description: book.description || book.summary || "",
-      publishYear: book.publishYear || book.publish_year || new Date().getFullYear(),
-      isTrending: book.isTrending || book.is_trending || false,
-    }));
+    return books;
   } catch (error) {
     console.error("Error in getAllBooks:", error);
     throw error;